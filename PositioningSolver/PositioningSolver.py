@@ -4,17 +4,32 @@ from PositioningSolver.src.algorithms import __algorithms_description__
 from PositioningSolver.src.common_log.logger import clean_logs
 
 
-def PositioningSolver(algorithm_id, config_file):
+def PositioningSolver(algorithm_id, config_file, resume=False):
     clean_logs()
 
     print(f"Running {__algorithms_description__[algorithm_id]['description']} with config file {config_file} ...")
+    if resume and algorithm_id != 0:
+        print("Option --resume is only available for the GNSS Single Point Positioning algorithm. Ignored")
 
     if algorithm_id == 0:
         # run GNSS Single Point Positioning for 1 Constellation and 1 Frequency
-        scripts.gnss_spp.main(config_file)
+        scripts.gnss_spp.main(config_file, resume=resume)
 
     if algorithm_id == 1:
         # run GNSS Single Point Positioning for 1 Constellation and 1 Frequency
         scripts.gnss_plots.main(config_file)
 
+    if algorithm_id == 2:
+        # run the benchmark of the GNSS SPP pipeline with synthetic observation data
+        scripts.gnss_benchmark.main(config_file)
+
+    if algorithm_id == 3:
+        # simulate a RINEX observation file (GPS L1 / L2) from broadcast or precise orbits
+        scripts.gnss_simulator.main(config_file)
+
+    if algorithm_id == 4:
+        # run GNSS Single Point Positioning on a real-time stream of observations (socket, pipe or replay of RINEX
+        # files)
+        scripts.gnss_stream.main(config_file)
+
     print("Successfully ran", __algorithms_description__[algorithm_id]["description"], "\n")
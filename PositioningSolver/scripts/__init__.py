@@ -1 +1 @@
-from . import gnss_spp, gnss_plots
+from . import gnss_spp, gnss_plots, gnss_benchmark, gnss_simulator, gnss_stream
@@ -0,0 +1,74 @@
+import json
+import os
+import time
+
+from PositioningSolver.src import set_logs
+from PositioningSolver.src.common_log import get_logger
+from ..src.benchmark import BenchmarkHarness, compare_results
+from ..src.config import config
+from ..src.utils.errors import ConfigError
+
+__code__ = "gnss_benchmark"
+
+
+def setup(path_to_config_file):
+    # read user configurations
+    config.read_configure_json(path_to_config_file)
+
+    # create output folder if it does not exist yet
+    output_path = config["outputs"]["output_path"]
+    os.makedirs(output_path, exist_ok=True)
+
+    set_logs(config, output_path)
+    open(output_path + "/log.txt", 'w').close()
+
+    return output_path
+
+
+def main(path_to_config_file):
+    output_path = setup(path_to_config_file)
+    main_log = get_logger("main")
+    main_log.info(f"Successfully read config file {path_to_config_file}")
+
+    try:
+        harness = BenchmarkHarness(config, output_path)
+        results = harness.run()
+    except (ConfigError, RuntimeError) as e:
+        main_log.exception(f"Exception in benchmark:\n{e}")
+        exit(-1)
+
+    # compare with the results of a previous run
+    previous_file = config.get("outputs", "compare_with", fallback=False)
+    if previous_file:
+        with open(previous_file) as f:
+            results["comparison"] = {"file": previous_file, "throughput_ratio": compare_results(results, json.load(f))}
+
+    results_file = os.path.join(output_path, f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(results_file, "w") as f:
+        json.dump(results, f, indent=3)
+
+    for name, startup in results.get("startup", {}).items():
+        print(f"startup {name}: median {startup['median[s]']:.3f} [s], budget {startup['budget[s]']:.3f} [s]" +
+              ("" if startup["within_budget"] else " -> EXCEEDED") +
+              (f", loaded {startup['loaded_packages']}" if startup.get("loaded_packages") else ""))
+
+    for name, case in results["cases"].items():
+        throughput = case["throughput[epochs/s]"]
+        latency = case["epoch_latency[s]"] or {}
+        print(f"{name}: {case['epochs']} epochs, " +
+              ", ".join(f"{stage} {throughput[stage]:.1f}" for stage in throughput
+                        if "/" not in stage and throughput[stage]) +
+              f" [epochs/s], peak memory {case['peak_memory[MB]']['total']} [MB], median epoch latency "
+              f"{latency.get('median', float('nan')) * 1E3:.3f} [ms]")
+        if name in results.get("comparison", {}).get("throughput_ratio", {}):
+            ratios = results["comparison"]["throughput_ratio"][name]
+            print("\tthroughput ratio to previous run: " +
+                  ", ".join(f"{stage} {ratio:.2f}" for stage, ratio in ratios.items() if "/" not in stage))
+
+    main_log.info(f"Benchmark results written to {results_file}")
+
+    # startup check: error exit status if a budget is exceeded or a headless run imported the plotting stack
+    if not all(startup["within_budget"] for startup in results.get("startup", {}).values()) or \
+            any(case["loaded_packages"] for case in results["cases"].values()):
+        main_log.error(f"Startup budget check failed (see {results_file})")
+        exit(1)
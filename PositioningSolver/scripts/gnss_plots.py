@@ -1,11 +1,32 @@
-from numpy import sqrt
+import os
 
-from ..src.io_manager.import_timeseries import read_timeseries
-from ..src.plots.plot_manager import *
+import numpy as np
+
+from ..src.io_manager.import_timeseries import read_table
 from ..src.config import config
 
 
+def get_table_file(path, name):
+    """
+    Returns the output table of a run, in any of the output formats (text, npz or parquet)
+
+    Args:
+        path (str) : output directory of the run
+        name (str) : name of the table (file name without extension)
+    Return:
+        str : path of the table file (the text file if there is none)
+    """
+    for extension in (".txt", ".npz", ".parquet"):
+        file = path + "/output/" + name + extension
+        if os.path.exists(file):
+            return file
+    return path + "/output/" + name + ".txt"
+
+
 def main(file):
+    # the plotting stack (matplotlib) is only imported when this script runs
+    from ..src.plots.plot_manager import plot_1D, plot_2D_trajectory, show_all
+
     config.read_configure_json(file)
 
     pt_ax = rms_ax = enu_ax = dop_ax = None
@@ -16,19 +37,19 @@ def main(file):
 
         # Clock bias vs time plot
         try:
-            pt_file = path + "/output/PositionTime.txt"
-            time, data = read_timeseries(pt_file, 0, 7)
+            pt_file = get_table_file(path, "PositionTime")
+            time, data = read_table(pt_file, "clock_dt[s]")
 
-            pt_ax = plot_1D(time, data[0], label=name, x_label="Time", y_label="Clock bias [s]",
+            pt_ax = plot_1D(time, data["clock_dt[s]"], label=name, x_label="Time", y_label="Clock bias [s]",
                             title="Receiver Clock Bias", set_legend=True, ax=pt_ax)
         except Exception as e:
             print(f"Error reading file {pt_file} due to exception {e}")
 
         # 3D RMS vs Time plot
         try:
-            rms_file = path + "/output/RMS_ECEF.txt"
-            time, (x, y, z) = read_timeseries(rms_file, 0, 1, 2, 3)
-            rms = [sqrt(x[i] ** 2 + y[i] ** 2 + z[i] ** 2) for i in range(len(x))]
+            rms_file = get_table_file(path, "RMS_ECEF")
+            time, data = read_table(rms_file, "x_RMS[m]", "y_RMS[m]", "z_RMS[m]")
+            rms = np.sqrt(data["x_RMS[m]"] ** 2 + data["y_RMS[m]"] ** 2 + data["z_RMS[m]"] ** 2)
 
             rms_ax = plot_1D(time, rms, label=name, x_label="Time", y_label="RMS [m]", title="Estimation RMS error",
                              set_legend=True, ax=rms_ax)
@@ -37,21 +58,21 @@ def main(file):
 
         # Horizontal error: East vs North scatter plot
         try:
-            enu_file = path + "/output/RMS_ENU.txt"
-            time, (east, north, up) = read_timeseries(enu_file, 0, 1, 2, 3)
+            enu_file = get_table_file(path, "RMS_ENU")
+            time, data = read_table(enu_file, "east_RMS[m]", "north_RMS[m]")
 
-            enu_ax = plot_2D_trajectory(east, north, label=name, x_label="East [m]", y_label="North [m]",
-                                        title="Horizontal error", set_legend=True, ax=enu_ax)
+            enu_ax = plot_2D_trajectory(data["east_RMS[m]"], data["north_RMS[m]"], label=name, x_label="East [m]",
+                                        y_label="North [m]", title="Horizontal error", set_legend=True, ax=enu_ax)
         except Exception as e:
             print(f"Error reading file {enu_file} due to exception {e}")
 
         # Geometry DOP vs Time plot
         try:
-            dop_file = path + "/output/DOPs.txt"
-            time, geometry = read_timeseries(dop_file, 0, 1)
+            dop_file = get_table_file(path, "DOPs")
+            time, data = read_table(dop_file, "geometry_DOP")
 
-            dop_ax = plot_1D(time, geometry[0], label=name, x_label="Time", y_label="DOP [m]", title="Geometry DOP",
-                             set_legend=True, ax=dop_ax)
+            dop_ax = plot_1D(time, data["geometry_DOP"], label=name, x_label="Time", y_label="DOP [m]",
+                             title="Geometry DOP", set_legend=True, ax=dop_ax)
         except Exception as e:
             print(f"Error reading file {dop_file} due to exception {e}")
 
@@ -0,0 +1,100 @@
+import glob
+import os
+import time
+
+import numpy as np
+
+from PositioningSolver.src import set_logs
+from PositioningSolver.src.common_log import get_logger
+from ..src.config import config
+from ..src.data_types.basics.Epoch import Epoch
+from ..src.data_types.containers.NavigationData import NavigationDataMap
+from ..src.data_types.containers.SP3Data import SP3Data
+from ..src.io_manager.import_rinex.RinexNavReaderGPS import RinexNavReaderGPS
+from ..src.io_manager.import_sp3 import Sp3Reader
+from ..src.simulator import BroadcastOrbitSource, ObservationSimulator, ReceiverTrajectory, SP3OrbitSource
+from ..src.utils.errors import ConfigError, FileError
+
+__code__ = "gnss_simulator"
+
+
+def setup(path_to_config_file):
+    # read user configurations
+    config.read_configure_json(path_to_config_file)
+
+    # create output folder if it does not exist yet
+    output_path = config["outputs"]["output_path"]
+    os.makedirs(output_path, exist_ok=True)
+
+    # the log is written to its own folder (by default 'log', next to the output folder), so that the output folder
+    # only has RINEX files and can be used as the observation input folder of the PVT runs
+    log_path = config.get("outputs", "log_path",
+                          fallback=os.path.join(os.path.dirname(os.path.normpath(output_path)), "log"))
+    os.makedirs(log_path, exist_ok=True)
+
+    set_logs(config, log_path)
+    open(os.path.join(log_path, "log.txt"), 'w').close()
+
+    return output_path
+
+
+def _read_files(path, reader, container):
+    files = glob.glob(path + "/*")
+    if len(files) == 0:
+        raise ConfigError(f"No input file found in {path}")
+    for file in files:
+        reader(file, container)
+    return container
+
+
+def get_orbit_source(first_epoch):
+    nav_data = _read_files(config["orbits"]["rinex_nav_dir_path"], RinexNavReaderGPS, NavigationDataMap())
+
+    source = config["orbits"]["select"]
+    if source == 0:
+        return BroadcastOrbitSource(nav_data, first_epoch)
+    if source == 1:
+        sp3_data = _read_files(config["orbits"]["sp3_dir_path"],
+                               lambda file, data: Sp3Reader(file, data, satellite_systems="G"), SP3Data())
+        return SP3OrbitSource(sp3_data, first_epoch, nav_data)
+    raise ConfigError(f"Unknown orbit source {source} (0: broadcast ephemerides, 1: SP3 precise orbits)")
+
+
+def get_receiver():
+    trajectory_file = config.get("receiver", "trajectory_file", fallback=False)
+    if trajectory_file:
+        return ReceiverTrajectory.from_file(trajectory_file)
+    position = config["receiver"]["position"]
+    return ReceiverTrajectory(np.array([position["x_ecef"], position["y_ecef"], position["z_ecef"]]))
+
+
+def main(path_to_config_file):
+    output_path = setup(path_to_config_file)
+    main_log = get_logger("main")
+    main_log.info(f"Successfully read config file {path_to_config_file}")
+
+    errors = config["errors"]
+    try:
+        first_epoch = Epoch(config["arc"]["first_epoch"])
+        simulator = ObservationSimulator(
+            get_orbit_source(first_epoch), get_receiver(),
+            elevation_mask=errors["elevation_mask"],
+            code_sigma=errors["code_sigma"], phase_sigma=errors["phase_sigma"], doppler_sigma=errors["doppler_sigma"],
+            clock_bias=errors["receiver_clock"]["bias"], clock_drift=errors["receiver_clock"]["drift"],
+            clock_bias_psd=errors["receiver_clock"]["bias_psd"], clock_drift_psd=errors["receiver_clock"]["drift_psd"],
+            ionosphere=bool(errors["ionosphere"]), troposphere=bool(errors["troposphere"]),
+            multipath_amplitude=errors["multipath_amplitude"], cycle_slip_rate=errors["cycle_slip_rate"],
+            seed=config.get("errors", "seed", fallback=1))
+
+        start = time.perf_counter()
+        observations = simulator.simulate(first_epoch, config["arc"]["length"], config["arc"]["rate"])
+        main_log.info(f"Simulated {len(observations.epochs_offset)} epochs ({len(observations)} satellite "
+                      f"observations) in {time.perf_counter() - start:.3f} [s]")
+
+        start = time.perf_counter()
+        file_path = observations.write_rinex(os.path.join(output_path, config["outputs"]["file_name"]))
+    except (ConfigError, FileError) as e:
+        main_log.exception(f"Exception in simulator:\n{e}")
+        exit(-1)
+
+    main_log.info(f"Simulated observation file written to {file_path} in {time.perf_counter() - start:.3f} [s]")
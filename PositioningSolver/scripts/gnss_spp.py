@@ -1,22 +1,25 @@
 import os
 
-from PositioningSolver.src import set_logs
-from PositioningSolver.src.common_log import get_logger
+from PositioningSolver.src import set_logs, set_profiling
+from PositioningSolver.src.common_log import get_logger, get_profiler
 from ..src.algorithms.gnss.gnss_solver.gps_solver import GPSSolver
 from ..src.algorithms.gnss.preprocessor.preprocessor_manager import Preprocessor
 from ..src.config import config, validate_config
 
 from ..src.data_types.containers.DataManager import GNSSDataManager
+from ..src.data_types.containers.TimeSeries import TimeSeries
 from ..src.data_types.gnss.Constellation import SatelliteSystem
 from ..src.data_types.orbits.statevector import Position
+from ..src.io_manager.export import TRACE_STAGES, CheckpointJournal, TableWriter, TraceWriter, get_run_fingerprint
 from ..src.io_manager.import_rinex import read_data
+from ..src.io_manager.import_timeseries import read_timeseries
 from ..src.quality_check.qm_gnss import GNSSQualityManager
 from ..src.utils.errors import ConfigError
 
 __code__ = "gnss_spp"
 
 
-def setup(path_to_config_file):
+def setup(path_to_config_file, resume=False):
     # read user configurations
     config.read_configure_json(path_to_config_file)
     try:
@@ -39,54 +42,166 @@ def setup(path_to_config_file):
         # Create the new directory because it does not exist
         os.makedirs(trace_path)
 
-    # set up loggers
+    # set up loggers and profiler
     set_logs(config, output_path)
+    set_profiling(config, output_path)
 
-    # create and clean log file
-    open(output_path + "/log.txt", 'w').close()
+    # create and clean log file (the log of the interrupted run is kept when resuming)
+    if not resume:
+        open(output_path + "/log.txt", 'w').close()
 
     return output_path, trace_path
 
 
+def get_constellations(constellations, observations):
+    """
+    Parses the user-defined constellations and observations (services). The constellation may be a single system
+    ("GPS" or "GAL") or a list of systems, and the observations a string (the same services for all constellations) or
+    a dict with the services of each constellation
+
+    Return:
+        list [tuple [SatelliteSystem, str]] : the constellations to process and the corresponding services
+    """
+    if isinstance(constellations, str):
+        constellations = [constellations]
+
+    out = []
+    for constellation in constellations:
+        constellation = SatelliteSystem(constellation)
+        services = observations[constellation] if isinstance(observations, dict) else observations
+        out.append((constellation, services))
+    return out
+
+
+def get_trace_writer(trace_path):
+    """
+    Builds the writer of the trace files from the user configurations (`outputs/trace`). If not configured, all trace
+    files are written, uncompressed and without size limit
+
+    Return:
+        TraceWriter : the trace files writer
+    """
+    if not config.get("outputs", "trace", "select", fallback=1):
+        stages = {stage: False for stage in TRACE_STAGES}
+    else:
+        stages = {stage: config.get("outputs", "trace", "stages", stage, fallback=1) for stage in TRACE_STAGES}
+
+    return TraceWriter(trace_path, stages,
+                       compression=config.get("outputs", "trace", "compression", fallback="none"),
+                       max_size=config.get("outputs", "trace", "max_size", fallback=0))
+
+
+def get_checkpoint_journal(output_path, data_manager):
+    """
+    Builds the journal of the solver checkpoints from the user configurations (`outputs/checkpoint`). Disabled by
+    default. When enabled, a checkpoint is written every minute (by default)
+
+    Return:
+        CheckpointJournal or None : the checkpoint journal (None if disabled)
+    """
+    if not config.get("outputs", "checkpoint", "select", fallback=0):
+        return None
+    fingerprint = get_run_fingerprint(config, [config["inputs"]["rinex_obs_dir_path"],
+                                               config["inputs"]["rinex_nav_dir_path"]])
+    return CheckpointJournal(output_path + "checkpoint.journal", data_manager.get_outputs(), fingerprint,
+                             interval=config.get("outputs", "checkpoint", "interval", fallback=60.0))
+
+
+def get_true_position():
+    """
+    Builds the true receiver position from the user configurations: the static true position
+    (`performance_evaluation/true_position`), or a reference trajectory (`performance_evaluation/reference_trajectory`),
+    a comma separated file with a header line and columns time stamp, x, y and z (ECEF frame) [m], as the
+    `PositionTime` output table
+
+    Return:
+        Position or TimeSeries : the static true position, or the reference trajectory (time series of positions)
+    """
+    reference_file = config.get("performance_evaluation", "reference_trajectory", fallback="")
+    if not reference_file:
+        return Position([config["performance_evaluation"]["true_position"]["x_ecef"],
+                         config["performance_evaluation"]["true_position"]["y_ecef"],
+                         config["performance_evaluation"]["true_position"]["z_ecef"]],
+                        None, "ECEF", "cartesian")
+
+    time, (x, y, z) = read_timeseries(reference_file, 0, 1, 2, 3)
+    trajectory = TimeSeries()
+    for epoch, position in zip(time, zip(x, y, z)):
+        trajectory.set_data(epoch, position)
+    return trajectory
+
+
 def validate_services(service_manager):
-    # Currently, only GPS L1 / L2 data is allowed
-    if len(service_manager.getServicesForGAL()) > 0:
-        raise ConfigError(f"In the current software version, only GPS L1 and/or L2 data is allowed."
-                          f"\nPlease change Galileo to GPS")
+    # Currently, only GPS L1 / L2 and Galileo E1 / E5a data is allowed
+    allowed = {"GPS": {1: "L1", 2: "L2"}, "GAL": {1: "E1", 5: "E5a"}}
 
-    gps_service = service_manager.getServicesForGPS()
-    for freq in gps_service:
-        if int(freq[0]) != 1 and int(freq[0]) != 2:
-            raise ConfigError(f"In the current software version, only GPS L1 and/or L2 data is allowed."
-                              f"\nPlease change Frequency L{int(freq[0])} to the allowed ones")
+    bands = {}
+    for constellation, services in service_manager.items():
+        if len(services) == 0:
+            continue
+        bands[constellation] = {int(service[0]) for service in services}
+        for band in bands[constellation]:
+            if band not in allowed[constellation]:
+                raise ConfigError(f"In the current software version, only GPS L1 and/or L2 and Galileo E1 and/or E5a "
+                                  f"data is allowed.\nPlease change {constellation} frequency {band} to the allowed "
+                                  f"ones")
 
+    # observables in the same frequency band share the same datatypes (e.g., GPS L1 and Galileo E1 pseudoranges are
+    # both C1), so all constellations must be processed with the same frequency bands
+    if len({frozenset(band) for band in bands.values()}) > 1:
+        raise ConfigError(f"In multi-constellation processing, all constellations must use the same frequency bands. "
+                          f"Selected bands are {bands}")
 
-def main(path_to_config_file):
+
+def main(path_to_config_file, resume=False):
     # construct data container object
     data_manager = GNSSDataManager()
 
     # initial setup (read config json file and create output directories)
-    output_path, trace_path = setup(path_to_config_file)
+    output_path, trace_path = setup(path_to_config_file, resume)
     main_log = get_logger("main")
     main_log.info(f"Successfully read config file {path_to_config_file}")
+    if resume:
+        main_log.info("Resuming the run from its last checkpoint")
+    profiler = get_profiler()
 
-    # set constellation and services
-    constellation = SatelliteSystem(config["model"]["constellation"])
-    observations = config["model"]["observations"]
-    data_manager.set_constellation(constellation, observations)
+    # output format of the solution tables (checked before processing)
+    output_format = config.get("outputs", "output_format", fallback="csv")
+    try:
+        TableWriter(output_path, output_format)
+    except ConfigError as e:
+        main_log.exception(f"Exception in selected output format:\n{e}")
+        exit(-1)
+
+    # trace files and checkpoints
+    try:
+        trace = get_trace_writer(trace_path)
+        checkpoint = get_checkpoint_journal(output_path, data_manager)
+    except ConfigError as e:
+        main_log.exception(f"Exception in trace / checkpoint configuration:\n{e}")
+        exit(-1)
+
+    # set constellations and services
+    for constellation, observations in get_constellations(config["model"]["constellation"],
+                                                          config["model"]["observations"]):
+        data_manager.set_constellation(constellation, observations)
 
     try:
         # 1 - Read Input Data
-        read_data(data_manager.services,
-                  data_manager.raw_obs_data,
-                  data_manager.obs_header,
-                  data_manager.nav_data,
-                  config["inputs"]["rinex_obs_dir_path"],
-                  config["inputs"]["rinex_nav_dir_path"],
-                  config["inputs"]["arc"]["fist_epoch"],
-                  config["inputs"]["arc"]["last_epoch"],
-                  config["inputs"]["snr_control"]["select"],
-                  trace_path)
+        with profiler.stage("read_data"):
+            read_data(data_manager.services,
+                      data_manager.raw_obs_data,
+                      data_manager.obs_header,
+                      data_manager.nav_data,
+                      config["inputs"]["rinex_obs_dir_path"],
+                      config["inputs"]["rinex_nav_dir_path"],
+                      config["inputs"]["arc"]["fist_epoch"],
+                      config["inputs"]["arc"]["last_epoch"],
+                      config["inputs"]["snr_control"]["select"],
+                      trace,
+                      workers=config.get("inputs", "read_workers", fallback=1),
+                      epoch_index=config.get("inputs", "epoch_index", "select", fallback=1),
+                      index_dir=config.get("inputs", "epoch_index", "cache_dir", fallback=""))
     except Exception as e:
         main_log.exception(f"Exception in Read Input Data:\n{e}")
         exit(-1)
@@ -103,13 +218,14 @@ def main(path_to_config_file):
     try:
         compute_iono_free = config["model"]["ionosphere"]["select"] == 2
         output_rate = config["model"]["rate"]["select"]
-        preprocessor = Preprocessor(trace_path,
+        preprocessor = Preprocessor(trace,
                                     data_manager.services,
-                                    constellation,
+                                    data_manager.get_constellations(),
                                     data_manager.raw_obs_data,
                                     compute_iono_free,
                                     output_rate)
-        data_manager.processed_obs_data = preprocessor.compute()
+        with profiler.stage("preprocessor"):
+            data_manager.processed_obs_data = preprocessor.compute()
     except Exception as e:
         main_log.exception(f"Exception occurred during Process Observation Data Module:\n{e}")
         exit(-1)
@@ -122,29 +238,55 @@ def main(path_to_config_file):
 
     # 3 - GNSS PVT solver module
     try:
-        solver = GPSSolver(observation_data, data_manager.nav_data, config)
-        solver.solve(data_manager.receiver_position, data_manager.receiver_clock,
-                     data_manager.prefit_residuals, data_manager.estimated_iono,
-                     data_manager.postfit_residuals, data_manager.DOPs, data_manager.sat_info)
+        with profiler.stage("gps_solver"):
+            solver = GPSSolver(observation_data, data_manager.nav_data, config, data_manager.obs_header)
+            solver.solve(data_manager.receiver_position, data_manager.receiver_clock,
+                         data_manager.prefit_residuals, data_manager.estimated_iono,
+                         data_manager.postfit_residuals, data_manager.DOPs, data_manager.sat_info,
+                         receiver_velocity=data_manager.receiver_velocity,
+                         receiver_clock_drift=data_manager.receiver_clock_drift,
+                         covariance=data_manager.state_covariance,
+                         inter_system_bias=data_manager.inter_system_bias,
+                         checkpoint=checkpoint, resume=resume)
     except Exception as e:
         main_log.exception(f"Exception occurred during GNSS PVT Solver Module:\n{e}")
         exit(-1)
 
     # 4 - Quality Check module
-    true_position = Position([config["performance_evaluation"]["true_position"]["x_ecef"],
-                              config["performance_evaluation"]["true_position"]["y_ecef"],
-                              config["performance_evaluation"]["true_position"]["z_ecef"]],
-                             None, "ECEF", "cartesian")
     try:
-        GNSSQualityManager.process(output_path, trace_path, true_position,
-                                   data_manager.receiver_position, data_manager.receiver_clock,
-                                   data_manager.prefit_residuals, data_manager.postfit_residuals,
-                                   data_manager.DOPs, data_manager.sat_info, data_manager.estimated_iono,
-                                   config["outputs"]["show_plots"])
+        true_position = get_true_position()
+        with profiler.stage("quality_check"):
+            GNSSQualityManager.process(output_path, trace, true_position,
+                                       data_manager.receiver_position, data_manager.receiver_clock,
+                                       data_manager.prefit_residuals, data_manager.postfit_residuals,
+                                       data_manager.DOPs, data_manager.sat_info, data_manager.estimated_iono,
+                                       config["outputs"]["show_plots"],
+                                       receiver_velocity=data_manager.receiver_velocity,
+                                       receiver_clock_drift=data_manager.receiver_clock_drift,
+                                       state_covariance=data_manager.state_covariance,
+                                       inter_system_bias=data_manager.inter_system_bias,
+                                       output_format=output_format)
     except Exception as e:
         main_log.exception(f"Exception occurred during Quality Check Module:\n{e}")
         exit(-1)
 
+    # write run metrics
+    if profiler.enabled:
+        profiler.write()
+        for stage, metrics in profiler.get_metrics()["stages"].items():
+            main_log.info(f"Stage {stage}: wall time {metrics['wall_time[s]']:.3f} [s], CPU time "
+                          f"{metrics['cpu_time[s]']:.3f} [s], peak memory {metrics['peak_memory[MB]']} [MB]")
+        logging_stats = profiler.get_metrics()["logging"]
+        main_log.info(f"Logging overhead: {logging_stats['records']} records, "
+                      f"{logging_stats['caller_time[s]']:.3f} [s] in the log calls, "
+                      f"{logging_stats['writer_time[s]']:.3f} [s] in the writer thread, "
+                      f"{logging_stats['aggregated_messages']} repeated messages aggregated")
+        main_log.info(f"Run metrics written to {output_path}metrics.json")
+
+    # the run is complete: the checkpoints are no longer needed
+    if checkpoint is not None:
+        checkpoint.remove()
+
     main_log.info("Successfully ran this scenario!")
 
 
@@ -0,0 +1,179 @@
+import asyncio
+import os
+
+from PositioningSolver.src import set_logs, set_profiling
+from PositioningSolver.src.common_log import get_logger, get_profiler
+from ..src.algorithms.gnss.gnss_solver.streaming_pvt import StreamingPVT
+from ..src.config import config
+from ..src.data_types.containers.DataManager import GNSSDataManager
+from ..src.data_types.orbits.statevector import Position
+from ..src.io_manager.export import TableWriter
+from ..src.io_manager.import_rinex import read_data
+from ..src.io_manager.stream import FixPublisher, ReplayServer, StreamReceiver
+from ..src.quality_check.qm_gnss import GNSSQualityManager
+from ..src.utils.errors import ConfigError
+from .gnss_spp import get_constellations, get_trace_writer, validate_services
+
+__code__ = "gnss_stream"
+
+
+def setup(path_to_config_file):
+    # read user configurations
+    config.read_configure_json(path_to_config_file)
+
+    # create output folders if they do not exist yet
+    output_path = config["outputs"]["output_path"] + "/output/"
+    trace_path = output_path + "trace/"
+    os.makedirs(trace_path, exist_ok=True)
+
+    # set up loggers and profiler
+    set_logs(config, output_path)
+    set_profiling(config, output_path)
+    open(output_path + "/log.txt", 'w').close()
+
+    return output_path, trace_path
+
+
+def get_replay_server(trace):
+    """
+    Builds the replay server of the RINEX input files (`inputs`), streamed with the selected speed factor
+
+    Return:
+        ReplayServer : the replay server
+    """
+    replay_data = GNSSDataManager()
+    for constellation, observations in get_constellations(config["model"]["constellation"],
+                                                          config["model"]["observations"]):
+        replay_data.set_constellation(constellation, observations)
+
+    read_data(replay_data.services, replay_data.raw_obs_data, replay_data.obs_header, replay_data.nav_data,
+              config["inputs"]["rinex_obs_dir_path"], config["inputs"]["rinex_nav_dir_path"],
+              config["inputs"]["arc"]["fist_epoch"], config["inputs"]["arc"]["last_epoch"],
+              config["inputs"]["snr_control"]["select"], trace,
+              workers=config.get("inputs", "read_workers", fallback=1),
+              epoch_index=config.get("inputs", "epoch_index", "select", fallback=1),
+              index_dir=config.get("inputs", "epoch_index", "cache_dir", fallback=""))
+    return ReplayServer(replay_data.raw_obs_data, replay_data.nav_data,
+                        speed=config.get("stream", "replay", "speed", fallback=1.0))
+
+
+async def run_stream(receiver, replay=None):
+    """
+    Receives the stream until its end. With a replay server, the server and the receiver run concurrently
+    """
+    if replay is None:
+        await receiver.run()
+
+    elif receiver.protocol == "tcp":
+        ready = asyncio.Event()
+        server = asyncio.create_task(replay.serve_tcp(receiver.host, receiver.port, ready))
+        await ready.wait()
+        await receiver.run()
+        await server
+
+    elif receiver.protocol == "udp":
+        ready = asyncio.Event()
+        reception = asyncio.create_task(receiver.run(ready))
+        await ready.wait()
+        await replay.send_udp(receiver.host, receiver.port)
+        await reception
+
+    else:
+        if not os.path.exists(receiver.pipe_path):
+            os.mkfifo(receiver.pipe_path)
+        await asyncio.gather(receiver.run(), replay.write_pipe(receiver.pipe_path))
+
+
+def main(path_to_config_file):
+    # construct data container object (navigation data store and output timeseries)
+    data_manager = GNSSDataManager()
+
+    output_path, trace_path = setup(path_to_config_file)
+    main_log = get_logger("main")
+    main_log.info(f"Successfully read config file {path_to_config_file}")
+    profiler = get_profiler()
+
+    try:
+        output_format = config.get("outputs", "output_format", fallback="csv")
+        TableWriter(output_path, output_format)
+        trace = get_trace_writer(trace_path)
+
+        for constellation, observations in get_constellations(config["model"]["constellation"],
+                                                              config["model"]["observations"]):
+            data_manager.set_constellation(constellation, observations)
+        validate_services(data_manager.services)
+
+        session = StreamingPVT(data_manager, config, config["model"]["ionosphere"]["select"] == 2,
+                               config["model"]["rate"]["select"])
+        publisher = FixPublisher(output_path + config.get("stream", "publish", "file_name", fallback="fixes.jsonl"),
+                                 config.get("stream", "publish", "udp_address", fallback=None))
+        session.subscribe(publisher)
+
+        receiver = StreamReceiver(session.handle,
+                                  protocol=config["stream"]["protocol"],
+                                  host=config.get("stream", "host", fallback="127.0.0.1"),
+                                  port=config.get("stream", "port", fallback=5050),
+                                  pipe_path=config.get("stream", "pipe_path", fallback=None),
+                                  timeout=config.get("stream", "timeout", fallback=10.0))
+
+        replay = None
+        if config.get("stream", "replay", "select", fallback=0):
+            with profiler.stage("read_data"):
+                replay = get_replay_server(trace)
+            main_log.info(f"Replaying the input files over {receiver.protocol} with speed factor {replay.speed}")
+    except (ConfigError, AttributeError) as e:
+        main_log.exception(f"Exception in stream configuration:\n{e}")
+        exit(-1)
+
+    # 1 - Receive the stream and compute the fixes in real time
+    try:
+        with profiler.stage("stream"):
+            asyncio.run(run_stream(receiver, replay))
+        session.finish()
+        publisher.close()
+    except Exception as e:
+        main_log.exception(f"Exception occurred during the stream reception:\n{e}")
+        exit(-1)
+
+    latency_target = config.get("stream", "latency_target", fallback=0.01)
+    stats = session.get_latency_stats(latency_target)
+    main_log.info(f"Received {receiver.decoder.frames} frames ({receiver.bytes_received} bytes, "
+                  f"{receiver.decoder.crc_errors} CRC errors), {stats['epochs']} epochs processed, "
+                  f"{stats['fixes']} fixes published")
+    for name, description in (("latency[s]", "Fix latency"), ("end_to_end_latency[s]", "End-to-end fix latency"),
+                              ("solver_time[s]", "PVT computation time")):
+        if stats[name] is not None:
+            main_log.info(f"{description}: median {stats[name]['median'] * 1E3:.3f} [ms], 95% "
+                          f"{stats[name]['p95'] * 1E3:.3f} [ms], max {stats[name]['max'] * 1E3:.3f} [ms]")
+    if stats["fixes"] == 0:
+        main_log.error("No fix was computed from the stream")
+        exit(-1)
+    if not stats["within_target"]:
+        main_log.warning(f"Fix latency above the target of {latency_target * 1E3:.1f} [ms]")
+
+    # 2 - Quality Check module (fixes stored by the streaming session)
+    true_position = Position([config["performance_evaluation"]["true_position"]["x_ecef"],
+                              config["performance_evaluation"]["true_position"]["y_ecef"],
+                              config["performance_evaluation"]["true_position"]["z_ecef"]],
+                             None, "ECEF", "cartesian")
+    try:
+        with profiler.stage("quality_check"):
+            GNSSQualityManager.process(output_path, trace, true_position,
+                                       data_manager.receiver_position, data_manager.receiver_clock,
+                                       data_manager.prefit_residuals, data_manager.postfit_residuals,
+                                       data_manager.DOPs, data_manager.sat_info, data_manager.estimated_iono,
+                                       config["outputs"]["show_plots"],
+                                       receiver_velocity=data_manager.receiver_velocity,
+                                       receiver_clock_drift=data_manager.receiver_clock_drift,
+                                       state_covariance=data_manager.state_covariance,
+                                       inter_system_bias=data_manager.inter_system_bias,
+                                       output_format=output_format)
+    except Exception as e:
+        main_log.exception(f"Exception occurred during Quality Check Module:\n{e}")
+        exit(-1)
+
+    if profiler.enabled:
+        profiler.write()
+        main_log.info(f"Run metrics written to {output_path}metrics.json")
+
+    main_log.info("Successfully ran this scenario!")
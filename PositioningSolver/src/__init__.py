@@ -1,5 +1,6 @@
 # set the logger
 from .common_log.logger import get_logger, clean_logs
+from .common_log.profiler import get_profiler, set_profiler, Profiler, NullProfiler
 
 
 def set_logs(config, output_path):
@@ -19,3 +20,14 @@ def set_logs(config, output_path):
 
     get_logger("quality_check", file_level=config.get("log", "minimum_level", fallback="INFO"),
                file_path=output_path + "/log.txt")
+
+
+def set_profiling(config, output_path):
+    # profiling of the pipeline stages (disabled by default, see common_log.profiler)
+    if config.get("profiling", "select", fallback=0) == 1:
+        set_profiler(Profiler(output_path,
+                              memory=config.get("profiling", "memory", fallback=0) == 1,
+                              cprofile=config.get("profiling", "cprofile", fallback=0) == 1,
+                              per_epoch=config.get("profiling", "per_epoch", fallback=0) == 1))
+    else:
+        set_profiler(NullProfiler())
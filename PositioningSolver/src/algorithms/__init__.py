@@ -8,6 +8,21 @@ __algorithms_description__ = {
     1: {
         "code": "gnss_plots",
         "description": "Plotting GNSS PVT results"
+    },
+
+    2: {
+        "code": "gnss_benchmark",
+        "description": "Benchmark of the GNSS parsing, preprocessing and PVT throughput"
+    },
+
+    3: {
+        "code": "gnss_simulator",
+        "description": "Simulation of GNSS observation data"
+    },
+
+    4: {
+        "code": "gnss_stream",
+        "description": "Real-time GNSS Single Point Positioning from a stream of observations"
     }
 }
 
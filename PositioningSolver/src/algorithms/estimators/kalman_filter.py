@@ -0,0 +1,119 @@
+import numpy as np
+
+
+class ExtendedKalmanFilter:
+    """
+    Discrete Extended Kalman Filter (EKF) for the non-linear system
+        * x(k) = F @ x(k-1) + w,       w ~ N(0, Q)     (state transition, linear in our applications)
+        * z(k) = h(x(k)) + v,          v ~ N(0, R)     (observation equation)
+    where
+        * x - state vector
+        * z - observation vector
+        * F - state transition matrix
+        * Q - process noise covariance matrix
+        * h - observation function, linearized about the predicted state as H = dh/dx
+        * R - observation noise covariance matrix
+
+    Time update (prediction):
+        * x(k|k-1) = F @ x(k-1|k-1)
+        * P(k|k-1) = F @ P(k-1|k-1) @ F.T + Q
+
+    Measurement update (correction):
+        * dz = z - h(x(k|k-1))                          (innovation, provided by the user)
+        * K = P(k|k-1) @ H.T @ (H @ P(k|k-1) @ H.T + R)^-1
+        * x(k|k) = x(k|k-1) + K @ dz
+        * P(k|k) = (I - K @ H) @ P(k|k-1) @ (I - K @ H).T + K @ R @ K.T    (Joseph form, numerically stable)
+
+    The provided arrays must have the following dimensions
+        dim(x) = nx1
+        dim(P) = nxn
+        dim(F) = dim(Q) = nxn
+        dim(dz) = mx1
+        dim(H) = mxn
+        dim(R) = mx1 (diagonal of the observation noise covariance matrix)
+    If an inconsistency in these shapes is detected, an AttributeError exception is raised
+    """
+
+    def __init__(self, x: np.ndarray, P: np.ndarray):
+        """
+
+        Args:
+            x (numpy.ndarray) : the initial state vector
+            P (numpy.ndarray) : the initial state covariance matrix
+
+        Raises:
+            AttributeError : if the dimensions of the provided arrays do not match, or if the input vectors are not
+                            numpy ndarray objects
+        """
+        if not isinstance(x, np.ndarray) or len(x.shape) != 1:
+            raise AttributeError(f"Parameter 'x' must be an unidimensional {np.ndarray}, that is, of shape nx1")
+        self._n = x.shape[0]  # n (state dimension)
+        self._check_square("P", P)
+
+        self._x = np.array(x, dtype=float)
+        self._P = np.array(P, dtype=float)
+        self._innovation = None
+        self._dx = None
+
+    def _check_square(self, name, A):
+        if not isinstance(A, np.ndarray):
+            raise AttributeError(f"Parameter '{name}' must be of type {np.ndarray}")
+        if A.shape != (self._n, self._n):
+            raise AttributeError(f"Parameter '{name}' must be a square matrix with dimension nxn, consistent with the "
+                                 f"state vector of shape nx1. '{name}' is of shape {A.shape} whereas the state vector "
+                                 f"is of shape {(self._n,)}.")
+
+    def predict(self, F: np.ndarray, Q: np.ndarray):
+        """
+        Propagates the state vector and the covariance matrix to the next epoch (time update)
+
+        Args:
+            F (numpy.ndarray) : the state transition matrix
+            Q (numpy.ndarray) : the process noise covariance matrix
+        """
+        self._check_square("F", F)
+        self._check_square("Q", Q)
+
+        self._x = F @ self._x
+        self._P = F @ self._P @ F.T + Q
+
+    def update(self, dz: np.ndarray, H: np.ndarray, R: np.ndarray):
+        """
+        Corrects the predicted state with the provided observations (measurement update)
+
+        Args:
+            dz (numpy.ndarray) : the innovation vector (observation - predicted observation)
+            H (numpy.ndarray) : the observation (design) matrix, linearized about the predicted state
+            R (numpy.ndarray) : the diagonal of the observation noise covariance matrix
+
+        Raises:
+            AttributeError : if the dimensions of the provided arrays are not consistent
+            numpy.linalg.LinAlgError : if the innovation covariance matrix is singular
+        """
+        if len(dz.shape) != 1 or H.shape != (dz.shape[0], self._n) or R.shape != dz.shape:
+            raise AttributeError(f"Parameters 'dz', 'H' and 'R' should have consistent shapes (mx1, mxn and mx1, "
+                                 f"respectively). 'dz' is of shape {dz.shape}, 'H' is of shape {H.shape} and 'R' is "
+                                 f"of shape {R.shape}")
+
+        PHt = self._P @ H.T
+        S = H @ PHt + np.diag(R)  # innovation covariance matrix
+
+        # K = P @ H.T @ S^-1  <=>  S @ K.T = H @ P  (S and P are symmetric)
+        K = np.linalg.solve(S, PHt.T).T
+
+        self._dx = K @ dz
+        self._x = self._x + self._dx
+
+        I_KH = np.eye(self._n) - K @ H
+        self._P = I_KH @ self._P @ I_KH.T + (K * R) @ K.T
+        self._innovation = dz
+
+    def get_state(self):
+        return self._x
+
+    def get_covariance(self):
+        return self._P
+
+    def get_correction(self):
+        """Returns the state correction dx = K @ dz computed in the last measurement update"""
+        return self._dx
@@ -14,6 +14,8 @@ class WeightedLeastSquares:
     where:
         * W is the weight matrix
 
+    For diagonal weight matrices (uncorrelated observations) the problem is solved with the
+    :class:`WeightedLeastSquaresKernel`, which works with the weight vector instead of the dense m x m matrix.
 
     in the case of iterated least squares, the system of equations takes the form dy = G @ dx, where
         * dy are the prefit residuals (observation - predicted_observation)
@@ -93,9 +95,239 @@ class WeightedLeastSquares:
                                      f"'W' is of shape {W.shape} whereas y is of shape {y.shape}.")
 
     def solve(self):
-
-        self._S = np.linalg.inv(self._G.T @ self._W @ self._G)
-        self._x = self._S @ self._G.T @ self._W @ self._y
+        """
+        Solves the normal equations with a Cholesky factorization (see :class:`WeightedLeastSquaresKernel`). For a
+        diagonal weight matrix, the observations are scaled by the square root of the weights (the dense m x m weight
+        matrix is never used in the products).
+        """
+        W_diagonal = np.diagonal(self._W)
+        if np.count_nonzero(self._W) == np.count_nonzero(W_diagonal):
+            self._x, self._S, postfit, _ = WeightedLeastSquaresKernel(self._n, self._m).solve(self._y, self._G,
+                                                                                             W_diagonal)
+            self._postfit_res = postfit.copy()
+        else:
+            # full weight matrix (correlated observations)
+            GtW = self._G.T @ self._W
+            L = np.linalg.cholesky(GtW @ self._G)
+            self._x, self._S = WeightedLeastSquaresKernel.cholesky_solve(L, GtW @ self._y)
+            self._postfit_res = self._y - self._G @ self._x
 
     def get_solution(self):
         return self._x
+
+    def get_covariance(self):
+        """Returns the covariance (cofactor) matrix of the solution, S = (G.T @ W @ G)^-1"""
+        return self._S
+
+    def get_postfit_residuals(self):
+        """Returns the postfit residuals, y - G @ x^{hat}"""
+        return self._postfit_res
+
+
+class WeightedLeastSquaresKernel:
+    """
+    Weighted Least Squares kernel for diagonal weight matrices, to be used in iterative procedures (such as the
+    iterated Least Squares of the PVT solvers), where the same kind of problem is solved many times.
+
+    The weights are provided as a vector w (the diagonal of W), and the problem is solved with row scaling:
+        * A = diag(sqrt(w)) @ G,    b = diag(sqrt(w)) @ y
+        * min || b - A @ x ||^2 is equivalent to the WLS problem min (y - G @ x).T @ W @ (y - G @ x)
+
+    Two factorizations are available:
+        * "cholesky" (default) - the normal matrix N = A.T @ A = L @ L.T is factorized, and the covariance matrix
+                                S = N^-1 = L^-T @ L^-1 and the solution x = S @ A.T @ b are obtained from the inverse of
+                                the triangular factor L
+        * "qr" - A = Q @ R, x = R^-1 @ Q.T @ b and S = R^-1 @ R^-T. More robust for ill-conditioned geometries, since
+                 the normal matrix is never formed
+
+    The solution, the covariance matrix and the postfit residuals (y - G @ x) are all obtained from one factorization,
+    and no explicit inverse is computed.
+    The scaled arrays are stored in buffers that are allocated once and reused in the next calls (they only grow if a
+    larger problem is provided). The returned postfit residuals are a view of an internal buffer, which is overwritten
+    in the next call to `solve`.
+    """
+
+    METHODS = ("cholesky", "qr")
+
+    def __init__(self, n: int = 4, m: int = 16, method: str = "cholesky"):
+        """
+        Args:
+            n (int) : expected state dimension (the buffers grow if needed)
+            m (int) : expected observation dimension (the buffers grow if needed)
+            method (str) : factorization method, either "cholesky" or "qr"
+
+        Raises:
+            AttributeError : if the method is not valid
+        """
+        if method not in WeightedLeastSquaresKernel.METHODS:
+            raise AttributeError(f"Parameter 'method' must be one of {WeightedLeastSquaresKernel.METHODS}. "
+                                 f"Provided method is {method}")
+        self.method = method
+        self._allocate(m, n)
+
+    def _allocate(self, m, n):
+        self._A = np.empty((m, n))  # row scaled geometry matrix
+        self._b = np.empty(m)  # row scaled observation vector
+        self._sqrt_w = np.empty(m)  # square root of the weights
+        self._postfit = np.empty(m)  # postfit residuals
+        self._N = np.empty((2, n, n))  # normal matrices (weighted and unweighted)
+        self._identity = {}  # (stacked) identity matrices, for the triangular solves
+
+    def _reserve(self, m, n):
+        # grow the buffers, if necessary
+        if m > self._A.shape[0] or n > self._A.shape[1]:
+            self._allocate(max(m, self._A.shape[0]), max(n, self._A.shape[1]))
+
+    def _get_identity(self, shape):
+        if shape not in self._identity:
+            self._identity[shape] = np.broadcast_to(np.eye(shape[-1]), shape)
+        return self._identity[shape]
+
+    @staticmethod
+    def _check_args(y, G, w):
+        if y.ndim != 1 or G.ndim != 2 or G.shape[0] != y.shape[0]:
+            raise AttributeError(f"Parameters 'y' and 'G' should have consistent shapes (mx1 and mxn, respectively)."
+                                 f"'y' is of shape {y.shape} and 'G' is of shape {G.shape}")
+        if w is not None and w.shape != y.shape:
+            raise AttributeError(f"Parameter 'w' must be of shape mx1, consistent with 'y'. 'w' is of shape "
+                                 f"{w.shape} whereas y is of shape {y.shape}.")
+
+    @staticmethod
+    def cholesky_solve(L, b):
+        """
+        Given the Cholesky factor L of the (symmetric positive definite) matrix N = L @ L.T, computes S = N^-1 and
+        solves N @ x = b, from the inverse of the triangular factor:
+            S = L^-T @ L^-1,  x = S @ b
+        Supports stacked problems, that is, L of shape (..., n, n) and b of shape (..., n)
+
+        Return:
+            tuple [numpy.ndarray, numpy.ndarray] : x and S
+        """
+        L_inv = np.linalg.solve(L, np.broadcast_to(np.eye(L.shape[-1]), L.shape))
+        S = np.swapaxes(L_inv, -1, -2) @ L_inv
+        x = (S @ b[..., None])[..., 0]
+        return x, S
+
+    def solve(self, y: np.ndarray, G: np.ndarray, w: np.ndarray = None, G_dop: np.ndarray = None):
+        """
+        Solves the WLS problem y = G @ x with weights w
+
+        Args:
+            y (numpy.ndarray) : the observation vector (mx1)
+            G (numpy.ndarray) : the state matrix (mxn)
+            w (numpy.ndarray, optional) : the weights (diagonal of the weight matrix, mx1). If not provided, then the
+                                          solution resorts to a classical Least Squares
+            G_dop (numpy.ndarray, optional) : if provided, the unweighted cofactor matrix (G_dop.T @ G_dop)^-1 (the
+                                              DOP matrix) is also computed. With the Cholesky method and
+                                              G_dop of the same shape as G, both matrices are factorized together
+
+        Return:
+            tuple [numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray] : the solution x (nx1), the
+                covariance (cofactor) matrix S (nxn), the postfit residuals (mx1) and the DOP matrix (None if G_dop is
+                not provided)
+        Raises:
+            AttributeError : if the dimensions of the provided arrays do not match
+            numpy.linalg.LinAlgError : if the problem is rank deficient
+        """
+        self._check_args(y, G, w)
+        m, n = G.shape
+        self._reserve(m, n)
+
+        # row scaling
+        sqrt_w = self._sqrt_w[:m]
+        if w is None:
+            sqrt_w.fill(1.0)
+        else:
+            np.sqrt(w, out=sqrt_w)
+        A = self._A[:m, :n]
+        b = self._b[:m]
+        np.multiply(G, sqrt_w[:, None], out=A)
+        np.multiply(y, sqrt_w, out=b)
+
+        DOP = None
+        if self.method == "cholesky":
+            N = self._N[:, :n, :n]
+            np.matmul(A.T, A, out=N[0])
+            if G_dop is not None and G_dop.shape == G.shape:
+                # factorize the weighted and the unweighted normal matrices at once
+                np.matmul(G_dop.T, G_dop, out=N[1])
+            else:
+                N = N[0]
+
+            L = np.linalg.cholesky(N)
+            L_inv = np.linalg.solve(L, self._get_identity(L.shape))
+            S = np.swapaxes(L_inv, -1, -2) @ L_inv
+
+            if S.ndim == 3:
+                S, DOP = S[0], S[1]
+            x = S @ (A.T @ b)
+        else:
+            Q, R = np.linalg.qr(A)
+            R_inv = np.linalg.solve(R, np.eye(n))
+            S = R_inv @ R_inv.T  # S = R^-1 @ R^-T
+            x = R_inv @ (Q.T @ b)
+
+        if G_dop is not None and DOP is None:
+            DOP = self.cofactor(G_dop)
+
+        postfit = self._postfit[:m]
+        np.subtract(y, G @ x, out=postfit)
+
+        return x, S, postfit, DOP
+
+    def cofactor(self, G: np.ndarray, w: np.ndarray = None):
+        """
+        Computes the cofactor matrix (G.T @ W @ G)^-1 (for example, the DOP matrix when no weights are provided),
+        with the same factorization as `solve`, but without an observation vector
+
+        Return:
+            numpy.ndarray : the cofactor matrix (nxn)
+        Raises:
+            numpy.linalg.LinAlgError : if G is rank deficient
+        """
+        n = G.shape[1]
+        A = G if w is None else G * np.sqrt(w)[:, None]
+
+        if self.method == "cholesky":
+            L = np.linalg.cholesky(A.T @ A)
+            L_inv = np.linalg.solve(L, np.eye(n))
+            return L_inv.T @ L_inv
+
+        R_inv = np.linalg.solve(np.linalg.qr(A, mode="r"), np.eye(n))
+        return R_inv @ R_inv.T
+
+    @staticmethod
+    def solve_batch(y: np.ndarray, G: np.ndarray, w: np.ndarray = None):
+        """
+        Batched (many-epoch) variant of `solve`, with the Cholesky method. Solves k independent WLS problems at once.
+        Problems with fewer observations can be padded with zero weight rows (which do not contribute to the solution).
+
+        Args:
+            y (numpy.ndarray) : the observation vectors (kxm)
+            G (numpy.ndarray) : the state matrices (kxmxn)
+            w (numpy.ndarray, optional) : the weights (kxm)
+
+        Return:
+            tuple [numpy.ndarray, numpy.ndarray, numpy.ndarray] : the solutions (kxn), the covariance matrices (kxnxn)
+                                                                  and the postfit residuals (kxm)
+        Raises:
+            AttributeError : if the dimensions of the provided arrays do not match
+            numpy.linalg.LinAlgError : if any of the problems is rank deficient
+        """
+        if y.ndim != 2 or G.ndim != 3 or G.shape[0:2] != y.shape or (w is not None and w.shape != y.shape):
+            raise AttributeError(f"Parameters 'y', 'G' and 'w' should have consistent shapes (kxm, kxmxn and kxm, "
+                                 f"respectively). 'y' is of shape {y.shape} and 'G' is of shape {G.shape}")
+
+        if w is None:
+            A, b = G, y
+        else:
+            sqrt_w = np.sqrt(w)
+            A = G * sqrt_w[:, :, None]
+            b = y * sqrt_w
+
+        At = np.swapaxes(A, 1, 2)
+        L = np.linalg.cholesky(At @ A)
+        x, S = WeightedLeastSquaresKernel.cholesky_solve(L, (At @ b[:, :, None])[:, :, 0])
+        postfit = y - np.einsum("kmn,kn->km", G, x)
+
+        return x, S, postfit
@@ -0,0 +1,78 @@
+import numpy as np
+
+from PositioningSolver.src.utils.errors import PVTComputationFail
+
+
+def _lorentz(x, y):
+    """
+    Lorentz inner product <x, y> = x1*y1 + x2*y2 + x3*y3 - x4*y4 of 4-dimensional vectors. If x and y are matrices
+    (nx4), the product is computed row-wise.
+    """
+    return x[..., 0] * y[..., 0] + x[..., 1] * y[..., 1] + x[..., 2] * y[..., 2] - x[..., 3] * y[..., 3]
+
+
+def bancroft(satellite_positions, pseudoranges):
+    """
+    Direct (closed-form) solution of the pseudorange equations, with Bancroft's algorithm
+        P_i = || r_sat_i - r_rec || + b,    i = 1, ..., n  (n >= 4)
+    where r_sat_i are the satellite positions, r_rec the receiver position and b the receiver clock bias [m].
+
+    The pseudoranges should be corrected for the satellite clock bias. Atmospheric delays are not modeled, which means
+    that the solution is only approximate (few meters) and is meant to be used as initial guess for the iterated
+    Least Squares.
+
+    Algorithm (see, for example, Bancroft, S. (1985) "An Algebraic Solution of the GPS Equations" and Strang & Borre
+    (1997) "Linear Algebra, Geodesy, and GPS"):
+        B = [r_sat_i, P_i] (nx4), a_i = 0.5 * <B_i, B_i>, e = [1, ..., 1]
+        u = B^+ @ e, v = B^+ @ a, with B^+ the Least Squares pseudo-inverse of B
+        <u, u> * L^2 + 2 * (<u, v> - 1) * L + <v, v> = 0  -> two solutions for L
+        [r_rec, b] = M @ (L * u + v), with M = diag(1, 1, 1, -1)
+    of the two possible solutions, the one with the smallest residuals is selected
+
+    Args:
+        satellite_positions (numpy.ndarray) : satellite positions (nx3) in the ECEF frame [m]
+        pseudoranges (numpy.ndarray) : pseudoranges (n) corrected for the satellite clocks [m]
+
+    Return:
+        tuple [numpy.ndarray, float] : receiver position (3) in the ECEF frame [m] and receiver clock bias [m]
+
+    Raises:
+        PVTComputationFail : if less than 4 observations are provided or if the problem has no real solution
+    """
+    n = len(pseudoranges)
+    if n < 4:
+        raise PVTComputationFail(f"Bancroft algorithm requires at least 4 observations, {n} were provided")
+
+    B = np.empty((n, 4))
+    B[:, 0:3] = satellite_positions
+    B[:, 3] = pseudoranges
+
+    a = 0.5 * _lorentz(B, B)
+    ones = np.ones(n)
+
+    try:
+        # least squares pseudo-inverse, applied to [e, a] at once
+        u, v = np.linalg.lstsq(B, np.column_stack((ones, a)), rcond=None)[0].T
+    except np.linalg.LinAlgError as e:
+        raise PVTComputationFail(e)
+
+    # quadratic equation in L
+    A2 = _lorentz(u, u)
+    A1 = _lorentz(u, v) - 1
+    A0 = _lorentz(v, v)
+    discriminant = A1 * A1 - A2 * A0
+    if discriminant < 0 or A2 == 0:
+        raise PVTComputationFail(f"Bancroft algorithm has no real solution (discriminant = {discriminant})")
+
+    roots = (-A1 + np.array([-1.0, 1.0]) * np.sqrt(discriminant)) / A2
+
+    # candidate solutions (2x4) -> [x, y, z, b]
+    candidates = roots[:, None] * u[None, :] + v[None, :]
+    candidates[:, 3] = -candidates[:, 3]  # [r_rec, b] = M @ (L * u + v)
+
+    # select the candidate with the smallest residuals
+    ranges = np.linalg.norm(satellite_positions[None, :, :] - candidates[:, None, 0:3], axis=2)
+    residuals = np.linalg.norm(pseudoranges[None, :] - ranges - candidates[:, 3:4], axis=1)
+    best = int(np.argmin(residuals))
+
+    return candidates[best, 0:3], float(candidates[best, 3])
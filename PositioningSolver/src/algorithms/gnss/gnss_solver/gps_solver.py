@@ -1,14 +1,25 @@
 from numpy.linalg import norm
 import numpy as np
 
-from PositioningSolver.src import get_logger
+from PositioningSolver.src import get_logger, get_profiler
+from PositioningSolver.src.common_log import LogAggregator
+from PositioningSolver.src.algorithms.estimators.kalman_filter import ExtendedKalmanFilter
 from PositioningSolver.src.algorithms.estimators.state_space import SPPStateSpace
-from PositioningSolver.src.algorithms.estimators.weighted_ls import WeightedLeastSquares
+from PositioningSolver.src.algorithms.estimators.weighted_ls import WeightedLeastSquaresKernel
+from PositioningSolver.src.algorithms.gnss.gnss_solver.bancroft import bancroft
+from PositioningSolver.src.algorithms.gnss.gnss_solver.observation_models.ephemeride_propagator import \
+    EphemeridePropagator, correct_gps_week_crossovers_array, rotate_to_reception_frame
 from PositioningSolver.src.algorithms.gnss.gnss_solver.observation_models.geometry_obs import SystemGeometry
-from PositioningSolver.src.algorithms.gnss.gnss_solver.observation_models.observation_reconstructor import ObservationReconstruction
+from PositioningSolver.src.algorithms.gnss.gnss_solver.observation_models.observation_reconstructor import \
+    ObservationReconstruction
+from PositioningSolver.src.algorithms.gnss.gnss_solver.raim import RAIM
+from PositioningSolver.src.algorithms.gnss.gnss_solver.velocity_solver import VelocitySolver
+from PositioningSolver.src.algorithms.gnss.gnss_solver.visibility import SatelliteVisibility
+from PositioningSolver.src.data_types.orbits.statevector import Position
 from PositioningSolver.src.math_utils.Constants import Constant
 from PositioningSolver.src.utils.errors import ConfigError, PVTComputationFail
 from PositioningSolver.src.data_types.basics.DataType import DataType, DataTypeFactory
+from PositioningSolver.src.data_types.gnss.ServicesUtils import CodeToConstellationMap
 from PositioningSolver.src.algorithms.gnss.gnss_solver.observation_models import clock_obs
 
 np.set_printoptions(linewidth=np.inf)
@@ -20,8 +31,9 @@ f1 = C1.freq
 
 class GPSSolver:
     """
-        GPSSolver. Implements GPS Position Velocity Time (PVT) algorithms, to compute receiver position and clock bias
-        (not yet velocity).
+        GPSSolver. Implements GPS Position Velocity Time (PVT) algorithms, to compute receiver position and clock bias,
+        and receiver velocity and clock drift (from doppler observables, when available).
+        Galileo satellites may be processed together with GPS (multi-constellation PVT), see below.
 
         The following algorithms are included:
 
@@ -56,12 +68,27 @@ class GPSSolver:
                     * ionosphere - a priori Klobuchar Ionospheric Model or estimated in DF mode
                     * troposphere - a priori Saastamoinen model
 
+                Multi-constellation (GPS + Galileo): the Galileo observation model is the same, with the Galileo
+                broadcast ephemerides and clocks (BGDs instead of TGDs). The receiver clock bias refers to the GPS time,
+                and an inter-system bias (ISB) is estimated for Galileo, that is, the state vector is
+                x = [dx, dy, dz, dt, isb, dl], where isb only affects the Galileo observations. The ISB absorbs the
+                GPS to Galileo time offset and the receiver inter-system hardware delays. It is only estimated in the
+                epochs with satellites of both constellations in view (one more satellite is then required).
+
+                For Single Frequency LS/WLS, the converged solution may be checked with RAIM (Receiver Autonomous
+                Integrity Monitoring). Faulty satellites are detected with a chi-square test of the postfit residuals
+                and excluded from the solution (see RAIM).
+
+            -> Doppler-based velocity. After the position solution of each epoch, the receiver velocity and clock drift
+                are estimated from the doppler observables, using the same satellite geometry (see VelocitySolver).
+
 
         Iterated Least Squares PVT - High Level Algorithm
         -------
 
         for each observation epoch (time tag in rinex obs):
-            set initial pos = 0, dt = 0 (or with previous results...)
+            set initial pos and dt with previous results. If there is no valid previous solution (first epoch, or
+            previous epoch failed or is too old), compute a direct (Bancroft) solution instead
 
             get closest navigation message
 
@@ -84,38 +111,106 @@ class GPSSolver:
                 update (x,y,z) += (dx,dy,dz) and finish this iteration
                 finish iterative procedure if process converged
 
+            fault detection and exclusion (RAIM): if the residuals fail the chi-square test, exclude the faulty
+            satellites and correct the solution
+
+
+        Extended Kalman Filter PVT - High Level Algorithm
+        -------
+
+        The EKF is a recursive alternative to the epoch-wise iterated LS. The state vector is
+            x = [x, y, z, vx, vy, vz, c * dt, c * dt_dot]
+        that is, receiver position, velocity, clock bias and clock drift (both in meters), with a constant velocity
+        dynamic model for the position and the usual two-state model for the receiver clock. In multi-constellation
+        processing, the inter-system bias (in meters, random walk) is appended to the state vector.
+        Only Single Frequency models are supported.
+
+        initialize the filter with an iterated LS solution (first epoch, or whenever the filter has been reset)
+
+        for each observation epoch (time tag in rinex obs):
+            propagate state and covariance to the current epoch (prediction)
+            compute the satellite geometry once, about the predicted receiver position
+            compute prefit_residual = observation - predicted_observation
+            innovation = prefit_residual - predicted clock bias
+            correct the predicted state with the innovation (measurement update). If doppler observables are
+            available, range rate observations are also used to update the velocity and clock drift states
+
     """
     MODEL = {0: "Single Frequency",
              1: "Dual Frequency"}
 
     SOLVER = {0: "Least Squares",
-              1: "Weighted Least Squares"}
+              1: "Weighted Least Squares",
+              2: "Extended Kalman Filter"}
+
+    # size of the EKF state vector [position (3), velocity (3), clock bias (1), clock drift (1)], followed by the
+    # inter-system biases (multi-constellation only)
+    EKF_STATE_LENGTH = 8
 
-    def __init__(self, obs_data, nav_data, config):
+    def __init__(self, obs_data, nav_data, config, obs_header=None):
         """
 
         Args:
             obs_data (src.data_types.containers.ObservationData.ObservationData) : observation data
             nav_data (src.data_types.containers.NavigationData.NavigationDataMap) : navigation data
             config (src.config.Config) : user configurations
+            obs_header (src.data_types.containers.ObservationData.ObservationHeader) : observation header, with the
+                                                                                      approximate receiver position
+                                                                                      (optional)
         """
         self.obs_data = obs_data
         self.nav_data = nav_data
 
         self.log = get_logger("gps_solver")
+        # satellites discarded by the URA / health filters: logged once, then summarized at the end of the run
+        self._discarded_satellites = LogAggregator(self.log, "Satellite %s was discarded due to %s at %d epochs")
         self.log.info("#########################################################")
         self.log.info("######### Starting module 'GPS PVT Solver' ... ##########")
 
         # user configurations  #
         self._info, self.compute_TX_time = self._set_solver_info(config, obs_data.get_types())
 
+        # Weighted Least Squares kernel (buffers reused across iterations and epochs)
+        self._wls = WeightedLeastSquaresKernel(n=4 + len(self._info["ISB_SYSTEMS"]))
+
+        # integrity monitoring (fault detection and exclusion)
+        self.raim = None
+        if self._info["RAIM"]["select"] == 1:
+            self.raim = RAIM(self._info["RAIM"]["probability_false_alarm"], self._info["RAIM"]["sigma"],
+                             self._info["RAIM"]["max_exclusions"])
+
+        # doppler-based velocity solver
+        self.velocity_solver = None
+        if self._info["DOPPLER"] is not None:
+            self.velocity_solver = VelocitySolver(nav_data, self._info["DOPPLER"], self._info["REL_CORRECTION"] == 1)
+
+        # satellite visibility prediction (pruning of the satellites well below the elevation mask)
+        self.visibility = None
+        if self._info["VISIBILITY"]["select"] == 1:
+            self.visibility = SatelliteVisibility(nav_data, self._info["ELEVATION_FILTER"],
+                                                  self._info["VISIBILITY"]["margin"])
+            approx_position = obs_header.get_receiver_position() if obs_header is not None else None
+            if approx_position is not None:
+                self.visibility.precompute(obs_data, np.array(approx_position))
+            # new ephemerides (navigation data updated during the run) invalidate the elevations of their satellite
+            nav_data.subscribe(self.visibility.invalidate)
+
+        # epoch of the last valid solution, and statistics of the direct (Bancroft) initialization
+        self._last_fix_epoch = None
+        self._init_stats = {"epochs": 0, "iterations": 0}
+
+        # recursive filter (Extended Kalman Filter solver only), epoch of its last update and length of its state
+        self._filter = None
+        self._filter_epoch = None
+        self._filter_length = GPSSolver.EKF_STATE_LENGTH + len(self._info["ISB_SYSTEMS"])
+
     def _set_solver_info(self, config, datatypes):
 
         # Fetching user options
         MAX_ITER = config["gps_solver"]["iterations"]["select"]  # maximum number of iterations
         STOP_CRITERIA = config["gps_solver"]["stop_criteria"]["select"]  # RMS threshold for stop criteria
         MODEL = config["model"]["obs_combination"]["select"]  # 0 - SF, 1 - DF
-        SOLVER = config["gps_solver"]["solution_solver"]["select"]  # 0 - LS, 1 - WLS
+        SOLVER = config["gps_solver"]["solution_solver"]["select"]  # 0 - LS, 1 - WLS, 2 - EKF
         TROPO = config["model"]["troposphere"]["select"]  # 0 - no model, 1 - Saastamoinen
         IONO = config["model"]["ionosphere"]["select"]  # 0 - no model, 1 - Klobuchar, 2 - Iono Free Combination
         REL_CORRECTION = config["model"]["relativistic_corrections"]["select"]  # 0 disable, 1 enable
@@ -123,12 +218,58 @@ class GPSSolver:
         SIGNAL_STRENGTH_FILTER = config["gps_solver"]["signal_strength_filter"]["select"]  # threshold (in dBHz)
         ELEVATION_FILTER = config["gps_solver"]["elevation_filter"]["select"]
         SATELLITE_STATUS_FILTER = config["gps_solver"]["satellite_status"]
+        VELOCITY = config.get("gps_solver", "velocity_estimation", "select", fallback=1)  # 0 disable, 1 enable
+
+        # direct (Bancroft) initial fix, when no valid prior state exists or the previous fix is older than max_age
+        INITIALIZATION = {
+            "select": config.get("gps_solver", "initialization", "select", fallback=1),  # 0 disable, 1 enable
+            "max_age": config.get("gps_solver", "initialization", "max_age", fallback=60)  # [s]
+        }
+
+        # satellite visibility prediction, with the approximate receiver position (RINEX header or previous fix)
+        VISIBILITY = {
+            "select": config.get("gps_solver", "visibility", "select", fallback=0),  # 0 disable, 1 enable
+            "margin": config.get("gps_solver", "visibility", "margin", fallback=2.0)  # hysteresis margin [deg]
+        }
+
+        # Receiver Autonomous Integrity Monitoring (Single Frequency LS / WLS only)
+        RAIM = {
+            "select": config.get("gps_solver", "raim", "select", fallback=0),  # 0 disable, 1 enable
+            "probability_false_alarm": config.get("gps_solver", "raim", "probability_false_alarm", fallback=1e-5),
+            "sigma": config.get("gps_solver", "raim", "sigma", fallback=5.0),  # [m]
+            "max_exclusions": config.get("gps_solver", "raim", "max_exclusions", fallback=2)
+        }
+
+        # Extended Kalman Filter tuning (only used when SOLVER = 2)
+        EKF = {
+            "velocity_psd": config.get("gps_solver", "kalman_filter", "velocity_psd", fallback=1.0),
+            "clock_bias_psd": config.get("gps_solver", "kalman_filter", "clock_bias_psd", fallback=0.01),
+            "clock_drift_psd": config.get("gps_solver", "kalman_filter", "clock_drift_psd", fallback=0.04),
+            "code_sigma": config.get("gps_solver", "kalman_filter", "code_sigma", fallback=5.0),
+            "doppler_sigma": config.get("gps_solver", "kalman_filter", "doppler_sigma", fallback=0.5),
+            "initial_velocity_sigma": config.get("gps_solver", "kalman_filter", "initial_velocity_sigma",
+                                                 fallback=10.0),
+            "initial_clock_drift_sigma": config.get("gps_solver", "kalman_filter", "initial_clock_drift_sigma",
+                                                    fallback=100.0),
+            "isb_psd": config.get("gps_solver", "kalman_filter", "isb_psd", fallback=0.001),
+            "initial_isb_sigma": config.get("gps_solver", "kalman_filter", "initial_isb_sigma", fallback=100.0),
+            "max_gap": config.get("gps_solver", "kalman_filter", "max_gap", fallback=60)
+        }
 
         # Checking Additional information
 
         # find number of necessary observations per epoch
         NR_EQS = 4  # base number of unidimensional equations/observations for each epoch
 
+        # constellations: the receiver clock refers to the first system (GPS, if available), and an inter-system bias
+        # is estimated for each of the other systems
+        SYSTEMS = sorted({CodeToConstellationMap[sat[0]] for sat in self.obs_data.get_satellite_list()},
+                         key=lambda system: (system != "GPS", system))
+        ISB_SYSTEMS = SYSTEMS[1:]
+        if ISB_SYSTEMS:
+            self.log.info(f"Multi-constellation PVT with systems {SYSTEMS}. Estimating the inter-system bias of "
+                          f"{ISB_SYSTEMS} with respect to {SYSTEMS[0]}")
+
         # algorithm to compute transmission time
         if config["gps_solver"]["transmission_time_alg"]["select"] == 0:
             compute_TX_time = clock_obs.compute_TX_time_geometric
@@ -153,7 +294,35 @@ class GPSSolver:
                 raise ConfigError(f"No available code datatypes to perform PVT. Exiting.")
             MAIN_CODE = code_types[0]
             SECOND_CODE = None
+
+        # the Kalman Filter only supports the single frequency model
+        if SOLVER == 2 and MODEL == 1:
+            self.log.warning(f"User selected dual frequency PVT but the {GPSSolver.SOLVER[SOLVER]} solver only "
+                             f"supports Single Frequency PVT. Resorting to Single Frequency PVT")
+            MODEL = 0
+            SECOND_CODE = None
         self.log.info(f"Main code for PVT: {MAIN_CODE}, second code: {SECOND_CODE}")
+
+        if RAIM["select"] == 1 and (SOLVER == 2 or MODEL == 1):
+            self.log.warning(f"RAIM is only available for the Single Frequency Least Squares solvers. Disabling RAIM")
+            RAIM["select"] = 0
+
+        # doppler datatype for velocity estimation (preferably in the same frequency of the main code)
+        DOPPLER = None
+        if VELOCITY == 1:
+            doppler_types = sorted(DataType.get_doppler_datatypes(datatypes))
+            main_freq = MAIN_CODE.freq if hasattr(MAIN_CODE, "freq") else None  # iono free codes have no frequency
+            for doppler_type in doppler_types:
+                if main_freq is not None and doppler_type.freq == main_freq:
+                    DOPPLER = doppler_type
+                    break
+            else:
+                DOPPLER = doppler_types[0] if doppler_types else None
+
+            if DOPPLER is None:
+                self.log.warning(f"No doppler observables available. Receiver velocity will not be computed")
+            else:
+                self.log.info(f"Doppler for velocity estimation: {DOPPLER}")
         self.log.info(f"SPP Algorithm - {GPSSolver.MODEL[MODEL]}. Solver - {GPSSolver.SOLVER[SOLVER]}")
 
         # add more info if necessary
@@ -172,14 +341,22 @@ class GPSSolver:
             "ELEVATION_FILTER": ELEVATION_FILTER,
             "SATELLITE_STATUS_FILTER": SATELLITE_STATUS_FILTER,
             "NR_EQS": NR_EQS,
+            "SYSTEMS": SYSTEMS,
+            "ISB_SYSTEMS": ISB_SYSTEMS,
             "MAIN_CODE": MAIN_CODE,
-            "SECOND_CODE": SECOND_CODE
+            "SECOND_CODE": SECOND_CODE,
+            "DOPPLER": DOPPLER,
+            "INITIALIZATION": INITIALIZATION,
+            "VISIBILITY": VISIBILITY,
+            "RAIM": RAIM,
+            "EKF": EKF
         }
 
         return _info, compute_TX_time
 
     def solve(self, receiver_pos, receiver_bias, prefit_residuals, estimated_iono,
-              postfit_residuals, DOPs, sat_info):
+              postfit_residuals, DOPs, sat_info, receiver_velocity=None, receiver_clock_drift=None, covariance=None,
+              inter_system_bias=None, checkpoint=None, resume=False):
         """
 
         Args:
@@ -190,6 +367,18 @@ class GPSSolver:
             postfit_residuals (src.data_types.containers.TimeSeries.TimeSeries) : postfit residuals output
             DOPs (src.data_types.gnss.DOP.DOP) : DOPs output timeseries
             sat_info (src.data_types.containers.TimeSeries.TimeSeries) : satellite info time series
+            receiver_velocity (src.data_types.containers.TimeSeries.TimeSeries) : receiver velocity output timeseries
+                                                                                 (optional)
+            receiver_clock_drift (src.data_types.containers.TimeSeries.TimeSeries) : receiver clock drift output
+                                                                                    timeseries (optional)
+            covariance (src.data_types.containers.TimeSeries.TimeSeries) : state covariance matrix output
+                                                                          timeseries (optional)
+            inter_system_bias (src.data_types.containers.TimeSeries.TimeSeries) : inter-system bias output timeseries
+                                                                                 (optional, multi-constellation only)
+            checkpoint (src.io_manager.export.checkpoint.CheckpointJournal) : journal of the periodic checkpoints
+                                                                            (optional)
+            resume (bool) : resume from the last checkpoint of the journal (the outputs of the solved epochs are
+                            restored from the journal and these epochs are not solved again)
         """
 
         # available epochs
@@ -198,44 +387,171 @@ class GPSSolver:
         # initialize receiver_position
         previous_state = SPPStateSpace()
 
+        if checkpoint is not None:
+            last_checkpoint = checkpoint.start(resume)
+            if last_checkpoint is not None:
+                previous_state = last_checkpoint["state"]
+                self.set_checkpoint_state(last_checkpoint["solver"])
+                epochs = [epoch for epoch in epochs if epoch > last_checkpoint["epoch"]]
+
+        # per-epoch counters (LS iterations, satellites used, geometry computations and navigation lookups) and latency
+        profiler = get_profiler()
+
         # iterate over all available epochs
         for epoch in epochs:
+            profiler.next_epoch()
 
             # fetch observation data for this epoch
             epoch_data = self.obs_data.get_epoch_data(epoch)
 
-            # initialize solve-for variables (receiver position and bias) for the present epoch
-            state = SPPStateSpace(receiver_position=previous_state.receiver_position.copy(),
-                                  receiver_clock=previous_state.receiver_clock)
-            state.receiver_position.date = epoch
-
-            # fetch closest navigation message header
-            nav_header = self.nav_data.get_header_data(epoch)
-
-            # call lower level of solve
-            _debug_info = {}
-            success, RMS = self._solve(epoch, epoch_data, state, nav_header, _debug_info)
+            success, state, RMS, _debug_info = self.solve_epoch(epoch, epoch_data, previous_state)
 
             if success:
                 # add solution to Output timeseries
-                self.log.info(f"Successfully solved positioning for epoch {epoch.to_time_stamp()} with "
-                              f"RMS = {RMS} [m]")
-
-                # store data for this epoch
-                receiver_pos.set_data(epoch, state.receiver_position)
-                receiver_bias.set_data(epoch, state.receiver_clock)
-                if state.iono:
-                    estimated_iono.set_data(epoch, state.iono)
-                sat_info.set_data(epoch, _debug_info.get("geometry", None))
-                DOPs.set_dop(epoch, "matrix", _debug_info.get("DOP", None))
-                prefit_residuals.set_data(epoch, _debug_info.get("prefit", None))
-                postfit_residuals.set_data(epoch, _debug_info.get("postfit", None))
+                self.log.info("Successfully solved positioning for epoch %r with RMS = %s [m]", epoch, RMS)
+
+                self.store_solution(epoch, state, _debug_info, receiver_pos, receiver_bias, prefit_residuals,
+                                    estimated_iono, postfit_residuals, DOPs, sat_info,
+                                    receiver_velocity=receiver_velocity, receiver_clock_drift=receiver_clock_drift,
+                                    covariance=covariance, inter_system_bias=inter_system_bias)
             else:
-                self.log.warning(f"PVT failed to converge for epoch {epoch.to_time_stamp()}. "
-                                 f"No solution will be computed for this epoch.")
+                self.log.warning("PVT failed to converge for epoch %r. No solution will be computed for this epoch.",
+                                 epoch)
 
             previous_state = state
+            profiler.end_epoch()
+
+            if checkpoint is not None and checkpoint.due():
+                checkpoint.write(epoch, previous_state, self.get_checkpoint_state())
+
+        if checkpoint is not None:
+            # final checkpoint: a crash in the next modules does not require solving again
+            if len(epochs) > 0:
+                checkpoint.write(epochs[-1], previous_state, self.get_checkpoint_state())
+            checkpoint.close()
+
+        self.finish()
+
+    def solve_epoch(self, epoch, epoch_data, previous_state):
+        """
+        Computes the PVT solution of a single epoch, from the state of the previous epoch. This is the body of the
+        `solve` loop, also called directly when the observations arrive one epoch at a time (streaming input)
+
+        Args:
+            epoch (src.data_types.basics.Epoch.Epoch) : epoch to process
+            epoch_data (src.data_types.containers.ObservationData.EpochData) : observation data of this epoch
+            previous_state (src.algorithms.estimators.state_space.SPPStateSpace) : state of the previous epoch
+
+        Return:
+            tuple [bool, SPPStateSpace, float, dict] : success flag, state of this epoch, RMS of the solution and
+                                                       debug info (geometry, residuals, DOPs, velocity, ...)
+        """
+        profiler = get_profiler()
+
+        # initialize solve-for variables (receiver position and bias) for the present epoch
+        state = SPPStateSpace(receiver_position=previous_state.receiver_position.copy(),
+                              receiver_clock=previous_state.receiver_clock)
+        state.receiver_position.date = epoch
+
+        # fetch closest navigation message header
+        nav_header = self.nav_data.get_header_data(epoch)
+
+        # URA, Satellite health filters (once for the initialization and the solution). Flagged satellites are removed
+        self._initial_satellite_validation(epoch, epoch_data)
+
+        # direct initial fix, when there is no valid prior state (the EKF only uses it to reinitialize the filter)
+        initial_fix = False
+        if self._info["INITIALIZATION"]["select"] == 1 and self._is_prior_stale(epoch) and \
+                (self._info["SOLVER"] != 2 or not self._is_filter_valid(epoch)):
+            initial_fix = self._initial_fix(epoch, epoch_data, state, nav_header)
+
+        # call lower level of solve
+        _debug_info = {}
+        if self._info["SOLVER"] == 2:
+            success, RMS = self._solve_ekf(epoch, epoch_data, state, nav_header, _debug_info)
+        else:
+            success, RMS = self._solve(epoch, epoch_data, state, nav_header, _debug_info)
+            if success:
+                self._solve_velocity(epoch, epoch_data, _debug_info)
 
+        if initial_fix and success and "iterations" in _debug_info:
+            self._init_stats["epochs"] += 1
+            self._init_stats["iterations"] += _debug_info["iterations"]
+
+        self._last_fix_epoch = epoch if success else None
+
+        profiler.count("ls_iterations", _debug_info.get("iterations", 0))
+        if success and _debug_info.get("geometry") is not None:
+            profiler.count("satellites_used", len(_debug_info["geometry"]))
+        else:
+            profiler.count("failed_epochs")
+
+        return success, state, RMS, _debug_info
+
+    @staticmethod
+    def store_solution(epoch, state, _debug_info, receiver_pos, receiver_bias, prefit_residuals, estimated_iono,
+                       postfit_residuals, DOPs, sat_info, receiver_velocity=None, receiver_clock_drift=None,
+                       covariance=None, inter_system_bias=None):
+        """
+        Stores the solution of an epoch (see `solve_epoch`) in the output timeseries (see `solve` for the arguments)
+        """
+        # store data for this epoch
+        receiver_pos.set_data(epoch, state.receiver_position)
+        receiver_bias.set_data(epoch, state.receiver_clock)
+        if state.iono:
+            estimated_iono.set_data(epoch, state.iono)
+        if state.ISB and inter_system_bias is not None:
+            inter_system_bias.set_data(epoch, state.ISB)
+        sat_info.set_data(epoch, _debug_info.get("geometry", None))
+        DOPs.set_dop(epoch, "matrix", _debug_info.get("DOP", None))
+        prefit_residuals.set_data(epoch, _debug_info.get("prefit", None))
+        postfit_residuals.set_data(epoch, _debug_info.get("postfit", None))
+
+        # velocity and recursive filter outputs
+        if "velocity" in _debug_info:
+            if receiver_velocity is not None:
+                receiver_velocity.set_data(epoch, _debug_info["velocity"])
+            if receiver_clock_drift is not None:
+                receiver_clock_drift.set_data(epoch, _debug_info["clock_drift"])
+        if "covariance" in _debug_info and covariance is not None:
+            covariance.set_data(epoch, _debug_info["covariance"])
+
+    def get_checkpoint_state(self):
+        """
+        State of the solver carried from one epoch to the next (besides the state space of the previous epoch), saved
+        in the checkpoints
+
+        Return:
+            dict : the state of the solver (see `set_checkpoint_state`)
+        """
+        # the recursive filter is restored from its state vector and covariance matrix
+        _filter = (self._filter.get_state(), self._filter.get_covariance()) if self._filter is not None else None
+        return {"last_fix_epoch": self._last_fix_epoch, "init_stats": dict(self._init_stats),
+                "filter": _filter, "filter_epoch": self._filter_epoch,
+                "discarded_satellites": dict(self._discarded_satellites.counts),
+                "visibility_pruned": self.visibility.pruned if self.visibility is not None else 0}
+
+    def set_checkpoint_state(self, solver_state):
+        """
+        Restores the state of the solver from a checkpoint (see `get_checkpoint_state`)
+        """
+        self._last_fix_epoch = solver_state["last_fix_epoch"]
+        self._init_stats = solver_state["init_stats"]
+        self._filter = ExtendedKalmanFilter(*solver_state["filter"]) if solver_state["filter"] is not None else None
+        self._filter_epoch = solver_state["filter_epoch"]
+        self._discarded_satellites.counts.update(solver_state["discarded_satellites"])
+        if self.visibility is not None:
+            self.visibility.pruned = solver_state["visibility_pruned"]
+
+    def finish(self):
+        """Logs the summary of the run (initialization statistics, discarded satellites and visibility pruning)"""
+        self._log_initialization_stats()
+        self._discarded_satellites.flush()
+        if self.visibility is not None:
+            self.log.info(f"Visibility prediction pruned {self.visibility.pruned} satellite links below the elevation "
+                          f"mask before the PVT computation")
+            if self.visibility.invalidated > 0:
+                self.log.info(f"{self.visibility.invalidated} precomputed elevations invalidated by new ephemerides")
         self.log.info("########## End of module 'GPS PVT Solver' ... ###########\n")
 
     @staticmethod
@@ -248,9 +564,7 @@ class GPSSolver:
         success = False
         RMS_prev = RMS = 1
         DOP = prefit_residuals = postfit_residuals = None
-
-        # URA, Satellite health filters. Flagged satellites are removed
-        self._initial_satellite_validation(epoch, epoch_data)
+        lsq_info = {}  # LS system of the last iteration
 
         # system geometry manager
         system_geometry = SystemGeometry(self.nav_data, nav_header, epoch_data)
@@ -261,6 +575,10 @@ class GPSSolver:
         if not control:
             return False, 0  # not enough data to process this epoch
 
+        # prune the satellites predicted to be well below the elevation mask
+        if not self._prune_invisible(system_geometry, epoch, state):
+            return False, 0
+
         # self.log.info(f"Processing {epoch.to_time_stamp()} with model {GPSSolver.MODEL[model]}. Available Satellites:"
         #              f"{system_geometry.get_satellites()}")
 
@@ -280,7 +598,7 @@ class GPSSolver:
                 if model == 0:
                     # Single Frequency Algorithm
                     postfit_residuals, DOP, prefit_residuals = self._solve_sf_LS(
-                        system_geometry, epoch_data, state, nav_header, epoch)
+                        system_geometry, epoch_data, state, nav_header, epoch, lsq_info)
                 else:
                     # Dual Frequency Algorithm
                     postfit_residuals, DOP, prefit_residuals = self._solve_df_LS(
@@ -304,85 +622,447 @@ class GPSSolver:
             RMS_prev = RMS
             iteration += 1
 
+        # fault detection and exclusion
+        if success and self.raim is not None and lsq_info:
+            try:
+                success, postfit_residuals, DOP, prefit_residuals = self._fault_detection_exclusion(
+                    epoch, system_geometry, state, lsq_info, DOP)
+            except (AttributeError, np.linalg.LinAlgError) as e:
+                self.log.warning(f"RAIM failed for {epoch.to_time_stamp()}\nReason: {e}")
+                success = False
+            if postfit_residuals is not None:
+                RMS = np.linalg.norm(postfit_residuals)
+
         # save debug_info
         _debug_info["geometry"] = system_geometry
         _debug_info["DOP"] = DOP
         _debug_info["prefit"] = prefit_residuals
         _debug_info["postfit"] = postfit_residuals
+        _debug_info["iterations"] = min(iteration + 1, self._info["MAX_ITER"])
         return success, RMS
 
+    def _is_prior_stale(self, epoch):
+        """
+        Returns True if there is no valid prior state to initialize the solution for this epoch, that is, if the
+        previous epoch failed (or this is the first epoch), or if the last fix is older than the allowed maximum age
+        """
+        if self._last_fix_epoch is None:
+            return True
+        return abs(epoch - self._last_fix_epoch) > self._info["INITIALIZATION"]["max_age"]
+
+    def _is_filter_valid(self, epoch):
+        """
+        Returns True if the recursive filter can be propagated to this epoch, that is, if it is initialized and its last
+        update is within the maximum allowed time gap
+        """
+        return self._filter is not None and abs(epoch - self._filter_epoch) <= self._info["EKF"]["max_gap"]
+
+    def _initial_fix(self, epoch, epoch_data, state, nav_header):
+        """
+        Computes a direct (Bancroft) solution for the receiver position and clock bias with the main code
+        pseudoranges, to be used as initial guess for the iterated Least Squares. The pseudoranges are corrected for the
+        satellite clocks (broadcast clock model, relativistic correction and TGD), but not for atmospheric delays.
+
+        Return:
+            bool : True if the initial fix was computed (and set in `state`), False otherwise
+        """
+        code = self._info["MAIN_CODE"]
+        c = Constant.SPEED_OF_LIGHT
+
+        satellites = epoch_data.get_satellites_for_datatypes(code)
+        if len(satellites) < self._info["NR_EQS"]:
+            return False
+
+        pseudoranges = np.array([epoch_data.get_observable(sat, code).value for sat in satellites])
+        nav_messages = [self.nav_data.get_sat_data_for_epoch(sat, epoch) for sat in satellites]
+        transit = pseudoranges / c
+
+        # satellite clock bias at the emission epoch (satellite time), and emission epoch in GPS time
+        time_sv = [epoch + (-float(tau)) for tau in transit]
+        af0 = np.array([nav_message.af0 for nav_message in nav_messages])
+        af1 = np.array([nav_message.af1 for nav_message in nav_messages])
+        af2 = np.array([nav_message.af2 for nav_message in nav_messages])
+        dt_toc = correct_gps_week_crossovers_array(
+            np.array([t - nav_message.toc for t, nav_message in zip(time_sv, nav_messages)], dtype=float))
+        dt_sat = af0 + af1 * dt_toc + af2 * dt_toc * dt_toc
+        time_emission = [t + (-float(dt)) for t, dt in zip(time_sv, dt_sat)]
+
+        # satellite positions at emission time, in the ECEF frame at reception time
+        positions, _, dt_relative, _ = EphemeridePropagator.compute_states(nav_messages, time_emission,
+                                                                           self._info["REL_CORRECTION"] == 1)
+        positions = rotate_to_reception_frame(positions, transit)
+
+        # TGD (0 for iono free observables, and scaled for frequencies different from f1)
+        TGD = np.array([nav_message.TGD for nav_message in nav_messages])
+        if DataType.is_iono_free_smooth_code(code) or DataType.is_iono_free_code(code):
+            TGD = TGD * 0
+        elif code.freq != f1:
+            TGD = TGD * (f1.freq_value / code.freq.freq_value) ** 2
+
+        try:
+            position, clock = bancroft(positions, pseudoranges + c * (dt_sat + dt_relative - TGD))
+        except PVTComputationFail as e:
+            self.log.debug("Direct initial fix failed for %r. Reason: %s", epoch, e)
+            return False
+
+        state.receiver_position = Position(position, epoch, "ECEF", "cartesian")
+        state.receiver_clock = clock / c  # receiver clock in seconds
+        self.log.debug("Direct initial fix for %r: position = %s [m], clock = %s [s]", epoch, position, clock / c)
+        return True
+
+    def _log_initialization_stats(self):
+        epochs = self._init_stats["epochs"]
+        if epochs == 0:
+            return
+
+        # a cold start (from the Earth's centre) is bounded by the maximum number of iterations of each epoch
+        iterations = self._init_stats["iterations"]
+        reference = self._info["MAX_ITER"]
+        self.log.info(f"Direct (Bancroft) initialization used in {epochs} epochs, requiring on average "
+                      f"{iterations / epochs:.2f} Least Squares iterations per epoch. Iterations saved with respect to "
+                      f"a cold start ({reference} iterations per epoch, MAX_ITER): {reference * epochs - iterations}")
+
+    def _solve_velocity(self, epoch, epoch_data, _debug_info):
+        """
+        Computes the receiver velocity and clock drift with the doppler observables, using the satellite geometry of
+        the position solution
+        """
+        if self.velocity_solver is None:
+            return
+
+        try:
+            velocity, clock_drift, _ = self.velocity_solver.solve(_debug_info["geometry"], epoch_data, epoch,
+                                                                         self._info["NR_EQS"])
+        except PVTComputationFail as e:
+            self.log.warning(f"Velocity computation failed for {epoch.to_time_stamp()}\nReason: {e}")
+            return
+
+        _debug_info["velocity"] = velocity
+        _debug_info["clock_drift"] = clock_drift
+
     def get_weight(self, system_geometry, sat):
         sigma_elevation = np.e ** (-system_geometry.get("el", sat))
         w = (1 / sigma_elevation) ** 2
 
         return w
 
-    def _solve_sf_LS(self, system_geometry, epoch_data, state, nav_header, epoch):
-
-        # initializations
-        satellite_list = system_geometry.get_satellites()
-        obs_length = len(satellite_list)  # number of available satellites
-        state_length = len(state)  # number of solve for parameters to estimate
+    def get_weights(self, system_geometry):
+        """Vectorized version of `get_weight`, for all satellites of `system_geometry` -> sigma = 1 / e^{-elevation}"""
+        sigma_elevation = np.e ** (-system_geometry.get_array("el"))
+        return (1 / sigma_elevation) ** 2
 
-        # least squares arrays
-        y = np.zeros(obs_length)  # observation vector <=> prefit residuals
-        G = np.ones((obs_length, state_length))  # geometry matrix
-        W = np.eye(obs_length)  # diagonal weight matrix
+    def _build_sf_system(self, system_geometry, epoch_data, nav_header, epoch):
+        """
+        Builds the single frequency linearized observation system, about the receiver position and clock used in the
+        last call to `system_geometry.compute`
 
+        Return:
+            tuple : (y, G, w), with y the prefit residuals (mx1), G the geometry matrix (mx4, [LOS, 1]) and w the
+                    diagonal of the weight matrix (mx1)
+        """
         observation_rec = ObservationReconstruction(system_geometry, self._info["MAIN_CODE"],
                                                     tropo=self._info["TROPO"] == 1,
                                                     iono=self._info["IONO"] == 1, true_range=True,
                                                     relativistic_correction=self._info["REL_CORRECTION"] == 1,
                                                     satellite_clock=True)
 
-        i = 0
-        for sat in satellite_list:
-            # get observable
-            obs = epoch_data.get_observable(sat, self._info["MAIN_CODE"])
+        # prefit residuals (measured observation - predicted observation)
+        y = system_geometry.get_observable_array(self._info["MAIN_CODE"]) - \
+            observation_rec.compute_array(nav_header, epoch)
 
-            # fetch valid navigation message (closest to the current epoch)
-            nav_message = self.nav_data.get_sat_data_for_epoch(sat, epoch)
+        # geometry matrix (LOS vectors w.r.t. ECEF frame + clock)
+        G = np.ones((len(y), 4))
+        G[:, 0:3] = system_geometry.get_line_of_sight_matrix()
 
-            # compute predicted observation
-            predicted_obs = observation_rec.compute(nav_message, nav_header, sat, epoch)
+        # diagonal of the weight matrix
+        w = self.get_weights(system_geometry)
 
-            # prefit residuals (measured observation - predicted observation)
-            prefit_residuals = obs - predicted_obs
+        return y, G, w
 
-            # get LOS vector w.r.t. ECEF frame (column in geometry matrix)
-            LOS = system_geometry.get_unit_line_of_sight(sat)
+    def _get_isb_matrix(self, system_geometry):
+        """
+        Builds the columns of the geometry matrix of the inter-system biases (ISB), for the current satellites of
+        `system_geometry`. An ISB is estimated for each system (other than the reference one) with satellites in view,
+        as long as the reference system is also in view (otherwise, the ISB is absorbed by the receiver clock)
 
-            # filling the corresponding entry of data vectors for the Least Squares quantities
-            y[i] = prefit_residuals.value
-            G[i][0:3] = LOS
+        Return:
+            tuple [numpy.ndarray, list] : ISB columns of the geometry matrix (mxk, 1 for the observations of the
+                                          corresponding system and 0 otherwise) and the list of the k estimated systems
+        """
+        if not self._info["ISB_SYSTEMS"]:
+            return np.zeros((len(system_geometry), 0)), []
 
-            # Weight matrix -> sigma = 1 / e^{-elevation}
-            W[i][i] = self.get_weight(system_geometry, sat)
+        systems = system_geometry.get_system_array()
+        isb_systems = []
+        if np.any(systems == self._info["SYSTEMS"][0]):
+            isb_systems = [system for system in self._info["ISB_SYSTEMS"] if np.any(systems == system)]
 
-            i += 1
+        return (systems[:, None] == np.array(isb_systems, dtype=str)[None, :]).astype(float), isb_systems
 
-        # solve LS problem for this iteration
-        try:
-            solver = WeightedLeastSquares(y, G, W=W)
-            solver.solve()
+    @staticmethod
+    def _set_clock_states(state, x, isb_systems):
+        """
+        Sets the receiver clock bias and the inter-system biases of `state` (in seconds) from the LS solution
+        x = [dx, dy, dz, c * dt, c * isb_1, ..., c * isb_k, ...]
+        """
+        state.receiver_clock = x[3] / Constant.SPEED_OF_LIGHT
+        state.ISB = {system: x[4 + i] / Constant.SPEED_OF_LIGHT for i, system in enumerate(isb_systems)} \
+            if isb_systems else None
 
-            DOP = np.linalg.inv(G.T @ G)  # Dilution of precision matrix (without Weights)
+    def _solve_sf_LS(self, system_geometry, epoch_data, state, nav_header, epoch, lsq_info=None):
+
+        # least squares arrays (with the inter-system bias columns, in multi-constellation processing)
+        y, G, w = self._build_sf_system(system_geometry, epoch_data, nav_header, epoch)
+        isb_matrix, isb_systems = self._get_isb_matrix(system_geometry)
+        if isb_systems:
+            G = np.hstack((G, isb_matrix))
+
+        # solve LS problem for this iteration, and Dilution of precision matrix (without Weights)
+        try:
+            dX, S, _, DOP = self._wls.solve(y, G, w, G_dop=G)
 
         except (AttributeError, np.linalg.LinAlgError) as e:
-            # possible error in the numpy.linalg.inv() function -> solution not possible
+            # possible error in the factorization -> solution not possible
             raise PVTComputationFail(e)
 
-        dX = solver.get_solution()
-
         # update state vector with incremental dX
         state.receiver_position.form = "cartesian"
         state.receiver_position += dX[0:3]
-        state.receiver_clock = dX[3] / Constant.SPEED_OF_LIGHT  # receiver clock in seconds
+        self._set_clock_states(state, dX, isb_systems)  # receiver clock and inter-system biases in seconds
+
+        # get post-fit residuals (full state: position increment, receiver clock and inter-system biases), and the
+        # prefit residuals with the estimated receiver clock (and inter-system biases) removed
+        post_fit = y - G @ dX
+        pre_fit = y - G[:, 3:] @ dX[3:]
+
+        if lsq_info is not None:
+            lsq_info.update({"satellites": system_geometry.get_satellites(), "y": y, "G": G, "w": w, "x": dX, "S": S,
+                             "isb_systems": isb_systems})
+
+        return post_fit, DOP, pre_fit
+
+    def _fault_detection_exclusion(self, epoch, system_geometry, state, lsq_info, DOP):
+        """
+        Checks the integrity of the converged Single Frequency solution (RAIM). Satellites flagged as faulty are
+        excluded from `system_geometry` (and recorded in it), and the solution is corrected with the rank-one
+        downdated LS solution, at the same linearization point
+
+        Return:
+            tuple : (success, postfit residuals, DOP matrix, prefit residuals) for the remaining satellites. success is
+                    False if a fault was detected but could not be excluded
+        """
+        satellites, y, G, w = lsq_info["satellites"], lsq_info["y"], lsq_info["G"], lsq_info["w"]
+        result = self.raim.run(y, G, w, lsq_info["x"], lsq_info["S"])
+
+        keep = np.ones(len(satellites), dtype=bool)
+        keep[result["excluded"]] = False
+        for i in result["excluded"]:
+            system_geometry.exclude(satellites[i], f"RAIM (normalized residual "
+                                                   f"{result['residuals'][i] * np.sqrt(w[i]) / self.raim.sigma:.2f})")
+
+        if result["excluded"]:
+            excluded = [satellites[i] for i in result["excluded"]]
+            self.log.info(f"RAIM excluded satellites {excluded} at epoch {epoch.to_time_stamp()}. Test statistic "
+                          f"{result['statistic']:.3f} (threshold {result['threshold']:.3f})")
+
+            # replace the solution of the last iteration with the downdated solution
+            dX = result["x"] - lsq_info["x"]
+            state.receiver_position.form = "cartesian"
+            state.receiver_position += dX[0:3]
+            self._set_clock_states(state, result["x"], lsq_info["isb_systems"])
+
+        # residuals (same definition as in _solve_sf_LS) and DOP matrix for the remaining satellites
+        y, G, x = y[keep], G[keep], result["x"]
+        post_fit = y - G @ x
+        pre_fit = y - G[:, 3:] @ x[3:]
+        DOP = self._wls.cofactor(G) if result["excluded"] else DOP
+
+        if result["passed"] is False:
+            self.log.warning(f"RAIM detected a fault at epoch {epoch.to_time_stamp()} that could not be excluded. Test "
+                             f"statistic {result['statistic']:.3f} (threshold {result['threshold']:.3f})")
+            return False, post_fit, DOP, pre_fit
+
+        return True, post_fit, DOP, pre_fit
+
+    def _solve_ekf(self, epoch, epoch_data, state, nav_header, _debug_info):
+        """
+        Extended Kalman Filter solution for the present epoch. The filter is (re)initialized with the iterated
+        Least Squares solution whenever there is no valid filter state (first epoch, or the time gap to the last filter
+        update is larger than the configured `max_gap`)
+        """
+        ekf_info = self._info["EKF"]
+
+        # (re)initialize the filter with the iterated LS solution
+        if not self._is_filter_valid(epoch):
+            if self._filter is not None:
+                self.log.warning(f"Resetting the {GPSSolver.SOLVER[2]} at epoch {epoch.to_time_stamp()}. Time gap to "
+                                 f"the last update ({abs(epoch - self._filter_epoch)} [s]) is larger than the maximum "
+                                 f"allowed ({ekf_info['max_gap']} [s])")
+                self._filter = None
+
+            success, RMS = self._solve(epoch, epoch_data, state, nav_header, _debug_info)
+            if success:
+                self._solve_velocity(epoch, epoch_data, _debug_info)
+                self._initialize_filter(epoch, state, _debug_info)
+                self._save_filter_info(_debug_info)
+            return success, RMS
+
+        # time update (prediction)
+        F, Q = self._get_transition_matrices(epoch - self._filter_epoch)
+        self._filter.predict(F, Q)
+        self._filter_epoch = epoch
+        x = self._filter.get_state()
+
+        state.receiver_position = Position(x[0:3], epoch, "ECEF", "cartesian")
+        self._set_filter_clock_states(state, x)
+
+        # system geometry, computed once about the predicted receiver position and clock
+        system_geometry = SystemGeometry(self.nav_data, nav_header, epoch_data)
+        control, model = self._check_model_availability(system_geometry, epoch_data, epoch)
+        if not control or not self._prune_invisible(system_geometry, epoch, state):
+            return False, 0  # not enough data to process this epoch
 
-        # get post-fit residuals
-        post_fit = y - G[:, 0:3] @ dX[0:3]
+        system_geometry.compute(epoch, state.receiver_position, state.receiver_clock, self.compute_TX_time,
+                                self._info["MAIN_CODE"], self._info["REL_CORRECTION"])
+        self._apply_elevation_mask(system_geometry, epoch)
+
+        if len(system_geometry.get_satellites()) < self._info["NR_EQS"]:
+            self.log.warning(f"Not enough satellites above the elevation mask to update the {GPSSolver.SOLVER[2]} at "
+                             f"epoch {epoch.to_time_stamp()}. Available satellites -- "
+                             f"{system_geometry.get_satellites()}")
+            return False, 0
+
+        # measurement update (correction)
+        try:
+            y, G, w = self._build_sf_system(system_geometry, epoch_data, nav_header, epoch)
+
+            H = np.zeros((len(y), self._filter_length))
+            H[:, 0:3] = G[:, 0:3]
+            H[:, 6] = 1.0
+            if self._info["ISB_SYSTEMS"]:
+                systems = system_geometry.get_system_array()
+                for i, system in enumerate(self._info["ISB_SYSTEMS"]):
+                    H[:, GPSSolver.EKF_STATE_LENGTH + i] = systems == system
+
+            # the prefit residuals are computed about the predicted clock bias (and inter-system biases)
+            innovation = y - H[:, 6:] @ x[6:]
+            R = ekf_info["code_sigma"] ** 2 / w
+
+            # range rate observations (doppler)
+            if self.velocity_solver is not None:
+                y_dot, G_dot, w_dot, _ = self.velocity_solver.build_system(system_geometry, epoch_data, epoch)
+
+                H_dot = np.zeros((len(y_dot), self._filter_length))
+                H_dot[:, 3:6] = G_dot[:, 0:3]
+                H_dot[:, 7] = 1.0
+
+                innovation = np.concatenate((innovation, y_dot - H_dot @ x))
+                H = np.vstack((H, H_dot))
+                R = np.concatenate((R, ekf_info["doppler_sigma"] ** 2 / w_dot))
+
+            self._filter.update(innovation, H, R)
+            DOP = self._wls.cofactor(G)  # Dilution of precision matrix (without Weights)
+
+        except (AttributeError, np.linalg.LinAlgError) as e:
+            self.log.warning(f"{GPSSolver.SOLVER[2]} failed to update for {epoch.to_time_stamp()}\nReason: {e}")
+            return False, 0
 
-        return post_fit, DOP, y
+        # update state vector
+        x = self._filter.get_state()
+        state.receiver_position = Position(x[0:3], epoch, "ECEF", "cartesian")
+        self._set_filter_clock_states(state, x)  # receiver clock and inter-system biases in seconds
+
+        # get post-fit residuals (code observations only)
+        post_fit = (innovation - H @ self._filter.get_correction())[0:len(y)]
+        RMS = np.linalg.norm(post_fit)
+
+        # save debug_info
+        _debug_info["geometry"] = system_geometry
+        _debug_info["DOP"] = DOP
+        _debug_info["prefit"] = innovation[0:len(y)]  # about the predicted receiver clock (and inter-system biases)
+        _debug_info["postfit"] = post_fit
+        self._save_filter_info(_debug_info)
+
+        return True, RMS
+
+    def _set_filter_clock_states(self, state, x):
+        # receiver clock and inter-system biases (in seconds), from the EKF state vector
+        state.receiver_clock = x[6] / Constant.SPEED_OF_LIGHT
+        if self._info["ISB_SYSTEMS"]:
+            state.ISB = {system: x[GPSSolver.EKF_STATE_LENGTH + i] / Constant.SPEED_OF_LIGHT
+                         for i, system in enumerate(self._info["ISB_SYSTEMS"])}
+
+    def _initialize_filter(self, epoch, state, _debug_info):
+        """
+        Initializes the Kalman Filter state with the provided (LS) solution. The position and clock covariance
+        (and the covariance of the inter-system biases estimated by the LS) is obtained from the DOP matrix, scaled by
+        the code noise variance. If available, the doppler-based velocity and clock drift are used to initialize the
+        corresponding states
+        """
+        ekf_info = self._info["EKF"]
+        c = Constant.SPEED_OF_LIGHT
+
+        state.receiver_position.form = "cartesian"
+        x = np.zeros(self._filter_length)
+        x[0:3] = state.receiver_position
+        x[6] = state.receiver_clock * c
+        if "velocity" in _debug_info:
+            x[3:6] = _debug_info["velocity"]
+            x[7] = _debug_info["clock_drift"] * c
+
+        # LS solution rows in the filter state: position, clock bias and the estimated inter-system biases
+        indexes = [0, 1, 2, 6]
+        for i, system in enumerate(self._info["ISB_SYSTEMS"]):
+            if state.ISB and system in state.ISB:
+                x[GPSSolver.EKF_STATE_LENGTH + i] = state.ISB[system] * c
+                indexes.append(GPSSolver.EKF_STATE_LENGTH + i)
+
+        P = np.diag(np.full(self._filter_length, ekf_info["initial_isb_sigma"] ** 2))
+        P[np.ix_(indexes, indexes)] = ekf_info["code_sigma"] ** 2 * \
+            _debug_info["DOP"][0:len(indexes), 0:len(indexes)]
+        P[3:6, 3:6] = np.eye(3) * ekf_info["initial_velocity_sigma"] ** 2
+        P[7, 7] = ekf_info["initial_clock_drift_sigma"] ** 2
+
+        self._filter = ExtendedKalmanFilter(x, P)
+        self._filter_epoch = epoch
+        self.log.info(f"Initialized the {GPSSolver.SOLVER[2]} at epoch {epoch.to_time_stamp()}")
+
+    def _get_transition_matrices(self, dt):
+        """
+        Computes the state transition matrix F and the process noise matrix Q for a time interval dt. The position
+        follows a constant velocity model (white noise acceleration), the receiver clock a two-state model (bias and
+        drift, driven by white noise) and the inter-system biases a random walk
+
+        Args:
+            dt (float) : time interval in seconds
+        Return:
+            tuple : (F, Q)
+        """
+        ekf_info = self._info["EKF"]
+        q_v = ekf_info["velocity_psd"]
+        q_b = ekf_info["clock_bias_psd"]
+        q_d = ekf_info["clock_drift_psd"]
+
+        F = np.eye(self._filter_length)
+        F[0:3, 3:6] = np.eye(3) * dt
+        F[6, 7] = dt
+
+        Q = np.zeros((self._filter_length, self._filter_length))
+        Q[0:3, 0:3] = np.eye(3) * q_v * dt ** 3 / 3
+        Q[0:3, 3:6] = Q[3:6, 0:3] = np.eye(3) * q_v * dt ** 2 / 2
+        Q[3:6, 3:6] = np.eye(3) * q_v * dt
+        Q[6, 6] = q_b * dt + q_d * dt ** 3 / 3
+        Q[6, 7] = Q[7, 6] = q_d * dt ** 2 / 2
+        Q[7, 7] = q_d * dt
+        Q[8:, 8:] = np.eye(len(self._info["ISB_SYSTEMS"])) * ekf_info["isb_psd"] * dt
+
+        return F, Q
+
+    def _save_filter_info(self, _debug_info):
+        x = self._filter.get_state()
+        _debug_info["velocity"] = x[3:6].copy()
+        _debug_info["clock_drift"] = x[7] / Constant.SPEED_OF_LIGHT  # receiver clock drift in s/s
+        _debug_info["covariance"] = self._filter.get_covariance().copy()
 
     def _solve_df_LS(self, system_geometry, epoch_data, state, nav_header, epoch):
 
@@ -393,72 +1073,48 @@ class GPSSolver:
         # least squares arrays
         y = np.zeros(obs_length*2)  # observation vector <=> prefit residuals
         G = np.ones((obs_length, 4))  # geometry matrix (state + clock)
-        W = np.eye(obs_length*2)  # diagonal weight matrix
+        G[:, 0:3] = system_geometry.get_line_of_sight_matrix()  # LOS vectors w.r.t. ECEF frame
+        isb_matrix, isb_systems = self._get_isb_matrix(system_geometry)
+        if isb_systems:
+            G = np.hstack((G, isb_matrix))  # inter-system biases (multi-constellation)
+        w = np.tile(self.get_weights(system_geometry), 2)  # diagonal of the weight matrix
         ionoMatrix1 = np.eye(obs_length) * (f1.freq_value / self._info["MAIN_CODE"].freq.freq_value)**2
         ionoMatrix2 = np.eye(obs_length) * (f1.freq_value / self._info["SECOND_CODE"].freq.freq_value)**2
 
-        # fill in the LS arrays
-        iFreq = 0
-        for code in [self._info["MAIN_CODE"], self._info["SECOND_CODE"]]:
+        # fill in the observation vector with the prefit residuals of each frequency
+        for iFreq, code in enumerate([self._info["MAIN_CODE"], self._info["SECOND_CODE"]]):
             observation_rec = ObservationReconstruction(system_geometry, code,
                                                         tropo=self._info["TROPO"] == 1,
                                                         iono=False, true_range=True,
                                                         relativistic_correction=self._info["REL_CORRECTION"] == 1,
                                                         satellite_clock=True)
-            iSat = 0
-            for sat in satellite_list:
-                # get observable
-                obs = epoch_data.get_observable(sat, code)
-
-                # fetch valid navigation message (closest to the current epoch)
-                nav_message = self.nav_data.get_sat_data_for_epoch(sat, epoch)
-
-                # compute predicted observation
-                predicted_obs = observation_rec.compute(nav_message, nav_header, sat, epoch)
-
-                # prefit residuals (measured observation - predicted observation)
-                prefit_residuals = obs - predicted_obs
-
-                if iFreq == 0:
-                    # get LOS vector w.r.t. ECEF frame (column in geometry matrix)
-                    LOS = system_geometry.get_unit_line_of_sight(sat)
-                    G[iSat][0:3] = LOS
-
-                # filling the corresponding entry of data vectors for the Least Squares quantities
-                y[iFreq * obs_length + iSat] = prefit_residuals.value
-
-                # Weight matrix -> sigma = 1 / e^{-elevation}
-                W[iFreq * obs_length + iSat][iFreq * obs_length + iSat] = self.get_weight(system_geometry, sat)
-
-                iSat += 1
-            iFreq += 1
+            y[iFreq * obs_length:(iFreq + 1) * obs_length] = system_geometry.get_observable_array(code) - \
+                observation_rec.compute_array(nav_header, epoch)
 
         # concatenate G matrices and iono matrices
         system_matrix = np.block([[G, ionoMatrix1], [G, ionoMatrix2]])
 
         # solve LS problem for this iteration
         try:
-            solver = WeightedLeastSquares(y, system_matrix, W=W)
-            solver.solve()
-
-            DOP = np.linalg.inv(G.T @ G)  # Dilution of precision matrix (without Weights)
+            dX, _, _, DOP = self._wls.solve(y, system_matrix, w, G_dop=G)
 
         except (AttributeError, np.linalg.LinAlgError) as e:
-            # possible error in the numpy.linalg.inv() function -> solution not possible
+            # possible error in the factorization -> solution not possible
             raise PVTComputationFail(e)
 
-        dX = solver.get_solution()
-
         # update state vector with incremental dX
         state.receiver_position.form = "cartesian"
         state.receiver_position += dX[0:3]
-        state.receiver_clock = dX[3] / Constant.SPEED_OF_LIGHT  # receiver clock in seconds
-        state.iono = [(satellite_list[i], dX[i+4]) for i in range(obs_length)]
+        self._set_clock_states(state, dX, isb_systems)  # receiver clock and inter-system biases in seconds
+        state.iono = [(satellite_list[i], dX[i + G.shape[1]]) for i in range(obs_length)]
 
-        # get post-fit residuals
-        post_fit = y[0:obs_length] - G[:, 0:3] @ dX[0:3]
+        # get post-fit residuals of the first frequency (full state: position increment, receiver clock, inter-system
+        # biases and ionosphere delays), and the prefit residuals with the estimated receiver clock (and inter-system
+        # biases) removed
+        post_fit = (y - system_matrix @ dX)[0:obs_length]
+        pre_fit = y - np.tile(G[:, 3:] @ dX[3:G.shape[1]], 2)
 
-        return post_fit, DOP, y
+        return post_fit, DOP, pre_fit
 
     def _check_model_availability(self, system_geometry, epoch_data, epoch):
         """
@@ -477,12 +1133,12 @@ class GPSSolver:
         """
         # user selected model (Dual Frequency or Single Frequency)
         model = self._info["MODEL"]
-        MIN_SAT = self._info["NR_EQS"]
 
         # Dual Frequency model
         if model == 1:
             available_sat_list = \
                 epoch_data.get_satellites_for_datatypes(self._info["MAIN_CODE"], self._info["SECOND_CODE"])
+            MIN_SAT = self._get_minimum_satellites(available_sat_list)
 
             if len(available_sat_list) < MIN_SAT:
                 self.log.warning(
@@ -503,6 +1159,7 @@ class GPSSolver:
 
         elif model == 0:
             available_sat_list = epoch_data.get_satellites_for_datatypes(self._info["MAIN_CODE"])
+            MIN_SAT = self._get_minimum_satellites(available_sat_list)
 
             if len(available_sat_list) < MIN_SAT:
                 self.log.warning(
@@ -513,28 +1170,72 @@ class GPSSolver:
 
         return True, model
 
+    def _get_minimum_satellites(self, satellites):
+        """
+        Returns the minimum number of satellites to compute the PVT solution: one more satellite is required for each
+        inter-system bias to be estimated (multi-constellation processing)
+        """
+        if not self._info["ISB_SYSTEMS"]:
+            return self._info["NR_EQS"]
+        return self._info["NR_EQS"] + len({sat.sat_system for sat in satellites}) - 1
+
+    def _prune_invisible(self, system_geometry, epoch, state):
+        """
+        Removes from `system_geometry` the satellites predicted to be below the elevation mask (by more than the
+        hysteresis margin), with the approximate receiver position or the prior receiver position in `state`
+
+        Return:
+            bool : False if there are not enough satellites left to compute the PVT solution, True otherwise
+        """
+        if self.visibility is None:
+            return True
+
+        pruned = self.visibility.prune(system_geometry, epoch, state.receiver_position)
+        if pruned:
+            self.log.debug("Pruning satellites %s at epoch %r, predicted below the elevation mask", pruned, epoch)
+
+        satellites = system_geometry.get_satellites()
+        if len(satellites) < self._get_minimum_satellites(satellites):
+            self.log.warning(f"Not enough satellites above the elevation mask to compute the PVT solution at "
+                             f"{epoch.to_time_stamp()}. Available satellites -- {satellites}")
+            return False
+        return True
+
     def _elevation_filter(self, system_geometry, iteration):
         # only apply the filter after iteration 3
         if iteration > 3:
+            sats_to_remove = self._apply_elevation_mask(system_geometry)
 
-            # get elevation threshold in radians
-            sats_to_remove = []
-            threshold = self._info["ELEVATION_FILTER"]
-            for sat, sat_info in system_geometry.items():
+            if sats_to_remove:
+                self.log.debug("Removing satellites %s in iteration %d due to elevation filter. ", sats_to_remove,
+                               iteration)
 
-                if sat_info.el * Constant.RAD2DEG < threshold:
-                    sats_to_remove.append(sat)
-                    # self.log.debug(f"Removing satellite {sat} in iteration {iteration} due to elevation filter. "
-                    #               f"Minimum threshold is {threshold} "
-                    #               f"[deg], computed elevation is {sat_info.el * Constant.RAD2DEG} [deg]")
+    def _apply_elevation_mask(self, system_geometry, epoch=None):
+        """
+        Removes from `system_geometry` the satellites below the elevation threshold
 
-            # remove flagged satellites
-            for sat in sats_to_remove:
-                system_geometry.remove(sat)
+        Return:
+            list : the removed satellites
+        """
+        # get elevation threshold in degrees
+        sats_to_remove = []
+        threshold = self._info["ELEVATION_FILTER"]
+        for sat, sat_info in system_geometry.items():
 
-            if sats_to_remove:
-                self.log.debug(f"Removing satellites {sats_to_remove} in iteration {iteration} due to "
-                               f"elevation filter. ")
+            if sat_info.el * Constant.RAD2DEG < threshold:
+                sats_to_remove.append(sat)
+                # self.log.debug(f"Removing satellite {sat} due to elevation filter. "
+                #               f"Minimum threshold is {threshold} "
+                #               f"[deg], computed elevation is {sat_info.el * Constant.RAD2DEG} [deg]")
+
+        # remove flagged satellites
+        for sat in sats_to_remove:
+            system_geometry.remove(sat)
+
+        if sats_to_remove and epoch is not None:
+            self.log.debug("Removing satellites %s at epoch %r due to elevation filter. ", sats_to_remove, epoch)
+
+        return sats_to_remove
 
     def _initial_satellite_validation(self, epoch, epoch_data):
         """
@@ -556,8 +1257,9 @@ class GPSSolver:
                 URA_threshold = self._info["SATELLITE_STATUS_FILTER"]["SV_minimum_URA"]
 
                 if URA > URA_threshold:
-                    self.log.warning(f"Satellite {sat} is being discarded at epoch {epoch.to_time_stamp()} due to high "
-                                     f"URA value ({URA}) compared to threshold {URA_threshold}")
+                    self._discarded_satellites.log((sat, "URA"), "Satellite %s is being discarded at epoch %r due to "
+                                                   "high URA value (%s) compared to threshold %s", sat, epoch, URA,
+                                                   URA_threshold)
                     sats_to_remove.append(sat)
                     continue
 
@@ -566,8 +1268,9 @@ class GPSSolver:
                 SV_health = nav_message.SV_health
 
                 if SV_health != 0:
-                    self.log.warning(f"Satellite {sat} is being discarded at epoch {epoch.to_time_stamp()} due to bad "
-                                     f"health flag. SV_health = {SV_health} in the navigation message")
+                    self._discarded_satellites.log((sat, "health"), "Satellite %s is being discarded at epoch %r due "
+                                                   "to bad health flag. SV_health = %s in the navigation message", sat,
+                                                   epoch, SV_health)
                     sats_to_remove.append(sat)
                     continue
 
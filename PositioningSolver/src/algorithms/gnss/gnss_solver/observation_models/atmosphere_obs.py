@@ -1,7 +1,5 @@
 import numpy as np
 
-from math import sin, cos
-
 from PositioningSolver.src.data_types.basics.DataType import DataTypeFactory
 from PositioningSolver.src.math_utils.Constants import Constant
 
@@ -41,40 +39,56 @@ def ionosphereCorrection(user_lat, user_long, sv_el, sv_az, alfa, beta, GPS_time
 
     """
 
+    iono = ionosphereCorrectionArray(user_lat, user_long, sv_el, sv_az, alfa, beta, GPS_time.seconds, frequency)
+    return float(iono)
+
+
+def ionosphereCorrectionArray(user_lat, user_long, sv_el, sv_az, alfa, beta, GPS_seconds, frequency):
+    """
+    Vectorized version of `ionosphereCorrection` (a priori Klobuchar Ionospheric Model), computing the ionosphere
+    corrections of all satellites at once. The arguments user_lat, user_long, sv_el, sv_az and GPS_seconds may be
+    scalars or numpy arrays (with broadcastable shapes)
+
+    Args:
+        user_lat (float or numpy.ndarray) : user latitude [rad]
+        user_long (float or numpy.ndarray) : user longitude [rad]
+        sv_el (float or numpy.ndarray) : satellite elevation [rad]
+        sv_az (float or numpy.ndarray) : satellite azimuth [rad]
+        alfa (list) : list of alfa parameters, length 4
+        beta (list) : list of beta parameters, length 4
+        GPS_seconds (float or numpy.ndarray) : GPS seconds of week of the epoch to compute the iono
+        frequency (src.data_types.basics.DataType.DataType) : user frequency (the iono is frequency dependent)
+
+    Return:
+        numpy.ndarray : ionosphere corrections [m]
+    """
     # Get angles in semicircles
-    sv_el_semi = sv_el / Constant.PI
-    user_lat_semi = user_lat / Constant.PI
-    user_long_semi = user_long / Constant.PI
+    sv_el_semi = np.asarray(sv_el, dtype=float) / Constant.PI
+    sv_az = np.asarray(sv_az, dtype=float)
+    user_lat_semi = np.asarray(user_lat, dtype=float) / Constant.PI
+    user_long_semi = np.asarray(user_long, dtype=float) / Constant.PI
 
     # Calculate the earth-centred angle (elevation in semicircles)
     psi = 0.0137 / (sv_el_semi + 0.11) - 0.022
 
     # Compute and fix the latitude of the Ionospheric Pierce Point(IPP)
-    lat_IPP = user_lat_semi + psi * cos(sv_az)
-    if lat_IPP > 0.416:
-        lat_IPP = 0.416
-    elif lat_IPP < -0.416:
-        lat_IPP = -0.416
+    lat_IPP = np.clip(user_lat_semi + psi * np.cos(sv_az), -0.416, 0.416)
 
     # Compute the longitude of the IPP
-    long_IPP = user_long_semi + (psi * sin(sv_az)) / cos(lat_IPP * Constant.PI)
+    long_IPP = user_long_semi + (psi * np.sin(sv_az)) / np.cos(lat_IPP * Constant.PI)
 
     # Find the geomagnetic latitude of the IPP
-    lat_m = lat_IPP + 0.064 * cos((long_IPP - 1.617) * Constant.PI)
+    lat_m = lat_IPP + 0.064 * np.cos((long_IPP - 1.617) * Constant.PI)
 
     # Find the local time at the IPP
-    t = Constant.SECONDS_IN_DAY / 2 * long_IPP + GPS_time.seconds
+    t = Constant.SECONDS_IN_DAY / 2 * long_IPP + GPS_seconds
     t = t % Constant.SECONDS_IN_DAY
 
     # Compute the amplitude of ionospheric delay.
-    A_I = alfa[0] + alfa[1] * lat_m + alfa[2] * (lat_m ** 2) + alfa[3] * (lat_m ** 3)
-    if A_I < 0:
-        A_I = 0
+    A_I = np.maximum(alfa[0] + alfa[1] * lat_m + alfa[2] * (lat_m ** 2) + alfa[3] * (lat_m ** 3), 0)
 
     # Compute the period of ionospheric delay
-    P_I = beta[0] + beta[1] * lat_m + beta[2] * (lat_m ** 2) + beta[3] * (lat_m ** 3)
-    if P_I < 72000:
-        P_I = 72000
+    P_I = np.maximum(beta[0] + beta[1] * lat_m + beta[2] * (lat_m ** 2) + beta[3] * (lat_m ** 3), 72000)
 
     # Compute the phase of ionospheric delay
     X_I = 2 * Constant.PI * (t - 50400) / P_I
@@ -83,22 +97,18 @@ def ionosphereCorrection(user_lat, user_long, sv_el, sv_az, alfa, beta, GPS_time
     F = 1.0 + 16.0 * (0.53 - sv_el_semi) ** 3
 
     # Compute the ionospheric time delay [s]
-    if abs(X_I) > 1.57:
-        iono = 5E-9 * F
-    else:
-        iono = (5E-9 + A_I * (1 - (X_I ** 2) / 2 + (X_I ** 4) / 24)) * F
+    iono = np.where(np.abs(X_I) > 1.57, 5E-9 * F, (5E-9 + A_I * (1 - (X_I ** 2) / 2 + (X_I ** 4) / 24)) * F)
 
     # fix I for non L1 users
     if frequency != f1:
         iono = (f1.freq_value / frequency.freq_value) ** 2 * iono
 
     # get ionosphere in meters
-    iono = iono * Constant.SPEED_OF_LIGHT
-    return iono
+    return iono * Constant.SPEED_OF_LIGHT
 
 
 # Constants for the tropospheric Saastamoinen model
-LimLat = (15, 30, 45, 60, 75)
+LimLat = np.array([15, 30, 45, 60, 75])
 
 #                   P0(mbar) T0(K)    e0(mbar) beta(K/m)  lambda0
 P_mean = np.array([[1013.25, 299.65,  26.31,   6.30e-3,   2.7],
@@ -137,42 +147,89 @@ def troposphericCorrection(h, lat, DOY, el):
 
     """
 
-    # convert lat to degrees
-    lat = Constant.RAD2DEG * lat
+    return float(SaastamoinenModel(lat, h, DOY).compute(el))
+
+
+def troposphericCorrectionArray(h, lat, DOY, el):
+    """
+    Vectorized version of `troposphericCorrection` (a priori Saastamoinen Model), computing the tropospheric
+    corrections of all satellites at once. The arguments may be scalars or numpy arrays (with broadcastable shapes).
+    When the receiver position is the same for all satellites, prefer `SaastamoinenModel`, which computes the zenith
+    delay only once
+
+    Args:
+        h (float or numpy.ndarray) : user altitude (geodetic coordinate)     [m]
+        lat (float or numpy.ndarray) : user latitude (geodetic coordinate)   [rad]
+        DOY (float or numpy.ndarray) : Day of the year (from 1 to 365)       [1 - 365]
+        el (float or numpy.ndarray) : user elevation                         [rad]
+
+    Return:
+        numpy.ndarray : tropospheric corrections [m]
+    """
+    return _saastamoinen_zenith_delay(h, lat, DOY) * _saastamoinen_mapping(el)
 
-    if lat < 0:
-        D_star = 211
-    else:
-        D_star = 28
 
-    if lat > LimLat[-1]:  # if lat > 75 [deg]
-        P0 = P_mean[-1]
-        DP = P_season[-1]
+def _saastamoinen_zenith_delay(h, lat, DOY):
+    """
+    Zenith (dry + wet) tropospheric delay of the Saastamoinen model [m], with the meteorological parameters
+    interpolated in latitude bands and corrected for the seasonal variation (see `troposphericCorrection`)
+    """
+    # convert lat to degrees
+    lat = Constant.RAD2DEG * np.asarray(lat, dtype=float)
+    h = np.asarray(h, dtype=float)
 
-    elif lat < LimLat[0]:  # if lat < 15 [deg]
-        P0 = P_mean[0]
-        DP = P_season[0]
+    D_star = np.where(lat < 0, 211, 28)
 
-    else:
-        _iis = [lat_i < lat for lat_i in LimLat]
-        _iis.reverse()
-        _i = 4 - _iis.index(True)
-        m = (lat - LimLat[_i]) / (LimLat[_i + 1] - LimLat[_i])
-        P0 = P_mean[_i] + (P_mean[_i + 1] - P_mean[_i]) * m
-        DP = P_season[_i] + (P_season[_i + 1] - P_season[_i]) * m
+    # latitude band [LimLat[i], LimLat[i+1]] and interpolation factor (clamped outside [15, 75] deg)
+    i = np.clip(np.searchsorted(LimLat, lat) - 1, 0, len(LimLat) - 2)
+    m = np.clip((lat - LimLat[i]) / (LimLat[i + 1] - LimLat[i]), 0, 1)[..., None]
+    P0 = P_mean[i] + (P_mean[i + 1] - P_mean[i]) * m
+    DP = P_season[i] + (P_season[i + 1] - P_season[i]) * m
 
-    Par = P0 - DP * cos(2 * np.pi * (DOY - D_star) / 365.25)
+    Par = P0 - DP * np.cos(2 * np.pi * (np.asarray(DOY) - D_star) / 365.25)[..., None]
 
-    P, T, e, beta, Lambda = Par[:]
+    P, T, e = Par[..., 0], Par[..., 1], Par[..., 2]
 
-    fs = 1 - 0.00266 * cos(2 * lat) - 0.00000028 * h
+    fs = 1 - 0.00266 * np.cos(2 * lat) - 0.00000028 * h
 
     D_z_dry = (0.0022768 - 0.0000005) * P / fs
 
     D_z_wet = (0.002277 * (1255 / T + 0.05) * e) / fs
 
-    M = 1.001 / np.sqrt(0.002001 + (sin(el)) ** 2)
+    return D_z_dry + D_z_wet
+
 
-    dD_tropo = (D_z_dry + D_z_wet) * M
+def _saastamoinen_mapping(el):
+    """Elevation mapping function of the Saastamoinen model"""
+    return 1.001 / np.sqrt(0.002001 + np.sin(el) ** 2)
 
-    return dD_tropo
+
+class SaastamoinenModel:
+    """
+    Saastamoinen tropospheric model for a given receiver position and day of the year. The latitude band interpolation
+    and the seasonal term (that is, the zenith delay) are computed once in the constructor, so that only the elevation
+    mapping is evaluated for each satellite
+    """
+    __slots__ = ["lat", "h", "DOY", "zenith_delay"]
+
+    def __init__(self, lat, h, DOY):
+        """
+        Args:
+            lat (float) : user latitude (geodetic coordinate)   [rad]
+            h (float) : user altitude (geodetic coordinate)     [m]
+            DOY (float) : Day of the year (from 1 to 365)       [1 - 365]
+        """
+        self.lat = lat
+        self.h = h
+        self.DOY = DOY
+        self.zenith_delay = float(_saastamoinen_zenith_delay(h, lat, DOY))
+
+    def compute(self, el):
+        """
+        Args:
+            el (float or numpy.ndarray) : satellite elevation(s) [rad]
+
+        Return:
+            numpy.ndarray : tropospheric correction(s) [m]
+        """
+        return self.zenith_delay * _saastamoinen_mapping(el)
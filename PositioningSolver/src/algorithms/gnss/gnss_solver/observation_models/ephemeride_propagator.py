@@ -3,6 +3,7 @@ from math import sqrt, cos, sin
 import numpy
 
 from PositioningSolver.src.math_utils.Constants import Constant
+from PositioningSolver.src.data_types.containers.NavigationData import NavigationPointGAL
 from PositioningSolver.src.data_types.orbits.frame import M2E, E2v, matrix_ECEF2ECI
 from PositioningSolver.src.data_types.orbits.statevector import Position
 
@@ -34,6 +35,44 @@ def correct_gps_week_crossovers(time_diff: float) -> float:
     return time_diff
 
 
+def correct_gps_week_crossovers_array(time_diff: numpy.ndarray) -> numpy.ndarray:
+    """
+    Vectorized version of :func:`correct_gps_week_crossovers`, for an array of time differences
+
+    Args:
+        time_diff (numpy.ndarray) : time differences to be fixed
+    Return:
+        numpy.ndarray : fixed time differences
+    """
+    half_week = 302400
+
+    time_diff = numpy.where(time_diff > half_week, time_diff - 2 * half_week, time_diff)
+    time_diff = numpy.where(time_diff < -half_week, time_diff + 2 * half_week, time_diff)
+
+    return time_diff
+
+
+def rotate_to_reception_frame(vectors: numpy.ndarray, transit: numpy.ndarray) -> numpy.ndarray:
+    """
+    Vectorized rotation of satellite vectors (positions or velocities) from the ECEF frame defined at transmission
+    time to the ECEF frame defined at reception time, that is, R(-transit) @ vector for each satellite, where R() is
+    the rotation matrix from ECEF to ECI (see :func:`matrix_ECEF2ECI`)
+
+    Args:
+        vectors (numpy.ndarray) : satellite vectors (nx3) in the ECEF frame at transmission time
+        transit (numpy.ndarray) : transit times (n) in seconds
+    Return:
+        numpy.ndarray : satellite vectors (nx3) in the ECEF frame at reception time
+    """
+    theta = Constant.EARTH_ROTATION * transit
+    cos_theta = numpy.cos(theta)
+    sin_theta = numpy.sin(theta)
+
+    return numpy.column_stack((cos_theta * vectors[:, 0] + sin_theta * vectors[:, 1],
+                               -sin_theta * vectors[:, 0] + cos_theta * vectors[:, 1],
+                               vectors[:, 2]))
+
+
 class EphemeridePropagator:
 
     @staticmethod
@@ -76,13 +115,32 @@ class EphemeridePropagator:
         return p_sat, rho_0, dt_relative
 
     @staticmethod
-    def compute(nav_message, epoch, relativistic_correction, constellation="GPS") -> tuple[Position, float]:
+    def get_orbital_constants(nav_message) -> tuple[float, float]:
         """
-        Computes the satellite ephemeride at the requested epoch, given the closest (valid) navigation data point
+        Returns the Earth's gravitational parameter and rotation rate to use with the broadcast ephemerides of the
+        navigation message (WGS84 values for GPS, and the values of table 59 of the Galileo OS SIS ICD for Galileo)
 
         Args:
-            constellation (src.data_types.gnss.SatelliteSystem) : the constellation to process
-            nav_message (src.data_types.containers.NavigationData.NavigationPointGPS) : navigation data point object
+            nav_message (src.data_types.containers.NavigationData.NavigationPointGPS or NavigationPointGAL) : navigation
+                                                                                                      data point
+        Returns:
+            tuple [float, float] : gravitational parameter [m^3/sec^2] and Earth rotation rate [rad/sec]
+        """
+        if isinstance(nav_message, NavigationPointGAL):
+            return Constant.MU_GAL, Constant.EARTH_ROTATION_GAL
+        return Constant.MU, Constant.EARTH_ROTATION
+
+    @staticmethod
+    def compute(nav_message, epoch, relativistic_correction) -> tuple[Position, float]:
+        """
+        Computes the satellite ephemeride at the requested epoch, given the closest (valid) navigation data point.
+
+        The Galileo broadcast ephemerides follow the same Keplerian model as the GPS ones (section 5.1.1 of the Galileo
+        OS SIS ICD), only the orbital constants differ (see `get_orbital_constants`)
+
+        Args:
+            nav_message (src.data_types.containers.NavigationData.NavigationPointGPS or NavigationPointGAL) : navigation
+                                                                                                      data point object
             epoch (src.data_types.basics.Epoch.Epoch) : Epoch to compute the ephemerides. For a correct implementation,
                                                         should be in GPS time (not SV nor receiver time)
             relativistic_correction (bool) : whether or not to compute the relativistic correction
@@ -92,17 +150,197 @@ class EphemeridePropagator:
                                       corresponding clock relativistic corrections
 
         """
-        return EphemeridePropagator._compute_ephemeride_GPS(nav_message, epoch, relativistic_correction)
-        # if constellation == "GPS":
-        #    return EphemeridePropagator._compute_ephemeride_GPS(nav_message, epoch, relativistic_correction)
-        # else:
-        #    raise NotImplementedError(f"Galileo ephemeride propagator not yet implemented. Only GPS is currently "
-        #                              f"possible.")
+        mu, earth_rotation = EphemeridePropagator.get_orbital_constants(nav_message)
+        return EphemeridePropagator._compute_ephemeride_GPS(nav_message, epoch, relativistic_correction,
+                                                            mu, earth_rotation)
+
+    @staticmethod
+    def compute_states(nav_messages, epochs, relativistic_correction) -> tuple:
+        """
+        Vectorized version of :meth:`compute` that also computes the satellite velocities. Propagates a batch of
+        navigation data points (one for each satellite, GPS and/or Galileo) to the requested epochs in a single pass
+        over numpy arrays.
+
+        Args:
+            nav_messages (list) : list of n navigation data point objects
+                                  (src.data_types.containers.NavigationData.NavigationPointGPS or NavigationPointGAL)
+            epochs (list) : list of n epochs (src.data_types.basics.Epoch.Epoch) to compute the ephemerides, in GPS time
+            relativistic_correction (bool) : whether or not to compute the relativistic correction (and its rate)
+
+        Returns:
+            tuple [numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray] : satellite positions (nx3) and
+                velocities (nx3) in the ECEF frame defined at the requested epochs, relativistic clock corrections (n)
+                and their time derivatives (n)
+        """
+        elements = EphemeridePropagator.get_elements_array(nav_messages)
+
+        # time from ephemeris reference epoch
+        dt = numpy.array([epoch - nav_message.toe for epoch, nav_message in zip(epochs, nav_messages)], dtype=float)
+        return EphemeridePropagator.propagate_states(elements, dt, relativistic_correction)
+
+    # broadcast orbital elements used in the propagation of the ephemerides
+    ORBITAL_ELEMENTS = ("M0", "sqrtA", "deltaN", "eccentricity", "omega", "RAANDot", "RAAN0", "cuc", "cus", "crc",
+                        "crs", "i0", "iDot", "cic", "cis")
+
+    @staticmethod
+    def get_elements_array(nav_messages) -> dict:
+        """
+        Gathers the broadcast orbital elements of a batch of navigation data points in numpy arrays
+
+        Args:
+            nav_messages (list) : list of n navigation data point objects
+                                  (src.data_types.containers.NavigationData.NavigationPointGPS or NavigationPointGAL)
+
+        Returns:
+            dict : orbital element (see ORBITAL_ELEMENTS) -> array (n), together with the seconds of week of the
+                   reference epoch of the ephemerides ("toe_seconds") and the orbital constants ("mu",
+                   "earth_rotation") of each navigation data point
+        """
+        elements = {name: numpy.array([getattr(nav_message, name) for nav_message in nav_messages], dtype=float)
+                    for name in EphemeridePropagator.ORBITAL_ELEMENTS}
+        elements["toe_seconds"] = numpy.array([nav_message.toe.seconds for nav_message in nav_messages], dtype=float)
+
+        constants = numpy.array([EphemeridePropagator.get_orbital_constants(nav_message)
+                                 for nav_message in nav_messages], dtype=float).reshape(-1, 2)
+        elements["mu"] = constants[:, 0]
+        elements["earth_rotation"] = constants[:, 1]
+        return elements
+
+    @staticmethod
+    def propagate_states(elements, dt, relativistic_correction) -> tuple:
+        """
+        Implements the updating of GPS ephemerides (position and velocity) and the transformation to ECEF frame,
+        for a batch of orbital elements (Galileo ephemerides follow the same model, with the Galileo orbital constants).
+
+        table 20-III [sec 20.3.3.4.3] of **REF[3]** (position) and table 20-IV of **REF[3]** (velocity)
+
+        Args:
+            elements (dict) : orbital elements arrays (n), see `get_elements_array`. The arrays may also be indexed
+                              (e.g. one row per epoch and satellite) with {name: array[rows]}
+            dt (numpy.ndarray) : time from the ephemerides reference epoch (n) [s]
+            relativistic_correction (bool) : whether or not to compute the relativistic correction (and its rate)
+
+        Returns:
+            tuple [numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray] : satellite positions (nx3) and
+                velocities (nx3) in the ECEF frame defined at the requested epochs, relativistic clock corrections (n)
+                and their time derivatives (n)
+        """
+        M0 = elements["M0"]
+        sqrtA = elements["sqrtA"]
+        deltaN = elements["deltaN"]
+        eccentricity = elements["eccentricity"]
+        omega = elements["omega"]
+        RAANDot = elements["RAANDot"]
+        RAAN0 = elements["RAAN0"]
+        cuc = elements["cuc"]
+        cus = elements["cus"]
+        crc = elements["crc"]
+        crs = elements["crs"]
+        i0 = elements["i0"]
+        iDot = elements["iDot"]
+        cic = elements["cic"]
+        cis = elements["cis"]
+        toe_seconds = elements["toe_seconds"]
+        mu = elements["mu"]
+        earth_rotation = elements["earth_rotation"]
+
+        # semi major axis
+        A = sqrtA * sqrtA
+
+        # mean motion
+        n = numpy.sqrt(mu / (A * A * A))
+
+        # correct time from ephemeris reference epoch for beginning / end of week crossovers
+        dt = correct_gps_week_crossovers_array(numpy.asarray(dt, dtype=float))
+
+        # corrected mean motion
+        n = n + deltaN
+
+        # mean anomaly at epoch
+        M = M0 + n * dt
+
+        # eccentric anomaly (Kepler equation, Newton-Raphson iterations)
+        E = M.copy()
+        for _ in range(10):
+            dE = (M - E + eccentricity * numpy.sin(E)) / (1 - eccentricity * numpy.cos(E))
+            E = E + dE
+            if numpy.all(numpy.abs(dE) < 1e-12):
+                break
+        sinE = numpy.sin(E)
+        cosE = numpy.cos(E)
+
+        # true anomaly
+        v = numpy.arctan2(numpy.sqrt(1 - eccentricity * eccentricity) * sinE, cosE - eccentricity)
+
+        # argument of latitude
+        phi = v + omega
+        sin2phi = numpy.sin(2 * phi)
+        cos2phi = numpy.cos(2 * phi)
+
+        # corrections
+        u_correction = cuc * cos2phi + cus * sin2phi
+        radius_correction = crc * cos2phi + crs * sin2phi
+        inclination_correction = cic * cos2phi + cis * sin2phi
+
+        # apply corrections
+        u = phi + u_correction
+        radius = A * (1 - eccentricity * cosE) + radius_correction
+        i = i0 + inclination_correction + iDot * dt
+
+        # time derivatives of the anomalies and of the corrected orbital elements
+        EDot = n / (1 - eccentricity * cosE)
+        vDot = EDot * numpy.sqrt(1 - eccentricity * eccentricity) / (1 - eccentricity * cosE)
+        uDot = vDot * (1 + 2 * (cus * cos2phi - cuc * sin2phi))
+        radiusDot = A * eccentricity * sinE * EDot + 2 * vDot * (crs * cos2phi - crc * sin2phi)
+        iDot_corrected = iDot + 2 * vDot * (cis * cos2phi - cic * sin2phi)
+
+        # SV position and velocity in orbital plane
+        cos_u = numpy.cos(u)
+        sin_u = numpy.sin(u)
+        x_orbital = radius * cos_u
+        y_orbital = radius * sin_u
+        x_orbital_dot = radiusDot * cos_u - radius * uDot * sin_u
+        y_orbital_dot = radiusDot * sin_u + radius * uDot * cos_u
+
+        # corrected RAAN
+        RAAN = RAAN0 + (RAANDot - earth_rotation) * dt - earth_rotation * toe_seconds
+        RAAN_dot = RAANDot - earth_rotation
+        cos_RAAN = numpy.cos(RAAN)
+        sin_RAAN = numpy.sin(RAAN)
+        cos_i = numpy.cos(i)
+        sin_i = numpy.sin(i)
+
+        # ECEF coordinates
+        positions = numpy.empty((len(dt), 3))
+        positions[:, 0] = x_orbital * cos_RAAN - y_orbital * cos_i * sin_RAAN
+        positions[:, 1] = x_orbital * sin_RAAN + y_orbital * cos_i * cos_RAAN
+        positions[:, 2] = y_orbital * sin_i
+
+        # ECEF velocities
+        velocities = numpy.empty((len(dt), 3))
+        velocities[:, 0] = x_orbital_dot * cos_RAAN - y_orbital_dot * cos_i * sin_RAAN + \
+            y_orbital * sin_i * sin_RAAN * iDot_corrected - positions[:, 1] * RAAN_dot
+        velocities[:, 1] = x_orbital_dot * sin_RAAN + y_orbital_dot * cos_i * cos_RAAN - \
+            y_orbital * sin_i * cos_RAAN * iDot_corrected + positions[:, 0] * RAAN_dot
+        velocities[:, 2] = y_orbital_dot * sin_i + y_orbital * cos_i * iDot_corrected
+
+        # compute relativistic correction (and its rate)
+        rel_correction = numpy.zeros(len(dt))
+        rel_correction_dot = numpy.zeros(len(dt))
+        if relativistic_correction:
+            # Eq 5.19 of **REF[1]**
+            F = -2 * numpy.sqrt(mu) / Constant.SPEED_OF_LIGHT ** 2
+            rel_correction = F * sqrtA * eccentricity * sinE
+            rel_correction_dot = F * sqrtA * eccentricity * cosE * EDot
+
+        return positions, velocities, rel_correction, rel_correction_dot
 
     @staticmethod
-    def _compute_ephemeride_GPS(nav_message, epoch, relativistic_correction):
+    def _compute_ephemeride_GPS(nav_message, epoch, relativistic_correction, mu=Constant.MU,
+                                earth_rotation=Constant.EARTH_ROTATION):
         """
-        Implements the updating of GPS ephemerides (position) and the transformation to ECEF frame
+        Implements the updating of GPS ephemerides (position) and the transformation to ECEF frame, with the
+        orbital constants `mu` and `earth_rotation`
 
         table 20-III [sec 20.3.3.4.3] of **REF[3]**
         """
@@ -135,7 +373,7 @@ class EphemeridePropagator:
         A_3 = A * A * A
 
         # mean motion
-        n = sqrt(Constant.MU / A_3)
+        n = sqrt(mu / A_3)
 
         # time from ephemeris reference epoch (correct for beginning / end of week crossovers)
         dt = epoch - toe
@@ -171,7 +409,7 @@ class EphemeridePropagator:
         y_orbital = radius * sin(u)
 
         # corrected RAAN
-        RAAN = RAAN0 + (RAANDot - Constant.EARTH_ROTATION) * dt - Constant.EARTH_ROTATION * toe.seconds
+        RAAN = RAAN0 + (RAANDot - earth_rotation) * dt - earth_rotation * toe.seconds
 
         # ECEF coordinates
         x_ECEF = x_orbital * cos(RAAN) - y_orbital * cos(i) * sin(RAAN)
@@ -185,5 +423,5 @@ class EphemeridePropagator:
         rel_correction = 0
         if relativistic_correction:
             # Eq 5.19 of **REF[1]**
-            rel_correction = -2 * sqrt(Constant.MU) * sqrtA / Constant.SPEED_OF_LIGHT ** 2 * eccentricity * sin(E)
+            rel_correction = -2 * sqrt(mu) * sqrtA / Constant.SPEED_OF_LIGHT ** 2 * eccentricity * sin(E)
         return position, rel_correction
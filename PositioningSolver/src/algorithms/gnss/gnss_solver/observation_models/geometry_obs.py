@@ -1,6 +1,12 @@
+import numpy as np
+
+from PositioningSolver.src import get_profiler
 from PositioningSolver.src.algorithms.gnss.gnss_solver.observation_models.ephemeride_propagator import EphemeridePropagator
 from PositioningSolver.src.data_types.basics.DataType import DataTypeFactory, DataType
+from PositioningSolver.src.data_types.basics.Epoch import Epoch
 from PositioningSolver.src.data_types.containers.Container import Container
+from PositioningSolver.src.data_types.gnss.Satellite import Satellite
+from PositioningSolver.src.data_types.orbits.statevector import Position
 from PositioningSolver.src.data_types.orbits.frame import ENU2AzEl
 from PositioningSolver.src.utils.errors import NonExistentObservable
 
@@ -35,6 +41,36 @@ class SatelliteGeometry(Container):
     def __repr__(self):
         return str(self)
 
+    def to_row(self):
+        """
+        Return:
+            list : the satellite geometry as a row of floats (see `from_row`)
+        """
+        return [self.transit_time, self.time_emission.week, self.time_emission.seconds, self.time_reception.week,
+                self.time_reception.seconds, self.true_range, self.az, self.el, *self.satellite_position[0:3],
+                *self.receiver_position[0:3], self.dt_rel_correction]
+
+    @staticmethod
+    def from_row(row, epoch):
+        """
+        Args:
+            row (list) : satellite geometry as a row of floats (see `to_row`)
+            epoch (src.data_types.basics.Epoch.Epoch) : epoch of the receiver position
+        Return:
+            SatelliteGeometry : the satellite geometry
+        """
+        info = SatelliteGeometry()
+        info.transit_time = row[0]
+        info.time_emission = Epoch((int(row[1]), row[2]))
+        info.time_reception = Epoch((int(row[3]), row[4]))
+        info.true_range = row[5]
+        info.az = row[6]
+        info.el = row[7]
+        info.satellite_position = Position(row[8:11], info.time_emission, "ECEF", "cartesian")
+        info.receiver_position = Position(row[11:14], epoch, "ECEF", "cartesian")
+        info.dt_rel_correction = row[14]
+        return info
+
     def compute(self, rec_pos, epoch, rec_bias, nav_message, computeTX, PR_obs, relativistic_correction):
         """
         compute satellite-related quantities (tropo, iono, transmission time, etc.) to be used in the PVT observation
@@ -96,6 +132,15 @@ class SatelliteGeometry(Container):
 
 
 class SystemGeometry:
+    """
+    Satellite geometry of an observation epoch, for all available satellites. Besides the per-satellite access
+    (`get`), the data of the current satellites can be fetched as numpy arrays (`get_array`, `get_observable_array`,
+    `get_navigation_array`, `get_line_of_sight_matrix`), with rows in the order of `get_satellites()`.
+
+    Observables and navigation parameters do not change within the epoch, so they are gathered once for all
+    satellites of the epoch, and indexed with the rows of the current satellites. Geometry arrays are gathered once
+    per call to `compute`. Removing a satellite removes the corresponding rows of the cached arrays.
+    """
     def __init__(self, nav_data, nav_header, epoch_data):
         """
         Args:
@@ -103,16 +148,26 @@ class SystemGeometry:
             nav_header (src.data_types.containers.NavigationData.NavigationHeader) : Valid navigation header
             epoch_data (src.data_types.containers.ObservationData.EpochData) : observation epoch data for
         """
-        self._data = dict.fromkeys(epoch_data.get_satellites())
+        satellites = epoch_data.get_satellites()
+        self._data = dict.fromkeys(satellites)
         self.nav_data = nav_data
         self.nav_header = nav_header
         self.epoch_data = epoch_data
+        self._excluded = {}  # satellites excluded from the solution by the integrity monitoring (sat -> reason)
+
+        # array views: row of each satellite in the epoch-wide arrays, rows of the current satellites, and caches
+        self._row = {sat: i for i, sat in enumerate(satellites)}
+        self._rows = np.arange(len(satellites))
+        self._nav_messages = {}  # sat -> navigation message (fetched in the first call to compute)
+        self._epoch_arrays = {}  # epoch-wide arrays (all satellites of the epoch)
+        self._arrays = {}  # geometry arrays (current satellites, valid until the next call to compute)
 
     def _clean(self):
         # reinitialize self._data
         vSats = self.get_satellites()
         self._data.clear()
         self._data = dict.fromkeys(vSats)
+        self._arrays = {}
 
     def items(self):
         return self._data.items()
@@ -122,8 +177,27 @@ class SystemGeometry:
 
     def remove(self, sat):
         if sat in self._data:
+            # remove the corresponding rows from the cached arrays
+            keep = np.array([_sat != sat for _sat in self._data])
+            self._rows = self._rows[keep]
+            self._arrays = {attribute: array[keep] for attribute, array in self._arrays.items()}
+
             self._data.pop(sat)
 
+    def exclude(self, sat, reason):
+        """
+        Removes a satellite from the solution, keeping record of the exclusion
+
+        Args:
+            sat (src.data_types.gnss.Satellite.Satellite) : satellite to exclude
+            reason (str) : reason for the exclusion
+        """
+        self.remove(sat)
+        self._excluded[sat] = reason
+
+    def get_excluded(self):
+        return dict(self._excluded)
+
     def get(self, attribute, sat):
         if sat in self._data:
             return getattr(self._data[sat], attribute)
@@ -151,7 +225,10 @@ class SystemGeometry:
             geometry = SatelliteGeometry()
 
             # fetch navigation message for this satellite
-            nav_message = self.nav_data.get_sat_data_for_epoch(sat, epoch)
+            nav_message = self._nav_messages.get(sat)
+            if nav_message is None:
+                nav_message = self.nav_data.get_sat_data_for_epoch(sat, epoch)
+                self._nav_messages[sat] = nav_message
 
             # fetch pseudorange observation for this satellite at epoch (used in the compute_TX_time algorithm)
             try:
@@ -169,6 +246,125 @@ class SystemGeometry:
         for sat in _to_remove:
             self.remove(sat)
 
+        get_profiler().count("geometry_computations", len(vSatellites) - len(_to_remove))
+
+    def get_array(self, attribute):
+        """
+        Args:
+            attribute (str) : numeric attribute of SatelliteGeometry (e.g. "el", "true_range", "transit_time")
+
+        Return:
+            numpy.ndarray : values of the attribute for the current satellites
+        """
+        array = self._arrays.get(attribute)
+        if array is None:
+            array = np.array([getattr(geometry, attribute) for geometry in self._data.values()], dtype=float)
+            self._arrays[attribute] = array
+        return array
+
+    def get_seconds_array(self, attribute):
+        """
+        Args:
+            attribute (str) : epoch attribute of SatelliteGeometry ("time_emission" or "time_reception")
+
+        Return:
+            numpy.ndarray : GPS seconds of week of the attribute, for the current satellites
+        """
+        key = f"{attribute}.seconds"
+        array = self._arrays.get(key)
+        if array is None:
+            array = np.array([getattr(geometry, attribute).seconds for geometry in self._data.values()], dtype=float)
+            self._arrays[key] = array
+        return array
+
+    def get_satellite_positions(self):
+        """
+        Return:
+            numpy.ndarray : satellite positions (mx3) in the ECEF frame at reception time, for the current satellites
+        """
+        array = self._arrays.get("satellite_position")
+        if array is None:
+            array = np.empty((len(self._data), 3))
+            for i, geometry in enumerate(self._data.values()):
+                geometry.satellite_position.form = "cartesian"
+                array[i] = geometry.satellite_position
+            self._arrays["satellite_position"] = array
+        return array
+
+    def get_line_of_sight_matrix(self):
+        """
+        Computes the line of sight vectors between the receiver and all current satellites (see
+        `get_unit_line_of_sight`). All satellites share the receiver position used in the last call to `compute`
+
+        Return:
+            numpy.ndarray : Line of sight matrix (mx3), for [x, y, z] axis of ECEF frame
+        """
+        if not self._data:
+            return np.zeros((0, 3))
+
+        receiver = next(iter(self._data.values())).receiver_position
+        receiver.form = "cartesian"
+
+        return (np.asarray(receiver)[None, :] - self.get_satellite_positions()) / self.get_array("true_range")[:, None]
+
+    def get_navigation_messages(self):
+        """
+        Return:
+            list : navigation messages used in `compute`, for the current satellites
+        """
+        return [self._nav_messages[sat] for sat in self._data]
+
+    def get_observable_array(self, datatype):
+        """
+        Args:
+            datatype (src.data_types.basics.DataType.DataType) : datatype of the observable
+
+        Return:
+            numpy.ndarray : observable values for the current satellites (NaN for satellites without this observable)
+        """
+        key = f"obs.{datatype}"
+        array = self._epoch_arrays.get(key)
+        if array is None:
+            array = np.full(len(self._row), np.nan)
+            for sat, row in self._row.items():
+                try:
+                    array[row] = self.epoch_data.get_observable(sat, datatype).value
+                except NonExistentObservable:
+                    pass
+            self._epoch_arrays[key] = array
+        return array[self._rows]
+
+    def get_navigation_array(self, attribute):
+        """
+        Args:
+            attribute (str) : numeric attribute of the navigation message (e.g. "af0", "TGD"). Epoch attributes (e.g.
+                              "toc") are returned as GPS seconds of week
+
+        Return:
+            numpy.ndarray : values of the attribute for the current satellites, from the navigation messages used in
+                            `compute`
+        """
+        key = f"nav.{attribute}"
+        array = self._epoch_arrays.get(key)
+        if array is None:
+            array = np.full(len(self._row), np.nan)
+            for sat, nav_message in self._nav_messages.items():
+                value = getattr(nav_message, attribute)
+                array[self._row[sat]] = value.seconds if isinstance(value, Epoch) else value
+            self._epoch_arrays[key] = array
+        return array[self._rows]
+
+    def get_system_array(self):
+        """
+        Return:
+            numpy.ndarray : satellite system ("GPS" or "GAL") of the current satellites
+        """
+        array = self._epoch_arrays.get("system")
+        if array is None:
+            array = np.array([str(sat.sat_system) for sat in self._row], dtype=str)
+            self._epoch_arrays["system"] = array
+        return array[self._rows]
+
     def get_unit_line_of_sight(self, sat):
         """
         Computes the line of sight vector between the receiver and the satellite, used in the PVT geometry matrix.
@@ -194,7 +390,67 @@ class SystemGeometry:
         return LOS
 
     def __str__(self):
+        if self._excluded:
+            return f"{self._data}, excluded={self._excluded}"
         return str(self._data)
 
     def __len__(self):
         return len(self.get_satellites())
+
+    def __getstate__(self):
+        # pickled (solver checkpoints) without the navigation data store and the array caches, which are only used to
+        # compute the geometry
+        state = self.__dict__.copy()
+        state.update(nav_data=None, _nav_messages={}, _epoch_arrays={}, _arrays={})
+        return state
+
+    @staticmethod
+    def pack_checkpoint(geometries):
+        """
+        Compact form of the geometries of several epochs, for the solver checkpoints: the satellites of each epoch, the
+        geometry of each satellite as a row of a float array (see `SatelliteGeometry.to_row`) and the excluded
+        satellites. The navigation and observation data of the epochs are not kept
+
+        Args:
+            geometries (list) : SystemGeometry of each epoch
+        Return:
+            dict : the compact form (see `unpack_checkpoint`)
+        """
+        counts, satellites, rows, excluded = [], [], [], []
+        for geometry in geometries:
+            counts.append(len(geometry._data))
+            for sat, info in geometry.items():
+                satellites.append(str(sat))
+                rows.append(info.to_row() if info is not None else [np.nan] * 15)
+            excluded.append({str(sat): reason for sat, reason in geometry._excluded.items()})
+
+        return {"counts": np.array(counts, dtype=np.int32), "satellites": satellites,
+                "values": np.array(rows, dtype=float).reshape(-1, 15), "excluded": excluded}
+
+    @staticmethod
+    def unpack_checkpoint(packed, epochs):
+        """
+        Restores the geometries packed with `pack_checkpoint`. They hold the satellite geometry only (the outputs of the
+        solver), without the navigation and observation data to compute it again
+
+        Args:
+            packed (dict) : the compact form of the geometries
+            epochs (list) : epochs of the geometries
+        Return:
+            list : SystemGeometry of each epoch
+        """
+        geometries = []
+        start = 0
+        for epoch, count, excluded in zip(epochs, packed["counts"].tolist(), packed["excluded"]):
+            satellites = [Satellite(sat) for sat in packed["satellites"][start:start + count]]
+            geometry = SystemGeometry.__new__(SystemGeometry)
+            geometry._data = {sat: SatelliteGeometry.from_row(row, epoch) if not np.isnan(row[0]) else None
+                              for sat, row in zip(satellites, packed["values"][start:start + count].tolist())}
+            geometry.nav_data = geometry.nav_header = geometry.epoch_data = None
+            geometry._excluded = {Satellite(sat): reason for sat, reason in excluded.items()}
+            geometry._row = {sat: i for i, sat in enumerate(satellites)}
+            geometry._rows = np.arange(count)
+            geometry._nav_messages, geometry._epoch_arrays, geometry._arrays = {}, {}, {}
+            geometries.append(geometry)
+            start += count
+        return geometries
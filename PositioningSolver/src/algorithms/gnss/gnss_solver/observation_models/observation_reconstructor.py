@@ -1,5 +1,10 @@
-from PositioningSolver.src.algorithms.gnss.gnss_solver.observation_models.atmosphere_obs import ionosphereCorrection, troposphericCorrection
+import numpy as np
+
+from PositioningSolver.src.algorithms.gnss.gnss_solver.observation_models.atmosphere_obs import \
+    ionosphereCorrectionArray, SaastamoinenModel
 from PositioningSolver.src.algorithms.gnss.gnss_solver.observation_models.clock_obs import SVBroadcastCorrection
+from PositioningSolver.src.algorithms.gnss.gnss_solver.observation_models.ephemeride_propagator import \
+    correct_gps_week_crossovers_array
 from PositioningSolver.src.data_types.basics.DataType import DataType, DataTypeFactory
 from PositioningSolver.src.data_types.gnss.Observation import Observation
 from PositioningSolver.src.math_utils.Constants import Constant
@@ -29,6 +34,102 @@ class ObservationReconstruction:
         self._datatype = datatype
         self._system_geometry = system_geometry
 
+        # atmospheric delays of all satellites (sat -> delay [m]), computed at once in the first call to `compute`
+        self._iono = None
+        self._tropo = None
+        self._atmosphere_ready = False
+
+    def _compute_atmosphere(self, nav_header, epoch):
+        # cache the atmospheric delays of all satellites, for the satellite-wise `compute`
+        self._atmosphere_ready = True
+        satellites = self._system_geometry.get_satellites()
+        iono, tropo = self.compute_atmosphere_array(nav_header, epoch)
+        self._iono = dict(zip(satellites, iono.tolist()))
+        self._tropo = dict(zip(satellites, tropo.tolist()))
+
+    def compute_atmosphere_array(self, nav_header, epoch):
+        """
+        Computes the a priori ionosphere and troposphere delays for all satellites of the system geometry at once.
+        All satellites share the same receiver position, so the tropospheric zenith delay is only computed once
+
+        Return:
+            tuple [numpy.ndarray, numpy.ndarray] : ionosphere and troposphere delays [m] (zero if the corresponding
+                                                   model is disabled), in the order of `get_satellites()`
+        """
+        m = len(self._system_geometry)
+        iono = np.zeros(m)
+        tropo = np.zeros(m)
+        if m == 0 or not (self._model["iono"] or self._model["tropo"]):
+            return iono, tropo
+
+        el = self._system_geometry.get_array("el")
+
+        satellites = self._system_geometry.get_satellites()
+        receiver_position = self._system_geometry.get("receiver_position", satellites[0]).copy()
+        receiver_position.form = "geodetic"
+
+        if self._model["iono"]:
+            iono = ionosphereCorrectionArray(receiver_position[0], receiver_position[1], el,
+                                             self._system_geometry.get_array("az"),
+                                             nav_header.iono_corrections["GPSA"],
+                                             nav_header.iono_corrections["GPSB"],
+                                             self._system_geometry.get_seconds_array("time_reception"),
+                                             frequency=self._datatype.freq)
+
+        if self._model["tropo"]:
+            tropo = SaastamoinenModel(receiver_position[0], receiver_position[2], epoch.to_DOY()).compute(el)
+
+        return iono, tropo
+
+    def _get_TGD_factor(self):
+        # TGD scale factor: 0 for Iono Free observables, (f1/f)^2 for non L1 users
+        if DataType.is_iono_free_smooth_code(self._datatype) or DataType.is_iono_free_code(self._datatype):
+            return 0
+        if self._datatype.freq != f1:
+            return (f1.freq_value / self._datatype.freq.freq_value) ** 2
+        return 1
+
+    def compute_array(self, nav_header, epoch):
+        """
+        Computes the predicted observations for all satellites of the system geometry at once, using the arrays of
+        the system geometry (see `SystemGeometry.get_array`)
+
+        Args:
+            nav_header (src.data_types.containers.NavigationData.NavigationHeader) : Valid navigation header
+            epoch (src.data_types.basics.Epoch.Epoch) : epoch under evaluation
+
+        Return:
+            numpy.ndarray : predicted observations [m], in the order of `get_satellites()`
+        """
+        geometry = self._system_geometry
+        obs = np.zeros(len(geometry))
+
+        # true range
+        if self._model["true_range"]:
+            obs += geometry.get_array("true_range")
+
+        # satellite clock
+        if self._model["satellite_clock"]:
+            TGD = self._get_TGD_factor() * geometry.get_navigation_array("TGD")
+
+            dt = correct_gps_week_crossovers_array(geometry.get_seconds_array("time_emission") -
+                                                   geometry.get_navigation_array("toc"))
+            dt_sat = geometry.get_navigation_array("af0") + geometry.get_navigation_array("af1") * dt + \
+                geometry.get_navigation_array("af2") * dt * dt
+
+            if self._model["relativistic_correction"]:
+                dt_sat += geometry.get_array("dt_rel_correction")
+
+            obs -= (dt_sat - TGD) * Constant.SPEED_OF_LIGHT
+
+        # atmosphere
+        if self._model["iono"] or self._model["tropo"]:
+            iono, tropo = self.compute_atmosphere_array(nav_header, epoch)
+            obs += iono
+            obs += tropo
+
+        return obs
+
     def compute(self, nav_message, nav_header, sat, epoch):
         obs = 0
 
@@ -38,12 +139,8 @@ class ObservationReconstruction:
         # satellite clock
         if self._model["satellite_clock"]:
 
-            # get TGD and fix it for non L1 users
-            TGD = nav_message.TGD
-            if DataType.is_iono_free_smooth_code(self._datatype) or DataType.is_iono_free_code(self._datatype):
-                TGD = 0  # TGD is 0 for Iono Free observables
-            elif self._datatype.freq != f1:  # correct TGD for L2 users
-                TGD = (f1.freq_value / self._datatype.freq.freq_value) ** 2 * TGD
+            # get TGD and fix it for non L1 users (TGD is 0 for Iono Free observables)
+            TGD = self._get_TGD_factor() * nav_message.TGD
 
             dt_sat, _ = SVBroadcastCorrection(nav_message.af0,
                                               nav_message.af1,
@@ -57,25 +154,16 @@ class ObservationReconstruction:
             # correct for TGD (already corrected for the appropriate frequency, and is 0 for IF observables)
             obs -= (dt_sat - TGD) * Constant.SPEED_OF_LIGHT  # convert dt_sat from seconds to meters using c
 
+        # atmosphere (computed for all satellites in the first call)
+        if (self._model["iono"] or self._model["tropo"]) and not self._atmosphere_ready:
+            self._compute_atmosphere(nav_header, epoch)
+
         # ionosphere
         if self._model["iono"]:
-            receiver_position = self._system_geometry.get("receiver_position", sat)
-            receiver_position.form = "geodetic"
-            az = self._system_geometry.get("az", sat)
-            el = self._system_geometry.get("el", sat)
-            time_reception = self._system_geometry.get("time_reception", sat)
-
-            obs += ionosphereCorrection(receiver_position[0], receiver_position[1], el, az,
-                                        nav_header.iono_corrections["GPSA"],
-                                        nav_header.iono_corrections["GPSB"],
-                                        time_reception, frequency=self._datatype.freq)
+            obs += self._iono[sat]
 
         # troposphere
         if self._model["tropo"]:
-            receiver_position = self._system_geometry.get("receiver_position", sat)
-            receiver_position.form = "geodetic"
-            el = self._system_geometry.get("el", sat)
-
-            obs += troposphericCorrection(receiver_position[2], receiver_position[0], epoch.to_DOY(), el)
+            obs += self._tropo[sat]
 
         return Observation(self._datatype, obs)
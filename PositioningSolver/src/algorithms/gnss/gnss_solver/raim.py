@@ -0,0 +1,111 @@
+import numpy as np
+
+from PositioningSolver.src.math_utils.probability import chi2_inverse
+
+
+class RAIM:
+    """
+    Receiver Autonomous Integrity Monitoring (RAIM) with Fault Detection and Exclusion (FDE), based on the
+    Weighted Least Squares residuals
+
+    Fault detection (global test):
+        T = r.T @ W @ r / sigma^2 ~ chi2(m - n) in the absence of faults
+    where r are the (full) postfit residuals of the m observations, W the weight matrix, n the number of estimated
+    parameters and sigma the standard deviation of unit weight. A fault is detected if T exceeds the threshold
+    chi2_inverse(1 - P_fa, m - n), with P_fa the probability of false alarm.
+
+    Fault exclusion:
+        When the global test fails, the observation whose removal most reduces T is excluded, and the test is repeated
+        with the remaining observations (up to `max_exclusions` observations). Instead of solving the reduced problems
+        from scratch, each candidate is evaluated with a rank-one downdate of the normal matrix (Sherman-Morrison):
+            h_i = w_i * g_i.T @ S @ g_i                              (leverage of observation i)
+            T_i = T - w_i * r_i^2 / (1 - h_i) / sigma^2              (test statistic without observation i)
+            x' = x - S @ g_i * w_i * r_i / (1 - h_i)                 (solution without observation i)
+            S' = S + (S @ g_i) @ (S @ g_i).T * w_i / (1 - h_i)       (cofactor matrix without observation i)
+        so that all candidates are evaluated at once in O(m n^2) and the exclusion itself costs O(m n).
+    """
+
+    def __init__(self, probability_false_alarm, sigma, max_exclusions):
+        """
+        Args:
+            probability_false_alarm (float) : probability of false alarm of the global test
+            sigma (float) : standard deviation of unit weight of the observations [m]
+            max_exclusions (int) : maximum number of observations that can be excluded in each epoch
+        """
+        self.probability_false_alarm = probability_false_alarm
+        self.sigma = sigma
+        self.max_exclusions = max_exclusions
+
+    def threshold(self, dof):
+        """Returns the threshold of the global test for `dof` degrees of freedom"""
+        return chi2_inverse(1 - self.probability_false_alarm, dof)
+
+    def test_statistic(self, residuals, w):
+        """Returns the global test statistic T = r.T @ W @ r / sigma^2"""
+        return float(np.dot(w * residuals, residuals)) / self.sigma ** 2
+
+    def run(self, y, G, w, x, S):
+        """
+        Runs the fault detection and exclusion procedure for the provided (converged) Weighted Least Squares solution
+
+        Args:
+            y (numpy.ndarray) : the observation vector (mx1)
+            G (numpy.ndarray) : the geometry matrix (mxn)
+            w (numpy.ndarray) : the weights (diagonal of the weight matrix, mx1)
+            x (numpy.ndarray) : the WLS solution (nx1)
+            S (numpy.ndarray) : the WLS cofactor matrix (G.T @ W @ G)^-1 (nxn)
+
+        Return:
+            dict : with keys
+                * "passed" (bool or None) : whether the final solution passes the global test (None if there is no
+                                            redundancy to perform the test)
+                * "excluded" (list) : indices of the excluded observations, by order of exclusion
+                * "x", "S", "residuals" : solution, cofactor matrix and full postfit residuals with the excluded
+                                          observations removed (the residuals of the excluded observations are kept)
+                * "statistic", "threshold" : final test statistic and threshold
+        """
+        m, n = G.shape
+        w = np.array(w, dtype=float)
+        residuals = y - G @ x
+        dof = m - n
+
+        result = {"passed": None, "excluded": [], "x": x, "S": S, "residuals": residuals,
+                  "statistic": None, "threshold": None}
+        if dof < 1:
+            return result  # no redundancy -> the test cannot be performed
+
+        statistic = self.test_statistic(residuals, w)
+        threshold = self.threshold(dof)
+
+        while statistic > threshold:
+            # exclusion requires at least one degree of freedom left to verify the reduced solution
+            if len(result["excluded"]) >= self.max_exclusions or dof < 2:
+                break
+
+            SG = G @ S  # rows are (S @ g_i).T
+            leverage = w * np.einsum("ij,ij->i", SG, G)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                reduction = w * residuals ** 2 / (1 - leverage)
+            # excluded observations (w = 0) and observations without redundancy (h = 1) are not candidates
+            reduction[(w == 0) | (leverage >= 1 - 1e-9)] = -np.inf
+
+            i = int(np.argmax(reduction))
+            if not np.isfinite(reduction[i]):
+                break
+
+            # rank-one downdate
+            gain = SG[i] * (w[i] / (1 - leverage[i]))
+            r_i = residuals[i]
+            x = x - gain * r_i
+            S = S + np.outer(SG[i], gain)
+            residuals = residuals + G @ gain * r_i
+            w[i] = 0.0
+
+            result["excluded"].append(i)
+            dof -= 1
+            statistic = self.test_statistic(residuals, w)
+            threshold = self.threshold(dof)
+
+        result.update({"passed": statistic <= threshold, "x": x, "S": S, "residuals": residuals,
+                       "statistic": statistic, "threshold": threshold})
+        return result
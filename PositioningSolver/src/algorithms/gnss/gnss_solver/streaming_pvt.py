@@ -0,0 +1,234 @@
+import time
+
+import numpy as np
+
+from PositioningSolver.src import get_logger, get_profiler
+from PositioningSolver.src.algorithms.estimators.state_space import SPPStateSpace
+from PositioningSolver.src.algorithms.gnss.gnss_solver.gps_solver import GPSSolver
+from PositioningSolver.src.algorithms.gnss.preprocessor.filter import FilterMapper, SignalCheckFilter, \
+    TypeConsistencyFilter
+from PositioningSolver.src.algorithms.gnss.preprocessor.functor import FunctorMapper, IonoFreeFunctor
+from PositioningSolver.src.data_types.containers.ObservationData import ObservationData
+from PositioningSolver.src.data_types.gnss.ServicesUtils import CodeToConstellationMap, get_code_type_from_service, \
+    get_doppler_type_from_service
+from PositioningSolver.src.io_manager.stream.frames import EPHEMERIS_GAL, EPHEMERIS_GPS, NAV_HEADER, OBSERVATIONS
+from PositioningSolver.src.utils.errors import NonExistentObservable, TimeSeriesError
+
+
+class StreamingPVT:
+    """
+    StreamingPVT. Real-time PVT from a stream of observation and navigation messages (see
+    src.io_manager.stream.StreamReceiver), as opposed to the batch processing of complete RINEX files.
+
+    The navigation messages update the navigation data store as they arrive (repeated ephemerides are discarded). Each
+    observation epoch is processed as soon as it is received:
+        * the preprocessing filters of the batch pipeline are applied to the epoch (SNR check, type consistency, iono
+          free combination and output rate)
+        * the PVT of the epoch is computed by the GPSSolver (see `GPSSolver.solve_epoch`), with the state of the
+          previous epoch
+        * the fix is published to the subscribers, and stored in the output timeseries of the data manager
+
+    The latency of each fix (from the arrival of its observation frame to the publication) is recorded, together with
+    the end-to-end latency (from the transmission time of the frame, when the sender provides it).
+
+    The GPSSolver is created with the first processed epoch, so the constellations and datatypes of the solver are those
+    of the first epoch. Satellites of other constellations in later epochs are ignored, as well as the satellites whose
+    navigation message has not been received yet.
+    """
+
+    def __init__(self, data_manager, config, compute_iono_free, output_rate):
+        """
+        Args:
+            data_manager (src.data_types.containers.DataManager.GNSSDataManager) : data manager, with the services of
+                                                                                  each constellation, the navigation
+                                                                                  data store and the output timeseries
+            config (src.config.Config) : user configurations
+            compute_iono_free (bool) : compute the iono free observables
+            output_rate (int) : output rate [s] (0 or None to process all epochs)
+        """
+        self.log = get_logger("gps_solver")
+        self.data_manager = data_manager
+        self.config = config
+        self.output_rate = output_rate
+
+        constellations = data_manager.get_constellations()
+        services = data_manager.services
+        self._types = []
+        for constellation in constellations:
+            self._types += get_code_type_from_service(services.services[constellation], constellation)
+            self._types += get_doppler_type_from_service(services.services[constellation], constellation)
+        self._iono_free = IonoFreeFunctor(services[constellations[0]]) if compute_iono_free else None
+
+        self.solver = None
+        self._systems = None
+        self._previous_state = SPPStateSpace()
+        self._first_epoch = None
+
+        self.subscribers = []
+        self.epochs = 0
+        self.fixes = 0
+        self.latencies = []  # arrival of the observation frame -> publication [s]
+        self.end_to_end_latencies = []  # transmission of the observation frame -> publication [s]
+        self.solver_times = []  # PVT computation of each epoch (GPSSolver.solve_epoch) [s]
+
+    def subscribe(self, callback):
+        """
+        Registers a subscriber of the fixes
+
+        Args:
+            callback (callable) : callback(fix), where fix is a dict with the epoch ("epoch", "week", "seconds"),
+                                  receiver position ("x_ecef", "y_ecef", "z_ecef" [m]), receiver clock bias
+                                  ("clock_bias" [s]), root mean square of the postfit residuals ("RMS" [m], corrected
+                                  for the receiver clock and inter-system biases), number of satellites ("satellites")
+                                  and latency ("latency[s]")
+        """
+        self.subscribers.append(callback)
+
+    def handle(self, message, arrival_time):
+        """
+        Handles a decoded stream message (see src.io_manager.stream.frames.decode_message)
+
+        Args:
+            message (tuple) : decoded message
+            arrival_time (float) : arrival time of the frame (time.perf_counter())
+        """
+        message_type = message[0]
+        if message_type == OBSERVATIONS:
+            self.process_epoch(*message[1:], arrival_time)
+        elif message_type in (EPHEMERIS_GPS, EPHEMERIS_GAL):
+            nav_message = message[1]
+            if not self.data_manager.nav_data.set_data(nav_message.toc, nav_message.satellite, nav_message):
+                self.log.debug("Duplicate navigation message of satellite %s (IODE %s) ignored", nav_message.satellite,
+                               nav_message.IODE)
+        elif message_type == NAV_HEADER:
+            self.data_manager.nav_data.set_header(message[1])
+
+    def process_epoch(self, epoch, epoch_data, transmission_time, arrival_time):
+        """
+        Preprocesses the observations of an epoch, computes its PVT and publishes the fix
+
+        Args:
+            epoch (src.data_types.basics.Epoch.Epoch) : epoch of the observations
+            epoch_data (src.data_types.containers.ObservationData.EpochData) : raw observations of the epoch
+            transmission_time (float) : UNIX time of transmission of the frame (0 if unknown)
+            arrival_time (float) : arrival time of the frame (time.perf_counter())
+        """
+        if self._first_epoch is None:
+            self._first_epoch = epoch
+        if self.output_rate and (epoch - self._first_epoch) % self.output_rate != 0:
+            return
+
+        profiler = get_profiler()
+        profiler.next_epoch()
+        self.epochs += 1
+
+        obs_data = self._preprocess(epoch, epoch_data)
+        try:
+            epoch_data = obs_data.get_epoch_data(epoch)
+        except NonExistentObservable:
+            self.log.warning("No valid observations for epoch %r after preprocessing", epoch)
+            profiler.end_epoch()
+            return
+
+        if self.solver is None:
+            self.solver = GPSSolver(obs_data, self.data_manager.nav_data, self.config)
+            self._systems = {CodeToConstellationMap[sat[0]] for sat in obs_data.get_satellite_list()}
+        self._filter_satellites(epoch_data)
+
+        start = time.perf_counter()
+        try:
+            success, state, _, _debug_info = self.solver.solve_epoch(epoch, epoch_data, self._previous_state)
+        except TimeSeriesError as e:
+            # navigation data not received yet
+            self.log.warning("PVT failed for epoch %r: %s", epoch, e)
+            success = False
+            state = SPPStateSpace()
+        self.solver_times.append(time.perf_counter() - start)
+
+        if success:
+            dm = self.data_manager
+            self.solver.store_solution(epoch, state, _debug_info, dm.receiver_position, dm.receiver_clock,
+                                       dm.prefit_residuals, dm.estimated_iono, dm.postfit_residuals, dm.DOPs,
+                                       dm.sat_info, receiver_velocity=dm.receiver_velocity,
+                                       receiver_clock_drift=dm.receiver_clock_drift, covariance=dm.state_covariance,
+                                       inter_system_bias=dm.inter_system_bias)
+            self._publish(epoch, state, _debug_info, arrival_time, transmission_time)
+        else:
+            self.log.warning("PVT failed to converge for epoch %r. No solution will be computed for this epoch.", epoch)
+
+        self._previous_state = state
+        profiler.end_epoch()
+
+    def _preprocess(self, epoch, epoch_data):
+        obs_data = ObservationData()
+        obs_data.set_epoch_data(epoch, epoch_data)
+
+        FilterMapper(SignalCheckFilter(obs_data)).apply(obs_data)
+        FilterMapper(TypeConsistencyFilter(self._types)).apply(obs_data)
+        if self._iono_free is not None:
+            iono_free_data = ObservationData()
+            FunctorMapper(self._iono_free).apply(obs_data, iono_free_data)
+            obs_data = iono_free_data
+        return obs_data
+
+    def _filter_satellites(self, epoch_data):
+        nav_data = self.data_manager.nav_data.get_data()
+        for sat in epoch_data.get_satellites():
+            if CodeToConstellationMap[str(sat)[0]] not in self._systems:
+                self.log.debug("Satellite %s ignored (constellation not processed by the solver)", sat)
+                epoch_data.remove_satellite(sat)
+            elif sat not in nav_data:
+                self.log.debug("Satellite %s ignored (no navigation message received yet)", sat)
+                epoch_data.remove_satellite(sat)
+
+    def _publish(self, epoch, state, _debug_info, arrival_time, transmission_time):
+        position = state.receiver_position
+        geometry = _debug_info.get("geometry")
+        postfit = np.asarray(_debug_info["postfit"], dtype=float)
+        fix = {"epoch": epoch.to_time_stamp(), "week": epoch.week, "seconds": epoch.seconds,
+               "x_ecef": float(position[0]), "y_ecef": float(position[1]), "z_ecef": float(position[2]),
+               "clock_bias": float(state.receiver_clock), "RMS": float(np.sqrt(np.mean(postfit * postfit))),
+               "satellites": len(geometry) if geometry is not None else 0}
+
+        # the latency includes the preprocessing and the PVT computation, up to the publication
+        latency = time.perf_counter() - arrival_time
+        fix["latency[s]"] = latency
+        for callback in self.subscribers:
+            callback(fix)
+
+        self.fixes += 1
+        self.latencies.append(latency)
+        if transmission_time > 0:
+            self.end_to_end_latencies.append(time.time() - transmission_time)
+
+    def finish(self):
+        """Logs the summary of the run (see `GPSSolver.finish`)"""
+        if self.solver is not None:
+            self.solver.finish()
+
+    def get_latency_stats(self, target=None):
+        """
+        Statistics of the fix latencies
+
+        Args:
+            target (float) : latency target [s] (optional)
+        Return:
+            dict : {"fixes", "epochs", "latency[s]": {"median", "p95", "max"}, "end_to_end_latency[s]": {...},
+                   "solver_time[s]": {...}} and, when a target is provided, "target[s]" and "within_target" (95% of
+                   the fixes within the target). The difference between the latency and the solver time is the
+                   overhead of the stream reception, preprocessing and publication
+        """
+        def _stats(values):
+            if not values:
+                return None
+            values = np.array(values)
+            return {"median": float(np.median(values)), "p95": float(np.percentile(values, 95)),
+                    "max": float(values.max())}
+
+        stats = {"fixes": self.fixes, "epochs": self.epochs, "latency[s]": _stats(self.latencies),
+                 "end_to_end_latency[s]": _stats(self.end_to_end_latencies),
+                 "solver_time[s]": _stats(self.solver_times)}
+        if target is not None:
+            stats["target[s]"] = target
+            stats["within_target"] = stats["latency[s]"] is not None and stats["latency[s]"]["p95"] <= target
+        return stats
@@ -0,0 +1,125 @@
+import numpy as np
+
+from PositioningSolver.src.algorithms.estimators.weighted_ls import WeightedLeastSquaresKernel
+from PositioningSolver.src.algorithms.gnss.gnss_solver.observation_models.ephemeride_propagator import \
+    EphemeridePropagator, correct_gps_week_crossovers_array, rotate_to_reception_frame
+from PositioningSolver.src.math_utils.Constants import Constant
+from PositioningSolver.src.utils.errors import PVTComputationFail
+
+
+class VelocitySolver:
+    """
+    Doppler-based receiver velocity and clock drift estimation
+
+    The velocity solver reuses the satellite geometry computed by the position solver for the same epoch (transmission
+    times, transit times, line of sight vectors and elevations), so that velocity is available at the same rate as
+    position, without additional iterations.
+
+    Observation equation (range rate), for each satellite:
+        -lambda * D = LOS_sat . (v_sat - v_rec) + c * (dt_rec_dot - dt_sat_dot)
+    where
+        * D is the measured doppler [Hz] and lambda the carrier wavelength [m]
+        * LOS_sat is the unit vector from the receiver to the satellite
+        * v_sat, v_rec are the satellite and receiver velocities in the ECEF frame
+        * dt_rec_dot, dt_sat_dot are the receiver and satellite clock drifts [s/s]
+
+    Using the line of sight convention of the position solver, LOS = -LOS_sat, the linear system is
+        y = -lambda * D + LOS . v_sat + c * dt_sat_dot = [LOS, 1] @ [v_rec, c * dt_rec_dot]
+    which is solved with Weighted Least Squares (elevation-dependent weights).
+    The satellite velocities and clock drifts are computed from the broadcast ephemerides, for all satellites at once.
+    """
+
+    def __init__(self, nav_data, doppler_datatype, relativistic_correction):
+        """
+        Args:
+            nav_data (src.data_types.containers.NavigationData.NavigationDataMap) : Navigation data map
+            doppler_datatype (src.data_types.basics.DataType.DataType) : doppler datatype to use (D1, D2, D5)
+            relativistic_correction (bool) : whether or not to compute the relativistic clock drift correction
+        """
+        self.nav_data = nav_data
+        self.doppler_datatype = doppler_datatype
+        self.wavelength = Constant.SPEED_OF_LIGHT / doppler_datatype.freq.freq_value
+        self.relativistic_correction = relativistic_correction
+        self._wls = WeightedLeastSquaresKernel(n=4)
+
+    def build_system(self, system_geometry, epoch_data, epoch):
+        """
+        Builds the linear range rate system for the satellites of `system_geometry` with available doppler data
+
+        Args:
+            system_geometry (SystemGeometry) : satellite geometry computed by the position solver for this epoch
+            epoch_data (src.data_types.containers.ObservationData.EpochData) : observation data for this epoch
+            epoch (src.data_types.basics.Epoch.Epoch) : epoch under evaluation
+
+        Return:
+            tuple : (y, G, w, satellites), with y the range rate observation vector (mx1) [m/s], G the geometry matrix
+                    (mx4, [LOS, 1]), w the diagonal of the weight matrix (mx1) and the list of the m used satellites
+        """
+        # satellites with doppler data
+        dopplers = system_geometry.get_observable_array(self.doppler_datatype)
+        available = ~np.isnan(dopplers)
+        satellites = [sat for sat, valid in zip(system_geometry.get_satellites(), available) if valid]
+
+        if not satellites:
+            return np.zeros(0), np.ones((0, 4)), np.zeros(0), satellites
+
+        nav_messages = [nav_message for nav_message, valid in
+                        zip(system_geometry.get_navigation_messages(), available) if valid]
+        time_emission = [system_geometry.get("time_emission", sat) for sat in satellites]
+        transit = system_geometry.get_array("transit_time")[available]
+        elevation = system_geometry.get_array("el")[available]
+        LOS = system_geometry.get_line_of_sight_matrix()[available]
+        dopplers = dopplers[available]
+
+        # satellite velocities at transmission time, rotated to the ECEF frame at reception time
+        _, v_sat, _, rel_drift = EphemeridePropagator.compute_states(nav_messages, time_emission,
+                                                                     self.relativistic_correction)
+        v_sat_rx = rotate_to_reception_frame(v_sat, transit)
+
+        # satellite clock drifts (broadcast clock model + relativistic correction)
+        af1 = system_geometry.get_navigation_array("af1")[available]
+        af2 = system_geometry.get_navigation_array("af2")[available]
+        dt_toc = correct_gps_week_crossovers_array(system_geometry.get_seconds_array("time_emission")[available] -
+                                                   system_geometry.get_navigation_array("toc")[available])
+        dt_sat_drift = af1 + 2 * af2 * dt_toc + rel_drift
+
+        # range rate system
+        y = -self.wavelength * dopplers + np.einsum("ij,ij->i", LOS, v_sat_rx) + \
+            Constant.SPEED_OF_LIGHT * dt_sat_drift
+        G = np.ones((len(satellites), 4))
+        G[:, 0:3] = LOS
+
+        # Weights -> sigma = 1 / e^{-elevation}
+        w = np.exp(2 * elevation)
+
+        return y, G, w, satellites
+
+    def solve(self, system_geometry, epoch_data, epoch, min_satellites=4):
+        """
+        Estimates the receiver velocity and clock drift for the present epoch
+
+        Args:
+            system_geometry (SystemGeometry) : satellite geometry computed by the position solver for this epoch
+            epoch_data (src.data_types.containers.ObservationData.EpochData) : observation data for this epoch
+            epoch (src.data_types.basics.Epoch.Epoch) : epoch under evaluation
+            min_satellites (int) : minimum number of satellites to compute the solution
+
+        Return:
+            tuple [numpy.ndarray, float, numpy.ndarray] : receiver velocity [m/s] in ECEF frame, receiver clock drift
+                                                          [s/s] and range rate post-fit residuals [m/s]
+
+        Raises:
+            PVTComputationFail : if there is not enough doppler data, or if the LS system is singular
+        """
+        y, G, w, satellites = self.build_system(system_geometry, epoch_data, epoch)
+
+        if len(satellites) < min_satellites:
+            raise PVTComputationFail(f"Not enough satellites with {self.doppler_datatype} data to compute the velocity "
+                                     f"at {epoch.to_time_stamp()}. Available satellites -- {satellites}")
+
+        try:
+            dX, _, post_fit, _ = self._wls.solve(y, G, w)
+        except (AttributeError, np.linalg.LinAlgError) as e:
+            raise PVTComputationFail(e)
+
+        return dX[0:3], dX[3] / Constant.SPEED_OF_LIGHT, post_fit.copy()
@@ -0,0 +1,163 @@
+import numpy as np
+
+from PositioningSolver.src.algorithms.gnss.gnss_solver.observation_models.ephemeride_propagator import \
+    EphemeridePropagator
+from PositioningSolver.src.data_types.orbits.frame import Cartesian2Geodetic
+from PositioningSolver.src.math_utils.Constants import Constant
+from PositioningSolver.src.utils.errors import TimeSeriesError
+
+
+class SatelliteVisibility:
+    """
+    Predicts the elevation of the observed satellites from an approximate receiver position, so that satellites well
+    below the elevation mask are pruned before the PVT iterations (and before their geometry is computed).
+
+    The approximate position is the `APPROX POSITION XYZ` of the RINEX observation header, in which case the
+    elevations are precomputed for the whole observation arc in a single vectorized pass, or the previous fix of the
+    solver (kinematic receivers, or files without an approximate position), in which case the elevations are computed
+    for each epoch, for all its satellites at once.
+
+    The predicted elevation neglects the signal transit time and the error of the approximate position, so a
+    satellite is only pruned when it is below the mask by more than a margin (hysteresis):
+        el_predicted < mask - margin
+    Satellites within the margin are kept, and the elevation filter of the solver decides with the computed geometry.
+    A displacement d of the receiver tilts the local vertical by d / R_earth, so a margin of 1 degree already tolerates
+    approximate positions ~100 km away from the true position.
+
+    The precomputed elevations of a satellite are invalidated when a new ephemeris of that satellite is stored in the
+    navigation data (see `invalidate`), and are computed again when needed, for each epoch.
+    """
+    # distance [m] between the previous fix and the header position above which the previous fix is used instead
+    MAX_REFERENCE_DISTANCE = 10E3
+
+    # minimum norm [m] of a valid receiver position (the solver starts at the Earth's centre)
+    MIN_POSITION_NORM = 1E6
+
+    def __init__(self, nav_data, elevation_mask, margin):
+        """
+        Args:
+            nav_data (src.data_types.containers.NavigationData.NavigationDataMap) : Navigation data map
+            elevation_mask (float) : elevation mask of the solver [deg]
+            margin (float) : hysteresis margin [deg]. Satellites are pruned below `elevation_mask - margin`
+        """
+        self.nav_data = nav_data
+        self.threshold = (elevation_mask - margin) * Constant.DEG2RAD
+        self._reference = None  # approximate receiver position of the precomputed arc
+        self._elevations = {}  # epoch -> {sat -> predicted elevation [rad]}
+        self._stale = set()  # satellites with invalidated precomputed elevations
+        self.pruned = 0  # number of pruned satellite links
+        self.invalidated = 0  # number of invalidated precomputed elevations
+
+    def precompute(self, obs_data, approx_position):
+        """
+        Predicts the elevations of all satellites of all epochs of `obs_data`, seen from `approx_position`
+
+        Args:
+            obs_data (src.data_types.containers.ObservationData.ObservationData) : observation data
+            approx_position (numpy.ndarray) : approximate receiver position in the ECEF frame [m]
+        """
+        if not self._is_valid(approx_position):
+            return
+        self._reference = np.array(approx_position, dtype=float)
+
+        epochs, satellites = [], []
+        for epoch in obs_data.get_epochs():
+            for sat in obs_data.get_epoch_data(epoch).get_satellites():
+                epochs.append(epoch)
+                satellites.append(sat)
+
+        elevations, valid = self._compute(epochs, satellites, self._reference)
+        for epoch, sat, el, ok in zip(epochs, satellites, elevations, valid):
+            if ok:
+                self._elevations.setdefault(epoch, {})[sat] = el
+
+    def invalidate(self, sat, nav_message):
+        """
+        Discards the precomputed elevations of a satellite that may use a new navigation message, that is, those of the
+        epochs after its time of clock. Subscriber of the navigation data (see `NavigationDataMap.subscribe`)
+
+        Args:
+            sat (src.data_types.gnss.Satellite.Satellite) : satellite of the new navigation message
+            nav_message (NavigationPointGPS or NavigationPointGAL) : new navigation message
+        """
+        for epoch, elevations in self._elevations.items():
+            if sat in elevations and epoch >= nav_message.toc:
+                del elevations[sat]
+                self._stale.add(sat)
+                self.invalidated += 1
+
+    def prune(self, system_geometry, epoch, receiver_position=None):
+        """
+        Removes from `system_geometry` the satellites predicted to be below the elevation mask by more than the margin
+
+        Args:
+            system_geometry (src.algorithms.gnss.gnss_solver.observation_models.geometry_obs.SystemGeometry) :
+                                                                              satellite geometry of the present epoch
+            epoch (src.data_types.basics.Epoch.Epoch) : epoch under evaluation
+            receiver_position (numpy.ndarray) : previous fix of the receiver, in the ECEF frame [m] (optional)
+
+        Return:
+            list : the pruned satellites
+        """
+        satellites = system_geometry.get_satellites()
+        elevations = self._get_elevations(epoch, satellites, receiver_position)
+
+        pruned = [sat for sat in satellites if elevations.get(sat, np.inf) < self.threshold]
+        for sat in pruned:
+            system_geometry.remove(sat)
+
+        self.pruned += len(pruned)
+        return pruned
+
+    def _get_elevations(self, epoch, satellites, receiver_position):
+        prior_valid = self._is_valid(receiver_position)
+
+        # precomputed arc, unless the receiver moved away from the approximate position
+        if self._reference is not None and (not prior_valid or np.linalg.norm(
+                np.asarray(receiver_position, dtype=float) - self._reference) <= self.MAX_REFERENCE_DISTANCE):
+            elevations = self._elevations.setdefault(epoch, {})
+            stale = [sat for sat in satellites if sat in self._stale and sat not in elevations]
+            if stale:
+                values, valid = self._compute([epoch] * len(stale), stale, self._reference)
+                elevations.update((sat, el) for sat, el, ok in zip(stale, values, valid) if ok)
+            return elevations
+
+        if not prior_valid:
+            return {}  # no approximate position -> no pruning
+
+        elevations, valid = self._compute([epoch] * len(satellites), satellites,
+                                          np.asarray(receiver_position, dtype=float))
+        return {sat: el for sat, el, ok in zip(satellites, elevations, valid) if ok}
+
+    def _compute(self, epochs, satellites, position):
+        """
+        Vectorized elevation of the satellites at the given epochs (one epoch for each satellite), seen from `position`
+
+        Return:
+            tuple [numpy.ndarray, numpy.ndarray] : elevations [rad] and validity flags (False for satellites without
+                                                   navigation data)
+        """
+        nav_messages, valid = [], np.ones(len(satellites), dtype=bool)
+        for i, (sat, epoch) in enumerate(zip(satellites, epochs)):
+            try:
+                nav_messages.append(self.nav_data.get_sat_data_for_epoch(sat, epoch))
+            except TimeSeriesError:
+                valid[i] = False
+
+        elevations = np.full(len(satellites), np.nan)
+        if not nav_messages:
+            return elevations, valid
+
+        p_sat, _, _, _ = EphemeridePropagator.compute_states(
+            nav_messages, [epoch for epoch, ok in zip(epochs, valid) if ok], False)
+
+        # elevation = angle between the line of sight and the local horizontal plane (ellipsoidal vertical)
+        lat, long, _ = Cartesian2Geodetic(*position)
+        up = np.array([np.cos(lat) * np.cos(long), np.cos(lat) * np.sin(long), np.sin(lat)])
+        los = p_sat - position
+        elevations[valid] = np.arcsin(los @ up / np.linalg.norm(los, axis=1))
+
+        return elevations, valid
+
+    def _is_valid(self, position):
+        return position is not None and np.linalg.norm(position) > self.MIN_POSITION_NORM
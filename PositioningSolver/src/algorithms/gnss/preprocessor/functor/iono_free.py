@@ -72,4 +72,9 @@ class IonoFreeFunctor(Functor):
             iono_free = self.compute_iono_free(L1, L2)
             v_obs_out.append(Observation(L12, iono_free))
 
+        # doppler observables are not combined (used for velocity estimation), so they are kept as they are
+        for obs in v_obs_in:
+            if DataType.is_doppler(obs.datatype):
+                v_obs_out.append(obs)
+
         return v_obs_out
@@ -1,7 +1,7 @@
-from .... import get_logger
+from .... import get_logger, get_profiler
 from ....config import config
 from ....data_types import ObservationData
-from ....data_types.gnss.ServicesUtils import get_code_type_from_service
+from ....data_types.gnss.ServicesUtils import get_code_type_from_service, get_doppler_type_from_service
 from ....utils.errors import PreprocessorError
 from .filter import FilterMapper, TypeConsistencyFilter, RateDowngradeFilter, SignalCheckFilter
 from .functor import FunctorMapper, IonoFreeFunctor, SmoothFunctor
@@ -9,16 +9,16 @@ from .functor import FunctorMapper, IonoFreeFunctor, SmoothFunctor
 
 class Preprocessor:
 
-    def __init__(self, trace_path, service_manager, constellation, raw_data, compute_iono_free, output_rate):
+    def __init__(self, trace, service_manager, constellations, raw_data, compute_iono_free, output_rate):
 
         log = get_logger("preprocessor")
         log.info("###############################################################")
         log.info("###### Starting module 'Processing Observation Data' ... ######")
 
         self.log = log
-        self.trace_path = trace_path
+        self.trace = trace  # trace files writer (io_manager.export.TraceWriter)
         self.service_manager = service_manager
-        self.constellation = constellation
+        self.constellations = constellations  # all constellations share the same frequency bands
         self.raw_data = raw_data
 
         self.compute_iono_free = compute_iono_free
@@ -37,15 +37,19 @@ class Preprocessor:
                 * Compute (IonoFree) Smooth Observation Data -> Compute smooth code observables
 
         """
+        profiler = get_profiler()
+
         # SNR Check Filter
         try:
-            self.snr_filter(self.raw_data)
+            with profiler.stage("snr_check"):
+                self.snr_filter(self.raw_data)
         except Exception as e:
             raise PreprocessorError(f"Error performing SNR filter: {e}")
 
         # Type Consistency Filter
         try:
-            self.consistency_filter(self.raw_data)
+            with profiler.stage("type_consistency"):
+                self.consistency_filter(self.raw_data)
         except Exception as e:
             raise PreprocessorError(f"Error performing Consistency Type filter: {e}")
 
@@ -54,7 +58,8 @@ class Preprocessor:
 
         # Get Iono Free Observation Data
         try:
-            _data_out = self.iono_free(_data_out)
+            with profiler.stage("iono_free"):
+                _data_out = self.iono_free(_data_out)
         except Exception as e:
             raise PreprocessorError(f"Error computing Iono Free Observation Data: {e}")
 
@@ -67,7 +72,8 @@ class Preprocessor:
 
         # Prepare ObservationData for output (downgrade output rate)
         try:
-            _data_out = self.downgrade(_data_out)
+            with profiler.stage("downgrade"):
+                _data_out = self.downgrade(_data_out)
         except Exception as e:
             raise PreprocessorError(f"Error performing Downgrade Rate filter: {e}")
 
@@ -77,7 +83,12 @@ class Preprocessor:
 
     def consistency_filter(self, observation_data):
         self.log.info("Applying consistency filter to remove unnecessary datatypes and data-less satellites")
-        types = get_code_type_from_service(self.service_manager.services[self.constellation], self.constellation)
+        types = []
+        for constellation in self.constellations:
+            types += get_code_type_from_service(self.service_manager.services[constellation], constellation)
+
+            # doppler observables are kept for the receiver velocity estimation
+            types += get_doppler_type_from_service(self.service_manager.services[constellation], constellation)
 
         # if self.compute_smooth:
         #    types += get_carrier_type_from_service(self.service_manager.services[self.constellation],
@@ -88,11 +99,7 @@ class Preprocessor:
         mapper.apply(observation_data)
 
         # Saving Consistent data to file
-        self.log.debug(
-            "Writing Type Consistent Observation Data to trace file {}".format("TypeConsistentObservationData.txt"))
-        f = open(self.trace_path + "/TypeConsistentObservationData.txt", "w")
-        f.write(str(observation_data))
-        f.close()
+        self.trace.write("type_consistency", "TypeConsistentObservationData.txt", observation_data.iter_str())
 
     def snr_filter(self, observation_data):
         self.log.info("Applying SNR check filter to remove data with low signal to noise ratio (SNR)")
@@ -101,26 +108,19 @@ class Preprocessor:
         mapper = FilterMapper(snr_functor)
         mapper.apply(observation_data)
 
-        # Saving Consistent data to file
-        self.log.debug(
-            "Writing SNR Checked Observation Data to trace file {}".format("SNRCheckObservationData.txt"))
-        f = open(self.trace_path + "/SNRCheckObservationData.txt", "w")
-        f.write(str(observation_data))
-        f.close()
+        # Saving SNR checked data to file
+        self.trace.write("snr_check", "SNRCheckObservationData.txt", observation_data.iter_str())
 
     def iono_free(self, data):
         if self.compute_iono_free:
             self.log.info("Computing iono free data")
-            iono_free_functor = IonoFreeFunctor(self.service_manager[self.constellation])
+            iono_free_functor = IonoFreeFunctor(self.service_manager[self.constellations[0]])
             mapper = FunctorMapper(iono_free_functor)
             iono_free_data = ObservationData()
             mapper.apply(data, iono_free_data)
 
             # Saving Iono Free data to file
-            self.log.debug("Writing Iono Free Observation Data to trace file {}".format("IonoFreeObservationData.txt"))
-            f = open(self.trace_path + "/IonoFreeObservationData.txt", "w")
-            f.write(str(iono_free_data))
-            f.close()
+            self.trace.write("iono_free", "IonoFreeObservationData.txt", iono_free_data.iter_str())
 
             # change pointer of _data_out
             data = iono_free_data
@@ -136,10 +136,7 @@ class Preprocessor:
         smooth_data = ObservationData()
         mapper.apply(data, smooth_data)
 
-        self.log.debug("Writing Smooth Observation Data to trace file {}".format("SmoothObservationData.txt"))
-        f = open(self.trace_path + "/SmoothObservationData.txt", "w")
-        f.write(str(smooth_data))
-        f.close()
+        self.trace.write("smooth", "SmoothObservationData.txt", smooth_data.iter_str())
 
         # change pointer of _data_out
         data = smooth_data
@@ -162,10 +159,6 @@ class Preprocessor:
                 mapper = FilterMapper(downgrade_filter)
                 mapper.apply(data)
 
-                self.log.debug(
-                    "Writing Downgraded Observation Data to trace file {}".format("DowngradedObservationData.txt"))
-                f = open(self.trace_path + "/DowngradedObservationData.txt", "w")
-                f.write(str(data))
-                f.close()
+                self.trace.write("downgrade", "DowngradedObservationData.txt", data.iter_str())
 
         return data
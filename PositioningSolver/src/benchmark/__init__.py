@@ -0,0 +1,2 @@
+from .harness import BenchmarkCase, BenchmarkHarness, compare_results
+from .startup import LAZY_PACKAGES, STARTUP_BUDGETS, measure_startup
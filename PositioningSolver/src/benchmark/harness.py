@@ -0,0 +1,270 @@
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from .startup import CASE_LOADED_PACKAGES, LAZY_PACKAGES, get_loaded_packages, measure_startup
+from .. import get_logger
+from ..data_types.basics.Epoch import Epoch
+from ..data_types.containers.NavigationData import NavigationDataMap
+from ..io_manager.import_rinex.RinexNavReaderGPS import RinexNavReaderGPS
+from ..simulator import BroadcastOrbitSource, ObservationSimulator
+from ..utils.errors import ConfigError
+
+# top level stages of the gnss_spp pipeline (see scripts.gnss_spp)
+PIPELINE_STAGES = ("read_data", "preprocessor", "gps_solver", "quality_check")
+
+# command to run the gnss_spp pipeline for a case configuration, in a separate process (so that the peak memory
+# of each case is measured independently). It also reports the lazily imported packages loaded by the headless run
+_RUN_CASE = "import sys; from PositioningSolver.scripts import gnss_spp; gnss_spp.main(sys.argv[1])" + \
+            CASE_LOADED_PACKAGES
+
+
+class BenchmarkCase:
+    """Benchmark case: the gnss_spp pipeline run over a synthetic observation file with the given rate and length"""
+    __slots__ = ["name", "rate", "length"]
+
+    def __init__(self, name, rate, length):
+        """
+        Args:
+            name (str) : name of the case
+            rate (int) : observation rate [s]
+            length (int) : length of the observation arc [s]
+        """
+        if rate <= 0 or length <= 0:
+            raise ConfigError(f"Benchmark case {name}: rate and length must be positive, got rate {rate} and "
+                              f"length {length}")
+        self.name = name
+        self.rate = rate
+        self.length = length
+
+    @property
+    def epochs(self):
+        return len(range(0, self.length, self.rate))
+
+
+class BenchmarkHarness:
+    """
+    Benchmark of the parsing, preprocessing and PVT throughput.
+
+    For each case, a synthetic RINEX observation file (GPS L1 / L2, static receiver) is generated from the navigation
+    data of the benchmark dataset, and the gnss_spp pipeline is run over it with profiling enabled, using a template
+    configuration for the models and solver. The run metrics (see common_log.profiler) are converted to:
+        * throughput[epochs/s] : processed epochs per second of wall time, for each stage and sub-stage
+        * wall_time[s] : wall time of each stage and sub-stage
+        * peak_memory[MB] : memory high-water mark at the end of each stage
+        * epoch_latency[s] : latency statistics of a single-epoch solve
+        * logging : logging overhead of the run (records and time spent in the log calls and writer thread)
+        * loaded_packages : lazily imported packages (plotting) loaded by the headless run (should be empty)
+
+    The startup time of the command line entry points is also checked against a time budget (see startup.py)
+    """
+
+    def __init__(self, config, output_path):
+        """
+        Args:
+            config (src.config.Config) : benchmark configuration
+            output_path (str) : directory of the synthetic data, the case outputs and the results file
+        """
+        self.config = config
+        self.output_path = output_path
+        self.log = get_logger("main")
+
+        self.cases = [BenchmarkCase(case["name"], case["rate"], case["length"]) for case in config["cases"]]
+        if len({case.name for case in self.cases}) != len(self.cases):
+            raise ConfigError(f"Benchmark case names must be unique")
+
+        with open(config["template"]) as f:
+            self.template = json.load(f)
+
+        self.nav_path = config["inputs"]["rinex_nav_dir_path"]
+        self.first_epoch = Epoch(config["inputs"]["first_epoch"])
+        self.receiver_position = np.array([config["inputs"]["receiver_position"]["x_ecef"],
+                                           config["inputs"]["receiver_position"]["y_ecef"],
+                                           config["inputs"]["receiver_position"]["z_ecef"]])
+        self._nav_data = None
+
+    def run(self):
+        """
+        Runs all benchmark cases
+
+        Return:
+            dict : benchmark results (environment and metrics of each case)
+        """
+        results = {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "environment": get_environment(),
+                   "template": self.config["template"], "cases": {}}
+
+        startup_config = self.config["startup"] if "startup" in self.config else {}
+        if startup_config.get("select", 1):
+            results["startup"] = measure_startup(startup_config.get("runs", 5), startup_config.get("budget"))
+            for name, startup in results["startup"].items():
+                if not startup["within_budget"]:
+                    self.log.error(f"Startup command {name} exceeds its budget: {startup}")
+
+        for case in self.cases:
+            self.log.info(f"Running benchmark case {case.name} (rate {case.rate} s, length {case.length} s, "
+                          f"{case.epochs} epochs)")
+            obs_path, generation_time = self.get_observation_data(case)
+            metrics = self.run_case(case, obs_path)
+
+            results["cases"][case.name] = get_case_results(case, metrics)
+            results["cases"][case.name]["generation_time[s]"] = generation_time
+        return results
+
+    def get_observation_data(self, case):
+        """
+        Generates the synthetic observation file of a case, unless a file with the same rate and length was already
+        generated (in this or a previous benchmark run)
+
+        Return:
+            tuple [str, float or None] : directory of the observation file and generation time [s] (None if reused)
+        """
+        obs_path = os.path.join(self.output_path, "obs", f"rate_{case.rate}_length_{case.length}")
+        file_path = os.path.join(obs_path, "SYNT00XXX_R_OBS.rnx")
+        if os.path.exists(file_path):
+            return obs_path, None
+
+        os.makedirs(obs_path, exist_ok=True)
+        start = time.perf_counter()
+        simulator = ObservationSimulator(BroadcastOrbitSource(self.get_navigation_data(), self.first_epoch),
+                                         self.receiver_position)
+        simulator.simulate(self.first_epoch, case.length, case.rate).write_rinex(file_path + ".tmp")
+        os.replace(file_path + ".tmp", file_path)
+        generation_time = time.perf_counter() - start
+        self.log.info(f"Generated synthetic observation file {file_path} in {generation_time:.3f} [s]")
+        return obs_path, generation_time
+
+    def get_navigation_data(self):
+        if self._nav_data is None:
+            self._nav_data = NavigationDataMap()
+            files = glob.glob(self.nav_path + "/*")
+            if len(files) == 0:
+                raise ConfigError(f"No navigation file found in {self.nav_path}")
+            for file in files:
+                RinexNavReaderGPS(file, self._nav_data)
+        return self._nav_data
+
+    def get_case_config(self, case, obs_path, output_path):
+        """
+        Builds the gnss_spp configuration of a case from the template: synthetic observation data, full arc, no
+        plots and trace files, and profiling enabled
+
+        Return:
+            dict : configuration of the case
+        """
+        case_config = json.loads(json.dumps(self.template))
+        case_config["log"]["minimum_level"] = self.config.get("log", "minimum_level", fallback="INFO")
+        case_config["profiling"] = {"select": 1, "memory": self.config.get("profiling", "memory", fallback=0),
+                                    "cprofile": self.config.get("profiling", "cprofile", fallback=0), "per_epoch": 0}
+
+        case_config["inputs"]["rinex_obs_dir_path"] = obs_path
+        case_config["inputs"]["rinex_nav_dir_path"] = self.nav_path
+        case_config["inputs"]["arc"]["fist_epoch"] = False
+        case_config["inputs"]["arc"]["last_epoch"] = False
+        case_config["model"]["rate"]["select"] = case.rate
+
+        case_config["performance_evaluation"]["true_position"] = self.config["inputs"]["receiver_position"]
+        case_config["outputs"]["output_path"] = output_path
+        case_config["outputs"]["trace"] = {"select": 0}
+        case_config["outputs"]["show_plots"] = False
+        return case_config
+
+    def run_case(self, case, obs_path):
+        """
+        Runs the gnss_spp pipeline of a case in a separate process
+
+        Return:
+            dict : run metrics of the case (metrics.json)
+        """
+        output_path = os.path.join(self.output_path, "cases", case.name)
+        os.makedirs(output_path, exist_ok=True)
+
+        config_file = os.path.join(output_path, "config.json")
+        with open(config_file, "w") as f:
+            json.dump(self.get_case_config(case, obs_path, output_path), f, indent=3)
+
+        process = subprocess.run([sys.executable, "-c", _RUN_CASE, config_file, *LAZY_PACKAGES], capture_output=True,
+                                 text=True)
+        metrics_file = os.path.join(output_path, "output", "metrics.json")
+        if process.returncode != 0 or not os.path.exists(metrics_file):
+            raise RuntimeError(f"Benchmark case {case.name} failed (see {output_path}/output/log.txt):\n"
+                               f"{process.stderr}")
+
+        with open(metrics_file) as f:
+            metrics = json.load(f)
+        metrics["loaded_packages"] = get_loaded_packages(process.stdout)
+        return metrics
+
+
+def get_case_results(case, metrics):
+    """
+    Converts the run metrics of a case to the benchmark results
+
+    Args:
+        case (BenchmarkCase) : benchmark case
+        metrics (dict) : run metrics (see common_log.profiler.Profiler.get_metrics)
+
+    Return:
+        dict : results of the case
+    """
+    epochs = metrics["run"]["epochs"] or case.epochs
+    satellites = metrics["counters"].get("satellites_used", {}).get("mean_per_epoch")
+
+    results = {"rate[s]": case.rate, "length[s]": case.length, "epochs": epochs, "satellites_per_epoch": satellites,
+               "throughput[epochs/s]": {}, "wall_time[s]": {}, "peak_memory[MB]": {}}
+    for stage, stage_metrics in metrics["stages"].items():
+        wall = stage_metrics["wall_time[s]"]
+        results["wall_time[s]"][stage] = wall
+        results["throughput[epochs/s]"][stage] = epochs / wall if wall > 0 else None
+        results["peak_memory[MB]"][stage] = stage_metrics["peak_memory[MB]"]
+
+    total = sum(metrics["stages"].get(stage, {}).get("wall_time[s]", 0.0) for stage in PIPELINE_STAGES)
+    results["wall_time[s]"]["total"] = total
+    results["throughput[epochs/s]"]["total"] = epochs / total if total > 0 else None
+    results["peak_memory[MB]"]["total"] = metrics["run"]["peak_memory[MB]"]
+    results["epoch_latency[s]"] = metrics.get("epoch_latency[s]")
+    results["logging"] = metrics.get("logging")
+    results["loaded_packages"] = metrics.get("loaded_packages", [])
+    return results
+
+
+def compare_results(results, previous):
+    """
+    Compares the throughput of two benchmark runs, for the cases and stages in both
+
+    Args:
+        results (dict) : benchmark results
+        previous (dict) : results of a previous benchmark run
+
+    Return:
+        dict : case -> stage -> throughput ratio (current / previous, > 1 is faster)
+    """
+    comparison = {}
+    for name, case in results["cases"].items():
+        if name not in previous["cases"]:
+            continue
+        old = previous["cases"][name]["throughput[epochs/s]"]
+        comparison[name] = {stage: value / old[stage] for stage, value in case["throughput[epochs/s]"].items()
+                            if value and old.get(stage)}
+    return comparison
+
+
+def get_environment():
+    """
+    Return:
+        dict : description of the environment of the benchmark run (versions, platform and source revision)
+    """
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        revision = None
+
+    return {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(), "cpu_count": os.cpu_count(),
+            "revision": revision}
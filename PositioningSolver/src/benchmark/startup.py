@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+"""
+Startup cost of the command line entry points. The solver is often launched as many short runs (e.g. cron jobs), so the
+fixed cost of the python imports matters: heavy optional stacks (plotting) must only be imported when they are used.
+
+Each command is run in a fresh interpreter and its wall time is compared with a time budget:
+    * help : `main.py --help`
+    * headless_spp : imports of a headless gnss_spp run (the PositioningSolver package, as loaded by main.py)
+"""
+
+# packages that must not be imported by a headless run (no plots requested)
+LAZY_PACKAGES = ("matplotlib",)
+
+# default startup time budgets [s]
+STARTUP_BUDGETS = {"help": 1.0, "headless_spp": 1.0}
+
+# prints the lazily imported packages loaded by the interpreter (last line of the output)
+_LOADED_PACKAGES = "print(','.join(sorted({m.split('.')[0] for m in sys.modules} & set(sys.argv[1:]))))"
+
+_MAIN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "main.py")
+
+_STARTUP_COMMANDS = {
+    "help": [sys.executable, _MAIN_FILE, "--help"],
+    "headless_spp": [sys.executable, "-c", "import sys; import PositioningSolver; " + _LOADED_PACKAGES,
+                     *LAZY_PACKAGES]
+}
+
+# appended to a case run, to check the packages loaded by a complete headless gnss_spp run
+CASE_LOADED_PACKAGES = "; " + _LOADED_PACKAGES
+
+
+def get_loaded_packages(stdout):
+    """Returns the lazily imported packages reported in the last line of the output of a run"""
+    lines = stdout.strip().splitlines()
+    return [package for package in lines[-1].split(",") if package in LAZY_PACKAGES] if lines else []
+
+
+def measure_startup(runs=5, budgets=None):
+    """
+    Measures the startup wall time of the command line entry points (median of several runs) and checks it against
+    the time budgets
+
+    Args:
+        runs (int) : number of runs of each command
+        budgets (dict) : command -> time budget [s]. Defaults to STARTUP_BUDGETS
+
+    Return:
+        dict : command -> {"median[s]", "min[s]", "budget[s]", "within_budget"}. For the headless_spp command, also
+               "loaded_packages": lazily imported packages that were loaded (should be empty)
+    """
+    budgets = {**STARTUP_BUDGETS, **(budgets or {})}
+    cwd = os.path.dirname(os.path.abspath(_MAIN_FILE))
+
+    results = {}
+    for name, command in _STARTUP_COMMANDS.items():
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            process = subprocess.run(command, capture_output=True, text=True, cwd=cwd)
+            times.append(time.perf_counter() - start)
+            if process.returncode != 0:
+                raise RuntimeError(f"Startup command {name} failed:\n{process.stderr}")
+
+        median = float(np.median(times))
+        results[name] = {"median[s]": median, "min[s]": float(np.min(times)), "budget[s]": budgets[name],
+                         "within_budget": median <= budgets[name]}
+        if name == "headless_spp":
+            results[name]["loaded_packages"] = get_loaded_packages(process.stdout)
+            results[name]["within_budget"] &= len(results[name]["loaded_packages"]) == 0
+    return results
@@ -1 +1,2 @@
-from .logger import get_logger
+from .logger import get_logger, get_logging_stats, LogAggregator
+from .profiler import get_profiler, set_profiler, Profiler, NullProfiler
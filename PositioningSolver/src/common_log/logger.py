@@ -1,4 +1,8 @@
+import atexit
 import logging
+import logging.handlers
+import queue
+import time
 
 """
 logging:
@@ -10,13 +14,139 @@ logging:
         the logging outputs to corresponding destinations, like sys.stdout or a disk file.
     * Formatter: This is where you specify the format of the output by specifying a string format that lists out the
         attributes that the output should contain.
+
+The loggers do not write to the console and file directly: each logger has a QueueHandler that puts its records in the
+queue of the log file, and a QueueListener (background thread) writes them to the console and file. The level of each
+logger is the lowest level of its handlers, so that disabled log calls (e.g. debug messages with an INFO log file)
+return immediately. In the hot paths, use %-style messages (log.debug("... %s", value)), which are only formatted if
+the record is enabled.
 """
 
 __logs__ = {}  # global dict for all logs
+__listeners__ = {}  # (file path, file level) -> (queue, QueueListener) of the log files
+
+
+class _LogStats:
+    """Logging overhead of a run: records and time spent in the log calls (callers) and in the writer threads"""
+    records = 0
+    caller_time = 0.0
+    writer_time = 0.0
+    aggregated = 0
+
+
+class _TimedLogger(logging.Logger):
+    """Logger that measures the time spent by the callers in the enabled log calls (record creation and enqueue)"""
+
+    def _log(self, level, msg, args, stacklevel=1, **kwargs):
+        start = time.perf_counter()
+        super()._log(level, msg, args, stacklevel=stacklevel + 1, **kwargs)  # the caller is one frame up
+        _LogStats.records += 1
+        _LogStats.caller_time += time.perf_counter() - start
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that formats the message of the records, to be written by the writer thread"""
+
+    def prepare(self, record):
+        # the message is formatted here (the arguments may change after the log call), but the record is not copied,
+        # as it is not shared with other handlers
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _BufferedFileHandler(logging.FileHandler):
+    """FileHandler that does not flush the file after each record (the writer thread flushes it after each batch)"""
+
+    def flush(self):
+        pass
+
+    def flush_buffer(self):
+        with self.lock:
+            if self.stream is not None:
+                self.stream.flush()
+
+
+class _TimedQueueListener(logging.handlers.QueueListener):
+    """QueueListener that writes the records in batches (all records in the queue) and measures its time"""
+
+    def _monitor(self):
+        log_queue = self.queue
+        while True:
+            records = [log_queue.get()]
+            while True:
+                try:
+                    records.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            start = time.thread_time()  # CPU time of the writer thread (its wall time includes waits for the GIL)
+            for record in records:
+                if record is self._sentinel:
+                    self._flush()
+                    _LogStats.writer_time += time.thread_time() - start
+                    return
+                self.handle(record)
+            self._flush()
+            _LogStats.writer_time += time.thread_time() - start
+
+    def _flush(self):
+        for handler in self.handlers:
+            handler.flush_buffer() if isinstance(handler, _BufferedFileHandler) else handler.flush()
+
+
+class _Formatter(logging.Formatter):
+    """Formatter that converts the time stamps to strings once per second"""
+
+    def __init__(self, fmt):
+        super().__init__(fmt)
+        self._time_stamp = (None, "")
+
+    def formatTime(self, record, datefmt=None):
+        seconds = int(record.created)
+        if seconds != self._time_stamp[0]:
+            self._time_stamp = (seconds, time.strftime(self.default_time_format, self.converter(record.created)))
+        return self.default_msec_format % (self._time_stamp[1], record.msecs)
 
 
 def clean_logs():
+    """Writes the pending log records, stops the writer threads and resets the loggers and logging statistics"""
+    stop_listeners()
     __logs__.clear()
+    _LogStats.records = _LogStats.aggregated = 0
+    _LogStats.caller_time = _LogStats.writer_time = 0.0
+
+
+def stop_listeners():
+    """Writes the pending log records and stops the writer threads of the log files"""
+    for _, listener in __listeners__.values():
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+    __listeners__.clear()
+
+
+atexit.register(stop_listeners)
+
+
+def flush_logs():
+    """Waits until the writer threads have written all pending log records"""
+    for _, listener in __listeners__.values():
+        listener.stop()
+        listener.start()
+
+
+def get_logging_stats():
+    """
+    Return:
+        dict : logging overhead of the run: number of records, time spent in the log calls by the callers and CPU time
+               of the writer threads [s], and number of repeated messages aggregated (see LogAggregator)
+    """
+    return {"records": _LogStats.records, "caller_time[s]": _LogStats.caller_time,
+            "writer_time[s]": _LogStats.writer_time, "aggregated_messages": _LogStats.aggregated}
 
 
 def set_log(log_str, logger):
@@ -46,25 +176,85 @@ def setup(log_str, file_level, file_path):
         return
 
     # Create custom loggers for provided modules (in ´´list_of_loggers´´)
-    new_log = logging.getLogger(log_str)
+    manager = logging.Logger.manager
+    logger_class, manager.loggerClass = manager.loggerClass, _TimedLogger
+    try:
+        new_log = logging.getLogger(log_str)
+    finally:
+        manager.loggerClass = logger_class
     new_log.handlers = []  # remove all handlers
-    new_log.setLevel(logging.DEBUG)
     set_log(log_str, new_log)
 
-    # Create handlers
-    c_handler = logging.StreamHandler()
-    f_handler = logging.FileHandler(file_path, mode='a')
-    c_handler.setLevel(logging.WARN)  # only print errors or above to the console
-    f_handler.setLevel(file_level)  # defined by the user
+    # the lowest level of the handlers (console: WARN)
+    file_level = logging.getLevelName(file_level) if isinstance(file_level, str) else file_level
+    new_log.setLevel(min(file_level, logging.WARN))
 
-    # Create formatters and add it to handlers
-    c_format = logging.Formatter('%(name)s - %(levelname)s - %(message)s')
-    f_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    q_handler = _QueueHandler(_get_queue(file_level, file_path))
+    new_log.addHandler(q_handler)
 
-    c_handler.setFormatter(c_format)
-    f_handler.setFormatter(f_format)
+    return new_log
 
-    new_log.addHandler(c_handler)
-    new_log.addHandler(f_handler)
 
-    return new_log
+def _get_queue(file_level, file_path):
+    """Returns the queue of a log file, starting its writer thread (with the console and file handlers) if needed"""
+    key = (file_path, file_level)
+    if key not in __listeners__:
+        # Create handlers
+        c_handler = logging.StreamHandler()
+        f_handler = _BufferedFileHandler(file_path, mode='a')
+        c_handler.setLevel(logging.WARN)  # only print errors or above to the console
+        f_handler.setLevel(file_level)  # defined by the user
+
+        # Create formatters and add it to handlers
+        c_format = _Formatter('%(name)s - %(levelname)s - %(message)s')
+        f_format = _Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+        c_handler.setFormatter(c_format)
+        f_handler.setFormatter(f_format)
+
+        log_queue = queue.SimpleQueue()
+        listener = _TimedQueueListener(log_queue, c_handler, f_handler, respect_handler_level=True)
+        listener.start()
+        __listeners__[key] = (log_queue, listener)
+
+    return __listeners__[key][0]
+
+
+class LogAggregator:
+    """
+    Aggregates repeated log messages (e.g. the same satellite discarded at every epoch): the first message of each key
+    is logged, and the following ones are only counted. `flush` logs a summary message for each repeated key.
+    """
+
+    def __init__(self, logger, summary, level=logging.WARNING):
+        """
+        Args:
+            logger (logging.Logger) : logger of the messages
+            summary (str) : %-style summary message, formatted with the key (tuple) followed by the number of messages
+            level (int) : level of the messages
+        """
+        self.logger = logger
+        self.summary = summary
+        self.level = level
+        self._counts = {}
+
+    def log(self, key, msg, *args):
+        """Logs the message (%-style, with args) if it is the first of the key (tuple), otherwise counts it"""
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count == 0:
+            self.logger.log(self.level, msg, *args)
+        else:
+            _LogStats.aggregated += 1
+
+    @property
+    def counts(self):
+        """Number of messages of each key since the last flush"""
+        return self._counts
+
+    def flush(self):
+        """Logs the summary message of each repeated key and resets the counts"""
+        for key, count in self._counts.items():
+            if count > 1:
+                self.logger.log(self.level, self.summary, *key, count)
+        self._counts.clear()
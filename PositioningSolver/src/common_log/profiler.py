@@ -0,0 +1,222 @@
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource  # peak resident memory (not available on Windows)
+except ImportError:
+    resource = None
+
+from .logger import flush_logs, get_logging_stats
+
+"""
+profiling:
+    * Profiler: records the wall time, CPU time and peak memory of each pipeline stage (`stage` context manager, nested
+        stages are named "parent/child"), and counters of the processed epochs (`next_epoch` and `count`). The results
+        are written to a JSON metrics file, optionally together with a cProfile dump of the whole run.
+    * NullProfiler: profiler with the same interface that does nothing. It is the active profiler unless profiling
+        is enabled, so that the instrumentation has (almost) no overhead.
+"""
+
+
+class NullProfiler:
+    """Disabled profiler. All methods are no-ops"""
+    enabled = False
+    _null_stage = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._null_stage
+
+    def count(self, name, n=1):
+        pass
+
+    def next_epoch(self):
+        pass
+
+    def end_epoch(self):
+        pass
+
+    def write(self):
+        pass
+
+
+class Profiler:
+    """
+    Profiler of a run. Stages record:
+        * wall_time[s] : elapsed time (time.perf_counter)
+        * cpu_time[s] : process CPU time (time.process_time)
+        * peak_memory[MB] : peak of the memory allocated by python during the stage (tracemalloc, only if `memory` is
+                            enabled, with a significant overhead), or the peak resident memory of the process at the end
+                            of the stage otherwise (where available)
+        * calls : number of times the stage was entered
+
+    Counters are accumulated over the run and for each epoch (between calls to `next_epoch`). The metrics file reports
+    the totals and the per-epoch mean, minimum and maximum of each counter (and the per-epoch values if `per_epoch`).
+    The latency of each epoch is the wall time between `next_epoch` and `end_epoch`.
+    """
+    enabled = True
+
+    def __init__(self, output_path, memory=False, cprofile=False, per_epoch=False):
+        """
+        Args:
+            output_path (str) : directory of the metrics file (metrics.json) and cProfile dumps (profile.pstats and
+                                profile.txt)
+            memory (bool) : trace the python memory allocations of each stage (tracemalloc)
+            cprofile (bool) : profile the whole run with cProfile
+            per_epoch (bool) : write the counters of each epoch to the metrics file
+        """
+        self.output_path = output_path
+        self.memory = memory
+        self.per_epoch = per_epoch
+
+        self._stages = {}  # stage name -> metrics
+        self._stack = []  # names and running memory peaks of the active stages
+        self._totals = {}  # counter -> total
+        self._epoch = None  # counters of the current epoch
+        self._epochs = []  # counters of all epochs
+        self._epoch_start = None
+        self._latencies = []  # wall time of each epoch [s]
+
+        self._start = (time.perf_counter(), time.process_time())
+
+        if memory:
+            tracemalloc.start()
+
+        self._cprofile = None
+        if cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Context manager to profile a stage of the pipeline
+
+        Args:
+            name (str) : name of the stage (nested in the active stage, if any)
+        """
+        full_name = "/".join([frame[0] for frame in self._stack] + [name])
+        if self.memory:
+            # the peak of the parent stage is kept before resetting the traced peak
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            tracemalloc.reset_peak()
+        self._stack.append([name, 0])
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            _, peak = self._stack.pop()
+
+            if self.memory:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+            else:
+                peak = self._peak_rss()
+
+            metrics = self._stages.setdefault(full_name, {"calls": 0, "wall_time[s]": 0.0, "cpu_time[s]": 0.0,
+                                                          "peak_memory[MB]": None})
+            metrics["calls"] += 1
+            metrics["wall_time[s]"] += wall
+            metrics["cpu_time[s]"] += cpu
+            if peak is not None:
+                metrics["peak_memory[MB]"] = max(metrics["peak_memory[MB]"] or 0.0, round(peak / 1E6, 3))
+
+    def count(self, name, n=1):
+        """Increments a counter (for the run and the current epoch)"""
+        self._totals[name] = self._totals.get(name, 0) + n
+        if self._epoch is not None:
+            self._epoch[name] = self._epoch.get(name, 0) + n
+
+    def next_epoch(self):
+        """Starts the counters (and the latency timer) of a new epoch"""
+        self._epoch = {}
+        self._epochs.append(self._epoch)
+        self._epoch_start = time.perf_counter()
+
+    def end_epoch(self):
+        """Stops the latency timer of the current epoch"""
+        if self._epoch_start is not None:
+            self._latencies.append(time.perf_counter() - self._epoch_start)
+            self._epoch_start = None
+
+    def get_metrics(self):
+        """
+        Return:
+            dict : run, stages, counters and logging overhead metrics
+        """
+        wall, cpu = time.perf_counter() - self._start[0], time.process_time() - self._start[1]
+        peak = self._peak_rss()
+
+        counters = {}
+        per_epoch = {}
+        for name, total in self._totals.items():
+            values = [epoch.get(name, 0) for epoch in self._epochs]
+            counters[name] = {"total": total}
+            if values:
+                counters[name].update({"mean_per_epoch": sum(values) / len(values), "min_per_epoch": min(values),
+                                       "max_per_epoch": max(values)})
+            if self.per_epoch:
+                per_epoch[name] = values
+
+        metrics = {
+            "run": {"wall_time[s]": wall, "cpu_time[s]": cpu,
+                    "peak_memory[MB]": round(peak / 1E6, 3) if peak is not None else None, "epochs": len(self._epochs)},
+            "stages": self._stages,
+            "counters": counters,
+            "logging": get_logging_stats()
+        }
+        if self._latencies:
+            latencies = sorted(self._latencies)
+            metrics["epoch_latency[s]"] = {"mean": sum(latencies) / len(latencies), "min": latencies[0],
+                                           "median": latencies[len(latencies) // 2],
+                                           "p95": latencies[min(int(0.95 * len(latencies)), len(latencies) - 1)],
+                                           "max": latencies[-1]}
+        if self.per_epoch:
+            per_epoch["latency[s]"] = self._latencies
+            metrics["per_epoch"] = per_epoch
+        return metrics
+
+    def write(self):
+        """Writes the metrics file (and the cProfile dumps, if enabled)"""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(os.path.join(self.output_path, "profile.pstats"))
+            with open(os.path.join(self.output_path, "profile.txt"), "w") as f:
+                pstats.Stats(self._cprofile, stream=f).sort_stats("cumulative").print_stats(50)
+
+        flush_logs()  # the logging overhead includes the pending records
+        with open(os.path.join(self.output_path, "metrics.json"), "w") as f:
+            json.dump(self.get_metrics(), f, indent=3)
+
+        if self.memory:
+            tracemalloc.stop()
+
+    @staticmethod
+    def _peak_rss():
+        """Peak resident memory of the process [bytes], or None if not available"""
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, kilobytes on Linux
+
+
+__profiler__ = [NullProfiler()]  # global active profiler
+
+
+def get_profiler():
+    """Returns the active profiler (a NullProfiler, unless profiling was enabled with `set_profiler`)"""
+    return __profiler__[0]
+
+
+def set_profiler(profiler):
+    __profiler__[0] = profiler
@@ -4,7 +4,7 @@ from ...math_utils.Constants import Constant
 class DataType:
     """
     Class DataType
-    Represents a GNSS observable datatype (CarrierPhase, PseudoRange, or Signal)
+    Represents a GNSS observable datatype (CarrierPhase, PseudoRange, Doppler or Signal)
 
     Attributes
         ----------
@@ -62,6 +62,11 @@ class DataType:
     def __lt__(self, other):
         return self.freq_number < other.freq_number
 
+    def __reduce__(self):
+        # immutable object: pickled as its short name (e.g. read in worker processes), and unpickled as the default
+        # data type instance
+        return DataTypeFactory, (self.data_type,)
+
     def get_short_type(self):
         return str(self)
 
@@ -97,6 +102,10 @@ class DataType:
     def is_signal(data_type):
         return data_type in cAvailableSignals
 
+    @staticmethod
+    def is_doppler(data_type):
+        return data_type in cAvailableDopplers
+
     @staticmethod
     def get_code_datatypes(datatype_list):
         list_out = []
@@ -106,6 +115,15 @@ class DataType:
 
         return list_out
 
+    @staticmethod
+    def get_doppler_datatypes(datatype_list):
+        list_out = []
+        for obs in datatype_list:
+            if obs in cAvailableDopplers:
+                list_out.append(obs)
+
+        return list_out
+
     @staticmethod
     def get_signal_datatypes(datatype_list):
         list_out = []
@@ -157,9 +175,10 @@ class DataType:
 # Default Data Types
 
 # Frequencies
-f1 = DataType(data_type="f1", description="Frequency L1 (GPS)", freq_value=Constant.L1_FREQ, freq_number=1)
+f1 = DataType(data_type="f1", description="Frequency L1 (GPS) / E1 (GAL)", freq_value=Constant.L1_FREQ, freq_number=1)
 f2 = DataType(data_type="f2", description="Frequency L2 (GPS)", freq_value=Constant.L2_FREQ, freq_number=2)
-f5 = DataType(data_type="f5", description="Frequency L5 (GPS)", freq_value=Constant.L2_FREQ, freq_number=5)
+f5 = DataType(data_type="f5", description="Frequency L5 (GPS) / E5a (GAL)", freq_value=Constant.L5_FREQ,
+              freq_number=5)
 
 ###################
 # Raw Observables #
@@ -175,6 +194,11 @@ L1 = DataType(data_type="L1", description="CarrierPhase in Frequency L1", freq=f
 L2 = DataType(data_type="L2", description="CarrierPhase in Frequency L2", freq=f2, freq_number=2)
 L5 = DataType(data_type="L5", description="CarrierPhase in Frequency L5", freq=f5, freq_number=5)
 
+# Doppler
+D1 = DataType(data_type="D1", description="Doppler in Frequency L1", freq=f1, freq_number=1)
+D2 = DataType(data_type="D2", description="Doppler in Frequency L2", freq=f2, freq_number=2)
+D5 = DataType(data_type="D5", description="Doppler in Frequency L5", freq=f5, freq_number=5)
+
 # Signals
 S1 = DataType(data_type="S1", description="Signal Strength in Frequency L1", freq=f1, freq_number=1)
 S2 = DataType(data_type="S2", description="Signal Strength in Frequency L2", freq=f2, freq_number=2)
@@ -211,6 +235,7 @@ UN = DataType(data_type="UN", description="Unknown inputs type")
 cAvailableCodes = [C1, C2, C5]
 cAvailableSignals = [S1, S2, S5]
 cAvailableCarriers = [L1, L2, L5]
+cAvailableDopplers = [D1, D2, D5]
 cAvailableFrequencies = [f1, f2, f5]
 cAvailableSmoothCodes = [SPR1, SPR2, SPR5]
 cAvailableIonoFreeSmoothCodes = [SPR12, SPR15, SPR25]
@@ -229,7 +254,7 @@ def DataTypeFactory(datatype: str):
          DataType : returns the corresponding DataType instance
     """
     for container in [cAvailableCodes, cAvailableSignals, cAvailableFrequencies, cAvailableCarriers,
-                      cAvailableSmoothCodes, cAvailableIonoFreeCodes, cAvailableIonoFreeCarriers,
+                      cAvailableDopplers, cAvailableSmoothCodes, cAvailableIonoFreeCodes, cAvailableIonoFreeCarriers,
                       cAvailableIonoFreeSmoothCodes]:
         for _type in container:
             if _type.data_type == datatype:
@@ -1,4 +1,7 @@
 import datetime
+
+import numpy as np
+
 from ...math_utils.Constants import Constant
 
 
@@ -135,6 +138,72 @@ class Epoch:
 
         return Epoch.GPS_REF_TIME + elapsed
 
+    @staticmethod
+    def to_datetime64_array(epochs, leap_seconds: int = 0):
+        """
+        Convert a sequence of Epoch instances to a numpy datetime64 array (microsecond resolution), in a single pass
+
+        Args:
+            epochs (list) : list of Epoch instances
+            leap_seconds (int): Leap seconds to be considered
+        Return:
+            numpy.ndarray : array of numpy.datetime64[us]
+        """
+        weeks = np.array([epoch.week for epoch in epochs], dtype=np.int64)
+        seconds = np.array([epoch.seconds for epoch in epochs], dtype=float) - leap_seconds
+
+        # integer microseconds (the fraction of second is rounded as in datetime.timedelta)
+        whole = np.floor(seconds)
+        elapsed = (weeks * Constant.SECONDS_IN_GPS_WEEK + whole.astype(np.int64)) * 10 ** 6 + \
+            np.round((seconds - whole) * 1E6).astype(np.int64)
+        return np.datetime64(Epoch.GPS_REF_TIME, "us") + elapsed.astype("timedelta64[us]")
+
+    @staticmethod
+    def from_datetime64_array(times, leap_seconds: int = 0):
+        """
+        Convert a numpy datetime64 array to a list of Epoch instances (inverse of `to_datetime64_array`). The GPS weeks
+        and seconds of week are computed for all times at once
+
+        Args:
+            times (numpy.ndarray) : array of numpy.datetime64
+            leap_seconds (int): Leap seconds to be considered
+        Return:
+            list : list of Epoch instances
+        """
+        elapsed = (np.asarray(times).astype("datetime64[us]") - np.datetime64(Epoch.GPS_REF_TIME, "us")).astype(
+            np.int64) + leap_seconds * 10 ** 6
+        weeks = elapsed // (Constant.SECONDS_IN_GPS_WEEK * 10 ** 6)
+        seconds = (elapsed - weeks * Constant.SECONDS_IN_GPS_WEEK * 10 ** 6) / 1E6
+
+        return [Epoch((week, second)) for week, second in zip(weeks.tolist(), seconds.tolist())]
+
+    @staticmethod
+    def to_time_stamp_array(epochs, leap_seconds: int = 0):
+        """
+        Vectorized version of `to_time_stamp`, converting a sequence of Epoch instances (or a numpy datetime64 array)
+        to time stamp strings in a single pass
+
+        Args:
+            epochs (list or numpy.ndarray) : list of Epoch instances, or array of numpy.datetime64
+            leap_seconds (int): Leap seconds to be considered (only for Epoch instances)
+        Return:
+            numpy.ndarray : array of time stamp strings, in format '%Y-%m-%d %H:%M:%S' (or '%Y-%m-%d %H:%M:%S.%f'
+                            for epochs with fractional seconds)
+        """
+        if isinstance(epochs, np.ndarray) and np.issubdtype(epochs.dtype, np.datetime64):
+            time = epochs.astype("datetime64[us]")
+        else:
+            time = Epoch.to_datetime64_array(epochs, leap_seconds)
+        if len(time) == 0:
+            return np.array([], dtype=str)
+
+        stamps = np.datetime_as_string(time, unit="s").astype(object)
+        fractional = time != time.astype("datetime64[s]")
+        if np.any(fractional):
+            stamps[fractional] = np.datetime_as_string(time[fractional], unit="us")
+
+        return np.char.replace(stamps.astype(str), "T", " ")
+
     def to_DOY(self):
         """
         Computes the associated day of the year
@@ -9,15 +9,24 @@ from ...data_types.gnss.ServiceManager import ServiceManager
 class GNSSDataManager(Container):
     __slots__ = ["receiver_position", "receiver_clock", "prefit_residuals",
                  "postfit_residuals", "DOPs", "estimated_iono",
+                 "receiver_velocity", "receiver_clock_drift", "state_covariance", "inter_system_bias",
                  "sat_info", "raw_obs_data", "processed_obs_data",
                  "obs_header", "nav_data",
                  "constellations", "services"]
 
+    # output timeseries of the PVT solver
+    OUTPUTS = ("receiver_position", "receiver_clock", "estimated_iono", "receiver_velocity", "receiver_clock_drift",
+               "state_covariance", "inter_system_bias", "prefit_residuals", "postfit_residuals", "DOPs", "sat_info")
+
     def __init__(self):
         super().__init__()
         self.receiver_position = TimeSeries()
         self.receiver_clock = TimeSeries()
         self.estimated_iono = TimeSeries()
+        self.receiver_velocity = TimeSeries()
+        self.receiver_clock_drift = TimeSeries()
+        self.state_covariance = TimeSeries()
+        self.inter_system_bias = TimeSeries()
         self.prefit_residuals = TimeSeries()
         self.postfit_residuals = TimeSeries()
         self.DOPs = DOP()
@@ -41,3 +50,10 @@ class GNSSDataManager(Container):
 
     def get_constellations(self):
         return self.constellations
+
+    def get_outputs(self):
+        """
+        Return:
+            dict : name -> output timeseries of the PVT solver
+        """
+        return {name: getattr(self, name) for name in GNSSDataManager.OUTPUTS}
@@ -1,4 +1,6 @@
+import heapq
 from collections import OrderedDict
+from ...common_log.profiler import get_profiler
 from ...utils.errors import TimeSeriesError
 from ...data_types.basics.Epoch import Epoch
 from ...data_types.gnss.Satellite import Satellite
@@ -6,7 +8,7 @@ from .TimeSeries import TimeSeries
 from .Container import Container
 
 
-# Note: currently only GPS navigation messages are allowed.
+# Note: currently GPS (LNAV) and Galileo (I/NAV or F/NAV) navigation messages are allowed.
 
 
 class NavigationHeader(Container):
@@ -53,34 +55,105 @@ class NavigationPointGPS(Container):
         return f'{type(self).__name__}({_allAttrs})'
 
 
+class NavigationPointGAL(Container):
+    """
+    NavigationPointGAL class, inherits from Container
+    stores the data contained in a single navigation message for Galileo satellites (I/NAV or F/NAV)
+
+    The Broadcast Group Delay (BGD) to apply depends on the message type, since the satellite clock is referred to the
+    iono-free combination of the corresponding frequency pair:
+        * I/NAV (E1, E5b) -> BGD(E1, E5b)
+        * F/NAV (E1, E5a) -> BGD(E1, E5a)
+    The `TGD` property returns this BGD, so that it can be applied as the GPS TGD (scaled by (f1/f)^2 for the second
+    frequency). Likewise, `SV_URA` returns the Signal In Space Accuracy (SISA) and `IODE` the Issue Of Data (IODnav).
+    """
+    __slots__ = ["satellite", "toc", "af0", "af1", "af2",
+                 "IODnav", "crs", "deltaN", "M0",
+                 "cuc", "eccentricity", "cus", "sqrtA",
+                 "cic", "RAAN0", "cis",
+                 "i0", "crc", "omega", "RAANDot",
+                 "iDot", "data_sources", "toe",
+                 "SISA", "SV_health", "BGD_E5a", "BGD_E5b",
+                 "TransmissionTime"]
+
+    # data sources bits: 0 - I/NAV E1-B, 1 - F/NAV E5a-I, 2 - I/NAV E5b-I, 8 - clock for (E1, E5a), 9 - clock for
+    # (E1, E5b)
+    FNAV_DATA_SOURCE = 1 << 1
+    E5a_CLOCK = 1 << 8
+    E5b_CLOCK = 1 << 9
+
+    def __init__(self):
+        super().__init__()
+        for attr in self.__slots__:
+            setattr(self, attr, None)
+
+    def is_fnav(self):
+        """Returns True if the clock parameters of this message refer to the (E1, E5a) pair (F/NAV message)"""
+        data_sources = int(self.data_sources)
+        if data_sources & (NavigationPointGAL.E5a_CLOCK | NavigationPointGAL.E5b_CLOCK):
+            return data_sources & NavigationPointGAL.E5a_CLOCK != 0
+        return data_sources & NavigationPointGAL.FNAV_DATA_SOURCE != 0
+
+    @property
+    def TGD(self):
+        return self.BGD_E5a if self.is_fnav() else self.BGD_E5b
+
+    @property
+    def SV_URA(self):
+        return self.SISA
+
+    @property
+    def IODE(self):
+        return self.IODnav
+
+    __str__ = NavigationPointGPS.__str__
+
+
 class NavigationDataMap:
     """
     NavigationDataMap
     this class stores data from rinex navigation files
+
+    The store is incremental, so that it can be updated while it is used (real-time streams) or filled from several
+    files with overlapping messages (e.g. daily BRDC files):
+        * the ephemerides are deduplicated by (satellite, IODE, toe). A message already in the store is not stored again
+        * the messages of each satellite are kept sorted by time of clock, and new messages are inserted in place
+          (binary search), so lookups never need to re-sort the series
+        * the subscribers (see `subscribe`) are notified of each new ephemeris of a satellite, so that the data derived
+          from the previous ephemerides of that satellite only (e.g. precomputed orbits) can be invalidated
     """
 
     def __init__(self):
         self._data = OrderedDict()
         self._header = TimeSeries()
+        self._ephemerides = {}  # sat -> set of (IODE, toe) of the stored messages
+        self._subscribers = []
+        self.duplicates = 0  # number of discarded duplicate messages
 
     def __str__(self):
-        myStr = "Navigation Header:\n" + str(self._header)
+        return "".join(self.iter_str())
 
-        myStr += "\nNavigation Data:\n"
-        for sat, data in self._data.items():
-            myStr += str(sat) + " ->\n"
-            myStr += str(data)
-            myStr += "\n"
+    def iter_str(self):
+        """Generator of the string representation of the navigation data, one chunk per satellite and epoch"""
+        yield "Navigation Header:\n"
+        yield from self._header.iter_str()
 
-        return myStr
+        yield "\nNavigation Data:\n"
+        for sat, data in self._data.items():
+            yield str(sat) + " ->\n"
+            yield from data.iter_str()
+            yield "\n"
 
-    def set_data(self, epoch: Epoch, satellite: Satellite, navMessage: NavigationPointGPS):
+    def set_data(self, epoch: Epoch, satellite: Satellite, navMessage):
         """
-        method to set a navigation data point for a given epoch and satellite
+        method to set a navigation data point for a given epoch and satellite. Duplicate ephemerides (same IODE and toe
+        as a stored message of the satellite) are discarded
         Args:
             epoch (Epoch)
             satellite (Satellite)
-            navMessage (NavigationPointGPS)
+            navMessage (NavigationPointGPS or NavigationPointGAL)
+        Return:
+            bool : True if the message was stored, False if it is a duplicate
         """
 
         if not isinstance(epoch, Epoch):
@@ -89,16 +162,89 @@ class NavigationDataMap:
         if not isinstance(satellite, Satellite):
             raise AttributeError(f'Second argument should be a valid Satellite object. Type {type(satellite)} '
                                  f'was provided instead')
-        if not issubclass(type(navMessage), NavigationPointGPS):
+        if not issubclass(type(navMessage), (NavigationPointGPS, NavigationPointGAL)):
             raise AttributeError(f'Third argument should be a valid NavigationData object. Type {type(navMessage)} '
                                  f'was provided instead')
 
-        if satellite in self._data:
-            self._data[satellite].set_data(epoch, navMessage)
-        else:
+        key = (navMessage.IODE, navMessage.toe)
+        ephemerides = self._ephemerides.setdefault(satellite, set())
+        if key in ephemerides:
+            self.duplicates += 1
+            return False
+
+        timeseries = self._data.get(satellite)
+        if timeseries is None:
+            timeseries = self._data[satellite] = TimeSeries()
+        elif timeseries.has_epoch(epoch):
+            # new ephemeris with the same time of clock: replaces the stored one
+            previous = timeseries.get_data_for_epoch(epoch)
+            ephemerides.discard((previous.IODE, previous.toe))
+        timeseries.insert_data(epoch, navMessage)
+        ephemerides.add(key)
+
+        for callback in self._subscribers:
+            callback(satellite, navMessage)
+        return True
+
+    def subscribe(self, callback):
+        """
+        Registers a subscriber of the new ephemerides
+
+        Args:
+            callback (callable) : callback(satellite, navMessage), called after a new ephemeris of the satellite is
+                                  stored (not for duplicates). The message is used from its time of clock onwards
+        """
+        self._subscribers.append(callback)
+
+    def merge(self, partials):
+        """
+        Merges partial navigation data (e.g. read from several files, see `read_data`) into this map. The messages of
+        each satellite are merged with a k-way merge of the sorted series of all maps, with the same rules as
+        `set_data` (duplicates discarded, messages with the same time of clock replaced by the later ones), as if the
+        messages were set in order. The subscribers are notified of the merged messages
+
+        Args:
+            partials (list [NavigationDataMap]) : navigation data to merge, in order
+        """
+        for partial in partials:
+            for navHeader in partial.get_headers():
+                self.set_header(navHeader)
+
+        maps = [self] + list(partials)
+        satellites = dict.fromkeys(sat for nav_map in maps for sat in nav_map._data)
+        for satellite in satellites:
+            sources = [(i, nav_map._data[satellite]) for i, nav_map in enumerate(maps) if satellite in nav_map._data]
+            if len(sources) == 1 and sources[0][0] == 0:
+                continue  # no new messages
+
+            for _, timeseries in sources:
+                timeseries.sort()
+            streams = [((toc, i, navMessage) for toc, navMessage in timeseries.items()) for i, timeseries in sources]
+
+            items, origins, ephemerides = [], [], set()  # (toc, message) and map index of the merged messages
+            for toc, i, navMessage in heapq.merge(*streams, key=lambda item: item[0:2]):
+                key = (navMessage.IODE, navMessage.toe)
+                if key in ephemerides:
+                    self.duplicates += 1
+                    continue
+                if len(items) > 0 and items[-1][0] == toc:
+                    # new ephemeris with the same time of clock: replaces the stored one
+                    previous = items.pop()[1]
+                    origins.pop()
+                    ephemerides.discard((previous.IODE, previous.toe))
+                items.append((toc, navMessage))
+                origins.append(i)
+                ephemerides.add(key)
+
             timeseries = TimeSeries()
-            timeseries.set_data(epoch, navMessage)
+            timeseries.extend_sorted(items)
             self._data[satellite] = timeseries
+            self._ephemerides[satellite] = ephemerides
+
+            for (_, navMessage), i in zip(items, origins):
+                if i > 0:
+                    for callback in self._subscribers:
+                        callback(satellite, navMessage)
 
     def set_header(self, navHeader: NavigationHeader):
         """
@@ -117,6 +263,10 @@ class NavigationDataMap:
     def get_data(self):
         return self._data
 
+    def get_headers(self):
+        """Returns all navigation headers, sorted by their first epoch"""
+        return [self._header.get_data_for_epoch(epoch) for epoch in self._header.get_all_epochs()]
+
     def get_sat_data(self, sat):
         try:
             return self._data[sat]
@@ -131,10 +281,12 @@ class NavigationDataMap:
             sat (Satellite)
             epoch (Epoch)
         Return:
-            NavigationPointGPS: navigation data for the given satellite closest to the provided epoch
+            NavigationPointGPS or NavigationPointGAL: navigation data for the given satellite closest to the provided
+                                                      epoch
         Raises:
             TimeSeriesError
         """
+        get_profiler().count("nav_lookups")
         try:
             _epoch = self._data[sat].get_closest_epoch(epoch)
             return self._data[sat].get_data_for_epoch(_epoch)
@@ -1,3 +1,4 @@
+import heapq
 from collections import OrderedDict
 from ...data_types.basics.DataType import DataType
 from ...data_types.basics.Epoch import Epoch
@@ -52,7 +53,7 @@ class EpochData:
             if observation not in self._data[satellite]:
                 self._data[satellite].append(observation)
             else:
-                from src import get_logger
+                from ... import get_logger
                 log = get_logger("io_manager")
                 log.warning(f"Trying to set an observable of type {str(observation)} for satellite {str(satellite)},"
                             f"which has already been set. Overwriting not permitted.")
@@ -60,6 +61,17 @@ class EpochData:
             self._data[satellite] = [observation]
         return True
 
+    def set_observables(self, satellite: Satellite, observations: list):
+        """
+        method to set all observations of a satellite at once (replacing the existing ones). The observations must have
+        distinct datatypes (e.g., decoded from a stream message)
+
+        Args:
+            satellite (Satellite)
+            observations (list) : list of Observation objects
+        """
+        self._data[satellite] = observations
+
     def get_observables(self, sat: Satellite):
         """
         Args:
@@ -113,14 +125,10 @@ class EpochData:
         return sat_list
 
     def __str__(self):
-        myStr = ""
-        for sat, obs in self._data.items():
-            myStr += "\t" + str(sat) + " -> " + str(obs) + "\n"
+        if not self._data:
+            return "\t-->Empty Epoch Data"
 
-        if myStr == "":
-            myStr = "\t-->Empty Epoch Data"
-
-        return myStr
+        return "".join(["\t" + str(sat) + " -> " + str(obs) + "\n" for sat, obs in self._data.items()])
 
     def remove_observable(self, sat: Satellite, datatype: DataType):
         obs_list = self._data[sat]
@@ -156,8 +164,12 @@ class ObservationHeader:
         self._header = TimeSeries()
 
     def __str__(self):
-        myStr = "Observation Header:\n" + str(self._header)
-        return myStr
+        return "".join(self.iter_str())
+
+    def iter_str(self):
+        """Generator of the string representation of the observation header"""
+        yield "Observation Header:\n"
+        yield from self._header.iter_str()
 
     def set_header(self, header: Header):
 
@@ -167,6 +179,33 @@ class ObservationHeader:
 
         self._header.set_data(header.first_epoch, header)
 
+    def merge(self, partials):
+        """
+        Merges the headers of other ObservationHeader objects (e.g. read from other files) into this one
+
+        Args:
+            partials (list [ObservationHeader]) : headers to merge
+        """
+        for partial in partials:
+            for header in partial.get_headers():
+                self.set_header(header)
+
+    def get_headers(self):
+        """Returns all observation headers, sorted by their first epoch"""
+        return [self._header.get_data_for_epoch(epoch) for epoch in self._header.get_all_epochs()]
+
+    def get_receiver_position(self):
+        """
+        Return:
+            tuple or None : approximate receiver position (ECEF frame) of the first header providing it, or None if
+                            no header provides an approximate position
+        """
+        for epoch in self._header.get_all_epochs():
+            header = self._header.get_data_for_epoch(epoch)
+            if header.receiver_position is not None and any(header.receiver_position):
+                return header.receiver_position
+        return None
+
 
 class ObservationData:
     """
@@ -185,12 +224,16 @@ class ObservationData:
         self._satellites = []
 
     def __str__(self):
-        myStr = "Observation Data:\n"
-        for epc, data in self._data.items():
-            myStr += str(epc.to_time_stamp()) + "\n"
-            myStr += str(data) + "\n"
+        return "".join(self.iter_str())
+
+    def iter_str(self):
+        """Generator of the string representation of the observation data, one chunk per epoch"""
+        yield "Observation Data:\n"
 
-        return myStr
+        # time stamps of all epochs formatted at once
+        stamps = Epoch.to_time_stamp_array(list(self._data.keys())).tolist()
+        for stamp, data in zip(stamps, self._data.values()):
+            yield stamp + "\n" + str(data) + "\n"
 
     def set_observable(self, epoch: Epoch, satellite: Satellite, obsType: DataType, value: float):
         """
@@ -240,6 +283,69 @@ class ObservationData:
         if satellite not in self._satellites:
             self._satellites.append(satellite)
 
+    def set_epoch_data(self, epoch: Epoch, epoch_data: EpochData):
+        """
+        method to set all observations of an epoch at once (e.g., simulated observation data)
+
+        Args:
+            epoch (Epoch) : time at reception of signal
+            epoch_data (EpochData) : observations of all satellites for the epoch
+        """
+        self._data.set_data(epoch, epoch_data)
+
+        for satellite in epoch_data.get_satellites():
+            if satellite not in self._satellites:
+                self._satellites.append(satellite)
+            for obs in epoch_data.get_observables(satellite):
+                if obs.datatype not in self._types:
+                    self._types.append(obs.datatype)
+
+    def merge(self, partials):
+        """
+        Merges partial observation data (e.g. read from several files, see `read_data`) into this container, with a
+        k-way merge of the sorted epochs of all containers. The observations of an epoch present in several containers
+        are combined (as if the files were read in order, the observables already set are kept)
+
+        Args:
+            partials (list [ObservationData]) : observation data to merge, in order
+        """
+        sources = [self._data] + [partial._data for partial in partials]
+        for source in sources:
+            source.sort()
+
+        merged = TimeSeries()
+        merged.extend_sorted(self._merge_epochs(sources))
+        self._data = merged
+
+        for partial in partials:
+            for satellite in partial._satellites:
+                if satellite not in self._satellites:
+                    self._satellites.append(satellite)
+            for datatype in partial._types:
+                if datatype not in self._types:
+                    self._types.append(datatype)
+
+    @staticmethod
+    def _merge_epochs(sources):
+        # (epoch, source index, epoch data) of all sources, by epoch and then by source
+        streams = [((epoch, i, epoch_data) for epoch, epoch_data in source.items()) for i, source in enumerate(sources)]
+        previous_epoch = previous_data = None
+        for epoch, _, epoch_data in heapq.merge(*streams, key=lambda item: item[0:2]):
+            if previous_epoch is not None and epoch == previous_epoch:
+                # epoch in several sources (e.g. overlapping files): combine the observations, keeping the observables
+                # already set
+                for satellite in epoch_data.get_satellites():
+                    for obs in epoch_data.get_observables(satellite):
+                        if satellite not in previous_data._data or not previous_data.has_observable(satellite,
+                                                                                                 obs.datatype):
+                            previous_data.set_observable(satellite, obs)
+                continue
+            if previous_epoch is not None:
+                yield previous_epoch, previous_data
+            previous_epoch, previous_data = epoch, epoch_data
+        if previous_epoch is not None:
+            yield previous_epoch, previous_data
+
     def has_type(self, datatype):
         return datatype in self._types
 
@@ -2,7 +2,7 @@ import numpy as np
 
 from ...data_types.containers.Container import Container
 from ...data_types.containers.TimeSeries import TimeSeries
-from ...quality_check.rms_manager import compute_error_static, compute_RMS_stats_static
+from ...quality_check.rms_manager import compute_position_errors, compute_RMS_stats
 
 
 class _RMS(Container):
@@ -20,36 +20,74 @@ class _RMS(Container):
 
 
 class RMS(TimeSeries):
+    """
+    Position error time series, in one frame (ECEF or ENU). The errors of all epochs are stored in a single (N,3)
+    array, in time order, with their norms, and each epoch of the time series holds a view of its row.
+    `export2time_data` returns views of these arrays, and `get_error` the error of a single epoch.
+    """
+
     def __init__(self):
         super().__init__()
-        self.stats = {}  # dict with time averaged RMS. keys are {"x", "y", "z", "2D", "3D"}
-        self._absolute_error = TimeSeries()
+        self.stats = {}  # dict with time averaged RMS. keys are {"x", "y", "z", "2D", "3D"} and percentiles / maximums
+        self.errors = np.zeros((0, 3))  # errors (N,3), in time order
+        self.norm = np.zeros(0)  # norms of the errors (N)
 
-    def compute_errors(self, receiver_pos, true_pos, mode, frame="ECEF"):
-        if mode == "static":
-            compute_error_static(self, receiver_pos, true_pos, frame)
-            self.stats = compute_RMS_stats_static(self)
-        else:
-            raise AttributeError(f"In the current software version only 'static' mode is permitted")
+    @staticmethod
+    def compute_errors(receiver_pos, true_pos, mode="static"):
+        """
+        Computes the position errors in the ECEF and ENU frames, and their statistics (see
+        `src.quality_check.rms_manager`)
 
-    def set_rms_data(self, epoch, error):
-        rms = _RMS()
-        rms.x = error[0]
-        rms.y = error[1]
-        rms.z = error[2]
-        rms.norm = np.linalg.norm(error)
+        Args:
+            receiver_pos (TimeSeries) : receiver position time series (ECEF frame, cartesian form)
+            true_pos (src.data_types.orbits.statevector.Position or TimeSeries) : static true position ("static"
+                                                                                 mode), or reference trajectory
+                                                                                 ("dynamic" mode)
+            mode (str) : "static" or "dynamic"
+        Return:
+            tuple [RMS, RMS] : the errors in the ECEF and ENU frames
+        """
+        epochs, errors_ecef, errors_enu = compute_position_errors(receiver_pos, true_pos, mode)
 
-        self.set_data(epoch, rms)
+        RMS_ECEF = RMS()
+        RMS_ECEF.set_errors(epochs, errors_ecef)
+        RMS_ENU = RMS()
+        RMS_ENU.set_errors(epochs, errors_enu)
+        return RMS_ECEF, RMS_ENU
 
-    def export2time_data(self, norm=False):
-        self.sort()
-        t = list(self.keys())
-        x = [err.x for err in self.values()]
-        y = [err.y for err in self.values()]
-        z = [err.z for err in self.values()]
+    def set_errors(self, epochs, errors):
+        """
+        Args:
+            epochs (list) : epochs of the errors, in time order
+            errors (numpy.ndarray) : errors of the epochs (Nx3) [m]
+        """
+        self.errors = np.asarray(errors, dtype=float).reshape(-1, 3)
+        self.norm = np.linalg.norm(self.errors, axis=1)
+        self.stats = compute_RMS_stats(self.errors)
+        self.extend_sorted(zip(epochs, self.errors))
 
+    def get_error(self, epoch):
+        """
+        Args:
+            epoch (Epoch) : epoch of the time series
+
+        Return:
+            _RMS : the error of the provided epoch
+        """
+        error = self.get_data_for_epoch(epoch)
+        rms = _RMS()
+        rms.x, rms.y, rms.z = (float(value) for value in error)
+        rms.norm = float(np.linalg.norm(error))
+        return rms
+
+    def export2time_data(self, norm=False):
+        """
+        Return:
+            tuple : time (list of epochs) and the x, y, z errors (and the norm of the errors, if `norm`) as arrays,
+                    which are views of the internal storage
+        """
+        t = self.get_all_epochs()
         if not norm:
-            return t, x, y, z
+            return t, self.errors[:, 0], self.errors[:, 1], self.errors[:, 2]
 
-        _norm = [err.norm for err in self.values()]
-        return t, x, y, z, _norm
+        return t, self.errors[:, 0], self.errors[:, 1], self.errors[:, 2], self.norm
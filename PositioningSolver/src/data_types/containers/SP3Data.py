@@ -0,0 +1,144 @@
+import numpy as np
+
+from ...data_types.basics.Epoch import Epoch
+from ...data_types.gnss.Satellite import Satellite
+from .TimeSeries import TimeSeries
+
+# order of the Lagrange polynomials used to interpolate the precise orbits
+SP3_INTERPOLATION_ORDER = 9
+
+
+class SP3Data:
+    """
+    SP3Data
+    this class stores the precise orbits and clocks of SP3 files: for each epoch, the satellite positions (ECEF frame)
+    and clock offsets (NaN where not available)
+
+    The data is also gathered in arrays (satellites x epochs), built once, for the vectorized interpolation of the
+    satellite positions and clocks (`interpolate`)
+    """
+
+    def __init__(self):
+        self._data = TimeSeries()  # epoch -> {satellite: (x, y, z, clock)}
+        self._satellites = []
+        self._arrays = None
+        self._times = None
+
+    def set_data(self, epoch: Epoch, satellite: Satellite, position, clock):
+        """
+        method to set the precise orbit and clock of a satellite for a given epoch
+        Args:
+            epoch (Epoch)
+            satellite (Satellite)
+            position (tuple) : satellite position in the ECEF frame [m]
+            clock (float) : satellite clock offset [s] (NaN if not available)
+        """
+        if not isinstance(epoch, Epoch):
+            raise AttributeError(f'First argument should be a valid Epoch object. Type {type(epoch)} was provided '
+                                 f'instead')
+        if not isinstance(satellite, Satellite):
+            raise AttributeError(f'Second argument should be a valid Satellite object. Type {type(satellite)} '
+                                 f'was provided instead')
+
+        if not self._data.has_epoch(epoch):
+            self._data.set_data(epoch, {})
+        self._data[epoch][satellite] = (*position, clock)
+
+        if satellite not in self._satellites:
+            self._satellites.append(satellite)
+        self._arrays = self._times = None
+
+    # Getters
+    def get_epochs(self):
+        return self._data.get_all_epochs()
+
+    def get_satellites(self):
+        return self._satellites
+
+    def is_empty(self):
+        return self._data.is_empty()
+
+    def get_arrays(self):
+        """
+        Return:
+            tuple [list, list, numpy.ndarray, numpy.ndarray] : epochs, satellites, positions (satellites x epochs x 3)
+                [m] and clocks (satellites x epochs) [s]. Missing positions and clocks are NaN
+        """
+        if self._arrays is None:
+            epochs = list(self.get_epochs())
+            index = {sat: i for i, sat in enumerate(self._satellites)}
+
+            data = np.full((len(self._satellites), len(epochs), 4), np.nan)
+            for i, epoch in enumerate(epochs):
+                for sat, record in self._data[epoch].items():
+                    data[index[sat], i] = record
+            self._arrays = (epochs, self._satellites, data[..., 0:3], data[..., 3])
+        return self._arrays
+
+    def _get_times(self, reference_epoch):
+        """Epochs of the data in seconds from the reference epoch (cached for the last reference epoch)"""
+        if self._times is None or self._times[0] != reference_epoch:
+            self._times = (reference_epoch, np.array([epoch - reference_epoch for epoch in self.get_epochs()],
+                                                     dtype=float))
+        return self._times[1]
+
+    def interpolate(self, reference_epoch, sat_indexes, t, order=SP3_INTERPOLATION_ORDER):
+        """
+        Interpolates the satellite positions and velocities (Lagrange polynomials of the given order) and the clocks
+        and clock drifts (linear) at a batch of time instants
+
+        Args:
+            reference_epoch (Epoch) : reference epoch of the time instants
+            sat_indexes (numpy.ndarray) : satellites (indexes in `get_satellites()`) (n)
+            t (numpy.ndarray) : time instants, in seconds from the reference epoch (n)
+            order (int) : order of the Lagrange polynomials
+
+        Return:
+            tuple [numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray] : satellite positions (nx3) [m],
+                velocities (nx3) [m/s], clocks (n) [s] and clock drifts (n) [s/s]. NaN outside the time span of the
+                data, or if the data of the satellite is missing in the interpolation window
+        """
+        _, _, positions, clocks = self.get_arrays()
+        times = self._get_times(reference_epoch)
+        t = np.asarray(t, dtype=float)
+        sat_indexes = np.asarray(sat_indexes)
+        n = order + 1
+
+        # interpolation windows (n nodes around each time instant), shared by the position and velocity polynomials
+        k = np.clip(np.searchsorted(times, t) - n // 2, 0, len(times) - n)
+        nodes = positions[sat_indexes[:, None], k[:, None] + np.arange(n)]
+
+        # the velocity is the central difference of the interpolating polynomial (exact up to its third derivative)
+        h = 0.5
+        position = np.matmul(_lagrange_weights(times, k, t, n)[:, None, :], nodes)[:, 0]
+        velocity = (np.matmul(_lagrange_weights(times, k, t + h, n)[:, None, :], nodes)[:, 0] -
+                    np.matmul(_lagrange_weights(times, k, t - h, n)[:, None, :], nodes)[:, 0]) / (2 * h)
+
+        # clocks: linear interpolation between the bracketing epochs
+        i = np.clip(np.searchsorted(times, t) - 1, 0, len(times) - 2)
+        drift = (clocks[sat_indexes, i + 1] - clocks[sat_indexes, i]) / (times[i + 1] - times[i])
+        clock = clocks[sat_indexes, i] + (t - times[i]) * drift
+
+        outside = (t < times[0]) | (t > times[-1])
+        for array in (position, velocity, clock, drift):
+            array[outside] = np.nan
+        return position, velocity, clock, drift
+
+
+def _lagrange_weights(times, k, t, n):
+    """
+    Lagrange basis polynomials of the windows times[k:k+n] at the time instants t. The numerators are products of
+    (t - t_m), m != j, computed with prefix and suffix products, and the denominators only depend on the window, so
+    they are computed once per window
+    """
+    diff = t[:, None] - times[k[:, None] + np.arange(n)]
+    prefix = np.ones_like(diff)
+    prefix[:, 1:] = np.cumprod(diff, axis=1)[:, :-1]
+    suffix = np.ones_like(diff)
+    suffix[:, :-1] = np.cumprod(diff[:, ::-1], axis=1)[:, ::-1][:, 1:]
+
+    windows, window_index = np.unique(k, return_inverse=True)
+    t_windows = times[windows[:, None] + np.arange(n)]
+    denominators = t_windows[:, :, None] - t_windows[:, None, :]
+    denominators[:, np.arange(n), np.arange(n)] = 1.0
+    return prefix * suffix / np.prod(denominators, axis=2)[window_index]
@@ -1,3 +1,4 @@
+from bisect import bisect_right
 from collections import OrderedDict
 from ...utils.errors import TimeSeriesError
 
@@ -10,6 +11,8 @@ class TimeSeries(OrderedDict):
     a feature to sort it by keys is introduced. This is suitable for time series, where keys represent time instants
     (epochs).
 
+    Appending epochs in time order keeps the series sorted. Epochs set out of order are sorted when the data is next
+    read, unless they are set with `insert_data`, which keeps the series sorted at all times.
     """
 
     def __init__(self):
@@ -19,16 +22,57 @@ class TimeSeries(OrderedDict):
 
     # methods to set data
     def set_data(self, epoch, epoch_data):
-        super().__setitem__(epoch, epoch_data)
-
-        if epoch not in self._epochs:
+        if not super().__contains__(epoch):  # dict lookup (the epochs list mirrors the keys)
+            if self._sorted and len(self._epochs) > 0 and not epoch > self._epochs[-1]:
+                self._sorted = False
             self._epochs.append(epoch)
-            self._sorted = False
         # else: overwriting some epoch which was already there
 
+        super().__setitem__(epoch, epoch_data)
+
     def __setitem__(self, key, value):
         self.set_data(key, value)
 
+    def insert_data(self, epoch, epoch_data):
+        """
+        Sets the data of an epoch keeping the series sorted: the position of a new epoch is found with a binary search,
+        and only the epochs after it are moved (none when the epoch is appended in time order)
+
+        Args:
+            epoch (Epoch) : epoch of the data
+            epoch_data : data to set
+        """
+        self.sort()
+        if super().__contains__(epoch):
+            super().__setitem__(epoch, epoch_data)
+            return
+
+        index = bisect_right(self._epochs, epoch)
+        self._epochs.insert(index, epoch)
+        super().__setitem__(epoch, epoch_data)
+        for later_epoch in self._epochs[index + 1:]:
+            self.move_to_end(later_epoch)
+
+    def extend_sorted(self, items):
+        """
+        Appends data sorted by epoch (e.g. the output of a k-way merge of sorted series), after the last epoch of the
+        series. The epochs are appended without searching or re-sorting the series
+
+        Args:
+            items (iterable [tuple]) : (epoch, data) pairs, sorted by epoch, with epochs after the last epoch of the
+                                       series
+        Raises:
+            TimeSeriesError : the items are not sorted, or start before the end of the series
+        """
+        self.sort()
+        epochs = self._epochs
+        for epoch, epoch_data in items:
+            if len(epochs) > 0 and not epoch > epochs[-1]:
+                raise TimeSeriesError(f"Epoch {repr(epoch)} is not after the last epoch of the TimeSeries "
+                                      f"{repr(epochs[-1])}")
+            epochs.append(epoch)
+            super().__setitem__(epoch, epoch_data)
+
     # method to remove data
     def remove_data(self, epoch):
 
@@ -58,14 +102,8 @@ class TimeSeries(OrderedDict):
             raise TimeSeriesError(f"Epoch {str(epoch)} is no inside TimeSeries interval "
                                   f"{[repr(i) for i in self.epochs]}")
 
-        # at this point, we can safely assume that vEpochs[0] <= epoch
-        prev_epoch = self.epochs[0]
-        for this_epoch in self.epochs:
-            if this_epoch > epoch:
-                return prev_epoch
-            prev_epoch = this_epoch
-
-        return prev_epoch
+        # at this point, we can safely assume that vEpochs[0] <= epoch. Last epoch before (or equal to) the provided one
+        return self.epochs[bisect_right(self.epochs, epoch) - 1]
 
     @staticmethod
     def get_common_epochs(series1, series2):
@@ -73,6 +111,8 @@ class TimeSeries(OrderedDict):
         Method to align the two time series to a common time interval
         returns a list with the common epochs for both series
 
+        Both series are sorted, so the common epochs are found with a single merge pass over the two lists of epochs
+
         Parameters:
             ----------
             series1 (TimeSeries):
@@ -84,16 +124,20 @@ class TimeSeries(OrderedDict):
         Return:
             list : A list with the common epochs
         """
-        # series1.sort()
-        # series2.sort()
-
-        # print(series1.epochs[0], series1.epochs[-1])
-        # print(series2.epochs[0], series2.epochs[-1])
+        epochs1 = series1.get_all_epochs()
+        epochs2 = series2.get_all_epochs()
 
         epochs = []
-        for key in series1.epochs:
-            if key in series2.epochs:
-                epochs.append(key)
+        i = j = 0
+        while i < len(epochs1) and j < len(epochs2):
+            if epochs1[i] == epochs2[j]:
+                epochs.append(epochs1[i])
+                i += 1
+                j += 1
+            elif epochs1[i] < epochs2[j]:
+                i += 1
+            else:
+                j += 1
 
         return epochs
 
@@ -101,21 +145,25 @@ class TimeSeries(OrderedDict):
 
     def sort(self):
         if self.sorted is False:
-            self._epochs = sorted(self.epochs)
-            new_dct = OrderedDict((key, self[key]) for key in self.epochs)
+            new_dct = OrderedDict((key, self[key]) for key in sorted(self.epochs))
 
+            # re-insert the data by time order (which also rebuilds the epochs list)
             self.clear()
+            self._epochs = []
             self.update(new_dct)
 
             self._sorted = True
 
     def __repr__(self):
+        return "".join(self.iter_str())
+
+    def iter_str(self):
+        """Generator of the string representation of the time series, one chunk per epoch"""
         self.sort()
 
-        myStr = "Time Series:\n"
+        yield "Time Series:\n"
         for epc, obs in self.items():
-            myStr += "\t" + repr(epc) + " -> " + str(obs) + "\n"
-        return myStr
+            yield "\t" + repr(epc) + " -> " + str(obs) + "\n"
 
     def copy(self):
         self.sort()
@@ -134,10 +182,12 @@ class TimeSeries(OrderedDict):
         return _copy
 
     def has_epoch(self, epoch):
-        if epoch in self.epochs:
-            return True
-        else:
-            return False
+        return super().__contains__(epoch)
+
+    def __reduce__(self):
+        # pickled as the sorted (epoch, data) items, which are set again in order when unpickled
+        self.sort()
+        return self.__class__, (), None, None, iter(self.items())
 
     # def get_sub(self, n):
     #    tmOut = []
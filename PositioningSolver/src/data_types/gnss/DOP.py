@@ -3,8 +3,7 @@ import numpy as np
 from ...data_types.basics.Epoch import Epoch
 from ...data_types.containers.Container import Container
 from ...data_types.containers.TimeSeries import TimeSeries
-from ...math_utils.Constants import Constant
-from ...math_utils.matrix import rot1, rot3
+from ...data_types.orbits.frame import Cartesian2GeodeticArray, matrix_ECEF2ENU_array
 
 
 class _DOP(Container):
@@ -33,72 +32,99 @@ class _DOP(Container):
 
 
 class DOP(TimeSeries):
+    """
+    DOP time series. Stores the ECEF DOP matrix (4x4, receiver position and clock) of each epoch.
+
+    The derived DOPs (geometry, position, time, horizontal, x, y, z, east, north, up) are computed for all epochs at
+    once by `compute_DOPs`, from the (N,4,4) stack of DOP matrices, and stored as columns of a single (N,10) array, in
+    time order. `export2time_data` returns views of this array, and `get_dop` the DOPs of a single epoch.
+    """
+    DOP_TYPES = ("geometry", "position", "time", "horizontal", "x_ecef", "y_ecef", "z_ecef", "east", "north", "up")
 
     def __init__(self):
         super().__init__()
+        self.matrix = np.zeros((0, 4, 4))  # DOP matrices (N,4,4), in time order (set by compute_DOPs)
+        self._values = np.zeros((0, len(DOP.DOP_TYPES)))  # derived DOPs (N,10), columns in the order of DOP_TYPES
+        self._rows = {}  # epoch -> row of the arrays
 
     def set_dop(self, epoch: Epoch, dop_type, dop_value):
 
         if not isinstance(epoch, Epoch):
             raise TypeError(f'First argument should be a valid Epoch object. Type {type(epoch)} was provided instead')
 
-        if not self.has_epoch(epoch):
-            self.set_data(epoch, _DOP())
+        if dop_type != "matrix":
+            raise AttributeError(f"Only the DOP matrix can be set. The DOPs {DOP.DOP_TYPES} are computed from the "
+                                 f"DOP matrices of all epochs with 'compute_DOPs'")
 
-        setattr(self.get_data_for_epoch(epoch), dop_type, dop_value)
+        # keep the position and clock block (the solver may also estimate inter-system biases or ionosphere delays)
+        if dop_value is None:
+            matrix = np.full((4, 4), np.nan)
+        else:
+            matrix = np.array(dop_value[0:4, 0:4], dtype=float)
+        self.set_data(epoch, matrix)
 
     def compute_DOPs(self, receiver_pos: TimeSeries):
-
-        for epoch, DOPs in self.items():
-            # get receiver position
-            receiver = receiver_pos.get_data_for_epoch(epoch).copy()
-            receiver.form = "geodetic"
-            lat, long, h = receiver
-
-            # get ECEF DOP matrix
-            DOP_matrix = DOPs.matrix
-
-            # geometry DOP
-            DOPs.geometry = np.sqrt(DOP_matrix[0, 0] + DOP_matrix[1, 1] + DOP_matrix[2, 2] + DOP_matrix[3, 3])
-
-            # position DOP
-            DOPs.position = np.sqrt(DOP_matrix[0, 0] + DOP_matrix[1, 1] + DOP_matrix[2, 2])
-
-            # time DOP
-            DOPs.time = np.sqrt(DOP_matrix[3, 3])
-
-            # x, y, z DOPs
-            DOPs.x_ecef = np.sqrt(DOP_matrix[0, 0])
-            DOPs.y_ecef = np.sqrt(DOP_matrix[1, 1])
-            DOPs.z_ecef = np.sqrt(DOP_matrix[2, 2])
-
-            # get DOPs with respect to ENU coordinates
-            R = rot1((Constant.PI / 2 - lat)) @ rot3((Constant.PI / 2 + long))  # rotation matrix from ECEF to ENU
-            DOP_ENU = R @ DOP_matrix[0:3, 0:3] @ R.T
-
-            # east, north, up DOPs
-            DOPs.east = np.sqrt(DOP_ENU[0, 0])
-            DOPs.north = np.sqrt(DOP_ENU[1, 1])
-            DOPs.up = np.sqrt(DOP_ENU[2, 2])
-
-            # horizontal DOP
-            DOPs.horizontal = np.sqrt(DOP_ENU[0, 0] + DOP_ENU[1, 1])
+        """
+        Computes the derived DOPs of all epochs. The ENU DOPs are obtained by rotating the position block of the DOP
+        matrices to the ENU frame of the receiver position of each epoch, DOP_ENU = R @ DOP_matrix[0:3, 0:3] @ R.T
+
+        Args:
+            receiver_pos (TimeSeries) : receiver position time series (ECEF frame), with (at least) the epochs of the
+                                        DOP time series
+        """
+        epochs = self.get_all_epochs()
+        self._rows = {epoch: i for i, epoch in enumerate(epochs)}
+        self.matrix = np.array([self[epoch] for epoch in epochs], dtype=float).reshape(-1, 4, 4)
+
+        # receiver latitude and longitude, and rotation matrices from ECEF to ENU
+        positions = np.array([receiver_pos.get_data_for_epoch(epoch)[0:3] for epoch in epochs],
+                             dtype=float).reshape(-1, 3)
+        lat, long, _ = Cartesian2GeodeticArray(positions[:, 0], positions[:, 1], positions[:, 2])
+        R = matrix_ECEF2ENU_array(lat, long)
+
+        # diagonals of the ECEF and ENU DOP matrices
+        diag_ecef = np.einsum("nii->ni", self.matrix)
+        diag_enu = np.einsum("nij,njk,nik->ni", R, self.matrix[:, 0:3, 0:3], R)
+
+        values = np.empty((len(epochs), len(DOP.DOP_TYPES)))
+        values[:, 0] = diag_ecef.sum(axis=1)  # geometry
+        values[:, 1] = diag_ecef[:, 0:3].sum(axis=1)  # position
+        values[:, 2] = diag_ecef[:, 3]  # time
+        values[:, 3] = diag_enu[:, 0:2].sum(axis=1)  # horizontal
+        values[:, 4:7] = diag_ecef[:, 0:3]  # x, y, z
+        values[:, 7:10] = diag_enu  # east, north, up
+        self._values = np.sqrt(values)
+
+    def get_dop(self, epoch):
+        """
+        Args:
+            epoch (Epoch) : epoch of the DOPs, after calling `compute_DOPs`
+
+        Return:
+            _DOP : the DOP matrix and derived DOPs for the provided epoch
+        """
+        row = self._rows[epoch]
+        dop = _DOP()
+        dop.matrix = self.matrix[row]
+        for dop_type, value in zip(DOP.DOP_TYPES, self._values[row]):
+            setattr(dop, dop_type, float(value))
+        return dop
+
+    def get_rows(self, epochs):
+        """
+        Args:
+            epochs (list) : epochs of the DOP time series, after calling `compute_DOPs`
+
+        Return:
+            numpy.ndarray : rows of the provided epochs in the arrays of derived DOPs
+        """
+        return np.array([self._rows[epoch] for epoch in epochs], dtype=int)
 
     def export2time_data(self):
-        self.sort()
-        t = list(self.keys())
-        matrix = [_dop.matrix for _dop in self.values()]
-        geometry = [_dop.geometry for _dop in self.values()]
-        position = [_dop.position for _dop in self.values()]
-        time = [_dop.time for _dop in self.values()]
-        horizontal = [_dop.horizontal for _dop in self.values()]
-
-        x = [_dop.x_ecef for _dop in self.values()]
-        y = [_dop.y_ecef for _dop in self.values()]
-        z = [_dop.z_ecef for _dop in self.values()]
-
-        east = [_dop.east for _dop in self.values()]
-        north = [_dop.north for _dop in self.values()]
-        up = [_dop.up for _dop in self.values()]
-
-        return t, matrix, geometry, position, time, horizontal, x, y, z, east, north, up
+        """
+        Return:
+            tuple : time (list of epochs), DOP matrices (N,4,4) and the derived DOPs (geometry, position, time,
+                    horizontal, x, y, z, east, north, up) as arrays, which are views of the internal storage
+        """
+        t = self.get_all_epochs()
+        return (t, self.matrix) + tuple(self._values[:, i] for i in range(len(DOP.DOP_TYPES)))
@@ -1,20 +1,19 @@
 from ...data_types.gnss.Constellation import SatelliteSystem, SatelliteSystemFactory
 
-# list of all satellites for the SatelliteFactory
-__all_sats__ = []
+# registry of all satellites for the SatelliteFactory (satellite string -> Satellite)
+__all_sats__ = {}
 
 
 def new_sat(sat):
-    if sat not in __all_sats__:
-        __all_sats__.append(sat)
+    __all_sats__.setdefault(str(sat), sat)
 
 
 def SatelliteFactory(sat_string):
-    for sat in __all_sats__:
-        if str(sat) == sat_string:
-            return sat
-    else:
-        return Satellite(sat_string)
+    sat = __all_sats__.get(sat_string)
+    if sat is None:
+        sat = Satellite(sat_string)
+        sat = __all_sats__.setdefault(sat_string, __all_sats__[str(sat)])
+    return sat
 
 
 class Satellite:
@@ -56,6 +55,11 @@ class Satellite:
             raise TypeError("Unable to initialize satellite with arguments {} and {}. See documentation."
                             "".format(identifier, sat_system))
 
+        # satellites are used as dict keys in all epoch-wise containers -> string and hash are computed only once
+        sat_str = str(self._nID) if self._nID > 9 else '0' + str(self._nID)
+        self._str = "{}{}".format(self._sat_system.get_system_short(), sat_str)
+        self._hash = hash(self._str)
+
         new_sat(self)
 
     @property
@@ -73,17 +77,20 @@ class Satellite:
         return str(self)
 
     def __str__(self):
-        sat_str = str(self.nID) if self.nID > 9 else '0' + str(self.nID)
-        return "{}{}".format(self.sat_system.get_system_short(), sat_str)
+        return self._str
 
     def __eq__(self, other):
-        return self.nID == other.nID and self.sat_system == other.sat_system
+        return self._nID == other.nID and self._sat_system == other.sat_system
 
     def __hash__(self):
         # used for hashing Satellites in lists or dict keys
-        return hash(str(self))
+        return self._hash
 
     def __ne__(self, other):
         # Not strictly necessary, but to avoid having both x==y and x!=y
         # True at the same time
         return not (self == other)
+
+    def __reduce__(self):
+        # pickled as its identifier, so that unpickled satellites (e.g. read in worker processes) are the registry ones
+        return SatelliteFactory, (self._str,)
@@ -54,3 +54,19 @@ def get_carrier_type_from_service(services, constellation):
                 datatypes.append(DataTypeFactory("L" + service[0]))
 
     return datatypes
+
+
+def get_doppler_type_from_service(services, constellation):
+    datatypes = []
+
+    if constellation == "GPS":
+        for service in services:
+            if service in GPSAvailableServices:
+                datatypes.append(DataTypeFactory("D" + service[0]))
+
+    elif constellation == "GAL":
+        for service in services:
+            if service in GALAvailableServices:
+                datatypes.append(DataTypeFactory("D" + service[0]))
+
+    return datatypes
@@ -182,6 +182,71 @@ def Cartesian2Geodetic(x, y, z):
     return [lat, long, h]
 
 
+def Cartesian2GeodeticArray(x, y, z):
+    """
+    Vectorized version of `Cartesian2Geodetic`, converting a batch of cartesian coordinates (ECEF frame) to geodetic
+    coordinates at once (Algorithm B.1.2 from **REF[1]**)
+
+    Args:
+        x (numpy.ndarray) : [m]
+        y (numpy.ndarray) : [m]
+        z (numpy.ndarray) : [m]
+    Return:
+        list : [lat, long, h] [rad,rad,m], as numpy arrays
+    """
+    e2 = Constant.EARTH_ECCENTRICITY_SQ
+    a = Constant.EARTH_SEMI_MAJOR_AXIS
+    x, y, z = np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(z, dtype=float)
+
+    # computation of longitude
+    long = np.arctan2(y, x)
+
+    # initial value of latitude (0 on the polar axis, as in `Cartesian2Geodetic`)
+    p = np.sqrt(x * x + y * y)
+    polar = p == 0
+    p_safe = np.where(polar, 1.0, p)
+    lat = np.where(polar, 0.0, np.arctan2(z / p_safe, 1 - e2))
+
+    # iterative process to refine latitude (each coordinate stops iterating once converged)
+    MAX_ITERS = 10
+    h = np.zeros_like(lat)
+    active = np.ones(lat.shape, dtype=bool)
+    for _ in range(MAX_ITERS):
+        lat_prev = lat
+
+        N = a / np.sqrt(1 - e2 * np.sin(lat) * np.sin(lat))
+        h = np.where(active, p / np.cos(lat) - N, h)
+        with np.errstate(divide="ignore", invalid="ignore"):  # N + h = 0 on the polar axis (masked)
+            lat = np.where(active, np.where(polar, 0.0, np.arctan2(z / p_safe, 1 - N / (N + h) * e2)), lat)
+
+        active &= np.abs(lat - lat_prev) >= 1E-10
+        if not np.any(active):
+            break
+
+    return [lat, long, h]
+
+
+def matrix_ECEF2ENU_array(lat, long):
+    """
+    Rotation matrices from the ECEF frame to the ENU frame of a batch of ground observers, R = rot1(pi/2 - lat) @
+    rot3(pi/2 + long), whose rows are the east, north and up unit vectors in the ECEF frame
+
+    Args:
+        lat (numpy.ndarray) : latitudes of the ground observers (n) [rad]
+        long (numpy.ndarray) : longitudes of the ground observers (n) [rad]
+    Return:
+        numpy.ndarray : rotation matrices (nx3x3)
+    """
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    sin_long, cos_long = np.sin(long), np.cos(long)
+
+    R = np.empty(np.shape(lat) + (3, 3))
+    R[..., 0, 0], R[..., 0, 1], R[..., 0, 2] = -sin_long, cos_long, 0.0
+    R[..., 1, 0], R[..., 1, 1], R[..., 1, 2] = -sin_lat * cos_long, -sin_lat * sin_long, cos_lat
+    R[..., 2, 0], R[..., 2, 1], R[..., 2, 2] = cos_lat * cos_long, cos_lat * sin_long, sin_lat
+    return R
+
+
 def ENU2ECEF(x_enu, y_enu, z_enu, lat, long, h):
     """
     Convert from ENU frame to ECEF frame (cartesian coordinates). The ENU frame is centered (origin O) at the ground
@@ -41,6 +41,12 @@ def validate_form(form):
         raise FormError(f"Provided form {form} should either be 'cartesian' or 'geodetic'")
 
 
+def _unpickle_state_vector(cls, coord, data):
+    obj = cls(coord, data["date"], data["frame"], data["form"])
+    obj._data.update(data)
+    return obj
+
+
 class _StateVector(np.ndarray):
     """Coordinate representation"""
 
@@ -78,24 +84,10 @@ class _StateVector(np.ndarray):
         self._data = obj._data.copy()
 
     def __reduce__(self):
-        """For pickling
-        see http://stackoverflow.com/questions/26598109
-        """
-        reconstruct, clsinfo, state = super().__reduce__()
-
-        new_state = {
-            "basestate": state,
-            "inputs": self._data,
-        }
-
-        return reconstruct, clsinfo, new_state
-
-    def __setstate__(self, state):
-        """For pickling
-        see http://stackoverflow.com/questions/26598109
+        """For pickling: the vector is built again with the constructor, so that its coordinates are in its buffer
+        (`base`), as for any other vector
         """
-        super().__setstate__(state["basestate"])
-        self._data = state["inputs"]
+        return _unpickle_state_vector, (self.__class__, self.tolist(), self._data)
 
     def copy(self, form=None, frame=None):
         """
@@ -0,0 +1,3 @@
+from .checkpoint import CheckpointJournal, get_run_fingerprint
+from .table_writer import OUTPUT_FORMATS, TableWriter, TimeColumn
+from .trace_writer import TRACE_COMPRESSIONS, TRACE_STAGES, TraceWriter
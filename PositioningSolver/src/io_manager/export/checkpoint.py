@@ -0,0 +1,251 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+
+from ... import get_logger
+from ...data_types.basics.Epoch import Epoch
+from ...data_types.orbits.statevector import Position
+from ...utils.errors import ConfigError
+
+"""
+Checkpoints of the PVT solver, to resume a long run after a crash without solving the completed epochs again.
+
+The checkpoints are appended to a journal file (pickle records):
+    * a first record with the version of the journal and the fingerprint of the run (configuration and input files)
+    * one record per checkpoint, with the last solved epoch, the state of the solver at that epoch (see
+      `GPSSolver.get_checkpoint_state`) and the entries of the output timeseries set since the previous checkpoint
+
+Each checkpoint only writes the new output entries (the output cursors), so the cost of a checkpoint does not grow with
+the length of the run. The entries are written in a compact form (see `_pack_values`): the epochs as arrays of weeks and
+seconds, and the values as float arrays instead of the pickled containers. A record interrupted by a crash is
+discarded when the journal is loaded. The checkpoints are written at a fixed time interval, which is increased when the
+checkpoints are slow, so that they take a bounded fraction of the run time.
+"""
+
+_JOURNAL_VERSION = 2
+
+
+def _pack_values(values):
+    """
+    Compact form of the values of an output timeseries: numbers and position vectors as float arrays, numpy arrays
+    stacked (or concatenated, with their lengths, when the lengths differ) and the values of the classes with a
+    `pack_checkpoint` method (e.g. SystemGeometry) in the compact form of the class. Other values are kept as they are
+
+    Args:
+        values (list) : values of the output timeseries
+    Return:
+        tuple : the compact form (see `_unpack_values`)
+    """
+    cls = type(values[0]) if values else None
+    if cls is None or any(type(value) is not cls for value in values):
+        return "objects", list(values)
+
+    if cls is Position:
+        frame, form = values[0].frame, values[0].form
+        if all(value.frame == frame and value.form == form for value in values):
+            return "position", np.array(values, dtype=float), frame, form
+    elif hasattr(cls, "pack_checkpoint"):
+        return "class", cls, cls.pack_checkpoint(values)
+    elif cls in (float, int, np.float64):
+        return "number", np.array(values, dtype=float)
+    elif cls is np.ndarray and all(value.dtype == float for value in values):
+        if all(value.shape == values[0].shape for value in values):
+            return "array", np.stack(values)
+        if all(value.ndim == 1 for value in values):
+            return "ragged", np.concatenate(values), np.array([len(value) for value in values], dtype=np.int32)
+
+    return "objects", list(values)
+
+
+def _unpack_values(packed, epochs):
+    """
+    Restores the values of an output timeseries from their compact form (see `_pack_values`)
+
+    Args:
+        packed (tuple) : the compact form of the values
+        epochs (list) : epochs of the values
+    Return:
+        list : the values
+    """
+    kind = packed[0]
+    if kind == "position":
+        return [Position(row, epoch, packed[2], packed[3]) for row, epoch in zip(packed[1], epochs)]
+    if kind == "class":
+        return packed[1].unpack_checkpoint(packed[2], epochs)
+    if kind == "number":
+        return packed[1].tolist()
+    if kind == "array":
+        return list(packed[1])
+    if kind == "ragged":
+        return np.split(packed[1], np.cumsum(packed[2])[:-1])
+    return packed[1]
+
+
+def get_run_fingerprint(config, paths):
+    """
+    Fingerprint of a run: the configuration (except the output, log and profiling sections, which do not change the
+    solutions) and the name, size and modification time of the input files
+
+    Args:
+        config (src.config.Config) : user configurations
+        paths (list [str]) : input directories
+    Return:
+        str : the fingerprint (hexadecimal digest)
+    """
+    settings = {key: value for key, value in config.items() if key not in ("outputs", "log", "profiling", "_comment")}
+    files = []
+    for path in paths:
+        for file in sorted(glob.glob(path + "/*")):
+            stat = os.stat(file)
+            files.append([os.path.basename(file), stat.st_size, stat.st_mtime_ns])
+    text = json.dumps({"config": settings, "files": files}, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class CheckpointJournal:
+    """
+    Journal of the solver checkpoints (see the module documentation)
+    """
+
+    def __init__(self, file, outputs, fingerprint, interval=60.0, max_overhead=0.01):
+        """
+        Args:
+            file (str) : path of the journal file
+            outputs (dict) : name -> output timeseries (src.data_types.containers.TimeSeries.TimeSeries) to checkpoint
+            fingerprint (str) : fingerprint of the run (see `get_run_fingerprint`)
+            interval (float) : minimum time between checkpoints [s]
+            max_overhead (float) : maximum fraction of the run time spent writing checkpoints
+        """
+        self.file = file
+        self.outputs = outputs
+        self.fingerprint = fingerprint
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.log = get_logger("io_manager")
+
+        self._cursors = {name: 0 for name in outputs}  # number of entries of each output already in the journal
+        self._journal = None
+        self._next_time = None
+        self.checkpoints = 0
+        self.write_time = 0.0
+
+    def start(self, resume=False):
+        """
+        Opens the journal. When resuming, the output timeseries are restored from the journal and the last checkpoint
+        is returned. Otherwise, a new journal is started
+
+        Args:
+            resume (bool) : resume from the journal
+        Return:
+            dict or None : last checkpoint ({"epoch", "state", "solver"}), None if there is none
+        Raises:
+            ConfigError : the journal was written by a run with another configuration or other input files
+        """
+        checkpoint = None
+        if resume and os.path.exists(self.file):
+            checkpoint, valid_size = self._load()
+            self._journal = open(self.file, "r+b")
+            # drop a record interrupted by the crash, so that the next records are readable
+            self._journal.truncate(valid_size)
+            self._journal.seek(valid_size)
+        else:
+            if resume:
+                self.log.warning(f"No checkpoint journal {self.file} to resume from: starting a new run")
+            self._journal = open(self.file, "wb")
+            self._append({"version": _JOURNAL_VERSION, "fingerprint": self.fingerprint})
+
+        self._next_time = time.perf_counter() + self.interval
+        return checkpoint
+
+    def _load(self):
+        checkpoint, valid_size, records = None, 0, 0
+        with open(self.file, "rb") as journal:
+            try:
+                header = pickle.load(journal)
+            except (EOFError, pickle.UnpicklingError):
+                header = None
+            if not isinstance(header, dict) or header.get("version") != _JOURNAL_VERSION:
+                raise ConfigError(f"File {self.file} is not a valid checkpoint journal")
+            if header["fingerprint"] != self.fingerprint:
+                raise ConfigError(f"Checkpoint journal {self.file} was written by a run with a different configuration "
+                                  f"or different input files. Run without --resume to start a new run")
+            valid_size = journal.tell()
+
+            while True:
+                try:
+                    record = pickle.load(journal)
+                except Exception:
+                    # end of the journal, or a record interrupted by the crash (any error unpickling partial data)
+                    break
+                for name, (weeks, seconds, packed) in record["outputs"].items():
+                    timeseries = self.outputs[name]
+                    epochs = [Epoch((week, second)) for week, second in zip(weeks.tolist(), seconds.tolist())]
+                    for epoch, value in zip(epochs, _unpack_values(packed, epochs)):
+                        timeseries.set_data(epoch, value)
+                checkpoint = {"epoch": record["epoch"], "state": record["state"], "solver": record["solver"]}
+                valid_size = journal.tell()
+                records += 1
+
+        self._cursors = {name: len(timeseries.epochs) for name, timeseries in self.outputs.items()}
+        if checkpoint is not None:
+            self.log.info(f"Resuming from checkpoint {records} of {self.file}, after epoch "
+                          f"{checkpoint['epoch'].to_time_stamp()}")
+        return checkpoint, valid_size
+
+    def _append(self, record):
+        pickle.dump(record, self._journal, protocol=pickle.HIGHEST_PROTOCOL)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def due(self):
+        """
+        Return:
+            bool : True if a checkpoint should be written now
+        """
+        return time.perf_counter() >= self._next_time
+
+    def write(self, epoch, state, solver_state):
+        """
+        Appends a checkpoint to the journal
+
+        Args:
+            epoch (src.data_types.basics.Epoch.Epoch) : last solved epoch
+            state (src.algorithms.estimators.state_space.SPPStateSpace) : state of the last solved epoch
+            solver_state (dict) : state of the solver (see `GPSSolver.get_checkpoint_state`)
+        """
+        start = time.perf_counter()
+        outputs = {}
+        for name, timeseries in self.outputs.items():
+            epochs = timeseries.epochs
+            new_epochs = epochs[self._cursors[name]:]
+            self._cursors[name] = len(epochs)
+            if not new_epochs:
+                continue
+            outputs[name] = (np.array([new_epoch.week for new_epoch in new_epochs], dtype=np.int32),
+                             np.array([new_epoch.seconds for new_epoch in new_epochs], dtype=float),
+                             _pack_values([timeseries[new_epoch] for new_epoch in new_epochs]))
+        self._append({"epoch": epoch, "state": state, "solver": solver_state, "outputs": outputs})
+
+        # the next checkpoint is delayed so that the checkpoints take at most max_overhead of the run time
+        end = time.perf_counter()
+        self.checkpoints += 1
+        self.write_time += end - start
+        self._next_time = end + max(self.interval, (end - start) / self.max_overhead)
+
+    def close(self):
+        if self._journal is None:
+            return
+        self._journal.close()
+        self._journal = None
+        self.log.info(f"Checkpoints written to {self.file}: {self.checkpoints} ({self.write_time:.3f} [s])")
+
+    def remove(self):
+        """Closes and deletes the journal (after a successful run)"""
+        self.close()
+        if os.path.exists(self.file):
+            os.remove(self.file)
@@ -0,0 +1,176 @@
+import os
+
+import numpy as np
+
+from ...data_types.basics.Epoch import Epoch
+from ...utils.errors import ConfigError
+
+# available output formats and the corresponding file extensions
+OUTPUT_FORMATS = {"csv": ".txt", "npz": ".npz", "parquet": ".parquet"}
+
+
+class TimeColumn:
+    """
+    Time column of the output tables. The epochs are converted to numpy datetime64 once, and formatted as time stamps
+    (only for text outputs) once, so that all tables with the same epochs share them.
+
+    Tables with a subset of the epochs (`select`) or with repeated epochs (`take`, for example one row per epoch and
+    satellite) reuse the converted values.
+    """
+
+    def __init__(self, epochs):
+        """
+        Args:
+            epochs (list) : list of epochs (src.data_types.basics.Epoch.Epoch), in time order
+        """
+        self.epochs = list(epochs)
+        self.datetime = Epoch.to_datetime64_array(self.epochs)
+        self._stamps = None
+        self._rows = None
+        self._source = None  # (time column, rows) this time column was taken from
+
+    def __len__(self):
+        return len(self.datetime)
+
+    @property
+    def stamps(self):
+        """numpy.ndarray : time stamps of the epochs, in format '%Y-%m-%d %H:%M:%S' (formatted once)"""
+        if self._stamps is None:
+            if self._source is not None:
+                source, rows = self._source
+                self._stamps = source.stamps[rows]
+            else:
+                self._stamps = Epoch.to_time_stamp_array(self.datetime)
+        return self._stamps
+
+    def rows(self, epochs):
+        """
+        Args:
+            epochs (list) : epochs of this time column
+
+        Return:
+            numpy.ndarray : rows of the provided epochs
+        """
+        if self._rows is None:
+            self._rows = {epoch: i for i, epoch in enumerate(self.epochs)}
+        return np.array([self._rows[epoch] for epoch in epochs], dtype=int)
+
+    def take(self, rows):
+        """
+        Args:
+            rows (numpy.ndarray) : rows of this time column (may be repeated)
+
+        Return:
+            TimeColumn : the time column with the provided rows
+        """
+        column = TimeColumn.__new__(TimeColumn)
+        column.epochs = [self.epochs[i] for i in rows]
+        column.datetime = self.datetime[rows]
+        column._stamps = None
+        column._rows = None
+        column._source = (self, rows)
+        return column
+
+    def select(self, epochs):
+        """Returns the time column of a subset of the epochs (see `take`)"""
+        return self.take(self.rows(epochs))
+
+
+class TableWriter:
+    """
+    Columnar writer of the output tables. Each table is a time column followed by numeric (or string) columns, which
+    are written in one vectorized pass:
+        * csv : text file (.txt) with a header line, comma separated values and one time stamp per row
+        * npz : numpy archive (.npz) with one array per column, and the time column as datetime64[us]
+        * parquet : Apache Parquet file (.parquet), with the time column as timestamp[us]. Requires `pyarrow`
+    """
+
+    def __init__(self, output_path, output_format="csv"):
+        """
+        Args:
+            output_path (str) : directory of the output files
+            output_format (str) : one of "csv", "npz" or "parquet"
+
+        Raises:
+            ConfigError : if the output format is unknown, or its dependencies are not available
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ConfigError(f"Unknown output format {output_format}. Available formats are "
+                              f"{list(OUTPUT_FORMATS.keys())}")
+        if output_format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ConfigError(f"Output format 'parquet' requires the 'pyarrow' package. Install it or select "
+                                  f"another output format")
+
+        self.output_path = output_path
+        self.output_format = output_format
+
+    def write(self, name, time, columns, na_rep="nan"):
+        """
+        Writes an output table
+
+        Args:
+            name (str) : name of the table (file name without extension)
+            time (TimeColumn) : time column of the table
+            columns (dict or list) : column name -> values (numpy.ndarray or list with one value per row), or list of
+                                     (column name, values) pairs. Repeated column names are only kept in the text
+                                     format, and are numbered in the binary formats (e.g. "sigma_isb[s]_1")
+            na_rep (str) : representation of missing (NaN) values in the text format
+
+        Return:
+            str : path of the written file
+        """
+        path = os.path.join(self.output_path, name + OUTPUT_FORMATS[self.output_format])
+        if isinstance(columns, dict):
+            columns = columns.items()
+        columns = [(header, np.asarray(values)) for header, values in columns]
+
+        for header, values in columns:
+            if len(values) != len(time):
+                raise ValueError(f"Column {header} of table {name} has {len(values)} rows, but the time column has "
+                                 f"{len(time)} rows")
+
+        if self.output_format == "csv":
+            self._write_csv(path, time, columns, na_rep)
+            return path
+
+        # binary formats: unique column names
+        unique = {}
+        for header, values in columns:
+            key, n = header, 0
+            while key in unique or key == "Time":
+                n += 1
+                key = f"{header}_{n}"
+            unique[key] = values
+
+        if self.output_format == "npz":
+            np.savez(path, Time=time.datetime, **unique)
+        else:
+            self._write_parquet(path, time, unique)
+        return path
+
+    @staticmethod
+    def _format_column(values, na_rep):
+        """Formats a column as strings (str of the python values, i.e., the shortest repr of the floats)"""
+        text = list(map(str, values.tolist()))
+        if na_rep != "nan" and np.issubdtype(values.dtype, np.floating):
+            for i in np.flatnonzero(np.isnan(values)):
+                text[i] = na_rep
+        return text
+
+    def _write_csv(self, path, time, columns, na_rep):
+        rows = zip(time.stamps.tolist(), *(self._format_column(values, na_rep) for _, values in columns))
+
+        with open(path, "w") as f:
+            f.write(",".join(["Time"] + [header for header, _ in columns]) + "\n")
+            f.write("".join(",".join(row) + "\n" for row in rows))
+
+    @staticmethod
+    def _write_parquet(path, time, columns):
+        import pyarrow
+        import pyarrow.parquet
+
+        table = pyarrow.table({"Time": time.datetime, **columns})
+        pyarrow.parquet.write_table(table, path)
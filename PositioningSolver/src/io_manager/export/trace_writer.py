@@ -0,0 +1,110 @@
+import bz2
+import gzip
+import lzma
+import os
+
+from ... import get_logger
+from ...utils.errors import ConfigError
+
+# available compressions of the trace files and the corresponding (open function, file extension)
+TRACE_COMPRESSIONS = {"none": (open, ""), "gzip": (gzip.open, ".gz"), "bz2": (bz2.open, ".bz2"),
+                      "lzma": (lzma.open, ".xz")}
+
+# trace stages (one or more trace files per stage)
+TRACE_STAGES = ("navigation_data", "observation_data", "snr_check", "type_consistency", "iono_free", "smooth",
+                "downgrade", "satellite_info", "residuals", "estimated_iono")
+
+
+class TraceWriter:
+    """
+    Writer of the trace files (text dumps of the intermediate data of each processing stage).
+
+    The contents are provided as iterables of string chunks (e.g. `ObservationData.iter_str()`), which are formatted
+    and written incrementally, so that the full text of a large dataset is never built in memory. Disabled stages
+    are skipped without formatting anything, and a trace file stops being formatted once it reaches the maximum size.
+    """
+    BUFFER_SIZE = 1 << 20  # number of characters buffered before each write to the (compressed) file
+
+    def __init__(self, trace_path, stages=None, compression="none", max_size=0):
+        """
+        Args:
+            trace_path (str) : directory of the trace files
+            stages (dict) : stage -> enabled flag, for the stages in TRACE_STAGES. Stages not provided are enabled.
+                            If None, all stages are enabled
+            compression (str) : one of "none", "gzip", "bz2" or "lzma"
+            max_size (float) : maximum size of each trace file [MB] of uncompressed text (1 MB = 1E6 characters, as the
+                               traces are ASCII text). 0 for no limit
+
+        Raises:
+            ConfigError : if the compression or a stage is unknown
+        """
+        if compression not in TRACE_COMPRESSIONS:
+            raise ConfigError(f"Unknown trace compression {compression}. Available compressions are "
+                              f"{list(TRACE_COMPRESSIONS.keys())}")
+        stages = {} if stages is None else stages
+        for stage in stages:
+            if stage not in TRACE_STAGES:
+                raise ConfigError(f"Unknown trace stage {stage}. Available stages are {list(TRACE_STAGES)}")
+
+        self.trace_path = trace_path
+        self.stages = {stage: bool(stages.get(stage, True)) for stage in TRACE_STAGES}
+        self.compression = compression
+        self.max_size_mb = max_size
+        self.max_size = int(max_size * 1E6)  # [characters]
+        self.log = get_logger("io_manager")
+
+    def is_enabled(self, stage):
+        return self.stages[stage]
+
+    def write(self, stage, file_name, chunks):
+        """
+        Writes a trace file, if its stage is enabled
+
+        Args:
+            stage (str) : stage of the trace file (see TRACE_STAGES)
+            file_name (str) : name of the trace file (the compression extension is appended)
+            chunks (str or iterable) : contents of the trace file, as a string or an iterable of strings. Generators
+                                       are only consumed if the stage is enabled, and up to the maximum size
+
+        Return:
+            str or None : path of the written file, or None if the stage is disabled
+        """
+        if not self.is_enabled(stage):
+            return None
+
+        open_file, extension = TRACE_COMPRESSIONS[self.compression]
+        path = os.path.join(self.trace_path, file_name + extension)
+        self.log.debug(f"Writing {stage} to trace file {file_name + extension}")
+
+        if isinstance(chunks, str):
+            chunks = (chunks,)
+
+        size, truncated = 0, False
+        buffer, buffered = [], 0
+        with open_file(path, "wt") as f:
+            for chunk in chunks:
+                if self.max_size and size + len(chunk) > self.max_size:
+                    buffer.append(chunk[0:self.max_size - size])
+                    truncated = True
+                    break
+                buffer.append(chunk)
+                size += len(chunk)
+                buffered += len(chunk)
+
+                if buffered >= self.BUFFER_SIZE:
+                    f.write("".join(buffer))
+                    buffer, buffered = [], 0
+
+            if truncated:
+                buffer.append(f"\n[trace truncated: maximum size of {self.max_size_mb} MB of uncompressed text "
+                              f"reached]\n")
+            f.write("".join(buffer))
+
+        # stop the generator (and the formatting of the remaining data)
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+        if truncated:
+            self.log.warning(f"Trace file {file_name + extension} truncated at the maximum size of "
+                             f"{self.max_size_mb} MB of uncompressed text")
+        return path
@@ -0,0 +1,256 @@
+import bz2
+import gzip
+
+from ...utils.errors import FileError
+
+"""
+Transparent reading of compressed RINEX files. The files are decompressed on the fly while they are parsed (there is
+no decompressed copy on disk):
+    * gzip (.gz) and bzip2 (.bz2) files, detected by their magic bytes (not by the file extension)
+    * Hatanaka compressed observation files (Compact RINEX 3.0, .crx), also inside a gzip or bzip2 file (.crx.gz),
+      decoded epoch by epoch by `HatanakaDecoder`
+
+Compact RINEX (Y. Hatanaka, "A Compression Format and Tools for GNSS Observation Data", 2008):
+    * the two first lines (CRINEX VERS / TYPE and CRINEX PROG / DATE) are followed by the RINEX header, unchanged
+    * the epoch line is given in full when it starts with '>', and otherwise as the text difference with respect to the
+      previous epoch line: a space keeps the previous character, '&' sets a space and any other character replaces the
+      previous one. The satellites of the epoch are listed after column 41
+    * the next line has the receiver clock offset (empty when not available), and then there is one line for each
+      satellite, with one field per observation type, separated by spaces, followed by the LLI and signal strength
+      flags of all observation types (text difference with respect to the flags of the satellite in the previous epoch)
+    * the observations are integers (the observation without its decimal point). A field 'k&value' starts a data arc
+      with the value itself, and the next fields are the differences of order 1, 2, ... up to k of the values. An empty
+      field is a missing observation, and the arc starts again after it
+"""
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_BZIP2_MAGIC = b"BZh"
+_COMPRESS_MAGIC = b"\x1f\x9d"
+
+_CRINEX_VERSIONS = ("3.0",)
+
+
+def open_rinex(file):
+    """
+    Opens a RINEX file (or a SP3 file) for reading, decompressing it on the fly if it is a gzip, bzip2 or Hatanaka
+    compressed file
+
+    Args:
+        file (str) : path of the file
+    Return:
+        file object : text file object with the (decompressed) lines of the file
+    Raises:
+        FileError : unsupported compression or Compact RINEX version
+    """
+    with open(file, "rb") as binary_file:
+        magic = binary_file.read(3)
+
+    if magic[0:2] == _GZIP_MAGIC:
+        text_file = gzip.open(file, "rt")
+    elif magic == _BZIP2_MAGIC:
+        text_file = bz2.open(file, "rt")
+    elif magic[0:2] == _COMPRESS_MAGIC:
+        raise FileError(f"File {file} is compressed with Unix compress (.Z), which is not supported. Please use gzip")
+    else:
+        text_file = open(file, "r")
+
+    first_line = text_file.readline()
+    if "CRINEX VERS" in first_line:
+        return HatanakaDecoder(text_file, first_line, file)
+    text_file.seek(0)
+    return text_file
+
+
+def is_plain_rinex(file):
+    """
+    Args:
+        file (str) : path of the file
+    Return:
+        bool : True if the file is neither compressed nor Hatanaka compressed (that is, the byte offsets of its lines
+               can be used to seek the file opened by `open_rinex`)
+    """
+    with open(file, "rb") as binary_file:
+        first_line = binary_file.readline(81)
+    return first_line[0:2] not in (_GZIP_MAGIC, _COMPRESS_MAGIC) and first_line[0:3] != _BZIP2_MAGIC and \
+        b"CRINEX VERS" not in first_line
+
+
+def _repair(line, diff):
+    """Applies the text difference `diff` to `line` (see the module documentation)"""
+    if len(diff) > len(line):
+        line = line.ljust(len(diff))
+    chars = list(line)
+    for i, char in enumerate(diff):
+        if char != " ":
+            chars[i] = " " if char == "&" else char
+    return "".join(chars)
+
+
+def _decode_field(field, arc):
+    """
+    Decodes a Compact RINEX data field
+
+    Args:
+        field (str) : field text
+        arc (list or None) : data arc of the previous epoch, [arc order k, current order m, differences of order 0..k]
+                             (updated in place)
+    Return:
+        list or None : data arc of this epoch (the value is the difference of order 0, arc[2]), None if missing
+    """
+    if not field:
+        return None
+    if field[1:2] == "&":
+        arc_order = int(field[0])
+        return [arc_order, 0, int(field[2:])] + [0] * arc_order
+    if arc is None:
+        raise FileError(f"Compact RINEX difference {field} without an initialized data arc")
+
+    order = arc[1] + 1 if arc[1] < arc[0] else arc[0]
+    arc[1] = order
+    arc[2 + order] = int(field)
+    for i in range(order + 1, 1, -1):
+        arc[i] += arc[i + 1]
+    return arc
+
+
+class HatanakaDecoder:
+    """
+    Text file object that decodes a Compact RINEX 3.0 file (see the module documentation) into RINEX 3 lines, epoch by
+    epoch, as they are read. Supports `readline`, iteration and the context manager protocol
+    """
+
+    def __init__(self, text_file, first_line, name=""):
+        """
+        Args:
+            text_file (file object) : the Compact RINEX file, with the first line already read
+            first_line (str) : first line of the file (CRINEX VERS / TYPE)
+            name (str) : name of the file, for the error messages
+        """
+        version = first_line[0:20].strip()
+        if version not in _CRINEX_VERSIONS:
+            text_file.close()
+            raise FileError(f"Compact RINEX version {version} of file {name} is not supported (only version "
+                            f"{', '.join(_CRINEX_VERSIONS)}, for RINEX 3 files)")
+
+        self.name = name
+        self._file = text_file
+        self._file.readline()  # CRINEX PROG / DATE
+        self._lines = []  # decoded lines not read yet
+        self._next = 0
+        self._in_header = True
+
+        self._n_types = {}  # satellite system code -> number of observation types
+        self._epoch_line = ""
+        self._clock = None  # data arc of the receiver clock offset
+        self._arcs = {}  # satellite -> data arcs of the observation types (previous epoch)
+        self._flags = {}  # satellite -> LLI and signal strength flags (previous epoch)
+
+    def readline(self):
+        while self._next >= len(self._lines):
+            self._lines, self._next = [], 0
+            if not (self._read_header_line() if self._in_header else self._decode_epoch()):
+                return ""
+        line = self._lines[self._next]
+        self._next += 1
+        return line
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _read_header_line(self):
+        line = self._file.readline()
+        if not line:
+            return False
+
+        label = line[60:]
+        if label.startswith("SYS / # / OBS TYPES") and line[0] != " ":
+            self._n_types[line[0]] = int(line[3:6])
+        elif label.startswith("END OF HEADER"):
+            self._in_header = False
+        self._lines.append(line)
+        return True
+
+    def _decode_epoch(self):
+        line = self._file.readline()
+        if not line:
+            return False
+        line = line.rstrip("\r\n")
+        self._epoch_line = line if line.startswith(">") else _repair(self._epoch_line, line)
+        epoch_line = self._epoch_line
+
+        flag = epoch_line[31:32]
+        n_records = int(epoch_line[32:35])
+        if flag in ("2", "3", "4", "5"):
+            # special event: the records are header lines, unchanged
+            self._lines.append(epoch_line[0:35].rstrip() + "\n")
+            for _ in range(n_records):
+                self._lines.append(self._file.readline())
+            return True
+
+        # receiver clock offset (F15.12)
+        clock_field = self._file.readline().rstrip("\r\n")
+        self._clock = _decode_field(clock_field, self._clock)
+        if self._clock is None:
+            self._lines.append(epoch_line[0:35] + "\n")
+        else:
+            self._lines.append(epoch_line[0:35] + "      " + "%15.12f" % (self._clock[2] / 1E12) + "\n")
+
+        arcs, flags = {}, {}
+        readline = self._file.readline
+        for i in range(n_records):
+            sat = epoch_line[41 + 3 * i:44 + 3 * i]
+            n_types = self._n_types.get(sat[0])
+            if n_types is None:
+                raise FileError(f"Compact RINEX file {self.name}: no observation types for satellite {sat}")
+
+            fields = readline().rstrip("\r\n").split(" ", n_types)
+            sat_flags = _repair(self._flags.get(sat, ""), fields[n_types] if len(fields) > n_types else "")
+            sat_flags = sat_flags.ljust(2 * n_types)
+            del fields[n_types:]
+            previous_arcs = self._arcs.get(sat)
+            sat_arcs = [None] * n_types
+
+            # observations F14.3 (integers in units of 0.001, well within the float precision). The decoding of the
+            # data fields (see `_decode_field`) is inlined, as this loop runs for every observation of the file
+            record = [sat]
+            for j, field in enumerate(fields):
+                if not field:
+                    record.append("                ")
+                    continue
+                if field[1:2] == "&":
+                    arc = [int(field[0]), 0, int(field[2:])] + [0] * int(field[0])
+                else:
+                    arc = previous_arcs[j] if previous_arcs is not None else None
+                    if arc is None:
+                        raise FileError(f"Compact RINEX file {self.name}: difference {field} of satellite {sat} "
+                                        f"without an initialized data arc")
+                    order = arc[1] + 1 if arc[1] < arc[0] else arc[0]
+                    arc[1] = order
+                    arc[2 + order] = int(field)
+                    for k in range(order + 1, 1, -1):
+                        arc[k] += arc[k + 1]
+                sat_arcs[j] = arc
+                record.append("%14.3f" % (arc[2] / 1000) + sat_flags[2 * j:2 * j + 2])
+            record += ["                "] * (n_types - len(fields))
+            self._lines.append("".join(record) + "\n")
+            arcs[sat] = sat_arcs
+            flags[sat] = sat_flags
+
+        # the data arcs and flags continue only for the satellites of consecutive epochs
+        self._arcs, self._flags = arcs, flags
+        return True
@@ -0,0 +1,164 @@
+from ...io_manager.import_rinex.RinexUtils import to_float
+from ...data_types.basics.Epoch import Epoch
+from ...data_types.gnss.Satellite import SatelliteFactory
+
+from .RinexNavReaderGPS import RinexNavReaderGPS
+from ...data_types.containers.NavigationData import NavigationPointGAL
+
+
+"""
+Example of Galileo records in a Rinex Navigation File V3.03 (one I/NAV and one F/NAV message):
+
+E01 2019 01 14 06 10 00-6.028004176915D-04-7.815970093361D-12 0.000000000000D+00
+     5.300000000000D+01-1.428125000000D+02 2.804402527409D-09 1.926598505543D+00
+    -6.660446524620D-06 1.616114401259D-04 1.125969737768D-05 5.440616874695D+03
+     1.098000000000D+05 1.303851604462D-08-2.590488255280D+00 2.421438694000D-08
+     9.799627034180D-01 9.553125000000D+01-6.042385510160D-01-5.367010122016D-09
+    -2.278666067368D-10 5.170000000000D+02 2.036000000000D+03 0.000000000000D+00
+     3.120000000000D+00 0.000000000000D+00-1.629814505577D-09-1.862645149231D-09
+     1.105400000000D+05 0.000000000000D+00 0.000000000000D+00 0.000000000000D+00
+E01 2019 01 14 06 10 00-6.028011161834D-04-7.815970093361D-12 0.000000000000D+00
+     5.300000000000D+01-1.428125000000D+02 2.804402527409D-09 1.926598505543D+00
+    -6.660446524620D-06 1.616114401259D-04 1.125969737768D-05 5.440616874695D+03
+     1.098000000000D+05 1.303851604462D-08-2.590488255280D+00 2.421438694000D-08
+     9.799627034180D-01 9.553125000000D+01-6.042385510160D-01-5.367010122016D-09
+    -2.278666067368D-10 2.580000000000D+02 2.036000000000D+03 0.000000000000D+00
+     3.120000000000D+00 0.000000000000D+00-1.629814505577D-09 0.000000000000D+00
+     1.106000000000D+05 0.000000000000D+00 0.000000000000D+00 0.000000000000D+00
+
+Important Note: The time tags of the navigation messages are given in the Galileo System Time (GST), which is steered
+to GPS time, and the Galileo week number is aligned to the GPS week. The (small) GPS to Galileo time offset is absorbed
+by the inter-system bias estimated in the PVT solver."""
+
+
+class RinexNavReaderGAL(RinexNavReaderGPS):
+    """
+    Class RinexNavReaderGAL
+    Reads the Galileo navigation messages of a Rinex Navigation File (Galileo only or mixed file). The header is read
+    as in RinexNavReaderGPS.
+
+    The same ephemeris is usually broadcast in both I/NAV and F/NAV messages, with the same time of clock, but the
+    satellite clock parameters of each message refer to a different frequency pair. Only the messages of the
+    requested type are stored.
+
+    Attributes
+        ----------
+        nav_header : NavigationHeader (composed of attributes rinex_version, satellite_system,
+                                      iono_corrections, leap_seconds, first_epoch)
+        nav_data : NavigationDataMap
+        message_type : str ("I/NAV" for E1 / E5b users, "F/NAV" for E5a users)
+    """
+    MESSAGE_TYPES = ("I/NAV", "F/NAV")
+
+    def __init__(self, file, NavigationDataMap, message_type="I/NAV"):
+        if message_type not in RinexNavReaderGAL.MESSAGE_TYPES:
+            raise AttributeError(f"Galileo navigation message type must be one of {RinexNavReaderGAL.MESSAGE_TYPES}. "
+                                 f"Provided type is {message_type}")
+        self.message_type = message_type
+
+        super().__init__(file, NavigationDataMap)
+
+    def _read_data(self, cFile):
+        """
+        Read Galileo navigation data
+
+        Data to fetch:
+            * satellite, toc, af0, af1, af2                         [Line 1]
+            * IODnav, crs, deltaN, M0                               [Line 2]
+            * Cuc, e, Cus, sqrtA                                    [Line 3]
+            * Toe, Cic, RAAN0, Cis,                                 [Line 4]
+            * i0, crc, omega, RAANDot,                              [Line 5]
+            * iDot, data_sources, toe (gal week), spare             [Line 6]
+            * SISA, SV_health, BGD E5a/E1, BGD E5b/E1               [Line 7]
+            * TransmissionTime (seconds of week)                    [Line 8]
+
+        Control variables:
+            * SISA - Signal In Space Accuracy, in meters (-1 if no accuracy prediction is available)
+            * SV_health : Satellite health status (E1-B, E5a and E5b data validity and signal health bits):
+                    0 = all NAV data are OK,
+                    != 0 some or all NAV data are bad (ignore this entry!!).
+        """
+        fnav = self.message_type == "F/NAV"
+        line = " "
+
+        while line:
+            line = cFile.readline()
+
+            if len(line) == 0:
+                break
+
+            if line[0] == "E":
+                # new Galileo navigation epoch inputs
+                navMessage = NavigationPointGAL()
+
+                # read 1st line
+                satellite = SatelliteFactory(line[0:3])
+                toc = Epoch({"year": int(line[4:8]),
+                             "month": int(line[9:11]),
+                             "day": int(line[12:14]),
+                             "hour": int(line[15:17]),
+                             "minute": int(line[18:20]),
+                             "second": int(line[21:23])},
+                            time_system="gps")
+                setattr(navMessage, "satellite", satellite)
+                setattr(navMessage, "toc", toc)
+                setattr(navMessage, "af0", to_float(line[23:42]))
+                setattr(navMessage, "af1", to_float(line[42:61]))
+                setattr(navMessage, "af2", to_float(line[61:80]))
+
+                # read 2nd line
+                line = cFile.readline()
+                setattr(navMessage, "IODnav", to_float(line[4:23]))
+                setattr(navMessage, "crs", to_float(line[23:42]))
+                setattr(navMessage, "deltaN", to_float(line[42:61]))
+                setattr(navMessage, "M0", to_float(line[61:80]))
+
+                # read 3rd line
+                line = cFile.readline()
+                setattr(navMessage, "cuc", to_float(line[4:23]))
+                setattr(navMessage, "eccentricity", to_float(line[23:42]))
+                setattr(navMessage, "cus", to_float(line[42:61]))
+                setattr(navMessage, "sqrtA", to_float(line[61:80]))
+
+                # read 4th line
+                line = cFile.readline()
+                sec_toe = to_float(line[1:23])
+                setattr(navMessage, "cic", to_float(line[23:42]))
+                setattr(navMessage, "RAAN0", to_float(line[42:61]))
+                setattr(navMessage, "cis", to_float(line[61:80]))
+
+                # read 5th line
+                line = cFile.readline()
+                setattr(navMessage, "i0", to_float(line[4:23]))
+                setattr(navMessage, "crc", to_float(line[23:42]))
+                setattr(navMessage, "omega", to_float(line[42:61]))
+                setattr(navMessage, "RAANDot", to_float(line[61:80]))
+
+                # read 6th line
+                line = cFile.readline()
+                week_toe = to_float(line[42:61])
+                setattr(navMessage, "iDot", to_float(line[4:23]))
+                setattr(navMessage, "data_sources", to_float(line[23:42]))
+                setattr(navMessage, "toe", Epoch([week_toe, sec_toe]))
+
+                # read 7th line
+                line = cFile.readline()
+                setattr(navMessage, "SISA", to_float(line[4:23]))
+                setattr(navMessage, "SV_health", to_float(line[23:42]))
+                setattr(navMessage, "BGD_E5a", to_float(line[42:61]))
+                setattr(navMessage, "BGD_E5b", to_float(line[61:80]))
+
+                # read 8th line
+                line = cFile.readline()
+                setattr(navMessage, "TransmissionTime", to_float(line[4:23]))
+
+                # keep only the messages of the requested type
+                if navMessage.is_fnav() != fnav:
+                    continue
+
+                # set first epoch for this file
+                if not self._first_epoch_set:
+                    self._first_epoch = toc
+                    self._first_epoch_set = True
+
+                self.nav_data.set_data(toc, satellite, navMessage)
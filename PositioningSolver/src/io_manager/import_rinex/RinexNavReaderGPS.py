@@ -2,8 +2,10 @@ from ...io_manager.import_rinex.RinexUtils import to_float
 from ...data_types.basics.Epoch import Epoch
 from ...data_types.gnss.Satellite import SatelliteFactory
 
+from .RinexCompression import open_rinex
 from .RinexUtils import RinexUtils
 from ...data_types.containers.NavigationData import NavigationPointGPS, NavigationHeader
+from ...utils.errors import FileError
 
 
 """
@@ -51,17 +53,21 @@ class RinexNavReaderGPS:
         self._first_epoch = None
         self._first_epoch_set = False
 
-        cFile = open(file, "r")
+        cFile = open_rinex(file)
 
         # read header
         self._read_header(cFile)
+        if self.nav_header.rinex_version is None:
+            cFile.close()
+            raise FileError(f"No RINEX header found in file {file}")
 
         # read inputs
         self._read_data(cFile)
 
-        # attach header to the NavigationDataMap
-        self.nav_header.first_epoch = self._first_epoch
-        self.nav_data.set_header(self.nav_header)
+        # attach header to the NavigationDataMap (only if the file has navigation data for this constellation)
+        if self._first_epoch_set:
+            self.nav_header.first_epoch = self._first_epoch
+            self.nav_data.set_header(self.nav_header)
 
         cFile.close()
 
@@ -84,13 +90,11 @@ class RinexNavReaderGPS:
             if "RINEX VERSION / TYPE" in line:
                 self.nav_header.rinex_version = float(line[5:10])
                 if self.nav_header.rinex_version < 3:
-                    from src.utils.errors import FileError
                     raise FileError("The provided rinex file {} is of version {}. Only version 3.00 or "
                                     "higher is supported. Error!".format(cFile, self.nav_header.rinex_version))
 
                 rinex_type = line[20]
                 if rinex_type != 'N':
-                    from src.utils.errors import FileError
                     raise FileError("Rinex File {} should be a GNSS Navigation Data File. Instead, "
                                     "a {} was provided (code {})".format(cFile,
                                                                          RinexUtils.RINEX_FILE_TYPES.get
@@ -0,0 +1,152 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+from .RinexCompression import is_plain_rinex
+
+"""
+Epoch index of RINEX observation files: the epoch and byte offset of each epoch record line ('>') of the file, so that
+the reader can seek directly to the first epoch of the estimation arc instead of parsing the file from its start.
+
+The index is built once per file, with a scan of the raw bytes (much faster than the parsing of the observations),
+and cached in a hidden file next to the observation file ('.<file name>.epochs.npz', ignored by the input file
+globs), or in a cache directory. The cache is rebuilt when the size or the modification time of the file changes.
+
+Only uncompressed RINEX files are indexed: the compressed files (gzip, bzip2, Hatanaka) can not be seeked without
+decompressing them from the start.
+"""
+
+_INDEX_VERSION = 1
+
+
+class EpochIndex:
+    """
+    Epochs (calendar time, with the seconds truncated as in RinexObsReader) and byte offsets of the epoch records of a
+    RINEX observation file, in file order
+    """
+    __slots__ = ["times", "offsets"]
+
+    def __init__(self, times, offsets):
+        """
+        Args:
+            times (numpy.ndarray) : epochs of the records (numpy.datetime64[s])
+            offsets (numpy.ndarray) : byte offsets of the epoch record lines (int64)
+        """
+        self.times = times
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def get_offset(self, epoch):
+        """
+        Args:
+            epoch (src.data_types.basics.Epoch.Epoch) : first epoch to read
+        Return:
+            int or None : byte offset of the first epoch record at or after `epoch`, None if there is none
+        """
+        i = np.searchsorted(self.times, np.datetime64(epoch.to_datetime(), "s"), side="left")
+        return int(self.offsets[i]) if i < len(self.offsets) else None
+
+
+def _parse_time(line):
+    data = line[1:].split()
+    return f"{int(data[0]):04d}-{int(data[1]):02d}-{int(data[2]):02d}T{int(data[3]):02d}:{int(data[4]):02d}:" \
+           f"{int(float(data[5])):02d}"
+
+
+def build_epoch_index(file):
+    """
+    Scans the epoch record lines of an uncompressed RINEX observation file
+
+    Args:
+        file (str) : path of the file
+    Return:
+        EpochIndex or None : the index, None if the file can not be indexed (no header, or epochs out of order)
+    """
+    with open(file, "rb") as binary_file:
+        if os.fstat(binary_file.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = data.find(b"END OF HEADER")
+            if position < 0:
+                return None
+
+            times, offsets = [], []
+            position = data.find(b"\n>", position)
+            while position >= 0:
+                start = position + 1
+                end = data.find(b"\n", start)
+                line = data[start:end if end >= 0 else len(data)].decode("ascii", "replace")
+                try:
+                    times.append(_parse_time(line))
+                except (ValueError, IndexError):
+                    # special event records may have a blank epoch: keep the previous one
+                    times.append(times[-1] if times else "1980-01-06T00:00:00")
+                offsets.append(start)
+                position = data.find(b"\n>", start) if end >= 0 else -1
+
+    times = np.array(times, dtype="datetime64[s]")
+    if np.any(times[1:] < times[:-1]):
+        return None
+    return EpochIndex(times, np.array(offsets, dtype=np.int64))
+
+
+def _get_cache_file(file, cache_dir):
+    if not cache_dir:
+        directory, name = os.path.split(os.path.abspath(file))
+        return os.path.join(directory, f".{name}.epochs.npz")
+    key = hashlib.sha1(os.path.abspath(file).encode("utf-8")).hexdigest()[0:16]
+    return os.path.join(cache_dir, f"{os.path.basename(file)}.{key}.epochs.npz")
+
+
+def get_epoch_index(file, cache_dir="", log=None):
+    """
+    Gets the epoch index of a RINEX observation file, from the cache or built (and then cached)
+
+    Args:
+        file (str) : path of the observation file
+        cache_dir (str) : directory of the cached indexes ("" to cache the index next to the observation file)
+        log (logging.Logger) : logger (optional)
+    Return:
+        EpochIndex or None : the index, None if the file can not be indexed (e.g. compressed file)
+    """
+    if not is_plain_rinex(file):
+        return None
+
+    stat = os.stat(file)
+    cache_file = _get_cache_file(file, cache_dir)
+    try:
+        with np.load(cache_file) as cache:
+            if int(cache["version"]) == _INDEX_VERSION and int(cache["size"]) == stat.st_size and \
+                    int(cache["mtime"]) == stat.st_mtime_ns:
+                return EpochIndex(cache["times"], cache["offsets"])
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        pass
+
+    index = build_epoch_index(file)
+    if index is None:
+        return None
+
+    try:
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        # written to a temporary file and renamed, so that concurrent runs never read a partial index
+        descriptor, temporary_file = tempfile.mkstemp(dir=os.path.dirname(cache_file), prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                np.savez(f, version=_INDEX_VERSION, size=stat.st_size, mtime=stat.st_mtime_ns, times=index.times,
+                         offsets=index.offsets)
+            os.replace(temporary_file, cache_file)
+        except BaseException:
+            os.remove(temporary_file)
+            raise
+    except OSError as e:
+        # read-only input directory: the index is only used for this run
+        if log is not None:
+            log.debug("Could not cache the epoch index of file %s in %s: %s", file, cache_file, e)
+    return index
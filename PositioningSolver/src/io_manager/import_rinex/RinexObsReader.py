@@ -6,8 +6,10 @@ from ...data_types.basics.DataType import DataTypeFactory
 from ...data_types.containers.ObservationData import ObservationData, Header, ObservationHeader
 from ...data_types.gnss.ServiceManager import ServiceManager
 
+from .RinexCompression import open_rinex
+from .RinexObsIndex import get_epoch_index
 from .RinexUtils import RinexUtils
-from ...utils.errors import ConfigError
+from ...utils.errors import ConfigError, FileError
 
 """
 Example of File Rinex Observation File V3.03 (header + data):
@@ -55,12 +57,15 @@ class RinexObsReader:
                                     receiver_position, leap_seconds, first_epoch, last_epoch)
         log : logging
         first_arc_epoch : initial arc epoch to read
-        last_arc_epoch : final arc epoch to read
+        last_arc_epoch : final arc epoch to read (the reading stops after it)
+        epoch_index : seek the initial arc epoch with the epoch index of the file (see RinexObsIndex), instead of
+                      parsing the file from its start
+        index_dir : directory of the cached epoch indexes ("" to cache them next to the observation files)
 
     """
 
     def __init__(self, file, services: ServiceManager, cObsData: ObservationData, obs_header: ObservationHeader, log,
-                 first_arc_epoch=None, last_arc_epoch=None, snr_control_check=0):
+                 first_arc_epoch=None, last_arc_epoch=None, snr_control_check=0, epoch_index=False, index_dir=""):
         if not isinstance(services, ServiceManager):
             raise AttributeError(f'argument ´services´ should be of type ServiceManager')
         if not isinstance(cObsData, ObservationData):
@@ -79,14 +84,20 @@ class RinexObsReader:
         self.first_arc_epoch = first_arc_epoch
         self.last_arc_epoch = last_arc_epoch
 
-        cFile = open(self.file, "r")
+        cFile = open_rinex(self.file)
 
         # read header
         self._read_header(cFile)
+        if self.header.rinex_version is None:
+            cFile.close()
+            raise FileError(f"No RINEX header found in file {file}")
         obs_header.set_header(self.header)
 
         self._validate_requested_observations()
 
+        if self.first_arc_epoch and epoch_index:
+            self._seek_first_arc_epoch(cFile, index_dir)
+
         # read inputs
         self._read_obs(cFile)
 
@@ -114,13 +125,11 @@ class RinexObsReader:
             if "RINEX VERSION / TYPE" in line:
                 self.header.rinex_version = float(line[5:10])
                 if self.header.rinex_version < 3:
-                    from src.utils.errors import FileError
                     raise FileError("The provided rinex file {} is of version {}. Only version 3.00 or "
                                     "higher is supported. Error!".format(self.file, self.header.rinex_version))
 
                 rinexType = line[20]
                 if rinexType != 'O':
-                    from src.utils.errors import FileError
                     raise FileError("Rinex File {} should be a GNSS Observation Data File. Instead, "
                                     "a {} was provided (code {})".format(self.file,
                                                                          RinexUtils.RINEX_FILE_TYPES.get
@@ -213,6 +222,25 @@ class RinexObsReader:
                           .format(self.header.time_system))
             self.header.time_system = "GPS"
 
+    def _seek_first_arc_epoch(self, cFile, index_dir):
+        """
+        Moves the file position to the first epoch record at or after the initial arc epoch, if the file can be indexed
+        (uncompressed file). Otherwise, the file is read from the start and the epochs before the arc are skipped
+        """
+        index = get_epoch_index(self.file, index_dir, self.log)
+        if index is None:
+            self.log.debug("No epoch index for file %s: reading the file from the start", self.file)
+            return
+
+        offset = index.get_offset(self.first_arc_epoch)
+        if offset is None:
+            # all epochs are before the arc
+            cFile.seek(0, 2)
+        else:
+            cFile.seek(offset)
+        self.log.debug("Seeking the initial arc epoch of file %s (%d indexed epochs): byte offset %s", self.file,
+                       len(index), offset)
+
     def _read_obs(self, cFile):
         """
         Read observation data
@@ -265,7 +293,7 @@ class RinexObsReader:
 
                 if epochFlag != 0:
                     ignoring = True
-                    self.log.debug(f"Discarding all data for {this_epoch.to_time_stamp()} due to bad epoch flag")
+                    self.log.debug("Discarding all data for epoch %s due to bad epoch flag %d", line[2:29], epochFlag)
                     continue
 
                 this_epoch = Epoch(time_dict, time_system=self.header.time_system)
@@ -277,8 +305,8 @@ class RinexObsReader:
                         continue
                 if self.last_arc_epoch:
                     if this_epoch > self.last_arc_epoch:
-                        ignoring = True
-                        continue
+                        # the epochs of a RINEX file are in time order
+                        break
 
             else:
                 if ignoring:
@@ -314,9 +342,9 @@ class RinexObsReader:
                             try:
                                 signal_strength = int(signal_strength)
                                 if signal_strength < self.snr_control_check:
-                                    self.log.debug(f"Discarding observable {this_type} at {this_epoch.to_time_stamp()} "
-                                                   f"for {this_sat} due to low signal strength: {signal_strength} < "
-                                                   f"{self.snr_control_check}")
+                                    self.log.debug("Discarding observable %s at %r for %s due to low signal "
+                                                   "strength: %d < %d", this_type, this_epoch, this_sat,
+                                                   signal_strength, self.snr_control_check)
                                     continue
                             except ValueError:
                                 pass
@@ -326,5 +354,5 @@ class RinexObsReader:
                             # print("Setting observable", this_epoch.to_time_stamp(), this_sat, this_type, observable)
 
                         except (ValueError, IndexError) as e:
-                            self.log.debug("problem parsing line {} for index {}: {}".format(line, this_index, e))
+                            self.log.debug("problem parsing line %s for index %d: %s", line, this_index, e)
 
@@ -17,6 +17,7 @@ class RinexUtils:
     RINEX_OBS_END_OF_DATA_HEADER = 60
     RINEX_OBS_TYPES_TO_READ = {"C",  # pseudo range
                                "L",  # carrier phase
+                               "D",  # doppler
                                "S"}  # signal to noise ratio
 
 
@@ -1,15 +1,146 @@
 import glob
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 
 from ...data_types.basics.Epoch import Epoch
+from ...data_types.containers.NavigationData import NavigationDataMap
+from ...data_types.containers.ObservationData import ObservationData, ObservationHeader
+from ...io_manager.import_rinex.RinexNavReaderGAL import RinexNavReaderGAL
 from ...io_manager.import_rinex.RinexNavReaderGPS import RinexNavReaderGPS
 from ...io_manager.import_rinex.RinexObsReader import RinexObsReader
 
-from ... import get_logger
+from ... import get_logger, get_profiler
+
+"""
+Reading of the RINEX input files. Each file is parsed into its own partial container (navigation data map, or
+observation data and header), in this process or in a pool of worker processes (when requested, see `read_data`),
+and the partial containers are then merged in the order of the file names (k-way merge of the sorted epochs, see
+`NavigationDataMap.merge` and `ObservationData.merge`), so that the result does not depend on the number of workers
+nor on the completion order.
+"""
+
+# minimum number of input files to start a pool of worker processes with the automatic number of workers (workers = 0).
+# Below it, the startup of the worker processes costs more than the parallel parsing saves
+AUTO_WORKERS_MIN_FILES = 8
+
+
+class _RecordingLog:
+    """
+    Logger of the worker processes: the records enabled in the io_manager logger are kept and returned with the partial
+    containers, to be logged by the main process (the log writer threads only run in the main process)
+    """
+
+    def __init__(self, level):
+        self.level = level
+        self.records = []
+
+    def isEnabledFor(self, level):
+        return level >= self.level
+
+    def log(self, level, msg, *args):
+        if level >= self.level:
+            self.records.append((level, msg, args))
+
+    def debug(self, msg, *args):
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg, *args):
+        self.log(logging.INFO, msg, *args)
+
+    def warning(self, msg, *args):
+        self.log(logging.WARNING, msg, *args)
+
+    warn = warning
+
+
+def _read_nav_file(file, read_gps, gal_message_type):
+    """
+    Reads a navigation file into a partial navigation data map
+
+    Return:
+        tuple [NavigationDataMap, str] : the navigation data read (also when the reading fails, with the messages read
+                                         until the failure) and the error message (None if the file was read)
+    """
+    nav_data = NavigationDataMap()
+    try:
+        if read_gps:
+            RinexNavReaderGPS(file, nav_data)
+        if gal_message_type is not None:
+            RinexNavReaderGAL(file, nav_data, gal_message_type)
+    except Exception as e:
+        return nav_data, f"{type(e).__name__}: {e}"
+    return nav_data, None
+
+
+def _read_obs_file(file, services, first_epoch, last_epoch, snr_control, log_level, epoch_index, index_dir):
+    """
+    Reads an observation file into partial observation data and header
+
+    Return:
+        tuple [ObservationData, ObservationHeader, list, str] : the observation data and header read (also when the
+                                         reading fails), the log records and the error message (None if the file was
+                                         read)
+    """
+    obs_data, obs_header, log = ObservationData(), ObservationHeader(), _RecordingLog(log_level)
+    try:
+        RinexObsReader(file, services, obs_data, obs_header, log, first_epoch, last_epoch, snr_control,
+                       epoch_index=epoch_index, index_dir=index_dir)
+    except Exception as e:
+        return obs_data, obs_header, log.records, f"{type(e).__name__}: {e}"
+    return obs_data, obs_header, log.records, None
+
+
+def _get_results(pool, function, files, *args):
+    """
+    Runs `function(file, *args)` for all files, in the pool of workers (submitted immediately) or in this process when
+    there is no pool (each file is read when its result is requested)
+
+    Return:
+        generator : the result of each file, in the order of the files
+    """
+    if pool is None:
+        return (function(file, *args) for file in files)
+
+    futures = [pool.submit(function, file, *args) for file in files]
+    return (future.result() for future in futures)
+
+
+def _get_workers(workers, n_files):
+    if not workers:
+        if n_files < AUTO_WORKERS_MIN_FILES:
+            return 1
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, n_files))
 
 
 def read_data(services, obs_data, obs_header, nav_data, path_to_obs, path_to_nav,
-              first_epoch, last_epoch, snr_control, trace_file_path):
+              first_epoch, last_epoch, snr_control, trace, workers=1, epoch_index=True, index_dir=""):
+    """
+    Reads the RINEX navigation and observation files of the input directories. The files are parsed in this process, or
+    in parallel (one file per worker process) when more than one worker is requested, and merged in the order of the
+    file names
+
+    Args:
+        services (src.data_types.gnss.ServiceManager.ServiceManager) : services to read
+        obs_data (src.data_types.containers.ObservationData.ObservationData) : observation data to fill
+        obs_header (src.data_types.containers.ObservationData.ObservationHeader) : observation header to fill
+        nav_data (src.data_types.containers.NavigationData.NavigationDataMap) : navigation data to fill
+        path_to_obs (str) : directory of the observation files
+        path_to_nav (str) : directory of the navigation files
+        first_epoch (str) : first epoch to read (YYYY-MM-DD hh:mm:ss), or False to read from the start
+        last_epoch (str) : last epoch to read (YYYY-MM-DD hh:mm:ss), or False to read until the end
+        snr_control (int) : signal strength threshold of the observables
+        trace (src.io_manager.trace.TraceWriter) : trace writer
+        workers (int) : number of worker processes (1 to read the files in this process, 0 for the number of CPUs when
+                        there are at least AUTO_WORKERS_MIN_FILES files, and in this process otherwise)
+        epoch_index (bool) : seek the first epoch in the observation files with their epoch index (see
+                             RinexObsIndex), built and cached the first time
+        index_dir (str) : directory of the cached epoch indexes ("" to cache them next to the observation files)
+    """
     log = get_logger("io_manager")
+    profiler = get_profiler()
     log.info("#########################################################")
     log.info("###### Starting module 'Read Input Data Files' ... ######")
 
@@ -28,39 +159,69 @@ def read_data(services, obs_data, obs_header, nav_data, path_to_obs, path_to_nav
     except:
         log.warning(f"Failed to parse final epoch from input string {last_epoch}")
     
-    # read navigation files
-    files = glob.glob(path_to_nav + "/*")
-    if len(files) == 0: raise AttributeError(f"No valid navigation file provided. Please check file paths")
-    for file in files:
-        log.info("Reading file {}...".format(file))
-        try:
-            RinexNavReaderGPS(file, nav_data)
-            # RinexNavReaderGAL(...)
-
-        except Exception as e:
-            log.warning(f"Failed to read file {file} as a navigation file")
-
-    # read observation files
-    files = glob.glob(path_to_obs + "/*")
-    if len(files) == 0: raise AttributeError(f"No valid observation file provided. Please check file paths")
-    for file in files:
-        log.info("Reading file {}...".format(file))
-        try:
-            RinexObsReader(file, services, obs_data, obs_header, log, _first_epoch, _last_epoch, snr_control)
-
-        except Exception as e:
-            log.warning(f"Failed to read file {file} as an observation file file")
-
-    # write to trace file
-    log.debug("Writing Navigation Data to trace file {}".format("NavigationData.txt"))
-    f = open(trace_file_path + "/NavigationData.txt", "w")
-    f.write(str(nav_data))
-    f.close()
-
-    log.debug("Writing Observation Data to trace file {}".format("RawObservationData.txt"))
-    f = open(trace_file_path + "/ObservationData.txt", "w")
-    f.write(str(obs_header) + "\n" + str(obs_data))
-    f.close()
+    # Galileo navigation messages: F/NAV (clocks for the E1, E5a pair) for E5a users, I/NAV otherwise
+    gal_message_type = None
+    if len(services.getServicesForGAL()) > 0:
+        gal_message_type = "F/NAV" if any(service[0] == "5" for service in services.getServicesForGAL()) else "I/NAV"
+        log.info(f"Using Galileo {gal_message_type} navigation messages")
+
+    nav_files = sorted(glob.glob(path_to_nav + "/*"))
+    if len(nav_files) == 0: raise AttributeError(f"No valid navigation file provided. Please check file paths")
+    obs_files = sorted(glob.glob(path_to_obs + "/*"))
+    if len(obs_files) == 0: raise AttributeError(f"No valid observation file provided. Please check file paths")
+
+    workers = _get_workers(workers, len(nav_files) + len(obs_files))
+    if workers > 1:
+        log.info(f"Reading {len(nav_files) + len(obs_files)} files with {workers} worker processes")
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    failed = []  # (file, error)
+    try:
+        # the navigation and observation files are submitted together, so that both are parsed concurrently
+        nav_results = _get_results(pool, _read_nav_file, nav_files, len(services.getServicesForGPS()) > 0,
+                                   gal_message_type)
+        obs_results = _get_results(pool, _read_obs_file, obs_files, services, _first_epoch, _last_epoch,
+                                   snr_control, log.getEffectiveLevel(), bool(epoch_index), index_dir)
+
+        # read navigation files
+        with profiler.stage("read_navigation"):
+            partials = []
+            for file, (partial, error) in zip(nav_files, nav_results):
+                log.info("Read file {}".format(file))
+                if error is not None:
+                    log.warning(f"Failed to read file {file} as a navigation file: {error}")
+                    failed.append((file, error))
+                partials.append(partial)
+            nav_data.merge(partials)
+        if nav_data.duplicates > 0:
+            log.info(f"Discarded {nav_data.duplicates} duplicate navigation messages (same satellite, IODE and toe)")
+
+        # read observation files
+        with profiler.stage("read_observation"):
+            partials, partial_headers = [], []
+            for file, (partial, partial_header, records, error) in zip(obs_files, obs_results):
+                log.info("Read file {}".format(file))
+                for level, msg, args in records:
+                    log.log(level, msg, *args)
+                if error is not None:
+                    log.warning(f"Failed to read file {file} as an observation file: {error}")
+                    failed.append((file, error))
+                partials.append(partial)
+                partial_headers.append(partial_header)
+            obs_data.merge(partials)
+            obs_header.merge(partial_headers)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if failed:
+        log.warning(f"{len(failed)} of {len(nav_files) + len(obs_files)} input files could not be read: "
+                    f"{', '.join(os.path.basename(file) for file, _ in failed)}")
+
+    # write to trace files
+    with profiler.stage("trace"):
+        trace.write("navigation_data", "NavigationData.txt", nav_data.iter_str())
+        trace.write("observation_data", "ObservationData.txt",
+                    chain(obs_header.iter_str(), ["\n"], obs_data.iter_str()))
 
     log.info(f"Available Satellites: {obs_data.get_satellite_list()}")
     log.info("####### End of module 'Read Input Data Files' ... #######\n")
@@ -0,0 +1,94 @@
+from math import floor
+
+import numpy as np
+
+from ...data_types.basics.Epoch import Epoch
+from ...data_types.containers.SP3Data import SP3Data
+from ...data_types.gnss.Satellite import SatelliteFactory
+from ...io_manager.import_rinex.RinexCompression import open_rinex
+from ...utils.errors import FileError
+
+"""
+Example of SP3-c/d File (header + data):
+
+#dP2019  1 14  0  0  0.00000000     289 ORBIT IGS14 BHN ESOC
+## 2036  86400.00000000   300.00000000 58497 0.0000000000000
++   96   G18G14G13G28G21G11G22G07G05G20G31G17G15G16G29G12G19
+...
+%c M  cc GPS ccc cccc cccc cccc cccc ccccc ccccc ccccc ccccc
+...
+*  2019  1 14  0  0  0.00000000
+PG18  16144.653204 -19703.646047  -7722.480645     15.512676
+PG14  15082.539737   1643.831248 -21506.731716    -93.194907
+
+Positions are given in km (ECEF frame) and clocks in microseconds. Bad or absent positions are 0.000000 and bad or
+absent clocks are 999999.999999
+"""
+
+SP3_BAD_CLOCK = 999999.0  # clocks above this value are flagged as bad or absent
+
+
+class Sp3Reader:
+    """
+    Class Sp3Reader
+    reads the precise orbits and clocks (position records) of a SP3-c or SP3-d file to a SP3Data container. The time
+    system must be GPS
+
+    Attributes
+        ----------
+        sp3_data : SP3Data
+    """
+
+    def __init__(self, file, sp3_data: SP3Data, satellite_systems=None):
+        """
+        Args:
+            file (str) : path of the SP3 file
+            sp3_data (SP3Data) : container of the precise orbits
+            satellite_systems (str or None) : satellite system codes to read (e.g. "G" or "GE"), or None to read all
+        """
+        if not isinstance(sp3_data, SP3Data):
+            raise AttributeError(f'argument ´sp3_data´ should be of type SP3Data')
+
+        self.file = file
+        self.sp3_data = sp3_data
+        self.satellite_systems = satellite_systems
+
+        with open_rinex(file) as cFile:
+            self._read_header(cFile)
+            self._read_data(cFile)
+
+    def _read_header(self, cFile):
+        line = cFile.readline()
+        if not line.startswith("#") or line[2] not in "PV":
+            raise FileError(f"The provided file {self.file} is not a valid SP3 file")
+
+        # header lines: '##', '+', '++', '%c', '%f', '%i' and comments '/*'
+        while True:
+            position = cFile.tell()
+            line = cFile.readline()
+            if not line or line[0] == "*":
+                cFile.seek(position)
+                break
+            if line.startswith("%c") and line[9:12].strip() not in ("GPS", "ccc"):
+                raise FileError(f"SP3 file {self.file} has time system {line[9:12]}. Only GPS time is supported")
+
+    def _read_data(self, cFile):
+        this_epoch = None
+        for line in cFile:
+            if line[0] == "*":
+                data = line[1:].split()
+                this_epoch = Epoch({"year": int(data[0]), "month": int(data[1]), "day": int(data[2]),
+                                    "hour": int(data[3]), "minute": int(data[4]), "second": floor(float(data[5]))})
+
+            elif line[0] == "P" and this_epoch is not None:
+                if self.satellite_systems is not None and line[1] not in self.satellite_systems:
+                    continue
+                x, y, z, clock = (float(value) for value in line[4:60].split()[0:4])
+                if x == 0 and y == 0 and z == 0:
+                    continue
+                clock = np.nan if abs(clock) >= SP3_BAD_CLOCK else clock * 1E-6
+
+                self.sp3_data.set_data(this_epoch, SatelliteFactory(line[1:4]), (x * 1E3, y * 1E3, z * 1E3), clock)
+
+            elif line.startswith("EOF"):
+                break
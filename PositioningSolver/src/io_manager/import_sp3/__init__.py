@@ -0,0 +1 @@
+from .Sp3Reader import Sp3Reader
@@ -1 +1 @@
-from .read_tm import read_timeseries
+from .read_tm import read_table, read_timeseries
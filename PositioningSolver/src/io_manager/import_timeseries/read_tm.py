@@ -1,46 +1,121 @@
+import os
+
+import numpy as np
+
 from ...data_types.basics.Epoch import Epoch
 
+"""
+Reader of time series tables, such as the output tables written by `src.io_manager.export.TableWriter`:
+    * text (.txt, .csv) : comma separated values, with a time stamp ('%Y-%m-%d %H:%M:%S') in the first column. The
+      columns are parsed in bulk with numpy (the time stamps directly as numpy datetime64)
+    * npz (.npz) : numpy archive with one array per column
+    * parquet (.parquet) : Apache Parquet file. Requires `pyarrow`
 
-def read_timeseries(filepath, time_col, *args, ignore_header=True, delimiter=","):
-    """
+The columns are returned as numpy arrays, and the time column as a numpy datetime64 array (or as Epoch instances, with
+`read_timeseries`).
+"""
 
-    :param filepath:
-    :param time_col:
-    :param args:
-    :param ignore_header:
-    :param delimiter:
-    :return:
-    """
-    line = " "
-    time = []
-    dim = len(args)
-    data = []
+TIME_COLUMN = "Time"
+
+
+def _read_text_header(filepath, delimiter):
+    with open(filepath, "r") as f:
+        return [header.strip() for header in f.readline().rstrip("\n").split(delimiter)]
+
+
+def _read_text(filepath, time_col, cols, ignore_header, delimiter):
+    skip_rows = 1 if ignore_header else 0
+    try:
+        time = np.loadtxt(filepath, delimiter=delimiter, skiprows=skip_rows, usecols=time_col, dtype="datetime64[us]",
+                          ndmin=1)
+        if not cols:
+            return time, []
+        try:
+            values = np.loadtxt(filepath, delimiter=delimiter, skiprows=skip_rows, usecols=cols, ndmin=2)
+            return time, [values[:, i] for i in range(len(cols))]
+        except ValueError:
+            # missing values or text columns (e.g. satellites): converted column by column
+            text = np.loadtxt(filepath, delimiter=delimiter, skiprows=skip_rows, usecols=cols, dtype=str, ndmin=2)
+            return time, [_convert_text_column(text[:, i]) for i in range(len(cols))]
+    except ValueError as e:
+        raise ValueError(f"Problem parsing time series file {filepath}: {e}")
 
-    # initialize data output list
-    for i in range(dim):
-        data.append([])
 
-    with open(filepath, 'r') as f:
+def _convert_text_column(text):
+    try:
+        return np.where(np.char.strip(text) == "", "nan", text).astype(float)
+    except ValueError:
+        return text
 
-        # ignore fist line (with header)
-        if ignore_header:
-            f.readline()
 
-        while line:
-            line = f.readline()
-            if len(line.strip()) == 0:
-                continue
+def _read_binary_columns(filepath):
+    if filepath.endswith(".npz"):
+        with np.load(filepath, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
 
-            tokens = line.split(delimiter)
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError(f"Reading the parquet file {filepath} requires the 'pyarrow' package")
+    table = pyarrow.parquet.read_table(filepath)
+    return {name: table.column(name).to_numpy() for name in table.column_names}
 
-            try:
-                time.append(Epoch(tokens[time_col]))
 
-                for list_index, file_col in zip(range(dim), args):
-                    parsed = float(tokens[file_col])
-                    (data[list_index]).append(parsed)
+def read_table(filepath, *columns, delimiter=","):
+    """
+    Reads a time series table (see the module documentation), with a header line (text files)
+
+    Args:
+        filepath (str) : path of the file (.txt, .csv, .npz or .parquet)
+        columns (str) : names of the columns to read (all columns if none is provided)
+        delimiter (str) : delimiter of the text files
+    Return:
+        tuple [numpy.ndarray, dict] : time (numpy.datetime64[us]) and column name -> values (numpy.ndarray)
+    Raises:
+        ValueError : a column is not in the file, or the file can not be parsed
+    """
+    if os.path.splitext(filepath)[1] in (".npz", ".parquet"):
+        data = _read_binary_columns(filepath)
+        if TIME_COLUMN not in data:
+            raise ValueError(f"File {filepath} has no {TIME_COLUMN} column")
+        names = columns if columns else [name for name in data if name != TIME_COLUMN]
+        missing = [name for name in names if name not in data]
+        if missing:
+            raise ValueError(f"Columns {missing} not in file {filepath}. Available columns are {list(data.keys())}")
+        return data[TIME_COLUMN].astype("datetime64[us]"), {name: data[name] for name in names}
+
+    headers = _read_text_header(filepath, delimiter)
+    names = columns if columns else headers[1:]
+    missing = [name for name in names if name not in headers]
+    if missing:
+        raise ValueError(f"Columns {missing} not in file {filepath}. Available columns are {headers}")
+    time, values = _read_text(filepath, 0, [headers.index(name) for name in names], True, delimiter)
+    return time, dict(zip(names, values))
+
 
-            except:
-                raise ValueError(f"problem parsing line {line[0:-1]}")
+def read_timeseries(filepath, time_col, *args, ignore_header=True, delimiter=","):
+    """
+    Reads columns of a time series table (see the module documentation), selected by index
+
+    Args:
+        filepath (str) : path of the file (.txt, .csv, .npz or .parquet)
+        time_col (int) : index of the time column
+        args (int) : indexes of the columns to read
+        ignore_header (bool) : the first line of the text files is a header line
+        delimiter (str) : delimiter of the text files
+    Return:
+        tuple [list, list] : time (list of Epoch instances) and the values of the columns (list of numpy.ndarray)
+    Raises:
+        ValueError : a column is not in the file, or the file can not be parsed
+    """
+    if os.path.splitext(filepath)[1] in (".npz", ".parquet"):
+        data = _read_binary_columns(filepath)
+        names = list(data.keys())
+        if max((time_col,) + args) >= len(names):
+            raise ValueError(f"File {filepath} has only {len(names)} columns")
+        time = data[names[time_col]].astype("datetime64[us]")
+        values = [data[names[col]] for col in args]
+    else:
+        time, values = _read_text(filepath, time_col, list(args), ignore_header, delimiter)
 
-    return time, data
+    return Epoch.from_datetime64_array(time), values
@@ -0,0 +1,5 @@
+from .frames import FrameDecoder, decode_message, encode_frame, encode_nav_header, encode_navigation, \
+    encode_observations, END_OF_STREAM, EPHEMERIS_GAL, EPHEMERIS_GPS, NAV_HEADER, OBSERVATIONS
+from .receiver import PROTOCOLS, StreamReceiver
+from .replay import ReplayServer
+from .publisher import FixPublisher
@@ -0,0 +1,292 @@
+import struct
+import zlib
+
+import numpy as np
+
+from ...data_types.basics.DataType import DataTypeFactory
+from ...data_types.basics.Epoch import Epoch
+from ...data_types.containers.NavigationData import NavigationHeader, NavigationPointGAL, NavigationPointGPS
+from ...data_types.containers.ObservationData import EpochData
+from ...data_types.gnss.Observation import Observation
+from ...data_types.gnss.Satellite import SatelliteFactory
+from ...utils.errors import FileError
+
+"""
+Framed binary protocol of the real-time observation stream (RTCM-like framing, with a compact message set that maps
+directly onto the containers of the solver).
+
+Frame (big-endian):
+    | preamble 0xD3 (1) | message type (1) | payload length (2) | header check (1) | payload | CRC32 (4) |
+
+The header check (complement of the sum of the type and length bytes) lets the decoder reject a false preamble without
+waiting for a bogus length, and the CRC32 covers the whole frame after the preamble.
+
+Messages:
+    * OBSERVATIONS : week (uint16), seconds of week (float64), transmission time (float64, sender UNIX time, 0 if
+                     unknown), datatypes (uint8 length + comma separated ASCII names), number of satellites (uint8),
+                     then for each satellite the 3 char identifier and one float64 per datatype (NaN when not observed)
+    * EPHEMERIS_GPS / EPHEMERIS_GAL : 3 char satellite identifier, toc (uint16 week + float64 seconds) and the
+                     remaining navigation message fields as float64 (the toe as two float64, week and seconds)
+    * NAV_HEADER   : first epoch (uint16 week + float64 seconds), leap seconds (int16, -1 if unknown), number of
+                     ionosphere corrections (uint8), then for each the 4 char key, the number of coefficients (uint8)
+                     and the coefficients (float64)
+    * END_OF_STREAM : empty payload
+"""
+
+PREAMBLE = 0xD3
+
+# message types
+OBSERVATIONS = 1
+EPHEMERIS_GPS = 2
+EPHEMERIS_GAL = 3
+NAV_HEADER = 4
+END_OF_STREAM = 255
+
+_FRAME_HEADER = struct.Struct(">BBHB")
+_CRC = struct.Struct(">I")
+_EPOCH = struct.Struct(">Hd")
+_MAX_PAYLOAD = 0xFFFF
+
+_MESSAGE_TYPES = (OBSERVATIONS, EPHEMERIS_GPS, EPHEMERIS_GAL, NAV_HEADER, END_OF_STREAM)
+
+_NAV_CLASSES = {EPHEMERIS_GPS: NavigationPointGPS, EPHEMERIS_GAL: NavigationPointGAL}
+
+# navigation message fields sent as float64 (satellite and toc are encoded separately)
+_NAV_FIELDS = {message_type: nav_class.__slots__[2:] for message_type, nav_class in _NAV_CLASSES.items()}
+
+
+def _header_check(message_type, length):
+    return ~(message_type + (length >> 8) + (length & 0xFF)) & 0xFF
+
+
+def encode_frame(message_type, payload=b""):
+    """
+    Builds a frame with the provided payload
+
+    Args:
+        message_type (int) : message type
+        payload (bytes) : message payload
+    Return:
+        bytes : the frame
+    """
+    if len(payload) > _MAX_PAYLOAD:
+        raise FileError(f"Stream message of type {message_type} is too long ({len(payload)} bytes)")
+    header = _FRAME_HEADER.pack(PREAMBLE, message_type, len(payload), _header_check(message_type, len(payload)))
+    body = header + payload
+    return body + _CRC.pack(zlib.crc32(body[1:]))
+
+
+def encode_observations(epoch, epoch_data, transmission_time=0.0):
+    """
+    Encodes the observations of an epoch in an OBSERVATIONS frame
+
+    Args:
+        epoch (src.data_types.basics.Epoch.Epoch) : epoch of the observations
+        epoch_data (src.data_types.containers.ObservationData.EpochData) : observations of all satellites
+        transmission_time (float) : UNIX time of transmission, used by the receiver to compute the latency
+    Return:
+        bytes : the frame
+    """
+    satellites = epoch_data.get_satellites()
+    datatypes = {str(obs.datatype): obs.datatype for sat in satellites for obs in epoch_data.get_observables(sat)}
+    datatypes = [datatypes[name] for name in sorted(datatypes)]
+    index = {str(datatype): i for i, datatype in enumerate(datatypes)}
+
+    values = np.full((len(satellites), len(datatypes)), np.nan)
+    for i, sat in enumerate(satellites):
+        for obs in epoch_data.get_observables(sat):
+            values[i, index[str(obs.datatype)]] = obs.value
+
+    names = ",".join(str(datatype) for datatype in datatypes).encode("ascii")
+    payload = [_EPOCH.pack(int(epoch.week), epoch.seconds), struct.pack(">dB", transmission_time, len(names)), names,
+               struct.pack(">B", len(satellites))]
+    for i, sat in enumerate(satellites):
+        payload.append(str(sat).encode("ascii"))
+        payload.append(values[i].astype(">f8").tobytes())
+    return encode_frame(OBSERVATIONS, b"".join(payload))
+
+
+def decode_observations(payload):
+    """
+    Decodes the payload of an OBSERVATIONS frame
+
+    Return:
+        tuple [Epoch, EpochData, float] : epoch, observations and transmission time
+    """
+    week, seconds = _EPOCH.unpack_from(payload, 0)
+    transmission_time, length = struct.unpack_from(">dB", payload, _EPOCH.size)
+    offset = _EPOCH.size + 9
+    datatypes = [DataTypeFactory(name) for name in payload[offset:offset + length].decode("ascii").split(",") if name]
+    offset += length
+    n_sats = payload[offset]
+    offset += 1
+
+    epoch_data = EpochData()
+    record = 3 + 8 * len(datatypes)
+    for _ in range(n_sats):
+        sat = SatelliteFactory(payload[offset:offset + 3].decode("ascii"))
+        values = np.frombuffer(payload, dtype=">f8", count=len(datatypes), offset=offset + 3).tolist()
+        epoch_data.set_observables(sat, [Observation(datatype, value) for datatype, value in zip(datatypes, values)
+                                         if value == value])  # value is not NaN
+        offset += record
+    return Epoch([week, seconds]), epoch_data, transmission_time
+
+
+def encode_navigation(nav_message):
+    """
+    Encodes a navigation message (NavigationPointGPS or NavigationPointGAL) in an EPHEMERIS frame
+
+    Return:
+        bytes : the frame
+    """
+    message_type = EPHEMERIS_GAL if isinstance(nav_message, NavigationPointGAL) else EPHEMERIS_GPS
+    values = []
+    for field in _NAV_FIELDS[message_type]:
+        value = getattr(nav_message, field)
+        values += [value.week, value.seconds] if field == "toe" else [value]
+    payload = str(nav_message.satellite).encode("ascii") + _EPOCH.pack(int(nav_message.toc.week),
+                                                                         nav_message.toc.seconds)
+    return encode_frame(message_type, payload + np.array(values, dtype=">f8").tobytes())
+
+
+def decode_navigation(message_type, payload):
+    """
+    Decodes the payload of an EPHEMERIS frame
+
+    Return:
+        NavigationPointGPS or NavigationPointGAL : the navigation message
+    """
+    nav_message = _NAV_CLASSES[message_type]()
+    nav_message.satellite = SatelliteFactory(payload[0:3].decode("ascii"))
+    nav_message.toc = Epoch(list(_EPOCH.unpack_from(payload, 3)))
+
+    values = np.frombuffer(payload, dtype=">f8", offset=3 + _EPOCH.size).tolist()
+    i = 0
+    for field in _NAV_FIELDS[message_type]:
+        if field == "toe":
+            nav_message.toe = Epoch([values[i], values[i + 1]])
+            i += 2
+        else:
+            setattr(nav_message, field, values[i])
+            i += 1
+    return nav_message
+
+
+def encode_nav_header(nav_header):
+    """
+    Encodes a navigation header (first epoch, leap seconds and ionosphere corrections) in a NAV_HEADER frame
+
+    Return:
+        bytes : the frame
+    """
+    leap_seconds = nav_header.leap_seconds if nav_header.leap_seconds is not None else -1
+    payload = [_EPOCH.pack(int(nav_header.first_epoch.week), nav_header.first_epoch.seconds),
+               struct.pack(">hB", leap_seconds, len(nav_header.iono_corrections))]
+    for key, coefficients in nav_header.iono_corrections.items():
+        payload.append(key.ljust(4)[:4].encode("ascii") + struct.pack(f">B{len(coefficients)}d", len(coefficients),
+                                                                        *coefficients))
+    return encode_frame(NAV_HEADER, b"".join(payload))
+
+
+def decode_nav_header(payload):
+    """
+    Decodes the payload of a NAV_HEADER frame
+
+    Return:
+        NavigationHeader : the navigation header
+    """
+    nav_header = NavigationHeader()
+    nav_header.first_epoch = Epoch(list(_EPOCH.unpack_from(payload, 0)))
+    leap_seconds, n_corrections = struct.unpack_from(">hB", payload, _EPOCH.size)
+    nav_header.leap_seconds = leap_seconds if leap_seconds >= 0 else None
+
+    offset = _EPOCH.size + 3
+    for _ in range(n_corrections):
+        key = payload[offset:offset + 4].decode("ascii").strip()
+        n = payload[offset + 4]
+        nav_header.iono_corrections[key] = list(struct.unpack_from(f">{n}d", payload, offset + 5))
+        offset += 5 + 8 * n
+    return nav_header
+
+
+def decode_message(message_type, payload):
+    """
+    Decodes the payload of a frame into the corresponding objects
+
+    Return:
+        tuple : (message_type, *decoded objects), that is,
+                    (OBSERVATIONS, epoch, epoch_data, transmission_time)
+                    (EPHEMERIS_GPS or EPHEMERIS_GAL, navigation message)
+                    (NAV_HEADER, navigation header)
+                    (END_OF_STREAM,)
+    Raises:
+        FileError : unknown message type
+    """
+    if message_type == OBSERVATIONS:
+        return (OBSERVATIONS, *decode_observations(payload))
+    if message_type in _NAV_CLASSES:
+        return message_type, decode_navigation(message_type, payload)
+    if message_type == NAV_HEADER:
+        return NAV_HEADER, decode_nav_header(payload)
+    if message_type == END_OF_STREAM:
+        return END_OF_STREAM,
+    raise FileError(f"Unknown stream message type {message_type}")
+
+
+class FrameDecoder:
+    """
+    Incremental frame decoder. The received bytes are fed as they arrive (any chunking, e.g. TCP segments) and the
+    complete frames are returned. Corrupted frames (CRC mismatch) are dropped and the decoder resynchronizes on the
+    next preamble
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.frames = 0
+        self.crc_errors = 0
+        self.discarded_bytes = 0
+
+    def feed(self, data):
+        """
+        Args:
+            data (bytes) : received bytes
+        Return:
+            list [tuple [int, bytes]] : (message type, payload) of the complete frames
+        """
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        start = 0
+        while True:
+            start_preamble = buffer.find(PREAMBLE, start)
+            if start_preamble < 0:
+                self.discarded_bytes += len(buffer) - start
+                start = len(buffer)
+                break
+            self.discarded_bytes += start_preamble - start
+            start = start_preamble
+
+            if len(buffer) - start < _FRAME_HEADER.size:
+                break
+            _, message_type, length, check = _FRAME_HEADER.unpack_from(buffer, start)
+            if check != _header_check(message_type, length) or message_type not in _MESSAGE_TYPES:
+                # false preamble
+                self.discarded_bytes += 1
+                start += 1
+                continue
+            end = start + _FRAME_HEADER.size + length
+            if len(buffer) < end + _CRC.size:
+                break
+
+            if zlib.crc32(memoryview(buffer)[start + 1:end]) != _CRC.unpack_from(buffer, end)[0]:
+                # not a frame (or a corrupted one): resynchronize on the next preamble
+                self.crc_errors += 1
+                self.discarded_bytes += 1
+                start += 1
+                continue
+
+            frames.append((message_type, bytes(buffer[start + _FRAME_HEADER.size:end])))
+            start = end + _CRC.size
+        del buffer[:start]
+        self.frames += len(frames)
+        return frames
@@ -0,0 +1,39 @@
+import json
+import socket
+
+"""
+Publication of the real-time fixes, as JSON lines (one fix per line), to a file and/or to a UDP address (e.g. a local
+application that displays or forwards the fixes).
+"""
+
+
+class FixPublisher:
+    """
+    Subscriber of the fixes of a StreamingPVT (see `StreamingPVT.subscribe`). Each fix is written and sent immediately,
+    so that it is available with the minimum delay
+    """
+
+    def __init__(self, file_path=None, udp_address=None):
+        """
+        Args:
+            file_path (str) : output file of the fixes (optional)
+            udp_address (tuple [str, int]) : (host, port) to send the fixes to (optional)
+        """
+        self._file = open(file_path, "w", buffering=1) if file_path else None
+        self._udp_address = tuple(udp_address) if udp_address else None
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) if udp_address else None
+        self.published = 0
+
+    def __call__(self, fix):
+        line = json.dumps(fix)
+        if self._file is not None:
+            self._file.write(line + "\n")
+        if self._socket is not None:
+            self._socket.sendto(line.encode(), self._udp_address)
+        self.published += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._socket is not None:
+            self._socket.close()
@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+from ...utils.errors import ConfigError
+from .frames import END_OF_STREAM, FrameDecoder, decode_message
+
+"""
+Asynchronous receiver of the real-time observation stream. The framed messages (see frames.py) arrive from a local
+socket or pipe:
+    * tcp  : the receiver connects to a server (e.g. a receiver or caster bridge, or the ReplayServer)
+    * udp  : the receiver binds to a local address and reads the datagrams sent to it
+    * pipe : the receiver reads a named pipe (FIFO)
+and each decoded message is passed to a handler, together with its arrival time (time.perf_counter()), as soon as the
+frame is complete.
+"""
+
+PROTOCOLS = ("tcp", "udp", "pipe")
+
+_READ_SIZE = 65536
+
+
+class StreamReceiver:
+    """
+    Reads the framed stream from a local socket or pipe, and calls `handler(message, arrival_time)` for each decoded
+    message (see frames.decode_message). The reception ends with the END_OF_STREAM message, when the connection is
+    closed, or when no data arrives during `timeout` seconds
+    """
+
+    def __init__(self, handler, protocol="tcp", host="127.0.0.1", port=5050, pipe_path=None, timeout=10.0):
+        """
+        Args:
+            handler (callable) : handler(message, arrival_time) of the decoded messages
+            protocol (str) : "tcp", "udp" or "pipe"
+            host (str) : host of the TCP server, or local address of the UDP socket
+            port (int) : port of the TCP server, or local port of the UDP socket
+            pipe_path (str) : path of the named pipe
+            timeout (float) : maximum time without data [s]
+        """
+        if protocol not in PROTOCOLS:
+            raise ConfigError(f"Unknown stream protocol {protocol}. Available protocols are {PROTOCOLS}")
+        if protocol == "pipe" and not pipe_path:
+            raise ConfigError("The path of the named pipe must be provided for the 'pipe' stream protocol")
+
+        self.handler = handler
+        self.protocol = protocol
+        self.host = host
+        self.port = port
+        self.pipe_path = pipe_path
+        self.timeout = timeout
+
+        self.decoder = FrameDecoder()
+        self.bytes_received = 0
+        self._finished = False
+
+    async def run(self, ready=None):
+        """
+        Receives the stream until its end
+
+        Args:
+            ready (asyncio.Event) : optional event, set when the receiver is listening (UDP) or connected
+        """
+        if self.protocol == "udp":
+            await self._run_udp(ready)
+            return
+
+        if self.protocol == "tcp":
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        else:
+            reader, writer = await self._open_pipe(), None
+        if ready is not None:
+            ready.set()
+
+        try:
+            while not self._finished:
+                data = await asyncio.wait_for(reader.read(_READ_SIZE), self.timeout)
+                if not data:
+                    break
+                self._on_data(data)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if writer is not None:
+                writer.close()
+
+    async def _open_pipe(self):
+        loop = asyncio.get_running_loop()
+        # opening a FIFO for reading blocks until a writer opens it
+        pipe = await loop.run_in_executor(None, open, self.pipe_path, "rb", 0)
+        reader = asyncio.StreamReader(limit=_READ_SIZE)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+        return reader
+
+    async def _run_udp(self, ready):
+        loop = asyncio.get_running_loop()
+        datagrams = asyncio.Queue()
+
+        class _Protocol(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                datagrams.put_nowait(data)
+
+        transport, _ = await loop.create_datagram_endpoint(_Protocol, local_addr=(self.host, self.port))
+        if ready is not None:
+            ready.set()
+        try:
+            while not self._finished:
+                self._on_data(await asyncio.wait_for(datagrams.get(), self.timeout))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            transport.close()
+
+    def _on_data(self, data):
+        arrival_time = time.perf_counter()
+        self.bytes_received += len(data)
+        for message_type, payload in self.decoder.feed(data):
+            message = decode_message(message_type, payload)
+            if message_type == END_OF_STREAM:
+                self._finished = True
+                break
+            self.handler(message, arrival_time)
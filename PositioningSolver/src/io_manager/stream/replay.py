@@ -0,0 +1,142 @@
+import asyncio
+import heapq
+import os
+import time
+
+from .frames import END_OF_STREAM, encode_frame, encode_nav_header, encode_navigation, encode_observations
+
+"""
+Replay of RINEX data as a real-time stream, to test the streaming input without a receiver. The observations of each
+epoch are sent at their epoch, in real time or accelerated by a speed factor, and the navigation messages are sent
+before the first observation epoch that may use them (at their time of clock, or at the start of the stream for the
+messages older than the first observation epoch). Messages after the last observation epoch are not sent.
+"""
+
+# maximum amount of data buffered in the transport before waiting for the receiver [bytes]
+_MAX_BUFFER = 1 << 20
+
+
+class ReplayServer:
+    """
+    Streams observation and navigation data (read from RINEX files) as framed messages, over TCP (server), UDP
+    (datagrams sent to the receiver address) or a named pipe
+    """
+
+    def __init__(self, obs_data, nav_data, speed=1.0):
+        """
+        Args:
+            obs_data (src.data_types.containers.ObservationData.ObservationData) : observations to stream
+            nav_data (src.data_types.containers.NavigationData.NavigationDataMap) : navigation data to stream
+            speed (float) : replay speed factor (1 for real time, 0 to send as fast as possible)
+        """
+        self.obs_data = obs_data
+        self.nav_data = nav_data
+        self.speed = speed
+        self.frames_sent = 0
+
+    def iter_frames(self):
+        """
+        Generator of the frames to send, in order
+
+        Return:
+            generator [tuple [float, bytes]] : time offset from the start of the stream [s] and frame
+        """
+        epochs = self.obs_data.get_epochs()
+        if len(epochs) == 0:
+            return
+        first_epoch = epochs[0]
+        last_offset = epochs[-1] - first_epoch
+
+        navigation = []
+        for nav_header in self.nav_data.get_headers():
+            navigation.append((0.0, 0, encode_nav_header(nav_header)))
+        for sat, messages in self.nav_data.get_data().items():
+            for toc, nav_message in messages.items():
+                if toc - first_epoch <= last_offset:
+                    navigation.append((max(0.0, toc - first_epoch), 1, encode_navigation(nav_message)))
+        navigation.sort(key=lambda item: item[0:2])
+
+        # the observation frames are built when sent, with the current transmission time
+        observations = ((epoch - first_epoch, 2, epoch) for epoch in epochs)
+
+        for offset, kind, item in heapq.merge(navigation, observations, key=lambda item: item[0:2]):
+            if kind == 2:
+                item = encode_observations(item, self.obs_data.get_epoch_data(item), time.time())
+            yield offset, item
+        yield last_offset, encode_frame(END_OF_STREAM)
+
+    async def _send(self, write, transport=None):
+        start = time.perf_counter()
+        for offset, frame in self.iter_frames():
+            if self.speed > 0:
+                delay = start + offset / self.speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            write(frame)
+            self.frames_sent += 1
+
+            # simple flow control, for accelerated replays. Yielding after each frame also lets a receiver running in
+            # the same event loop read the frames as they are sent (UDP datagrams are dropped when its socket is full)
+            while transport is not None and transport.get_write_buffer_size() > _MAX_BUFFER:
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0)
+
+    async def serve_tcp(self, host="127.0.0.1", port=5050, ready=None):
+        """
+        Serves the stream to the first client that connects, and stops when the stream ends
+
+        Args:
+            host (str) : server address
+            port (int) : server port
+            ready (asyncio.Event) : optional event, set when the server is listening
+        """
+        done = asyncio.Event()
+
+        async def _on_client(reader, writer):
+            try:
+                await self._send(writer.write, writer.transport)
+                await writer.drain()
+            finally:
+                writer.close()
+                done.set()
+
+        server = await asyncio.start_server(_on_client, host, port)
+        if ready is not None:
+            ready.set()
+        async with server:
+            await done.wait()
+
+    async def send_udp(self, host="127.0.0.1", port=5050):
+        """
+        Sends the stream as UDP datagrams (one frame per datagram) to the receiver address
+
+        Args:
+            host (str) : receiver address
+            port (int) : receiver port
+        """
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+        try:
+            await self._send(transport.sendto)
+        finally:
+            transport.close()
+
+    async def write_pipe(self, pipe_path):
+        """
+        Writes the stream to a named pipe (created if it does not exist)
+
+        Args:
+            pipe_path (str) : path of the named pipe
+        """
+        if not os.path.exists(pipe_path):
+            os.mkfifo(pipe_path)
+        loop = asyncio.get_running_loop()
+        # opening a FIFO for writing blocks until a reader opens it
+        pipe = await loop.run_in_executor(None, open, pipe_path, "wb", 0)
+        transport, _ = await loop.connect_write_pipe(asyncio.Protocol, pipe)
+        try:
+            await self._send(transport.write, transport)
+            while transport.get_write_buffer_size() > 0:
+                await asyncio.sleep(0.001)
+        finally:
+            transport.close()
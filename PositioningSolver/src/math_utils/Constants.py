@@ -31,3 +31,8 @@ class Constant:
     EARTH_FLATNESS = 1 / 298.257223563
     EARTH_ECCENTRICITY_SQ = 2 * EARTH_FLATNESS - EARTH_FLATNESS * EARTH_FLATNESS
     EARTH_SEMI_MAJOR_AXIS = 6378137.0  # [m]
+
+    # Galileo Orbital Mechanics constants
+    # ref - Galileo OS SIS ICD, Table 59
+    MU_GAL = 3.986004418E14  # [m^3/sec^2]
+    EARTH_ROTATION_GAL = 7.2921151467E-5  # [rad/sec]
@@ -0,0 +1,141 @@
+import math
+from functools import lru_cache
+from statistics import NormalDist
+
+_MAX_ITER = 200
+_EPS = 1e-14
+_TINY = 1e-300
+
+
+def regularized_gamma_p(a, x):
+    """
+    Regularized lower incomplete gamma function P(a, x) = gamma(a, x) / Gamma(a)
+
+    Computed with the series expansion for x < a + 1 and with the continued fraction expansion of Q(a, x) = 1 - P(a, x)
+    otherwise (modified Lentz's method). See Press et al. (2007) "Numerical Recipes", section 6.2
+
+    Args:
+        a (float) : shape parameter (a > 0)
+        x (float) : upper limit of integration (x >= 0)
+
+    Return:
+        float : P(a, x)
+    """
+    if a <= 0:
+        raise ValueError(f"Parameter 'a' of the incomplete gamma function must be positive, got {a}")
+    if x <= 0:
+        return 0.0
+
+    log_prefactor = a * math.log(x) - x - math.lgamma(a)
+
+    if x < a + 1:
+        # series expansion
+        term = total = 1.0 / a
+        ap = a
+        for _ in range(_MAX_ITER):
+            ap += 1
+            term *= x / ap
+            total += term
+            if abs(term) < abs(total) * _EPS:
+                break
+        return min(1.0, total * math.exp(log_prefactor))
+
+    # continued fraction for Q(a, x)
+    b = x + 1 - a
+    c = 1 / _TINY
+    d = 1 / b
+    h = d
+    for i in range(1, _MAX_ITER):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = _TINY if abs(d) < _TINY else d
+        c = b + an / c
+        c = _TINY if abs(c) < _TINY else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < _EPS:
+            break
+    return max(0.0, 1.0 - math.exp(log_prefactor) * h)
+
+
+def chi2_cdf(x, dof):
+    """
+    Cumulative distribution function of the chi-square distribution
+
+    Args:
+        x (float) : value to evaluate
+        dof (int) : degrees of freedom
+
+    Return:
+        float : probability P(X <= x), for X ~ chi2(dof)
+    """
+    return regularized_gamma_p(dof / 2, x / 2)
+
+
+def chi2_pdf(x, dof):
+    """
+    Probability density function of the chi-square distribution
+
+    Args:
+        x (float) : value to evaluate
+        dof (int) : degrees of freedom
+
+    Return:
+        float : probability density at x, for X ~ chi2(dof)
+    """
+    if x <= 0:
+        return 0.0
+    k = dof / 2
+    return math.exp((k - 1) * math.log(x) - x / 2 - k * math.log(2) - math.lgamma(k))
+
+
+@lru_cache(maxsize=256)
+def chi2_inverse(p, dof):
+    """
+    Inverse of the cumulative distribution function (quantile) of the chi-square distribution, that is, the value x
+    such that P(X <= x) = p, for X ~ chi2(dof)
+
+    The Wilson-Hilferty approximation is used as initial guess, which is then refined with Newton-Raphson iterations,
+    safeguarded with bisection. Results are cached, since the same (p, dof) pairs are repeatedly requested
+
+    Args:
+        p (float) : probability, 0 < p < 1
+        dof (int) : degrees of freedom
+
+    Return:
+        float : the p-quantile of the chi-square distribution with dof degrees of freedom
+    """
+    if not 0 < p < 1:
+        raise ValueError(f"Probability must be in the open interval (0, 1), got {p}")
+    if dof <= 0:
+        raise ValueError(f"Degrees of freedom must be positive, got {dof}")
+
+    # Wilson-Hilferty initial guess
+    z = NormalDist().inv_cdf(p)
+    h = 2 / (9 * dof)
+    x = max(dof * (1 - h + z * math.sqrt(h)) ** 3, _EPS)
+
+    # bracket [low, high] of the solution
+    low, high = 0.0, max(2 * x, 1.0)
+    while chi2_cdf(high, dof) < p:
+        low, high = high, 2 * high
+
+    for _ in range(_MAX_ITER):
+        f = chi2_cdf(x, dof) - p
+        if f < 0:
+            low = x
+        else:
+            high = x
+
+        pdf = chi2_pdf(x, dof)
+        x_new = x - f / pdf if pdf > 0 else low - 1
+        if not low < x_new < high:
+            x_new = (low + high) / 2  # Newton step out of the bracket -> bisection
+
+        if abs(x_new - x) <= _EPS * max(1.0, x):
+            return x_new
+        x = x_new
+
+    return x
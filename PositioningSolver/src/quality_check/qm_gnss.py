@@ -1,116 +1,101 @@
-from .. import get_logger
+import numpy as np
+
+from .. import get_logger, get_profiler
 from ..data_types.containers.RMS import RMS
+from ..data_types.containers.TimeSeries import TimeSeries
+from ..data_types.orbits.frame import Cartesian2GeodeticArray
+from ..io_manager.export import TableWriter, TimeColumn
 from ..math_utils.Constants import Constant
-from ..plots.plot_manager import *
 
 
 class GNSSQualityManager:
 
     # main function of QualityManager
     @staticmethod
-    def process(output_path, trace_path, true_position, receiver_pos, receiver_bias, prefit_residuals,
-                postfit_residuals, DOPs, sat_info, estimated_iono, plot):
+    def process(output_path, trace, true_position, receiver_pos, receiver_bias, prefit_residuals,
+                postfit_residuals, DOPs, sat_info, estimated_iono, plot, receiver_velocity=None,
+                receiver_clock_drift=None, state_covariance=None, inter_system_bias=None, output_format="csv"):
         log = get_logger("quality_check")
         log.info("############################################################")
         log.info("######### Starting module 'PVT Quality Check' ... ##########")
 
+        profiler = get_profiler()
+
         # 1- computations
-        # compute DOPs
-        DOPs.compute_DOPs(receiver_pos)
+        with profiler.stage("statistics"):
+            # compute DOPs
+            DOPs.compute_DOPs(receiver_pos)
 
-        # compute RMS
-        RMS_ECEF = RMS()
-        RMS_ENU = RMS()
-        RMS_ECEF.compute_errors(receiver_pos, true_position, "static", "ECEF")
-        RMS_ENU.compute_errors(receiver_pos, true_position, "static", "ENU")
+            # compute position errors (ECEF and ENU frames) and error statistics
+            mode = "dynamic" if isinstance(true_position, TimeSeries) else "static"
+            RMS_ECEF, RMS_ENU = RMS.compute_errors(receiver_pos, true_position, mode)
+            if mode == "dynamic":
+                log.info(f"Position errors computed with respect to the reference trajectory at "
+                         f"{len(RMS_ENU.epochs)} of {len(receiver_pos.epochs)} solution epochs")
 
         # 2- save to files
-        GNSSQualityManager._write_trace_data(trace_path, sat_info, prefit_residuals, postfit_residuals, estimated_iono)
-        GNSSQualityManager._write_outputs(output_path, receiver_pos, receiver_bias, DOPs, RMS_ECEF, RMS_ENU)
+        with profiler.stage("trace"):
+            GNSSQualityManager._write_trace_data(trace, sat_info, prefit_residuals, postfit_residuals,
+                                                 estimated_iono)
+
+        # output tables (the time stamps of the solution epochs are formatted once, for all tables)
+        with profiler.stage("outputs"):
+            writer = TableWriter(output_path, output_format)
+            time = TimeColumn(receiver_pos.get_all_epochs())
+            GNSSQualityManager._write_outputs(writer, time, receiver_pos, receiver_bias, DOPs, RMS_ECEF, RMS_ENU)
+            GNSSQualityManager._write_residual_outputs(writer, time, prefit_residuals, postfit_residuals, sat_info)
+            if receiver_velocity is not None and not receiver_velocity.is_empty():
+                GNSSQualityManager._write_velocity_outputs(writer, time, receiver_velocity, receiver_clock_drift)
+            if state_covariance is not None and not state_covariance.is_empty():
+                GNSSQualityManager._write_covariance_outputs(writer, time, state_covariance)
+            if inter_system_bias is not None and not inter_system_bias.is_empty():
+                GNSSQualityManager._write_inter_system_bias_outputs(writer, time, inter_system_bias)
 
         log.info("########## End of module 'PVT Quality Check' ... ###########\n")
 
         # 3- plots
         if plot:
-            plot_1D_TimeSeries(receiver_bias, x_label="Time", y_label="clock [s]", title="Receiver Clock Bias")
-
-            plot_3D_trajectory(list(receiver_pos.values()), true_position=true_position.copy(form="cartesian"),
-                               x_label="X ECEF [m]", y_label="Y ECEF [m]", z_label="Z ECEF [m]",
-                               title="Estimated VS True position")
-
-            GNSSQualityManager.plot_errors(RMS_ECEF, "RMS Estimation Error - ECEF", "X", "Y", "Z", norm=True)
-            GNSSQualityManager.plot_errors(RMS_ENU, "RMS Estimation Error - ENU", "East", "North", "Up", norm=True)
-            GNSSQualityManager.plot_dops(DOPs)
-
-            plot_skyplot(sat_info)
-
-            plot_satellite_availability(sat_info, x_label="Time", y_label="Number of Sats",
-                                        title="Satellite Availability")
-
-            _, x, y, _ = RMS_ENU.export2time_data()
-            plot_2D_trajectory(x, y, x_label="East [m]", y_label="North [m]", title="Horizontal Position Error")
-
-            if not estimated_iono.is_empty():
-                GNSSQualityManager.plot_iono(estimated_iono)
-
-            show_all()
+            GNSSQualityManager.plot_results(true_position, receiver_pos, receiver_bias, DOPs, RMS_ECEF, RMS_ENU,
+                                            sat_info, estimated_iono)
 
     @staticmethod
-    def _write_trace_data(trace_path, sat_info, prefit_residuals, postfit_residuals, estimated_iono):
-        f = open(trace_path + "/Satellite_Info.txt", "w")
-        f.write(str(sat_info))
-        f.close()
-
-        f = open(trace_path + "/Prefit_Residuals.txt", "w")
-        f.write(str(prefit_residuals))
-        f.close()
-
-        f = open(trace_path + "/Postfit_Residuals.txt", "w")
-        f.write(str(postfit_residuals))
-        f.close()
+    def _write_trace_data(trace, sat_info, prefit_residuals, postfit_residuals, estimated_iono):
+        trace.write("satellite_info", "Satellite_Info.txt", sat_info.iter_str())
+        trace.write("residuals", "Prefit_Residuals.txt", prefit_residuals.iter_str())
+        trace.write("residuals", "Postfit_Residuals.txt", postfit_residuals.iter_str())
 
         if not estimated_iono.is_empty():
-            f = open(trace_path + "/EstimatedIono.txt", "w")
-            f.write(str(estimated_iono))
-            f.close()
+            trace.write("estimated_iono", "EstimatedIono.txt", estimated_iono.iter_str())
 
     @staticmethod
-    def _write_outputs(output_path, receiver_pos, receiver_bias, DOPs, RMS_ECEF, RMS_ENU):
-        f_PT = open(output_path + "/PositionTime.txt", "w")
-        f_DOP = open(output_path + "/DOPs.txt", "w")
-        f_DOP_ECEF = open(output_path + "/DOPs_ECEF.txt", "w")
-        f_DOP_ENU = open(output_path + "/DOPs_ENU.txt", "w")
-        f_RMS_ECEF = open(output_path + "/RMS_ECEF.txt", "w")
-        f_RMS_ENU = open(output_path + "/RMS_ENU.txt", "w")
-        f_RMS_stats = open(output_path + "/Stats.txt", "w")
-
-        # write headers
-        f_PT.write(f"Time,X[m],Y[m],Z[m],lat[deg],long[deg],height[m],clock_dt[s]\n")
-        f_DOP.write(f"Time,geometry_DOP,position_DOP,time_DOP,horizontal_DOP\n")
-        f_DOP_ECEF.write(f"Time,x_DOP,y_DOP,z_DOP\n")
-        f_DOP_ENU.write(f"Time,east_DOP,north_DOP,up_DOP\n")
-        f_RMS_ECEF.write(f"Time,x_RMS[m],y_RMS[m],z_RMS[m]\n")
-        f_RMS_ENU.write(f"Time,east_RMS[m],north_RMS[m],up_RMS[m]\n")
-
-        for epoch, position in receiver_pos.items():
-            # get data for epoch
-            bias = receiver_bias.get_data_for_epoch(epoch)
-            dop = DOPs.get_data_for_epoch(epoch)
-            rms_ecef = RMS_ECEF.get_data_for_epoch(epoch)
-            rms_enu = RMS_ENU.get_data_for_epoch(epoch)
-
-            position_geodetic = position.copy()
-            position_geodetic.form = "geodetic"
-
-            # save to files
-            f_PT.write(f"{epoch.to_time_stamp()},{position[0]},{position[1]},{position[2]},"
-                       f"{position_geodetic[0] * Constant.RAD2DEG},{position_geodetic[1] * Constant.RAD2DEG},"
-                       f"{position_geodetic[2]},{bias}\n")
-            f_DOP.write(f"{epoch.to_time_stamp()},{dop.geometry},{dop.position},{dop.time},{dop.horizontal}\n")
-            f_DOP_ECEF.write(f"{epoch.to_time_stamp()},{dop.x_ecef},{dop.y_ecef},{dop.z_ecef}\n")
-            f_DOP_ENU.write(f"{epoch.to_time_stamp()},{dop.east},{dop.north},{dop.up}\n")
-            f_RMS_ECEF.write(f"{epoch.to_time_stamp()},{rms_ecef.x},{rms_ecef.y},{rms_ecef.z}\n")
-            f_RMS_ENU.write(f"{epoch.to_time_stamp()},{rms_enu.x},{rms_enu.y},{rms_enu.z}\n")
+    def _write_outputs(writer, time, receiver_pos, receiver_bias, DOPs, RMS_ECEF, RMS_ENU):
+        epochs = time.epochs
+
+        # position and clock (geodetic coordinates for all epochs at once)
+        positions = np.array([receiver_pos.get_data_for_epoch(epoch)[0:3] for epoch in epochs],
+                             dtype=float).reshape(-1, 3)
+        lat, long, height = Cartesian2GeodeticArray(positions[:, 0], positions[:, 1], positions[:, 2])
+        bias = np.array([receiver_bias.get_data_for_epoch(epoch) for epoch in epochs], dtype=float)
+
+        writer.write("PositionTime", time, {"X[m]": positions[:, 0], "Y[m]": positions[:, 1], "Z[m]": positions[:, 2],
+                                            "lat[deg]": lat * Constant.RAD2DEG, "long[deg]": long * Constant.RAD2DEG,
+                                            "height[m]": height, "clock_dt[s]": bias})
+
+        # DOPs
+        _, _, geometry, position, time_dop, horizontal, x, y, z, east, north, up = DOPs.export2time_data()
+        rows = DOPs.get_rows(epochs)
+        writer.write("DOPs", time, {"geometry_DOP": geometry[rows], "position_DOP": position[rows],
+                                    "time_DOP": time_dop[rows], "horizontal_DOP": horizontal[rows]})
+        writer.write("DOPs_ECEF", time, {"x_DOP": x[rows], "y_DOP": y[rows], "z_DOP": z[rows]})
+        writer.write("DOPs_ENU", time, {"east_DOP": east[rows], "north_DOP": north[rows], "up_DOP": up[rows]})
+
+        # position errors (the RMS time series have the epochs of the receiver position, or the epochs also in the
+        # reference trajectory)
+        t, x, y, z = RMS_ECEF.export2time_data()
+        rms_time = time if len(t) == len(epochs) else time.select(t)
+        writer.write("RMS_ECEF", rms_time, {"x_RMS[m]": x, "y_RMS[m]": y, "z_RMS[m]": z})
+        _, x, y, z = RMS_ENU.export2time_data()
+        writer.write("RMS_ENU", rms_time, {"east_RMS[m]": x, "north_RMS[m]": y, "up_RMS[m]": z})
 
         # Overall Estimation Stats
         stats = "Root Mean Square Error:\n" \
@@ -124,25 +109,131 @@ class GNSSQualityManager:
                 f"\t\tup = {RMS_ENU.stats['z']} [m]\n" \
                 "\n\n\tOverall\n" \
                 f"\t\tHorizontal Error = {RMS_ENU.stats['2D']} [m]\n" \
-                f"\t\t3D Position Error = {RMS_ENU.stats['3D']} [m]\n"
-
+                f"\t\t3D Position Error = {RMS_ENU.stats['3D']} [m]\n" \
+                "\n\n\tPercentiles\n" \
+                f"\t\tCEP50 = {RMS_ENU.stats['CEP50']} [m]\n" \
+                f"\t\tR95 = {RMS_ENU.stats['R95']} [m]\n" \
+                f"\t\tMaximum Horizontal Error = {RMS_ENU.stats['max_2D']} [m]\n" \
+                f"\t\tMaximum 3D Position Error = {RMS_ENU.stats['max_3D']} [m]\n"
+
+        f_RMS_stats = open(writer.output_path + "/Stats.txt", "w")
         f_RMS_stats.write(stats)
+        f_RMS_stats.close()
         print(stats)
 
-        f_PT.close()
-        f_DOP.close()
-        f_DOP_ECEF.close()
-        f_DOP_ENU.close()
-        f_RMS_ECEF.close()
-        f_RMS_ENU.close()
-        f_RMS_stats.close()
+    @staticmethod
+    def _write_residual_outputs(writer, time, prefit_residuals, postfit_residuals, sat_info):
+        """
+        Writes the prefit and postfit residuals, with one row per epoch and satellite. The prefit residuals have the
+        estimated receiver clock (and inter-system biases) removed. For the dual frequency model, the prefit residuals
+        of the second frequency are written in an additional column
+        """
+        rows, satellites, prefit, prefit_2, postfit = [], [], [], [], []
+        dual_frequency = False
+
+        for row, epoch in enumerate(time.epochs):
+            geometry = sat_info.get_data_for_epoch(epoch) if sat_info.has_epoch(epoch) else None
+            pre = prefit_residuals.get_data_for_epoch(epoch) if prefit_residuals.has_epoch(epoch) else None
+            post = postfit_residuals.get_data_for_epoch(epoch) if postfit_residuals.has_epoch(epoch) else None
+            if geometry is None or pre is None or post is None:
+                continue
+
+            sats = geometry.get_satellites()
+            m = len(sats)
+            pre = np.asarray(pre, dtype=float)
+            if len(post) != m or len(pre) not in (m, 2 * m):
+                continue  # residuals not associated with the satellites of the geometry
+
+            rows.append(np.full(m, row))
+            satellites.extend(str(sat) for sat in sats)
+            prefit.append(pre[0:m])
+            prefit_2.append(pre[m:2 * m] if len(pre) == 2 * m else np.full(m, np.nan))
+            postfit.append(np.asarray(post, dtype=float))
+            dual_frequency |= len(pre) == 2 * m
+
+        if not rows:
+            return
+
+        columns = {"satellite": satellites, "prefit[m]": np.concatenate(prefit)}
+        if dual_frequency:
+            columns["prefit_2[m]"] = np.concatenate(prefit_2)
+        columns["postfit[m]"] = np.concatenate(postfit)
+        writer.write("Residuals", time.take(np.concatenate(rows)), columns)
+
+    @staticmethod
+    def _write_velocity_outputs(writer, time, receiver_velocity, receiver_clock_drift):
+        epochs = receiver_velocity.get_all_epochs()
+        velocity = np.array([receiver_velocity.get_data_for_epoch(epoch) for epoch in epochs],
+                            dtype=float).reshape(-1, 3)
+        drift = np.array([receiver_clock_drift.get_data_for_epoch(epoch) for epoch in epochs], dtype=float)
+
+        writer.write("Velocity", time.select(epochs), {"vx[m/s]": velocity[:, 0], "vy[m/s]": velocity[:, 1],
+                                                       "vz[m/s]": velocity[:, 2], "clock_drift[s/s]": drift})
+
+    @staticmethod
+    def _write_covariance_outputs(writer, time, state_covariance):
+        epochs = state_covariance.get_all_epochs()
+        sigma = np.sqrt(np.array([np.diag(state_covariance.get_data_for_epoch(epoch)) for epoch in epochs]))
+        sigma[:, 6:] /= Constant.SPEED_OF_LIGHT  # clock states (and inter-system biases) are estimated in meters
+
+        # the inter-system biases, if any, follow the clock states
+        headers = ["sigma_x[m]", "sigma_y[m]", "sigma_z[m]", "sigma_vx[m/s]", "sigma_vy[m/s]", "sigma_vz[m/s]",
+                   "sigma_clock_dt[s]", "sigma_clock_drift[s/s]"]
+        headers += ["sigma_isb[s]"] * (sigma.shape[1] - len(headers))
+
+        writer.write("Covariance", time.select(epochs), [(header, sigma[:, i]) for i, header in enumerate(headers)])
+
+    @staticmethod
+    def _write_inter_system_bias_outputs(writer, time, inter_system_bias):
+        epochs = inter_system_bias.get_all_epochs()
+        isb = [inter_system_bias.get_data_for_epoch(epoch) for epoch in epochs]
+        systems = sorted({system for _isb in isb for system in _isb})
+
+        writer.write("InterSystemBias", time.select(epochs),
+                     {f"{system}[s]": np.array([_isb.get(system, np.nan) for _isb in isb], dtype=float)
+                      for system in systems}, na_rep="")
 
     @staticmethod
     def plot_outputs():
         pass
 
+    @staticmethod
+    def plot_results(true_position, receiver_pos, receiver_bias, DOPs, RMS_ECEF, RMS_ENU, sat_info, estimated_iono):
+        # the plotting stack (matplotlib) is only imported when plots are requested
+        from ..plots.plot_manager import plot_1D_TimeSeries, plot_2D_trajectory, plot_3D_trajectory, \
+            plot_satellite_availability, plot_skyplot, show_all
+
+        plot_1D_TimeSeries(receiver_bias, x_label="Time", y_label="clock [s]", title="Receiver Clock Bias")
+
+        if isinstance(true_position, TimeSeries):
+            plot_3D_trajectory(list(receiver_pos.values()), x_label="X ECEF [m]", y_label="Y ECEF [m]",
+                               z_label="Z ECEF [m]", title="Estimated position")
+        else:
+            plot_3D_trajectory(list(receiver_pos.values()), true_position=true_position.copy(form="cartesian"),
+                               x_label="X ECEF [m]", y_label="Y ECEF [m]", z_label="Z ECEF [m]",
+                               title="Estimated VS True position")
+
+        GNSSQualityManager.plot_errors(RMS_ECEF, "RMS Estimation Error - ECEF", "X", "Y", "Z", norm=True)
+        GNSSQualityManager.plot_errors(RMS_ENU, "RMS Estimation Error - ENU", "East", "North", "Up", norm=True)
+        GNSSQualityManager.plot_dops(DOPs)
+
+        plot_skyplot(sat_info)
+
+        plot_satellite_availability(sat_info, x_label="Time", y_label="Number of Sats",
+                                    title="Satellite Availability")
+
+        _, x, y, _ = RMS_ENU.export2time_data()
+        plot_2D_trajectory(x, y, x_label="East [m]", y_label="North [m]", title="Horizontal Position Error")
+
+        if not estimated_iono.is_empty():
+            GNSSQualityManager.plot_iono(estimated_iono)
+
+        show_all()
+
     @staticmethod
     def plot_errors(rms, title, x_lab, y_lab, z_lab, norm=False):
+        from ..plots.plot_manager import plot_1D
+
         ax = None
 
         if norm:
@@ -159,6 +250,8 @@ class GNSSQualityManager:
 
     @staticmethod
     def plot_dops(rms):
+        from ..plots.plot_manager import plot_1D
+
         t, _, geometry, position, time, horizontal, x, y, z, east, north, up = rms.export2time_data()
 
         ax = plot_1D(t, geometry, label="geometry")
@@ -178,6 +271,8 @@ class GNSSQualityManager:
 
     @staticmethod
     def plot_iono(iono_tm):
+        from ..plots.plot_manager import plot_1D
+
         ax = None
         sat_data = {}
         epochs = iono_tm.get_all_epochs()
@@ -1,98 +1,123 @@
 import numpy as np
 
 from ..data_types.containers.TimeSeries import TimeSeries
-
-
-def compute_RMS_dynamic(vEpochs, series1: TimeSeries, series2: TimeSeries):
-    RMS = TimeSeries()
-
-    for epoch in vEpochs:
-        vector1 = series1.get_data_for_epoch(epoch)
-        vector2 = series2.get_data_for_epoch(epoch)
-
-        # make sure both vectors have the same size
-        if len(vector1) != len(vector2):
-            raise TypeError(f"Error in RMS computation: both time series should have the same size:"
-                            f" series 1 = {vector1}, series 2 = {vector2}")
-
-        # compute rms for each epoch
-        diff = vector1 - vector2
-        rms = np.linalg.norm(diff)
-        RMS.set_data(epoch, rms)
-
-    return RMS
-
-
-def compute_error_dynamic(vEpochs, series1: TimeSeries, series2: TimeSeries):
-    x = TimeSeries()
-    y = TimeSeries()
-    z = TimeSeries()
-
-    for epoch in vEpochs:
-        vector1 = series1.get_data_for_epoch(epoch)
-        vector2 = series2.get_data_for_epoch(epoch)
-
-        # make sure both vectors have the same size
-        if len(vector1) != len(vector2):
-            raise TypeError(f"Error in RMS computation: both time series should have the same size:"
-                            f" series 1 = {vector1}, series 2 = {vector2}")
-
-        # compute rms for each epoch
-        diff = vector1 - vector2
-        x.set_data(epoch, diff[0])
-        y.set_data(epoch, diff[1])
-        z.set_data(epoch, diff[2])
-
-    return x, y, z
-
-
-def compute_error_static(rms, receiver_pos: TimeSeries, true_pos, frame):
-    vEpochs = receiver_pos.get_all_epochs()
-
-    for epoch in vEpochs:
-        if frame == "ECEF":
-            receiver = receiver_pos.get_data_for_epoch(epoch).copy()
-            error = true_pos - receiver
-
-            rms.set_rms_data(epoch, error)
-
-        elif frame == "ENU":
-            receiver = receiver_pos.get_data_for_epoch(epoch).copy()
-            receiver.observer = true_pos
-            receiver.frame = "ENU"
-
-            rms.set_rms_data(epoch, receiver)
-
-
-def compute_RMS_stats_static(error_series: TimeSeries):
-
-    vEpochs = error_series.get_all_epochs()
-    rms_x = rms_y = rms_z = rms_2d = rms_3d = 0
-
-    for epoch in vEpochs:
-        error = error_series.get_data_for_epoch(epoch)
-
-        rms_x += error.x * error.x
-        rms_y += error.y * error.y
-        rms_z += error.z * error.z
-
-        rms_2d += error.x * error.x + error.y * error.y
-        rms_3d += error.x * error.x + error.y * error.y + error.z * error.z
-
-    # 1D RMS stats
-    rms_x = np.sqrt(1 / len(vEpochs) * rms_x)
-    rms_y = np.sqrt(1 / len(vEpochs) * rms_y)
-    rms_z = np.sqrt(1 / len(vEpochs) * rms_z)
-
-    # 2D RMS stats
-    rms_2d = np.sqrt(1 / len(vEpochs) * rms_2d)
-
-    # 3D RMS stats
-    rms_3d = np.sqrt(1 / len(vEpochs) * rms_3d)
-
-    return {"x": rms_x,
-            "y": rms_y,
-            "z": rms_z,
-            "2D": rms_2d,
-            "3D": rms_3d
+from ..data_types.orbits.frame import Cartesian2Geodetic, Cartesian2GeodeticArray, Geodetic2Cartesian, \
+    matrix_ECEF2ENU_array
+
+"""
+Position errors and error statistics of the quality check. The estimated positions are gathered in an array once, and
+the errors (ECEF and ENU frames) and the statistics are computed for all epochs at once:
+    * static mode : the errors with respect to a static true position (a single rotation to its ENU frame)
+    * dynamic mode : the errors with respect to a reference trajectory, at the epochs of the estimates that are also
+      epochs of the reference trajectory (ENU frame of the reference position of each epoch)
+"""
+
+
+def get_position_array(receiver_pos: TimeSeries, epochs):
+    """
+    Args:
+        receiver_pos (TimeSeries) : receiver position time series (ECEF frame, cartesian form)
+        epochs (list) : epochs of the time series
+    Return:
+        numpy.ndarray : positions of the provided epochs (nx3) [m]
+    """
+    return np.array([receiver_pos.get_data_for_epoch(epoch)[0:3] for epoch in epochs], dtype=float).reshape(-1, 3)
+
+
+def compute_error_static(positions, true_pos):
+    """
+    Errors of the estimated positions with respect to a static true position. The ENU errors are obtained with one
+    rotation, to the ENU frame of the true position (as `Position.frame = "ENU"` with the true position as observer)
+
+    Args:
+        positions (numpy.ndarray) : estimated positions (nx3), ECEF frame [m]
+        true_pos (src.data_types.orbits.statevector.Position) : true position (ECEF frame, cartesian form)
+    Return:
+        tuple [numpy.ndarray, numpy.ndarray] : errors in the ECEF frame (true - estimated) and in the ENU frame
+                                               (estimated - true) (nx3) [m]
+    """
+    true_pos = true_pos.copy(form="cartesian")
+    errors_ecef = np.array(true_pos[0:3], dtype=float) - positions
+
+    lat, long, h = Cartesian2Geodetic(true_pos[0], true_pos[1], true_pos[2])
+    R = matrix_ECEF2ENU_array(np.array([lat]), np.array([long]))[0]
+    origin = np.array(Geodetic2Cartesian(lat, long, h), dtype=float)
+    errors_enu = (positions - origin) @ R.T
+
+    return errors_ecef, errors_enu
+
+
+def compute_error_dynamic(positions, true_positions):
+    """
+    Errors of the estimated positions with respect to the positions of a reference trajectory at the same epochs. The
+    ENU errors are given in the ENU frame of the reference position of each epoch
+
+    Args:
+        positions (numpy.ndarray) : estimated positions (nx3), ECEF frame [m]
+        true_positions (numpy.ndarray) : reference positions (nx3), ECEF frame [m]
+    Return:
+        tuple [numpy.ndarray, numpy.ndarray] : errors in the ECEF frame (true - estimated) and in the ENU frame
+                                               (estimated - true) (nx3) [m]
+    """
+    errors_ecef = true_positions - positions
+
+    lat, long, _ = Cartesian2GeodeticArray(true_positions[:, 0], true_positions[:, 1], true_positions[:, 2])
+    R = matrix_ECEF2ENU_array(lat, long)
+    errors_enu = np.einsum("nij,nj->ni", R, -errors_ecef)
+
+    return errors_ecef, errors_enu
+
+
+def compute_position_errors(receiver_pos: TimeSeries, true_pos, mode):
+    """
+    Position errors of the estimated receiver positions, in the ECEF and ENU frames
+
+    Args:
+        receiver_pos (TimeSeries) : receiver position time series (ECEF frame, cartesian form)
+        true_pos (src.data_types.orbits.statevector.Position or TimeSeries) : static true position ("static" mode), or
+                                                                             reference trajectory ("dynamic" mode)
+        mode (str) : "static" or "dynamic"
+    Return:
+        tuple [list, numpy.ndarray, numpy.ndarray] : epochs of the errors, errors in the ECEF and ENU frames (nx3) [m]
+    """
+    if mode == "static":
+        epochs = receiver_pos.get_all_epochs()
+        return (epochs,) + compute_error_static(get_position_array(receiver_pos, epochs), true_pos)
+
+    if mode == "dynamic":
+        epochs = TimeSeries.get_common_epochs(receiver_pos, true_pos)
+        return (epochs,) + compute_error_dynamic(get_position_array(receiver_pos, epochs),
+                                                 get_position_array(true_pos, epochs))
+
+    raise AttributeError(f"Unknown quality check mode {mode}. Available modes are 'static' and 'dynamic'")
+
+
+def compute_RMS_stats(errors):
+    """
+    Error statistics of a set of position errors: root mean square errors of each component, horizontal (2D, first
+    two components) and 3D, the percentiles of the horizontal error (CEP50 and R95) and the maximum errors
+
+    Args:
+        errors (numpy.ndarray) : position errors (nx3) [m]
+    Return:
+        dict : the statistics, with keys {"x", "y", "z", "2D", "3D", "CEP50", "R95", "max_2D", "max_3D"} [m]
+    """
+    if len(errors) == 0:
+        return {key: np.nan for key in ("x", "y", "z", "2D", "3D", "CEP50", "R95", "max_2D", "max_3D")}
+
+    squared = errors * errors
+    mean_squared = squared.mean(axis=0)
+    horizontal = np.sqrt(squared[:, 0] + squared[:, 1])
+    norm = np.sqrt(squared.sum(axis=1))
+    cep50, r95 = np.percentile(horizontal, [50, 95])
+
+    return {"x": float(np.sqrt(mean_squared[0])),
+            "y": float(np.sqrt(mean_squared[1])),
+            "z": float(np.sqrt(mean_squared[2])),
+            "2D": float(np.sqrt(mean_squared[0] + mean_squared[1])),
+            "3D": float(np.sqrt(mean_squared.sum())),
+            "CEP50": float(cep50),
+            "R95": float(r95),
+            "max_2D": float(horizontal.max()),
+            "max_3D": float(norm.max())
             }
@@ -0,0 +1,3 @@
+from .observation_simulator import OBS_TYPES, ObservationSimulator, ReceiverTrajectory, SimulatedObservations
+from .orbit_sources import BroadcastOrbitSource, SP3OrbitSource
+from .rinex_writer import write_rinex_obs
@@ -0,0 +1,353 @@
+import numpy as np
+
+from ..algorithms.gnss.gnss_solver.observation_models.atmosphere_obs import ionosphereCorrectionArray, \
+    troposphericCorrectionArray
+from ..algorithms.gnss.gnss_solver.observation_models.ephemeride_propagator import rotate_to_reception_frame
+from ..data_types.basics.DataType import DataTypeFactory
+from ..data_types.containers.ObservationData import EpochData, Header, ObservationData, ObservationHeader
+from ..data_types.gnss.Observation import Observation
+from ..data_types.orbits.frame import Cartesian2GeodeticArray, matrix_ECEF2ENU_array
+from ..math_utils.Constants import Constant
+from ..utils.errors import ConfigError
+from .rinex_writer import write_rinex_obs
+
+f1 = DataTypeFactory("f1")
+
+# simulated observables (RINEX 3 codes): GPS L1 C/A and L2 P(Y) pseudorange, carrier phase, doppler and signal strength
+OBS_TYPES = ("C1C", "L1C", "D1C", "S1C", "C2W", "L2W", "D2W", "S2W")
+
+NOMINAL_TRANSIT = 0.075  # nominal signal transit time, to propagate the satellite states once per row [s]
+MULTIPATH_ELEVATION_SCALE = 15.0  # elevation scale of the multipath amplitude decay [deg]
+MULTIPATH_PERIODS = (300.0, 900.0)  # range of the multipath periods [s]
+MULTIPATH_PHASE_RATIO = 0.01  # carrier phase multipath relative to the pseudorange multipath
+MAX_CYCLE_SLIP = 10  # maximum size of the cycle slips [cycles]
+
+
+class ReceiverTrajectory:
+    """
+    Receiver trajectory of the simulation: a static position, or positions at a set of time instants (kinematic), with
+    linear interpolation between them (and constant positions outside)
+    """
+    __slots__ = ["times", "positions"]
+
+    def __init__(self, positions, times=None):
+        """
+        Args:
+            positions (numpy.ndarray) : static receiver position (3), or receiver positions (nx3), in the ECEF frame [m]
+            times (numpy.ndarray) : time instants of the positions (n), in seconds from the first simulated epoch,
+                                    in increasing order. Only for kinematic receivers
+        """
+        positions = np.asarray(positions, dtype=float)
+        if positions.ndim == 1:
+            positions, times = positions.reshape(1, 3), np.zeros(1)
+        else:
+            times = np.asarray(times, dtype=float)
+            if times.ndim != 1 or len(times) != len(positions) or np.any(np.diff(times) <= 0):
+                raise ConfigError(f"The receiver trajectory must have one time instant (in increasing order) for each "
+                                  f"position")
+        self.times = times
+        self.positions = positions
+
+    @staticmethod
+    def from_file(file_path):
+        """
+        Reads a receiver trajectory from a comma separated text file, with columns time [s] (from the first simulated
+        epoch), x, y and z (ECEF frame) [m]. Lines starting with '#' are ignored
+        """
+        data = np.loadtxt(file_path, delimiter=",", comments="#", ndmin=2)
+        return ReceiverTrajectory(data[:, 1:4], data[:, 0])
+
+    @property
+    def is_static(self):
+        return len(self.times) == 1
+
+    def get_states(self, t):
+        """
+        Args:
+            t (numpy.ndarray) : time instants (n), in seconds from the first simulated epoch
+
+        Return:
+            tuple [numpy.ndarray, numpy.ndarray] : receiver positions (nx3) [m] and velocities (nx3) [m/s]
+        """
+        if self.is_static:
+            return np.repeat(self.positions, len(t), axis=0), np.zeros((len(t), 3))
+
+        i = np.clip(np.searchsorted(self.times, t, side="right") - 1, 0, len(self.times) - 2)
+        step = self.times[i + 1] - self.times[i]
+        alpha = np.clip((t - self.times[i]) / step, 0, 1)
+        delta = self.positions[i + 1] - self.positions[i]
+
+        inside = (t >= self.times[0]) & (t <= self.times[-1])
+        return self.positions[i] + alpha[:, None] * delta, np.where(inside[:, None], delta / step[:, None], 0.0)
+
+
+class SimulatedObservations:
+    """
+    Simulated observation data, stored column-wise: one row per epoch and visible satellite, in time order, with the
+    values of each observable (OBS_TYPES) and the loss of lock indicators of the carrier phases
+    """
+    __slots__ = ["first_epoch", "epochs_offset", "satellites", "epoch_rows", "sat_rows", "observables", "lli",
+                 "receiver_position"]
+
+    def __init__(self, first_epoch, epochs_offset, satellites, epoch_rows, sat_rows, observables, lli,
+                 receiver_position):
+        self.first_epoch = first_epoch
+        self.epochs_offset = epochs_offset  # seconds from the first epoch (n_epochs)
+        self.satellites = satellites
+        self.epoch_rows = epoch_rows  # epoch (index) of each row
+        self.sat_rows = sat_rows  # satellite (index) of each row
+        self.observables = observables  # observation code -> values (n_rows)
+        self.lli = lli  # carrier phase observation code -> loss of lock indicators (n_rows)
+        self.receiver_position = receiver_position  # approximate (first) receiver position
+
+    def __len__(self):
+        return len(self.epoch_rows)
+
+    def get_epochs(self):
+        return [self.first_epoch + float(t) for t in self.epochs_offset]
+
+    def write_rinex(self, file_path):
+        """Writes the simulated data to a RINEX 3.03 observation file (see `rinex_writer.write_rinex_obs`)"""
+        return write_rinex_obs(file_path, self)
+
+    def to_observation_data(self, obs_data=None, obs_header=None, services=None):
+        """
+        Converts the simulated data to the containers of the RINEX observation reader
+
+        Args:
+            obs_data (ObservationData) : container to fill (a new one if None)
+            obs_header (ObservationHeader) : header container to fill (a new one if None)
+            services (list) : services to convert (e.g. ["1C", "2W"]), or None for all
+
+        Return:
+            tuple [ObservationData, ObservationHeader] : observation data and header
+        """
+        obs_data = ObservationData() if obs_data is None else obs_data
+        obs_header = ObservationHeader() if obs_header is None else obs_header
+        epochs = self.get_epochs()
+
+        header = Header()
+        header.rinex_version = 3.03
+        header.satellite_system = "G"
+        header.time_system = "GPS"
+        header.receiver_position = tuple(self.receiver_position)
+        header.first_epoch = epochs[0]
+        header.last_epoch = epochs[-1]
+        obs_header.set_header(header)
+
+        codes = [code for code in OBS_TYPES if services is None or code[1:] in services]
+        datatypes = [DataTypeFactory(code[0:2]) for code in codes]
+        values = np.column_stack([self.observables[code] for code in codes]).tolist()
+        bounds = np.searchsorted(self.epoch_rows, np.arange(len(epochs) + 1))
+
+        for i, epoch in enumerate(epochs):
+            epoch_data = EpochData()
+            for row in range(bounds[i], bounds[i + 1]):
+                satellite = self.satellites[self.sat_rows[row]]
+                for datatype, value in zip(datatypes, values[row]):
+                    epoch_data.set_observable(satellite, Observation(datatype, value))
+            obs_data.set_epoch_data(epoch, epoch_data)
+        return obs_data, obs_header
+
+
+class ObservationSimulator:
+    """
+    Simulator of GPS observation data (OBS_TYPES) for a static or kinematic receiver.
+
+    The observation model is the model of the PVT solver: geometric range (with the light time and Earth rotation
+    corrections), receiver clock (bias and drift, with optional random walks), satellite clock (including the
+    relativistic correction and group delay), Klobuchar ionosphere and Saastamoinen troposphere, plus:
+        * white noise in the pseudoranges, carrier phases and dopplers
+        * multipath: sinusoids with random period and phase for each satellite and frequency, whose amplitude decays
+            with the elevation (the carrier phase multipath is a fraction of the pseudorange multipath)
+        * cycle slips: random integer jumps of the carrier phases, at a given rate per satellite, flagged with the loss
+            of lock indicator
+
+    All epochs and satellites are computed in vectorized chunks of epochs. The satellite states are computed once per
+    row at a nominal transit time, and the light time iterations extrapolate them linearly (error below 0.1 mm).
+    """
+
+    def __init__(self, orbits, receiver, elevation_mask=5.0, code_sigma=0.5, phase_sigma=0.003, doppler_sigma=0.05,
+                 clock_bias=1E-4, clock_drift=1E-9, clock_bias_psd=0.0, clock_drift_psd=0.0, ionosphere=True,
+                 troposphere=True, iono_parameters=None, multipath_amplitude=0.0, cycle_slip_rate=0.0, seed=1,
+                 chunk_size=3600):
+        """
+        Args:
+            orbits (BroadcastOrbitSource or SP3OrbitSource) : source of the satellite orbits and clocks
+            receiver (ReceiverTrajectory or numpy.ndarray) : receiver trajectory, or static position (ECEF frame) [m]
+            elevation_mask (float) : minimum elevation of the observed satellites [deg]
+            code_sigma (float) : standard deviation of the pseudorange noise [m]
+            phase_sigma (float) : standard deviation of the carrier phase noise [m]
+            doppler_sigma (float) : standard deviation of the doppler (range rate) noise [m/s]
+            clock_bias (float) : initial receiver clock bias [s]
+            clock_drift (float) : initial receiver clock drift [s/s]
+            clock_bias_psd (float) : PSD of the receiver clock bias random walk [s^2/s]
+            clock_drift_psd (float) : PSD of the receiver clock drift random walk [s^2/s^3]
+            ionosphere (bool) : whether or not to simulate the ionosphere delays (Klobuchar model)
+            troposphere (bool) : whether or not to simulate the troposphere delays (Saastamoinen model)
+            iono_parameters (tuple) : Klobuchar (alfa, beta) parameters. If None, the parameters of the orbit source
+            multipath_amplitude (float) : amplitude of the pseudorange multipath at the horizon [m]
+            cycle_slip_rate (float) : rate of the cycle slips of each satellite and frequency [slips / hour]
+            seed (int) : seed of the random numbers
+            chunk_size (int) : number of epochs computed at once
+        """
+        self.orbits = orbits
+        self.receiver = receiver if isinstance(receiver, ReceiverTrajectory) else ReceiverTrajectory(receiver)
+        self.elevation_mask = elevation_mask * Constant.DEG2RAD
+        self.code_sigma = code_sigma
+        self.phase_sigma = phase_sigma
+        self.doppler_sigma = doppler_sigma
+        self.clock_bias = clock_bias
+        self.clock_drift = clock_drift
+        self.clock_bias_psd = clock_bias_psd
+        self.clock_drift_psd = clock_drift_psd
+        self.troposphere = troposphere
+        self.multipath_amplitude = multipath_amplitude
+        self.cycle_slip_rate = cycle_slip_rate
+        self.seed = seed
+        self.chunk_size = chunk_size
+
+        self.iono_parameters = None
+        if ionosphere:
+            self.iono_parameters = iono_parameters if iono_parameters is not None else orbits.iono_parameters
+            if self.iono_parameters is None:
+                raise ConfigError(f"The ionosphere simulation requires the Klobuchar parameters (navigation data)")
+
+    def simulate(self, first_epoch, length, rate):
+        """
+        Args:
+            first_epoch (src.data_types.basics.Epoch.Epoch) : first simulated epoch (GPS time)
+            length (float) : length of the simulated arc [s]
+            rate (float) : observation rate [s]
+
+        Return:
+            SimulatedObservations : simulated observation data
+        """
+        if rate <= 0 or length <= 0:
+            raise ConfigError(f"The simulation rate and length must be positive, got rate {rate} and length {length}")
+        rng = np.random.default_rng(self.seed)
+        c = Constant.SPEED_OF_LIGHT
+        gamma = (Constant.L1_FREQ / Constant.L2_FREQ) ** 2
+        wavelengths = np.array([Constant.L1_WAVELENGTH, Constant.L2_WAVELENGTH])
+
+        t0 = first_epoch - self.orbits.reference_epoch
+        gps_seconds = self.orbits.reference_epoch.seconds
+        DOY = first_epoch.to_DOY()
+        epochs_offset = np.arange(0, length, rate, dtype=float)
+        n_sats = len(self.orbits.satellites)
+
+        # receiver clock, and the multipath, ambiguities and cycle slips of each satellite and frequency
+        dt_receiver, drift_receiver = self._receiver_clock(epochs_offset, rng)
+        mp_period = rng.uniform(*MULTIPATH_PERIODS, (n_sats, 2))
+        mp_phase = rng.uniform(0, 2 * np.pi, (n_sats, 2))
+        ambiguities = rng.integers(-1000, 1000, (n_sats, 2))
+        slips = [[self._cycle_slips(length, rng) for _ in range(2)] for _ in range(n_sats)]
+
+        output = []
+        for start in range(0, len(epochs_offset), self.chunk_size):
+            t = epochs_offset[start:start + self.chunk_size]
+
+            # rows: one per epoch and satellite, with orbit data
+            epoch_rows = np.repeat(np.arange(len(t)), n_sats)
+            sat_rows = np.tile(np.arange(n_sats), len(t))
+            handle = self.orbits.select(sat_rows, t0 + t[epoch_rows])
+            valid = handle >= 0
+            epoch_rows, sat_rows, handle = epoch_rows[valid], sat_rows[valid], handle[valid]
+
+            # receiver states and local frames (once per epoch)
+            rx_position, rx_velocity = self.receiver.get_states(t)
+            lat, long, h = Cartesian2GeodeticArray(*rx_position.T)
+            R = matrix_ECEF2ENU_array(lat, long)
+
+            # satellite states at the nominal transit time (in the orbit source time), and light time iterations
+            t_reception = t0 + t[epoch_rows] - dt_receiver[start + epoch_rows]
+            p_sat, v_sat, dt_sat, drift_sat = self.orbits.compute(handle, t_reception - NOMINAL_TRANSIT)
+            receiver_position = rx_position[epoch_rows]
+            tau = np.full(len(handle), NOMINAL_TRANSIT)
+            for _ in range(3):
+                los = rotate_to_reception_frame(p_sat + v_sat * (NOMINAL_TRANSIT - tau)[:, None], tau) - \
+                    receiver_position
+                rho = np.linalg.norm(los, axis=1)
+                tau = rho / c
+
+            # visibility
+            enu = np.einsum("ijk,ik->ij", R[epoch_rows], los)
+            with np.errstate(invalid="ignore"):
+                el = np.arcsin(enu[:, 2] / rho)
+                visible = (el >= self.elevation_mask) & np.isfinite(dt_sat)
+            rows = np.flatnonzero(visible)
+            epoch_rows, sat_rows, handle, el = epoch_rows[rows], sat_rows[rows], handle[rows], el[rows]
+            los, rho, tau, t_reception = los[rows], rho[rows], tau[rows], t_reception[rows]
+            az = np.arctan2(enu[rows, 0], enu[rows, 1])
+
+            drift_sat = drift_sat[rows]
+            dt_sat = dt_sat[rows] + drift_sat * (NOMINAL_TRANSIT - tau)
+            v_sat = rotate_to_reception_frame(v_sat[rows], tau)
+            range_rate = np.einsum("ij,ij->i", v_sat - rx_velocity[epoch_rows], los) / rho
+            TGD = self.orbits.group_delay(handle)
+
+            # atmosphere
+            n = len(rows)
+            iono = np.zeros(n)
+            if self.iono_parameters is not None:
+                iono = ionosphereCorrectionArray(lat[epoch_rows], long[epoch_rows], el, az, *self.iono_parameters,
+                                                 gps_seconds + t_reception, f1)
+            tropo = troposphericCorrectionArray(h[epoch_rows], lat[epoch_rows], DOY, el) if self.troposphere else 0.0
+
+            # multipath and cycle slips
+            t_rows = t[epoch_rows]
+            decay = self.multipath_amplitude * np.exp(-el / (MULTIPATH_ELEVATION_SCALE * Constant.DEG2RAD))
+            multipath = decay[:, None] * np.sin(2 * np.pi * t_rows[:, None] / mp_period[sat_rows] + mp_phase[sat_rows])
+            cycles, lli = self._get_cycle_slips(slips, sat_rows, t_rows, rate)
+
+            # observables
+            epoch = start + epoch_rows
+            base = rho + c * (dt_receiver[epoch] - dt_sat) + tropo
+            range_rate = range_rate + c * (drift_receiver[epoch] - drift_sat)
+            delays = np.column_stack((c * TGD + iono, gamma * (c * TGD + iono)))
+            phase_iono = np.column_stack((iono, gamma * iono))
+
+            code = base[:, None] + delays + multipath + rng.normal(0, self.code_sigma, (n, 2))
+            phase = (base[:, None] - phase_iono + MULTIPATH_PHASE_RATIO * multipath +
+                     rng.normal(0, self.phase_sigma, (n, 2))) / wavelengths + ambiguities[sat_rows] + cycles
+            doppler = -(range_rate[:, None] + rng.normal(0, self.doppler_sigma, (n, 2))) / wavelengths
+            snr = 30 + 20 * np.sin(el)
+
+            output.append((epoch, sat_rows, np.column_stack((code[:, 0], phase[:, 0], doppler[:, 0], snr,
+                                                             code[:, 1], phase[:, 1], doppler[:, 1], snr - 5)), lli))
+
+        epoch_rows, sat_rows, values, lli = (np.concatenate(arrays) for arrays in zip(*output))
+        return SimulatedObservations(first_epoch, epochs_offset, self.orbits.satellites, epoch_rows, sat_rows,
+                                     {code: values[:, i] for i, code in enumerate(OBS_TYPES)},
+                                     {"L1C": lli[:, 0], "L2W": lli[:, 1]}, self.receiver.positions[0])
+
+    def _receiver_clock(self, t, rng):
+        """Receiver clock bias [s] and drift [s/s] at each epoch (random walks from the initial bias and drift)"""
+        dt = np.diff(t, prepend=t[0])
+        drift = self.clock_drift + np.cumsum(rng.normal(0, 1, len(t)) * np.sqrt(self.clock_drift_psd * dt))
+        previous_drift = np.concatenate(([self.clock_drift], drift[:-1]))
+        bias = self.clock_bias + np.cumsum(previous_drift * dt +
+                                           rng.normal(0, 1, len(t)) * np.sqrt(self.clock_bias_psd * dt))
+        return bias, drift
+
+    def _cycle_slips(self, length, rng):
+        """Random cycle slips of a satellite and frequency: times [s] and cumulative slips [cycles]"""
+        n = rng.poisson(self.cycle_slip_rate * length / 3600)
+        times = np.sort(rng.uniform(0, length, n))
+        jumps = rng.integers(1, MAX_CYCLE_SLIP + 1, n) * rng.choice([-1, 1], n)
+        return times, np.concatenate(([0], np.cumsum(jumps)))
+
+    @staticmethod
+    def _get_cycle_slips(slips, sat_rows, t, rate):
+        """Cumulative cycle slips (n x 2) and loss of lock indicators (slips since the previous epoch) of each row"""
+        cycles = np.zeros((len(t), 2))
+        lli = np.zeros((len(t), 2), dtype=bool)
+        for sat in np.unique(sat_rows):
+            rows = np.flatnonzero(sat_rows == sat)
+            for j, (times, cumulative) in enumerate(slips[sat]):
+                if len(times) == 0:
+                    continue
+                k = np.searchsorted(times, t[rows], side="right")
+                cycles[rows, j] = cumulative[k]
+                lli[rows, j] = k != np.searchsorted(times, t[rows] - rate, side="right")
+        return cycles, lli
@@ -0,0 +1,162 @@
+import numpy as np
+
+from ..algorithms.gnss.gnss_solver.observation_models.ephemeride_propagator import EphemeridePropagator, \
+    correct_gps_week_crossovers_array
+from ..math_utils.Constants import Constant
+from ..utils.errors import ConfigError, TimeSeriesError
+
+"""
+Orbit sources of the observation simulator. Both sources provide, for a batch of (satellite, time) rows, the satellite
+positions and velocities in the ECEF frame at the given (transmission) times, and the satellite clock offsets and
+drifts (including the relativistic correction):
+    * BroadcastOrbitSource : broadcast ephemerides and clock polynomials (the model of the PVT solver), using the
+        navigation message of each satellite closest to (and before) the reception time, as in
+        NavigationDataMap.get_sat_data_for_epoch
+    * SP3OrbitSource : precise orbits and clocks (SP3Data), with the group delays (TGD) of the broadcast navigation
+        messages when available
+
+The times are given in seconds from the reference epoch of the source.
+"""
+
+
+class BroadcastOrbitSource:
+    """Orbit source with the broadcast ephemerides of the GPS satellites in a NavigationDataMap"""
+
+    def __init__(self, nav_data, reference_epoch):
+        """
+        Args:
+            nav_data (src.data_types.containers.NavigationData.NavigationDataMap) : navigation data
+            reference_epoch (src.data_types.basics.Epoch.Epoch) : reference epoch of the times
+        """
+        self.reference_epoch = reference_epoch
+        self.satellites = sorted((sat for sat in nav_data.get_data() if sat.sat_system.is_GPS()), key=str)
+        if len(self.satellites) == 0:
+            raise ConfigError(f"No GPS navigation data available for the simulation")
+        self.iono_parameters = get_iono_parameters(nav_data, reference_epoch)
+
+        # navigation messages of all satellites, sorted by satellite and epoch
+        messages, message_sat, message_offset = [], [], []
+        for i, sat in enumerate(self.satellites):
+            series = nav_data.get_sat_data(sat)
+            for epoch in series.get_all_epochs():
+                messages.append(series.get_data_for_epoch(epoch))
+                message_sat.append(i)
+                message_offset.append(epoch - reference_epoch)
+        message_sat = np.array(message_sat)
+        message_offset = np.array(message_offset, dtype=float)
+        self._sat_messages = [(np.flatnonzero(message_sat == i), message_offset[message_sat == i])
+                              for i in range(len(self.satellites))]
+
+        self._elements = EphemeridePropagator.get_elements_array(messages)
+        self._toe_offset = np.array([message.toe - reference_epoch for message in messages], dtype=float)
+        self._toc_offset = np.array([message.toc - reference_epoch for message in messages], dtype=float)
+        self._clock = np.array([[message.af0, message.af1, message.af2] for message in messages], dtype=float)
+        self._TGD = np.array([message.TGD for message in messages], dtype=float)
+
+    def select(self, sat_indexes, t):
+        """
+        Selects the navigation message of each row
+
+        Args:
+            sat_indexes (numpy.ndarray) : satellites (indexes in `satellites`) (n)
+            t (numpy.ndarray) : reception times (n) [s]
+
+        Return:
+            numpy.ndarray : navigation message of each row (n), -1 if there is no navigation message before t
+        """
+        handle = np.full(len(t), -1)
+        for i, (indexes, offsets) in enumerate(self._sat_messages):
+            rows = np.flatnonzero(sat_indexes == i)
+            k = np.searchsorted(offsets, t[rows], side="right") - 1
+            handle[rows[k >= 0]] = indexes[k[k >= 0]]
+        return handle
+
+    def compute(self, handle, t):
+        """
+        Args:
+            handle (numpy.ndarray) : navigation messages (see `select`) (n)
+            t (numpy.ndarray) : transmission times (n) [s]
+
+        Return:
+            tuple [numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray] : satellite positions (nx3) [m] and
+                velocities (nx3) [m/s] in the ECEF frame at the transmission times, clock offsets (n) [s] and clock
+                drifts (n) [s/s]
+        """
+        elements = {name: array[handle] for name, array in self._elements.items()}
+        position, velocity, rel, rel_rate = EphemeridePropagator.propagate_states(elements,
+                                                                                  t - self._toe_offset[handle], True)
+
+        af0, af1, af2 = self._clock[handle].T
+        dt = correct_gps_week_crossovers_array(t - self._toc_offset[handle])
+        return position, velocity, af0 + af1 * dt + af2 * dt * dt + rel, af1 + 2 * af2 * dt + rel_rate
+
+    def group_delay(self, handle):
+        """Returns the group delay (TGD) of each row [s]"""
+        return self._TGD[handle]
+
+
+class SP3OrbitSource:
+    """Orbit source with the precise orbits and clocks of the GPS satellites in a SP3Data container"""
+
+    def __init__(self, sp3_data, reference_epoch, nav_data=None):
+        """
+        Args:
+            sp3_data (src.data_types.containers.SP3Data.SP3Data) : precise orbits and clocks
+            reference_epoch (src.data_types.basics.Epoch.Epoch) : reference epoch of the times
+            nav_data (src.data_types.containers.NavigationData.NavigationDataMap) : navigation data, optional. Provides
+                the group delays (TGD) and the ionosphere parameters. Without it, the group delays are zero
+        """
+        self.reference_epoch = reference_epoch
+        self.sp3_data = sp3_data
+        self.satellites = [sat for sat in sp3_data.get_satellites() if sat.sat_system.is_GPS()]
+        if len(self.satellites) == 0:
+            raise ConfigError(f"No GPS precise orbits available for the simulation")
+        self._sp3_indexes = np.array([sp3_data.get_satellites().index(sat) for sat in self.satellites])
+
+        self.iono_parameters = None
+        self._TGD = np.zeros(len(self.satellites))
+        if nav_data is not None:
+            self.iono_parameters = get_iono_parameters(nav_data, reference_epoch)
+            for i, sat in enumerate(self.satellites):
+                if sat in nav_data.get_data():
+                    try:
+                        self._TGD[i] = nav_data.get_sat_data_for_epoch(sat, reference_epoch).TGD
+                    except TimeSeriesError:
+                        # reference epoch before the first navigation message of the satellite
+                        series = nav_data.get_sat_data(sat)
+                        self._TGD[i] = series.get_data_for_epoch(series.get_all_epochs()[0]).TGD
+
+    def select(self, sat_indexes, t):
+        """Returns the satellite of each row (rows out of the time span of the data are removed by `compute`)"""
+        return sat_indexes
+
+    def compute(self, handle, t):
+        """
+        Same as `BroadcastOrbitSource.compute`. The relativistic clock correction (not included in the SP3 clocks) is
+        -2 r.v / c^2. Rows without precise orbits or clocks are NaN
+        """
+        position, velocity, clock, drift = self.sp3_data.interpolate(self.reference_epoch, self._sp3_indexes[handle],
+                                                                     t)
+        c2 = Constant.SPEED_OF_LIGHT ** 2
+        rel = -2 * np.einsum("ij,ij->i", position, velocity) / c2
+        # the rate of the relativistic correction is -2 (v.v + r.a) / c^2, with the central gravity acceleration
+        r = np.linalg.norm(position, axis=1)
+        rel_rate = -2 * (np.einsum("ij,ij->i", velocity, velocity) - Constant.MU / r) / c2
+        return position, velocity, clock + rel, drift + rel_rate
+
+    def group_delay(self, handle):
+        """Returns the group delay (TGD) of each row [s]"""
+        return self._TGD[handle]
+
+
+def get_iono_parameters(nav_data, epoch):
+    """
+    Return:
+        tuple [list, list] or None : Klobuchar alfa and beta parameters of the navigation header valid at the epoch
+                                     (None if not available)
+    """
+    try:
+        header = nav_data.get_header_data(epoch)
+        return header.iono_corrections["GPSA"], header.iono_corrections["GPSB"]
+    except Exception:
+        return None
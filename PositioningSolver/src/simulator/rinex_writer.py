@@ -0,0 +1,158 @@
+import datetime
+
+import numpy as np
+
+"""
+Writer of RINEX 3.03 observation files. The data records are formatted in vectorized form: each value is converted to
+the characters of its fixed width field (F14.3) with integer arithmetic over numpy arrays, and the records are placed
+in a byte buffer together with the epoch lines, so that no value is formatted in python.
+"""
+
+FIELD_WIDTH = 14
+FIELD_DECIMALS = 3
+EPOCH_LINE_WIDTH = 36  # "> yyyy mm dd hh mm ss.sssssss  f nnn" and new line
+MARKER_NAME = "SIMU"
+
+
+def write_rinex_obs(file_path, observations, chunk_size=3600):
+    """
+    Writes simulated observation data to a RINEX 3.03 observation file. The pseudoranges and carrier phases have the
+    signal strength indicator of the S observable of the same frequency, and the carrier phases the loss of lock
+    indicators of the simulation
+
+    Args:
+        file_path (str) : path of the RINEX observation file
+        observations (src.simulator.observation_simulator.SimulatedObservations) : simulated observation data
+        chunk_size (int) : number of epochs written at once
+
+    Return:
+        str : path of the written file
+    """
+    codes = list(observations.observables.keys())
+    epochs = observations.get_epochs()
+    sat_names = np.frombuffer("".join(str(sat) for sat in observations.satellites).encode(),
+                              dtype=np.uint8).reshape(-1, 3)
+
+    with open(file_path, "wb") as f:
+        f.write(_header(observations, codes, epochs).encode())
+
+        bounds = np.searchsorted(observations.epoch_rows, np.arange(len(epochs) + 1))
+        for start in range(0, len(epochs), chunk_size):
+            stop = min(start + chunk_size, len(epochs))
+            rows = slice(bounds[start], bounds[stop])
+            counts = np.diff(bounds[start:stop + 1])
+
+            records = _format_records(observations, codes, rows, sat_names)
+            epoch_lines = _epoch_lines(epochs[start:stop], counts)
+
+            # epoch line of each epoch followed by its records
+            width = records.shape[1]
+            epoch_rows = observations.epoch_rows[rows] - start
+            buffer = np.empty((stop - start) * EPOCH_LINE_WIDTH + records.size, dtype=np.uint8)
+            epoch_starts = np.arange(stop - start) * EPOCH_LINE_WIDTH + (bounds[start:stop] - bounds[start]) * width
+            buffer[epoch_starts[:, None] + np.arange(EPOCH_LINE_WIDTH)] = epoch_lines
+            record_starts = (epoch_rows + 1) * EPOCH_LINE_WIDTH + np.arange(len(epoch_rows)) * width
+            buffer[record_starts[:, None] + np.arange(width)] = records
+            f.write(buffer.tobytes())
+
+    return file_path
+
+
+def format_fixed(values, width=FIELD_WIDTH, decimals=FIELD_DECIMALS):
+    """
+    Formats values as right aligned fixed point fields (e.g. F14.3), as an array of characters
+
+    Args:
+        values (numpy.ndarray) : values (n)
+        width (int) : width of the fields
+        decimals (int) : number of decimal places
+
+    Return:
+        numpy.ndarray : characters of the fields (n x width, uint8). Non finite values are blank
+
+    Raises:
+        ValueError : if a value does not fit in the field width
+    """
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    scaled = np.round(np.abs(np.where(finite, values, 0.0)) * 10 ** decimals).astype(np.int64)
+    integer = scaled // 10 ** decimals
+
+    # number of integer digits (at least one) and sign
+    digits = np.ones(len(values), dtype=int)
+    rest = integer // 10
+    while np.any(rest):
+        digits += rest > 0
+        rest //= 10
+    negative = finite & (values < 0) & (scaled > 0)
+    if np.any(digits + decimals + 1 + negative > width):
+        raise ValueError(f"Values do not fit in fields of width {width} with {decimals} decimals")
+
+    out = np.full((len(values), width), ord(" "), dtype=np.uint8)
+    for k in range(decimals):
+        out[:, width - 1 - k] = ord("0") + scaled % 10
+        scaled //= 10
+    out[:, width - 1 - decimals] = ord(".")
+    for k in range(digits.max(initial=1)):
+        rows = digits > k
+        out[rows, width - 2 - decimals - k] = ord("0") + scaled[rows] % 10
+        scaled //= 10
+    out[negative, width - 2 - decimals - digits[negative]] = ord("-")
+    out[~finite] = ord(" ")
+    return out
+
+
+def _format_records(observations, codes, rows, sat_names):
+    """Data records (satellite and one 16 character field per observable) of a slice of rows, as characters"""
+    n = rows.stop - rows.start
+    fields = [sat_names[observations.sat_rows[rows]]]
+
+    for code in codes:
+        indicators = np.full((n, 2), ord(" "), dtype=np.uint8)
+        if code in observations.lli:
+            indicators[observations.lli[code][rows], 0] = ord("1")
+        snr_code = "S" + code[1:]
+        if code[0] in "CL" and snr_code in observations.observables:
+            # signal strength indicator (RINEX 3 mapping of the carrier to noise density ratio in dB-Hz)
+            snr = observations.observables[snr_code][rows]
+            indicators[:, 1] = ord("0") + np.clip(np.floor(snr / 6), 1, 9).astype(np.uint8)
+        fields.extend((format_fixed(observations.observables[code][rows]), indicators))
+
+    fields.append(np.full((n, 1), ord("\n"), dtype=np.uint8))
+    return np.hstack(fields)
+
+
+def _epoch_lines(epochs, counts):
+    """Epoch lines (epoch flag 0 and number of satellites), as characters"""
+    lines = []
+    for epoch, count in zip(epochs, counts):
+        date = epoch.to_datetime()
+        seconds = date.second + date.microsecond * 1E-6
+        lines.append(f"> {date.year:4d} {date.month:02d} {date.day:02d} {date.hour:02d} {date.minute:02d}"
+                     f"{seconds:11.7f}  0{count:3d}\n")
+    return np.frombuffer("".join(lines).encode(), dtype=np.uint8).reshape(-1, EPOCH_LINE_WIDTH)
+
+
+def _header(observations, codes, epochs):
+    def time_line(epoch, label):
+        date = epoch.to_datetime()
+        seconds = date.second + date.microsecond * 1E-6
+        return f"  {date.year:4d}    {date.month:2d}    {date.day:2d}    {date.hour:2d}    {date.minute:2d}" \
+               f"   {seconds:10.7f}     GPS         {label}"
+
+    position = observations.receiver_position
+    interval = observations.epochs_offset[1] - observations.epochs_offset[0] if len(epochs) > 1 else 0.0
+    now = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d %H%M%S")
+    lines = [
+        f"{3.03:9.2f}           OBSERVATION DATA    G                   RINEX VERSION / TYPE",
+        f"{'PositioningSolver':20s}{'simulator':20s}{now} UTC PGM / RUN BY / DATE",
+        f"{MARKER_NAME:60s}MARKER NAME",
+        f"{position[0]:14.4f}{position[1]:14.4f}{position[2]:14.4f}                  APPROX POSITION XYZ",
+        f"G{len(codes):5d}" + "".join(" " + code for code in codes) + " " * (54 - 4 * len(codes)) +
+        "SYS / # / OBS TYPES",
+        f"{interval:10.3f}                                                  INTERVAL",
+        time_line(epochs[0], "TIME OF FIRST OBS"),
+        time_line(epochs[-1], "TIME OF LAST OBS"),
+        " " * 60 + "END OF HEADER"
+    ]
+    return "\n".join(lines) + "\n"
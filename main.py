@@ -8,6 +8,8 @@ def main():
         print("USAGES:")
         print("\t./main.py algorithm_id <path_to_config_file.json>    -> Simple Run")
         print("\t./main.py algorithm_id <path_to_config_file1.json> <path_to_config_file.json2> ...   -> Multiple Runs")
+        print("\t./main.py --resume algorithm_id <path_to_config_file.json>    -> Resume an interrupted run from its "
+              "last checkpoint")
 
         print("Example:")
         print("\t ./main.py 0 ./workspace/outputs_gnss/gnss_1/spp_1c/config.json ./workspace/outputs_gnss/gnss_1/spp_2w/config.json")
@@ -20,11 +22,13 @@ def main():
         exit()
 
     # fetch argument
-    algorithm_id = int(sys.argv[1])
-    path_to_config_files = sys.argv[2:]
+    resume = "--resume" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--resume"]
+    algorithm_id = int(args[0])
+    path_to_config_files = args[1:]
 
     for config_file in path_to_config_files:
-        PositioningSolver(algorithm_id, config_file)
+        PositioningSolver(algorithm_id, config_file, resume=resume)
 
 
 